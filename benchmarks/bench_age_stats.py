@@ -0,0 +1,35 @@
+""" Age statistics of a ClientRtBuffer: the former implementation (statistics.mean and statistics.stdev over a
+deque of the last ages) versus runningstats.RunningStatistics. Measures adding one age and reading the statistics,
+for different window sizes.
+
+Run with "python -m benchmarks.bench_age_stats" from the repository root (src in PYTHONPATH).
+"""
+import random
+from collections import deque
+from statistics import mean, stdev
+
+from sdc11073.runningstats import RunningStatistics
+from .utils import print_result
+from .utils import time_per_call
+
+
+def main(windows=(100, 1000, 10000)):
+    rnd = random.Random(0)
+    ages = [rnd.uniform(0.0, 0.3) for _ in range(1000)]
+    for window in windows:
+        age_list = deque(ages * (window // len(ages) + 1), maxlen=window)
+        stats = RunningStatistics(window)
+        for age in age_list:
+            stats.add(age)
+        print_result('window {:5d}: add, former deque'.format(window), time_per_call(lambda: age_list.append(0.1)))
+        print_result('window {:5d}: add, RunningStatistics'.format(window), time_per_call(lambda: stats.add(0.1)))
+        print_result('window {:5d}: mean and stdev, statistics module'.format(window),
+                     time_per_call(lambda: (mean(age_list), stdev(age_list)), number=10))
+        print_result('window {:5d}: mean and stdev, RunningStatistics'.format(window),
+                     time_per_call(lambda: (stats.mean, stats.stdev)))
+        print_result('window {:5d}: 95th percentile, RunningStatistics'.format(window),
+                     time_per_call(lambda: stats.percentile(95), number=100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+""" Compares the mapping of ApplyAnnotations to the samples of a RealTimeSampleArrayMetricState on the client:
+the former ClientRtBuffer.mkRtSampleContainers (every sample is compared with every ApplyAnnotation) versus
+the current implementation (ApplyAnnotations are grouped by sample index in one pass).
+
+Run with "python -m benchmarks.bench_annotation_mapping" from the repository root (src in PYTHONPATH).
+"""
+from sdc11073 import namespaces
+from sdc11073 import pmtypes
+from sdc11073.mdib import descriptorcontainers
+from sdc11073.mdib import mdibbase
+from sdc11073.mdib import statecontainers
+from sdc11073.mdib.clientmdib import ClientRtBuffer
+from .utils import time_per_call
+
+
+def former_mk_rt_sample_containers(rt_buffer, state):
+    metric_value = state.metricValue
+    observation_time = metric_value.DeterminationTime
+    annotations = metric_value.Annotations
+    apply_annotations = metric_value.ApplyAnnotations
+    rt_sample_containers = []
+    for i, sample in enumerate(metric_value.Samples):
+        applied_annotations = []
+        for aa in apply_annotations:
+            if aa.SampleIndex == i:
+                applied_annotations.append(annotations[aa.AnnotationIndex])
+        t = observation_time + i * rt_buffer.sample_period
+        rt_sample_containers.append(mdibbase.RtSampleContainer(sample, t, metric_value.Validity, applied_annotations))
+    return rt_sample_containers
+
+
+def main(sample_count=500, annotation_counts=(0, 10, 100)):
+    nsmapper = namespaces.DocNamespaceHelper()
+    descriptor = descriptorcontainers.RealTimeSampleArrayMetricDescriptorContainer(
+        nsmapper=nsmapper, nodeName=namespaces.domTag('Metric'), handle='ecg', parentHandle='channel')
+    rt_buffer = ClientRtBuffer(sample_period=0.002, max_samples=sample_count * 10)
+    for annotation_count in annotation_counts:
+        state = statecontainers.RealTimeSampleArrayMetricStateContainer(nsmapper, descriptor)
+        state.mkMetricValue()
+        state.metricValue.Samples = [float(i % 100) for i in range(sample_count)]
+        state.metricValue.DeterminationTime = 1000.0
+        state.metricValue.Annotations = [pmtypes.Annotation(pmtypes.CodedValue('beat')),
+                                         pmtypes.Annotation(pmtypes.CodedValue('pace'))]
+        state.metricValue.ApplyAnnotations = [pmtypes.ApplyAnnotation(i % 2, (i * 37) % sample_count)
+                                              for i in range(annotation_count)]
+        tests = (('former mkRtSampleContainers', lambda: former_mk_rt_sample_containers(rt_buffer, state)),
+                 ('mkRtSampleContainers', lambda: rt_buffer.mkRtSampleContainers(state)),
+                 ('addRealtimeSampleArray', lambda: rt_buffer.addRealtimeSampleArray(state)))
+        for name, func in tests:
+            secs = time_per_call(func, number=100)
+            print('{:<30s} {} samples, {:3d} annotations: {:8.1f} us'.format(
+                name, sample_count, annotation_count, secs * 1e6))
+
+
+if __name__ == '__main__':
+    main()
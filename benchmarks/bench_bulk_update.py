@@ -0,0 +1,50 @@
+""" Compares the throughput of updating many metric values with a getMetricState call per handle versus
+DeviceMdibContainer.update_metric_values. Both variants commit one transaction (one EpisodicMetricReport).
+
+Run with "python -m benchmarks.bench_bulk_update" from the repository root (src in PYTHONPATH).
+"""
+import itertools
+
+from sdc11073.namespaces import domTag
+from .utils import mk_large_device_mdib, time_per_call
+
+
+class _ReportSink(object):
+    """ Replaces the sdc device, so that the report handling is part of the measured time."""
+
+    def _send(self, *args, **kwargs):
+        pass
+
+    sendDescriptorUpdates = sendMetricStateUpdates = sendAlertStateUpdates = sendComponentStateUpdates = _send
+    sendContextStateUpdates = sendOperationalStateUpdates = sendRealtimeSamplesStateUpdates = _send
+
+
+def main(metric_counts=(10, 100, 1000), number=20):
+    mdib = mk_large_device_mdib(max(metric_counts))
+    mdib.setSdcDevice(_ReportSink())
+    all_handles = [d.handle for d in mdib.descriptions.NODETYPE.get(domTag('NumericMetricDescriptor'))]
+    values = itertools.count()
+    for count in metric_counts:
+        handles = all_handles[:count]
+
+        def per_handle():
+            value = next(values)
+            with mdib.mdibUpdateTransaction() as mgr:
+                for handle in handles:
+                    state = mgr.getMetricState(handle)
+                    if state.metricValue is None:
+                        state.mkMetricValue()
+                    state.metricValue.Value = value
+
+        def bulk():
+            value = next(values)
+            mdib.update_metric_values({handle: (value, None, None) for handle in handles})
+
+        for label, func in (('getMetricState per handle', per_handle), ('update_metric_values', bulk)):
+            secs = time_per_call(func, number=number)
+            print('{:<30s} {:5d} metrics: {:10.2f} ms per transaction, {:10.0f} states/s'.format(
+                label, count, secs * 1000, count / secs))
+
+
+if __name__ == '__main__':
+    main()
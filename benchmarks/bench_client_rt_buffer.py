@@ -0,0 +1,79 @@
+""" Compares the former ClientRtBuffer storage (a deque with one RtSampleContainer per sample) with the ring buffer
+of ClientRtBuffer: time to add the samples of one WaveformStream state and memory of a full buffer.
+
+Default scenario: 20 waveforms at 500 Hz, 60 seconds of samples per waveform, 50 samples per state.
+
+Run with "python -m benchmarks.bench_client_rt_buffer" from the repository root (src in PYTHONPATH).
+"""
+import gc
+import math
+import tracemalloc
+from collections import deque
+
+from sdc11073 import namespaces
+from sdc11073 import pmtypes
+from sdc11073.mdib import descriptorcontainers
+from sdc11073.mdib import statecontainers
+from sdc11073.mdib.clientmdib import ClientRtBuffer
+from .utils import time_per_call
+
+
+class _DequeRtBuffer(ClientRtBuffer):
+    """ the former storage: a deque of RtSampleContainer objects"""
+
+    def __init__(self, sample_period, max_samples):
+        super().__init__(sample_period, 1)  # the ring buffer is not used
+        self.deque_data = deque(maxlen=max_samples)
+
+    def add(self, state):
+        self.deque_data.extend(self.mkRtSampleContainers(state))
+
+
+class _RingRtBuffer(ClientRtBuffer):
+    def add(self, state):
+        self.addRealtimeSampleArray(state)
+
+
+def _mk_state(sample_count, sample_period):
+    nsmapper = namespaces.DocNamespaceHelper()
+    descriptor = descriptorcontainers.RealTimeSampleArrayMetricDescriptorContainer(
+        nsmapper=nsmapper, nodeName=namespaces.domTag('Metric'), handle='rtsa', parentHandle='channel')
+    state = statecontainers.RealTimeSampleArrayMetricStateContainer(nsmapper, descriptor)
+    state.mkMetricValue()
+    state.metricValue.Samples = [math.sin(i / 10) for i in range(sample_count)]
+    state.metricValue.DeterminationTime = 1000.0
+    state.metricValue.Validity = pmtypes.MeasurementValidity.VALID
+    state.metricValue.Annotations = [pmtypes.Annotation(pmtypes.CodedValue('beat'))]
+    state.metricValue.ApplyAnnotations = [pmtypes.ApplyAnnotation(0, 3)]
+    return state
+
+
+def _fill(buffer_cls, waveforms, max_samples, state, sample_period):
+    buffers = [buffer_cls(sample_period, max_samples) for _ in range(waveforms)]
+    for buf in buffers:
+        for _ in range(max_samples // len(state.metricValue.Samples)):
+            buf.add(state)
+    return buffers
+
+
+def main(waveforms=20, sample_rate=500, seconds=60, samples_per_state=50):
+    sample_period = 1.0 / sample_rate
+    max_samples = sample_rate * seconds
+    state = _mk_state(samples_per_state, sample_period)
+    for name, buffer_cls in (('deque of RtSampleContainer', _DequeRtBuffer), ('ring buffer', _RingRtBuffer)):
+        buf = buffer_cls(sample_period, max_samples)
+        secs = time_per_call(lambda: buf.add(state), number=2000)
+        print('{:<28s} add {} samples: {:8.1f} us, {:10.0f} samples/s'.format(
+            name, samples_per_state, secs * 1e6, samples_per_state / secs))
+        gc.collect()
+        tracemalloc.start()
+        buffers = _fill(buffer_cls, waveforms, max_samples, state, sample_period)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print('{:<28s} {} waveforms x {} samples: {:.1f} MB'.format(name, waveforms, max_samples, size / 1e6))
+        del buffers
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+""" Measures the cost of one metric transaction per value (a producer that commits every metric on its own) with and
+without transaction coalescing, and counts the mdib versions and metric reports this produces.
+
+Run with "python -m benchmarks.bench_coalescing" from the repository root (src in PYTHONPATH).
+"""
+import itertools
+
+from sdc11073.namespaces import domTag
+from .utils import mk_large_device_mdib, time_per_call, print_result
+
+
+class _ReportCounter(object):
+    """ Replaces the sdc device and counts the reports."""
+
+    def __init__(self):
+        self.count = 0
+
+    def _send(self, *args, **kwargs):
+        self.count += 1
+
+    sendDescriptorUpdates = sendMetricStateUpdates = sendAlertStateUpdates = sendComponentStateUpdates = _send
+    sendContextStateUpdates = sendOperationalStateUpdates = sendRealtimeSamplesStateUpdates = _send
+
+
+def main(metric_count=100, number=5000):
+    mdib = mk_large_device_mdib(metric_count)
+    counter = _ReportCounter()
+    mdib.setSdcDevice(counter)
+    handles = itertools.cycle([d.handle for d in mdib.descriptions.NODETYPE.get(domTag('NumericMetricDescriptor'))])
+    values = itertools.count()
+
+    def commit():
+        with mdib.mdibUpdateTransaction() as mgr:
+            state = mgr.getMetricState(next(handles))
+            if state.metricValue is None:
+                state.mkMetricValue()
+            state.metricValue.Value = next(values)
+
+    for label, window_ms, max_states in (('no coalescing', None, None),
+                                         ('coalescing 20ms', 20, None),
+                                         ('coalescing 20ms, max. 50 states', 20, 50)):
+        mdib.setTransactionCoalescing(window_ms, max_states)
+        counter.count = 0
+        mdib_version = mdib.mdibVersion
+        secs = time_per_call(commit, repeat=1, number=number)
+        mdib.flushTransactions()
+        print_result('one metric per transaction, {}'.format(label), secs)
+        print('    {} transactions: {} mdib versions, {} reports'.format(number, mdib.mdibVersion - mdib_version,
+                                                                       counter.count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+""" Compares resolving descriptors by code with a scan over all descriptors (pmtypes.have_matching_codes for every
+descriptor, like getDescriptorByCode did before the typeCoding index) with the indexed lookups.
+
+Run with "python -m benchmarks.bench_code_lookup" from the repository root (src in PYTHONPATH).
+"""
+from sdc11073 import pmtypes
+from sdc11073.namespaces import domTag
+from .utils import mk_large_device_mdib, time_per_call, print_result
+
+
+def _scan_by_code(mdib, vmd_code, channel_code, metric_code):
+    vmds = mdib.descriptions.NODETYPE.get(domTag('VmdDescriptor'))
+    vmd_handles = [vmd.Handle for vmd in vmds if pmtypes.have_matching_codes(vmd.Type, vmd_code)]
+    channel_handles = [ch.Handle for handle in vmd_handles for ch in mdib.get_children_by_type_match(handle,
+                                                                                                      channel_code)]
+    return [d for handle in channel_handles for d in mdib.get_children_by_type_match(handle, metric_code)]
+
+
+def main(metric_count=2000, code_count=500):
+    mdib = mk_large_device_mdib(metric_count)
+    descriptors = list(mdib.descriptions.objects)
+    # a metric with a unique code (the benchmark metrics are clones with the same code)
+    metric = [d for d in mdib.descriptions.NODETYPE.get(domTag('NumericMetricDescriptor'))
+              if len(mdib.descriptions.coding.get(d.coding)) == 1][0]
+    channel = mdib.descriptions.handle.getOne(metric.parentHandle)
+    vmd = mdib.descriptions.handle.getOne(channel.parentHandle)
+    codes = [pmtypes.CodedValue(d.Type.Code, d.Type.CodingSystem) for d in descriptors if d.Type is not None]
+    codes = (codes * (code_count // len(codes) + 1))[:code_count]
+
+    print_result('scan, vmd/channel/metric', time_per_call(lambda: _scan_by_code(mdib, vmd.Type, channel.Type,
+                                                                                 metric.Type), number=100))
+    print_result('getDescriptorByCode', time_per_call(lambda: mdib.getDescriptorByCode(vmd.Type, channel.Type,
+                                                                                         metric.Type), number=100))
+    print_result('scan, {} codes, {} descriptors'.format(code_count, len(descriptors)),
+                 time_per_call(lambda: [[d for d in descriptors if pmtypes.have_matching_codes(d.Type, c)]
+                                        for c in codes], repeat=1, number=1))
+    print_result('getDescriptorsByCodes, {} codes'.format(code_count),
+                 time_per_call(lambda: mdib.getDescriptorsByCodes(codes), number=10))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+""" Measures the per-state cost of serialization and parsing of state and descriptor containers.
+
+The "legacy" numbers use the former mro walk that was executed for every call of _sortedContainerProperties,
+the other numbers use the precompiled container schema.
+Run with "python -m benchmarks.bench_container_serialization" from the repository root (src in PYTHONPATH).
+"""
+import inspect
+
+from lxml import etree as etree_
+
+from sdc11073.mdib import containerbase
+from sdc11073.namespaces import domTag
+from .utils import mk_device_mdib, time_per_call, print_result
+
+
+def _legacy_sorted_container_properties(self):
+    ret = []
+    for cls in reversed(inspect.getmro(self.__class__)):
+        try:
+            names = cls._props  # pylint:disable=protected-access
+        except AttributeError:
+            continue
+        for name in names:
+            obj = getattr(cls, name)
+            if obj is not None:
+                ret.append((name, obj))
+    return ret
+
+
+def _run(label, mdib, number):
+    state = mdib.states.NODETYPE.get(domTag('NumericMetricState'))[0]
+    descriptor = mdib.descriptions.handle.getOne(state.descriptorHandle)
+    state_node = state.mkStateNode()
+    copied = state.mkCopy()
+    print_result('{} mkStateNode'.format(label), time_per_call(state.mkStateNode, number=number))
+    print_result('{} updateFromNode'.format(label),
+                 time_per_call(lambda: state.updateFromNode(state_node), number=number))
+    print_result('{} updateFromOtherContainer'.format(label),
+                 time_per_call(lambda: copied.updateFromOtherContainer(state), number=number))
+    print_result('{} diff'.format(label), time_per_call(lambda: state.diff(copied), number=number))
+    print_result('{} mkDescriptorNode'.format(label),
+                 time_per_call(lambda: descriptor.mkDescriptorNode(etree_.Element('Parent')), number=number))
+
+
+def main(number=2000):
+    mdib = mk_device_mdib()
+    original = containerbase.ContainerBase._sortedContainerProperties
+    containerbase.ContainerBase._sortedContainerProperties = _legacy_sorted_container_properties
+    try:
+        _run('legacy', mdib, number)
+    finally:
+        containerbase.ContainerBase._sortedContainerProperties = original
+    _run('schema', mdib, number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+""" Throughput of formatting and parsing the Samples attribute of a SampleArrayValue in samples per second:
+one DecimalConverter call per value (former implementation of DecimalListAttributeProperty) versus
+containerproperties.DecimalListCodec.
+
+Run with "python -m benchmarks.bench_decimal_list" from the repository root (src in PYTHONPATH).
+"""
+import math
+
+from sdc11073 import dataconverters
+from sdc11073 import samplebuffer
+from sdc11073.dataconverters import DecimalConverter
+from sdc11073.mdib.containerproperties import DecimalListCodec
+from .utils import time_per_call
+
+
+def _print(name, count, secs):
+    print('{:<50s} {:5d} samples: {:12.0f} samples/s'.format(name, count, count / secs))
+
+
+def main(sample_counts=(50, 500), number=200):
+    codec = DecimalListCodec()
+    fixed_codec = DecimalListCodec(precision=2)
+    for count in sample_counts:
+        values = [math.sin(i / 50) * 150 for i in range(count)]
+        buffer = samplebuffer.mkSampleBuffer(values)
+        for numeric_mode in (None, dataconverters.NUMERIC_FLOAT):
+            with dataconverters.numericMode(numeric_mode):
+                text = codec.format(values)
+                data = text.encode('ascii')
+                tests = (('format, converter per value', lambda: ' '.join([DecimalConverter.toXML(v) for v in values])),
+                         ('format list, codec', lambda: codec.format(values)),
+                         ('format sample buffer, codec', lambda: codec.format(buffer)),
+                         ('parse, converter per value', lambda: [DecimalConverter.toPy(v) for v in text.split()]),
+                         ('parse str, codec', lambda: codec.parse(text)),
+                         ('parse bytes, codec', lambda: codec.parse(data)))
+                for name, func in tests:
+                    _print('{} ({})'.format(name, numeric_mode), count, time_per_call(func, number=number))
+        _print('format list, codec with precision 2', count, time_per_call(lambda: fixed_codec.format(values),
+                                                                            number=number))
+        _print('format sample buffer, codec with precision 2', count,
+               time_per_call(lambda: fixed_codec.format(buffer), number=number))
+
+
+if __name__ == '__main__':
+    main()
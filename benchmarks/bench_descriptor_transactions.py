@@ -0,0 +1,76 @@
+""" Measures one transaction that creates n metric descriptors (and their states) at runtime, like a hot plugged
+module, and one transaction that deletes them again. Scaling should be linear in n.
+"new channel": the metrics are children of a new channel, "existing channel": the metrics are added to a channel
+of the mdib.
+
+Run with "python -m benchmarks.bench_descriptor_transactions" from the repository root (src in PYTHONPATH).
+"""
+import time
+
+from sdc11073 import pmtypes
+from sdc11073.namespaces import domTag
+from .utils import mk_device_mdib
+
+
+class _ReportSink(object):
+    """ Replaces the sdc device, so that the report handling is part of the measured time."""
+
+    def _send(self, *args, **kwargs):
+        pass
+
+    sendDescriptorUpdates = sendMetricStateUpdates = sendAlertStateUpdates = sendComponentStateUpdates = _send
+    sendContextStateUpdates = sendOperationalStateUpdates = sendRealtimeSamplesStateUpdates = _send
+
+
+def _mk_descriptor(mdib, type_name, node_name, handle, parent_handle):
+    cls = mdib.getDescriptorContainerClass(domTag(type_name))
+    descriptor = cls(nsmapper=mdib.nsmapper, nodeName=domTag(node_name), handle=handle, parentHandle=parent_handle)
+    descriptor.Type = pmtypes.CodedValue('12345')
+    return descriptor
+
+
+def _run(mdib, parent_handle, count, new_channel):
+    descriptors = []
+    if new_channel:
+        descriptors.append(_mk_descriptor(mdib, 'ChannelDescriptor', 'Channel', 'hotplug_channel', parent_handle))
+        parent_handle = 'hotplug_channel'
+    for i in range(count):
+        metric = _mk_descriptor(mdib, 'NumericMetricDescriptor', 'Metric', 'hotplug_{}'.format(i), parent_handle)
+        metric.Unit = pmtypes.CodedValue('hector')
+        metric.Resolution = 1
+        descriptors.append(metric)
+    states = [mdib.mkStateContainerFromDescriptor(d) for d in descriptors]
+    start = time.perf_counter()
+    with mdib.mdibUpdateTransaction() as mgr:
+        for descriptor in descriptors:
+            mgr.createDescriptor(descriptor)
+        for state in states:
+            mgr.addState(state)
+    create_secs = time.perf_counter() - start
+    start = time.perf_counter()
+    with mdib.mdibUpdateTransaction() as mgr:
+        if new_channel:
+            mgr.removeDescriptor('hotplug_channel')
+        else:
+            for descriptor in descriptors:
+                mgr.removeDescriptor(descriptor.handle)
+    delete_secs = time.perf_counter() - start
+    return create_secs, delete_secs
+
+
+def main(counts=(100, 1000, 10000)):
+    mdib = mk_device_mdib()
+    mdib.setSdcDevice(_ReportSink())
+    vmd_handle = mdib.descriptions.NODETYPE.get(domTag('VmdDescriptor'))[0].handle
+    channel_handle = mdib.descriptions.NODETYPE.get(domTag('ChannelDescriptor'))[0].handle
+    for label, parent_handle, new_channel in (('new channel', vmd_handle, True),
+                                              ('existing channel', channel_handle, False)):
+        for count in counts:
+            create_secs, delete_secs = _run(mdib, parent_handle, count, new_channel)
+            print('{:<16s} {:6d} metrics: create {:9.1f} ms ({:6.1f} us each), '
+                  'delete {:9.1f} ms ({:6.1f} us each)'.format(label, count, create_secs * 1000,
+                                                               create_secs / count * 1e6, delete_secs * 1000,
+                                                               delete_secs / count * 1e6))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+""" Compares ancestry checks that walk up the parentHandle chain (one handle lookup per level) with the tree index of
+DescriptorsLookup, and measures the subtree enumeration of the Mds.
+
+Run with "python -m benchmarks.bench_descriptor_tree" from the repository root (src in PYTHONPATH).
+"""
+from sdc11073.namespaces import domTag
+from .utils import mk_large_device_mdib, time_per_call, print_result
+
+
+def _walk_up(lookup, handle, node_type):
+    descriptor = lookup.handle.getOne(handle)
+    while descriptor.parentHandle is not None:
+        descriptor = lookup.handle.getOne(descriptor.parentHandle)
+        if descriptor.NODETYPE == node_type:
+            return descriptor
+    return None
+
+
+def main(metric_count=2000):
+    mdib = mk_large_device_mdib(metric_count)
+    lookup = mdib.descriptions
+    mds = lookup.NODETYPE.getOne(domTag('MdsDescriptor'))
+    metric = lookup.NODETYPE.get(domTag('NumericMetricDescriptor'))[-1]
+    vmd_type = domTag('VmdDescriptor')
+    mds_type = domTag('MdsDescriptor')
+
+    print_result('walk up parentHandle, nearest Vmd', time_per_call(lambda: _walk_up(lookup, metric.handle, vmd_type)))
+    print_result('getNearestAncestor, nearest Vmd',
+                 time_per_call(lambda: lookup.getNearestAncestor(metric.handle, vmd_type)))
+    print_result('walk up parentHandle, is descendant of Mds',
+                 time_per_call(lambda: _walk_up(lookup, metric.handle, mds_type) is mds))
+    print_result('isDescendantOf Mds', time_per_call(lambda: lookup.isDescendantOf(metric.handle, mds.handle)))
+    print_result('getAllDescriptorsInSubTree(Mds), {} descriptors'.format(len(lookup.objects)),
+                 time_per_call(lambda: mdib.getAllDescriptorsInSubTree(mds), number=100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+""" Measures the latency of transaction commits while other threads continuously request the complete mdib
+(like GetMdib requests of several consumers).
+
+"locked" builds the complete response while holding the mdibLock (former implementation), "snapshot" only
+collects the containers under the lock and serializes them afterwards.
+Run with "python -m benchmarks.bench_getmdib_lock" from the repository root (src in PYTHONPATH).
+"""
+import threading
+import time
+
+from sdc11073.namespaces import domTag
+from .utils import mk_large_device_mdib
+
+
+def _locked_get_mdib(mdib):
+    with mdib.mdibLock:
+        return mdib._reconstructMdib(addContextStates=True)  # pylint: disable=protected-access
+
+
+def _snapshot_get_mdib(mdib):
+    return mdib.reconstructMdibWithContextStates()
+
+
+def _run(label, mdib, get_mdib, reader_count, commit_count):
+    handle = mdib.descriptions.NODETYPE.get(domTag('NumericMetricDescriptor'))[0].handle
+    running = True
+    get_counts = [0] * reader_count
+
+    def reader(index):
+        while running:
+            get_mdib(mdib)
+            get_counts[index] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(reader_count)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    latencies = []
+    for i in range(commit_count):
+        start = time.perf_counter()
+        with mdib.mdibUpdateTransaction() as mgr:
+            state = mgr.getMetricState(handle)
+            if state.metricValue is None:
+                state.mkMetricValue()
+            state.metricValue.Value = i
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.01)
+    running = False
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    print('{:<10s} readers={} commits={} median={:8.2f} ms  max={:8.2f} ms  get_mdib calls={}'.format(
+        label, reader_count, commit_count, latencies[len(latencies) // 2] * 1000, latencies[-1] * 1000,
+        sum(get_counts)))
+
+
+def main(metric_count=2000, reader_counts=(1, 4), commit_count=50):
+    mdib = mk_large_device_mdib(metric_count)
+    mdib.reconstructMdibWithContextStates()  # create the nodes of the states
+    for reader_count in reader_counts:
+        _run('locked', mdib, _locked_get_mdib, reader_count, commit_count)
+        _run('snapshot', mdib, _snapshot_get_mdib, reader_count, commit_count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+""" Measures the memory that state containers need.
+
+For the common state types, the states of a large mdib are created again from their nodes (like a client does it
+with a GetMdibResponse) and the python memory that these containers allocate is counted with tracemalloc.
+The etree nodes already exist before the measurement, their memory is not part of the per state numbers.
+The second part loads the complete mdib (descriptors and states) and reports the python memory and the growth
+of the resident set size (which also contains the memory of the libxml2 trees).
+
+Run with "python -m benchmarks.bench_memory" from the repository root (src in PYTHONPATH).
+"""
+import gc
+import os
+import tracemalloc
+
+from lxml import etree as etree_
+
+from sdc11073.mdib import DeviceMdibContainer
+from sdc11073.namespaces import domTag, msgTag
+from .utils import mk_large_device_mdib
+
+STATE_TYPES = ('NumericMetricState', 'StringMetricState', 'EnumStringMetricState', 'RealTimeSampleArrayMetricState',
+               'AlertConditionState', 'AlertSignalState', 'AlertSystemState', 'ChannelState', 'VmdState',
+               'SetValueOperationState', 'ActivateOperationState')
+
+
+def _rss_bytes():
+    """ resident set size of this process, only available on linux."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def _traced_bytes(func):
+    """ Calls func and returns (python bytes allocated by func that are still alive, result of func)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        result = func()
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return size, result
+
+
+def _bytes_per_state(mdib):
+    print('{:<35s} {:>8s} {:>14s} {:>14s}'.format('state type', 'count', 'bytes/state', 'bytes/copy'))
+    for type_name in STATE_TYPES:
+        states = mdib.states.NODETYPE.get(domTag(type_name)) or []
+        if not states:
+            continue
+        nodes = [(s.__class__, s.descriptorContainer, s.node) for s in states]
+
+        def mk_states():
+            return [cls(mdib.nsmapper, descriptor, node) for cls, descriptor, node in nodes]
+
+        size, new_states = _traced_bytes(mk_states)
+
+        def mk_copies():
+            # a transaction copy whose state version is incremented
+            copies = [s.mkCopy(copy_node=False) for s in new_states]
+            for s in copies:
+                s.incrementState()
+            return copies
+
+        copy_size, dummy_copies = _traced_bytes(mk_copies)
+        print('{:<35s} {:8d} {:14.0f} {:14.0f}'.format(type_name, len(nodes), size / len(nodes),
+                                                         copy_size / len(nodes)))
+
+
+def _complete_mdib(mdib_string, state_count):
+    gc.collect()
+    rss = _rss_bytes()
+
+    def load():
+        return DeviceMdibContainer.fromString(mdib_string)
+
+    size, mdib = _traced_bytes(load)
+    gc.collect()
+    rss_diff = None if rss is None else _rss_bytes() - rss
+    print('complete mdib with {} descriptors and states: python {:.1f} MB ({:.0f} bytes/state)'.format(
+        state_count, size / 1e6, size / state_count))
+    if rss_diff is not None:
+        print('    resident set size grows by {:.1f} MB ({:.0f} bytes/state)'.format(
+            rss_diff / 1e6, rss_diff / state_count))
+    return mdib
+
+
+def main(metric_count=20000):
+    mdib = mk_large_device_mdib(metric_count)
+    _bytes_per_state(mdib)
+    state_count = len(mdib.states.objects)
+    response_node = etree_.Element(msgTag('GetMdibResponse'), nsmap=mdib.nsmapper.docNssmap)
+    mdib_node, version_group = mdib.reconstructMdib()
+    version_group.update_node(response_node)
+    response_node.append(mdib_node)
+    mdib_string = mdib.nodeToString(response_node)
+    del mdib, response_node, mdib_node
+    _complete_mdib(mdib_string, state_count)
+
+
+if __name__ == '__main__':
+    main()
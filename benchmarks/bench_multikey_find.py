@@ -0,0 +1,36 @@
+""" Compares MultiKeyLookup.find / select on indexed attributes with the full scan of ObjectSelector, which was the
+only implementation before.
+
+Run with "python -m benchmarks.bench_multikey_find" from the repository root (src in PYTHONPATH).
+"""
+from sdc11073 import multikey
+from sdc11073.namespaces import domTag
+from .utils import mk_large_device_mdib, time_per_call, print_result
+
+
+def main(metric_count=2000):
+    mdib = mk_large_device_mdib(metric_count)
+    lookup = mdib.descriptions
+    mds = lookup.NODETYPE.getOne(domTag('MdsDescriptor'))
+    channel = lookup.NODETYPE.get(domTag('ChannelDescriptor'))[0]
+    count = len(lookup.objects)
+
+    print_result('scan, find(parentHandle=channel), {} descriptors'.format(count),
+                 time_per_call(lambda: multikey.ObjectSelector(lookup.objects).find(parentHandle=channel.handle),
+                               number=100))
+    print_result('indexed, find(parentHandle=channel), {} descriptors'.format(count),
+                 time_per_call(lambda: lookup.find(parentHandle=channel.handle), number=100))
+    print_result('scan, find(...).find(...) for the Sco of the Mds',
+                 time_per_call(lambda: multikey.ObjectSelector(lookup.objects).find(
+                     parentHandle=mds.handle).find(nodeName=domTag('Sco')), number=100))
+    print_result('composite index, select(parentHandle=mds, nodeName=Sco)',
+                 time_per_call(lambda: lookup.select(parentHandle=mds.handle, nodeName=domTag('Sco')), number=100))
+    print_result('scan, select(NODETYPE=VmdDescriptor, parentHandle=mds)',
+                 time_per_call(lambda: multikey.ObjectSelector(lookup.objects).select(
+                     NODETYPE=domTag('VmdDescriptor'), parentHandle=mds.handle), number=100))
+    print_result('single indices, select(NODETYPE=VmdDescriptor, parentHandle=mds)',
+                 time_per_call(lambda: lookup.select(NODETYPE=domTag('VmdDescriptor'), parentHandle=mds.handle),
+                               number=100))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+""" Compares replacing states in the states lookup with removeObjectNoLock + addObjectNoLock (former commit path)
+and with swapObjectNoLock, which keeps the index entries of unchanged keys.
+
+Run with "python -m benchmarks.bench_multikey_swap" from the repository root (src in PYTHONPATH).
+"""
+from sdc11073.namespaces import domTag
+from .utils import mk_large_device_mdib, time_per_call, print_result
+
+
+def main(metric_count=2000, counts=(1, 100, 1000)):
+    mdib = mk_large_device_mdib(metric_count)
+    lookup = mdib.states
+    states = lookup.NODETYPE.get(domTag('NumericMetricState'))
+
+    for count in counts:
+        current = list(states[:count])
+        copies = [s.mkCopy(copy_node=False) for s in current]
+
+        def remove_add():
+            for i, (old, new) in enumerate(zip(current, copies)):
+                lookup.removeObjectNoLock(old)
+                lookup.addObjectNoLock(new)
+                current[i], copies[i] = new, old
+
+        def swap():
+            for i, (old, new) in enumerate(zip(current, copies)):
+                lookup.swapObjectNoLock(old, new)
+                current[i], copies[i] = new, old
+
+        number = max(10, 10000 // count)
+        print_result('remove + add, {} of {} states'.format(count, len(lookup.objects)),
+                     time_per_call(remove_add, number=number))
+        print_result('swap, {} of {} states'.format(count, len(lookup.objects)), time_per_call(swap, number=number))
+
+
+if __name__ == '__main__':
+    main()
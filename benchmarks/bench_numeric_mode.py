@@ -0,0 +1,66 @@
+""" Compares the cost of encoding and decoding an EpisodicMetricReport in the numeric modes of an mdib:
+None (DecimalConverter.USE_DECIMAL_TYPE decides, Decimal by default), NUMERIC_DECIMAL and NUMERIC_FLOAT.
+
+Encoding creates the state nodes of all numeric metric states and serializes the report,
+decoding parses the report and creates the state containers from the MetricState nodes.
+(MessageReader.readEpisodicMetricReport copies each state node with its whole document first,
+that cost does not depend on the numeric mode and is not part of the measurement.)
+
+Run with "python -m benchmarks.bench_numeric_mode" from the repository root (src in PYTHONPATH).
+"""
+from decimal import Decimal
+
+from lxml import etree as etree_
+
+from sdc11073.dataconverters import NUMERIC_DECIMAL, NUMERIC_FLOAT
+from sdc11073.mdib import DeviceMdibContainer
+from sdc11073.namespaces import domTag, msgTag
+from .utils import mk_large_device_mdib, time_per_call
+
+
+def main(metric_count=1000, number=20):
+    template = mk_large_device_mdib(metric_count)
+    response_node = etree_.Element(msgTag('GetMdibResponse'), nsmap=template.nsmapper.docNssmap)
+    mdib_node, version_group = template.reconstructMdib()
+    version_group.update_node(response_node)
+    response_node.append(mdib_node)
+    mdib_string = template.nodeToString(response_node)
+
+    for numeric_mode in (None, NUMERIC_DECIMAL, NUMERIC_FLOAT):
+        mdib = DeviceMdibContainer.fromString(mdib_string, numeric_mode=numeric_mode)
+        handles = [d.handle for d in mdib.descriptions.NODETYPE.get(domTag('NumericMetricDescriptor'))]
+        if numeric_mode == NUMERIC_FLOAT:
+            values = {h: (i / 7, None, None) for i, h in enumerate(handles)}
+        else:
+            values = {h: (Decimal(i) / 7, None, None) for i, h in enumerate(handles)}
+        mdib.update_metric_values(values)
+        states = [mdib.states.descriptorHandle.getOne(h) for h in handles]
+
+        def encode():
+            body_node = etree_.Element(msgTag('EpisodicMetricReport'), nsmap=mdib.nsmapper.docNssmap)
+            mdib.mdib_version_group.update_node(body_node)
+            report_part_node = etree_.SubElement(body_node, msgTag('ReportPart'))
+            with mdib.numericContext():
+                for state in states:
+                    report_part_node.append(state.copyStateNode(msgTag('MetricState')))
+            return etree_.tostring(body_node)
+
+        report = encode()
+        descriptors = [s.descriptorContainer for s in states]
+        classes = [s.__class__ for s in states]
+
+        def decode():
+            state_nodes = etree_.fromstring(report).find(msgTag('ReportPart'))
+            with mdib.numericContext():
+                return [cls(mdib.nsmapper, descriptor, node)
+                        for cls, descriptor, node in zip(classes, descriptors, state_nodes)]
+
+        value_type = type(decode()[0].metricValue.Value).__name__
+        for label, func in (('encode', encode), ('decode', decode)):
+            secs = time_per_call(func, number=number)
+            print('{:<8s} {:<8s} ({:<7s}) {:5d} metrics: {:8.2f} ms per report, {:9.0f} states/s'.format(
+                str(numeric_mode), label, value_type, len(states), secs * 1000, len(states) / secs))
+
+
+if __name__ == '__main__':
+    main()
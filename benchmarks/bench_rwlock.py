@@ -0,0 +1,73 @@
+""" Measures read and commit latency with N reader threads and one committing thread.
+
+Readers collect the states of all metrics like GetMdState does, with a short pause between two requests.
+"exclusive" readers take the write side of the mdibLock (like the former plain lock), "shared" readers take the
+read side and can run in parallel.
+Run with "python -m benchmarks.bench_rwlock" from the repository root (src in PYTHONPATH).
+"""
+import threading
+import time
+
+from sdc11073.namespaces import domTag
+from .utils import mk_large_device_mdib, time_per_call, print_result
+
+
+def _exclusive_read(mdib, handles):
+    with mdib.mdibLock:
+        return [mdib.states.descriptorHandle.getOne(h) for h in handles]
+
+
+def _shared_read(mdib, handles):
+    with mdib.mdibLock.read_lock:
+        return [mdib.states.descriptorHandle.getOne(h) for h in handles]
+
+
+def _run(label, mdib, handles, read_func, reader_count, commit_count):
+    running = True
+    read_latencies = []
+
+    def reader():
+        while running:
+            start = time.perf_counter()
+            read_func(mdib, handles)
+            read_latencies.append(time.perf_counter() - start)
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=reader, daemon=True) for _ in range(reader_count)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    latencies = []
+    for i in range(commit_count):
+        start = time.perf_counter()
+        with mdib.mdibUpdateTransaction() as mgr:
+            state = mgr.getMetricState(handles[0])
+            if state.metricValue is None:
+                state.mkMetricValue()
+            state.metricValue.Value = i
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.005)
+    running = False
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    read_latencies.sort()
+    print('{:<10s} readers={} commit median={:7.2f} ms max={:7.2f} ms | read median={:7.2f} ms max={:7.2f} ms'.format(
+        label, reader_count, latencies[len(latencies) // 2] * 1000, latencies[-1] * 1000,
+        read_latencies[len(read_latencies) // 2] * 1000, read_latencies[-1] * 1000))
+
+
+def main(metric_count=500, reader_counts=(1, 4, 8), commit_count=50):
+    mdib = mk_large_device_mdib(metric_count)
+    handles = [d.handle for d in mdib.descriptions.NODETYPE.get(domTag('NumericMetricDescriptor'))]
+    # uncontended costs of the lookups
+    print_result('getOne, uncontended', time_per_call(lambda: mdib.states.descriptorHandle.getOne(handles[0])))
+    print_result('GetMdState style read, exclusive', time_per_call(lambda: _exclusive_read(mdib, handles), number=100))
+    print_result('GetMdState style read, shared', time_per_call(lambda: _shared_read(mdib, handles), number=100))
+    for reader_count in reader_counts:
+        _run('exclusive', mdib, handles, _exclusive_read, reader_count, commit_count)
+        _run('shared', mdib, handles, _shared_read, reader_count, commit_count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+""" Compares lists of floats and sample buffers (samplebuffer module) as Samples of a RealTimeSampleArrayMetricState:
+copy of a state (like a transaction does it), serialization of the state node (device) and parsing of the
+state node (client, a list of Decimals in the default numeric mode, a sample buffer in numeric mode NUMERIC_FLOAT).
+
+Run with "python -m benchmarks.bench_sample_buffer" from the repository root (src in PYTHONPATH).
+"""
+import math
+
+from sdc11073 import dataconverters
+from sdc11073 import namespaces
+from sdc11073 import samplebuffer
+from sdc11073.mdib import descriptorcontainers
+from sdc11073.mdib import statecontainers
+from .utils import time_per_call
+
+
+def _print(label, name, count, secs):
+    print('{:<14s} {:<10s} {:4d} samples: {:8.1f} us, {:10.0f} samples/s'.format(
+        label, name, count, secs * 1e6, count / secs))
+
+
+def main(sample_counts=(50, 500), number=200):
+    nsmapper = namespaces.DocNamespaceHelper()
+    descriptor = descriptorcontainers.RealTimeSampleArrayMetricDescriptorContainer(
+        nsmapper=nsmapper, nodeName=namespaces.domTag('Metric'), handle='rtsa', parentHandle='channel')
+    print('sample buffer type: {}'.format(type(samplebuffer.mkSampleBuffer()).__name__))
+    for count in sample_counts:
+        values = [math.sin(i / 50) * 100 for i in range(count)]
+        for label, samples, numeric_mode in (('list', values, None),
+                                             ('sample buffer', samplebuffer.mkSampleBuffer(values),
+                                              dataconverters.NUMERIC_FLOAT)):
+            state = statecontainers.RealTimeSampleArrayMetricStateContainer(nsmapper, descriptor)
+            state.mkMetricValue()
+            state.metricValue.Samples = samples
+            node = state.mkStateNode()
+
+            def copy_state():
+                return state.mkCopy().metricValue.Samples
+
+            def parse_state():
+                with dataconverters.numericMode(numeric_mode):
+                    return statecontainers.RealTimeSampleArrayMetricStateContainer(nsmapper, descriptor, node)
+
+            for name, func in (('copy', copy_state), ('serialize', state.mkStateNode), ('parse', parse_state)):
+                _print(label, name, count, time_per_call(func, number=number))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+""" Cost of one cycle of the real time sample loop for 64 waveforms with 1 kHz and a 0.1 second cycle
+(100 samples per waveform) with mdib.sharedmemorywaveform: the producer writes a block per channel into the
+SharedRingBuffer, the consumer takes the blocks out and makes the RtSampleArray objects.
+The mdib transaction is not included.
+
+Run with "python -m benchmarks.bench_sharedmemorywaveform" from the repository root (src in PYTHONPATH).
+"""
+import array
+import os
+import shutil
+import tempfile
+
+from sdc11073.mdib.sharedmemorywaveform import SharedRingBuffer
+from sdc11073.mdib.sharedmemorywaveform import _RingChannelReader
+from .utils import print_result
+from .utils import time_per_call
+
+
+def main(channels=64, samples_per_cycle=100):
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, 'ring')
+        producer = SharedRingBuffer(path, channels, 4096, [0.001] * channels)
+        consumer = SharedRingBuffer(path)
+        readers = [_RingChannelReader(consumer, i) for i in range(channels)]
+        block = array.array('d', range(samples_per_cycle))
+
+        def _produce():
+            for channel in range(channels):
+                producer.write(channel, block)
+
+        def _produce_consume():
+            _produce()
+            for reader in readers:
+                reader.getNextSampleArray()
+
+        print_result('{} channels: producer writes, consumer reads a block'.format(channels),
+                     time_per_call(_produce_consume, number=200))
+        consumer.close()
+        producer.close()
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
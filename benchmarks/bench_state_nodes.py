@@ -0,0 +1,47 @@
+""" Measures GetMdib (reconstructMdibWithContextStates) and GetMdState style serialization with the nodes that the
+states keep until they change, compared to creating a new node for every state.
+Run with "python -m benchmarks.bench_state_nodes" from the repository root (src in PYTHONPATH).
+"""
+from sdc11073.namespaces import domTag
+from .utils import mk_large_device_mdib, time_per_call, print_result
+
+
+def main(metric_count=2000, number=10):
+    mdib = mk_large_device_mdib(metric_count)
+    handles = [d.handle for d in mdib.descriptions.NODETYPE.get(domTag('NumericMetricDescriptor'))]
+    states = list(mdib.states.objects)
+
+    def update_nodes():
+        for state in states:
+            state.updateNode()
+
+    def new_nodes_and_get():
+        update_nodes()
+        mdib.reconstructMdibWithContextStates()
+
+    secs = time_per_call(new_nodes_and_get, number=number)
+    print_result('GetMdib, {} metrics, new state nodes'.format(metric_count), secs)
+    secs = time_per_call(mdib.reconstructMdibWithContextStates, number=number)
+    print_result('GetMdib, {} metrics, kept state nodes'.format(metric_count), secs)
+    secs = time_per_call(lambda: [s.mkStateNode() for s in states], number=number)
+    print_result('GetMdState, {} states, new state nodes'.format(len(states)), secs)
+    secs = time_per_call(lambda: [s.copyStateNode() for s in states], number=number)
+    print_result('GetMdState, {} states, kept state nodes'.format(len(states)), secs)
+
+    # one modified state per GetMdib call
+    values = iter(range(100000000))
+
+    def update_and_get():
+        with mdib.mdibUpdateTransaction() as mgr:
+            state = mgr.getMetricState(handles[0])
+            if state.metricValue is None:
+                state.mkMetricValue()
+            state.metricValue.Value = next(values)
+        mdib.reconstructMdibWithContextStates()
+
+    secs = time_per_call(update_and_get, number=number)
+    print_result('transaction + GetMdib, kept state nodes', secs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+""" Measures the commit latency of DeviceMdibContainer transactions versus the number of touched metric states.
+
+The "legacy" numbers use the former mkCopy implementation (shallow copy plus deep copy of the etree node; for states
+that were read from a file this copies the complete document), the other numbers use the copy-on-write copies.
+Run with "python -m benchmarks.bench_transaction_commit" from the repository root (src in PYTHONPATH).
+"""
+import copy
+
+from sdc11073 import xmlparsing
+from sdc11073.mdib import containerbase
+from sdc11073.namespaces import domTag
+from .utils import mk_large_device_mdib, time_per_call, print_result
+
+
+def _legacy_mk_copy(self, copy_node=True):  # pylint: disable=unused-argument
+    # former implementation; transactions and notifications always copied the node
+    copied = copy.copy(self)
+    if self.node is not None:
+        copied.node = xmlparsing.copy_node(self.node)
+    return copied
+
+
+class _ReportSink(object):
+    """ Replaces the sdc device, so that the copies for notifications are part of the measured commit latency."""
+
+    def _send(self, *args, **kwargs):
+        pass
+
+    sendDescriptorUpdates = sendMetricStateUpdates = sendAlertStateUpdates = sendComponentStateUpdates = _send
+    sendContextStateUpdates = sendOperationalStateUpdates = sendRealtimeSamplesStateUpdates = _send
+
+
+def _run(label, mdib, touched_counts, number):
+    handles = [d.handle for d in mdib.descriptions.NODETYPE.get(domTag('NumericMetricDescriptor'))]
+    values = iter(range(100000000))
+    for count in touched_counts:
+        my_handles = handles[:count]
+
+        def commit():
+            value = next(values)
+            with mdib.mdibUpdateTransaction() as mgr:
+                for handle in my_handles:
+                    state = mgr.getMetricState(handle)
+                    if state.metricValue is None:
+                        state.mkMetricValue()
+                    state.metricValue.Value = value
+
+        print_result('{} commit, {} touched states'.format(label, count), time_per_call(commit, number=number))
+
+
+def main(metric_count=2000, touched_counts=(1, 10, 100, 1000, 2000), number=3, legacy_max_touched=100):
+    """
+    :param legacy_max_touched: the legacy implementation copies the complete document for every touched state,
+                               therefore it is only measured up to this number of touched states.
+    """
+    mdib = mk_large_device_mdib(metric_count)
+    mdib.setSdcDevice(_ReportSink())
+    original = containerbase.ContainerBase.mkCopy
+    containerbase.ContainerBase.mkCopy = _legacy_mk_copy
+    try:
+        _run('legacy', mdib, [c for c in touched_counts if c <= legacy_max_touched], number)
+    finally:
+        containerbase.ContainerBase.mkCopy = original
+    _run('copy-on-write', mdib, touched_counts, number)
+
+
+if __name__ == '__main__':
+    main()
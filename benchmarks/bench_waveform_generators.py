@@ -0,0 +1,54 @@
+""" Samples per CPU second of the device side waveform generation: the former implementation (itertools.cycle
+over (value, flag) tuples, one next() per sample, values copied into a sample buffer) versus the block generators
+of sdcdevice.waveforms (period table, slice and wrap, trigger indices per block).
+Each step generates one block and the RtSampleArray for it, like DefaultWaveformSource does in every send loop tick.
+
+Run with "python -m benchmarks.bench_waveform_generators" from the repository root (src in PYTHONPATH).
+"""
+import itertools
+import time
+
+from sdc11073 import pmtypes
+from sdc11073 import samplebuffer
+from sdc11073.mdib.devicewaveform import RtSampleArray
+from sdc11073.sdcdevice import waveforms
+
+
+class _FormerGenerator(object):
+    def __init__(self, values_generator, min_value, max_value, waveformperiod, sampleperiod):
+        self.sampleperiod = sampleperiod
+        values = values_generator(min_value, max_value, int(waveformperiod / sampleperiod))
+        self._generator = itertools.cycle([(v, i == 0) for i, v in enumerate(values)])
+
+    def step(self, count):
+        samples = [next(self._generator) for _ in range(count)]
+        trigger_indices = [i for i, sample in enumerate(samples) if sample[1]]
+        values = samplebuffer.mkSampleBuffer([s[0] for s in samples])
+        return RtSampleArray(0.0, self.sampleperiod, values, pmtypes.ComponentActivation.ON, trigger_indices)
+
+
+class _BlockGenerator(waveforms.SinusGenerator):
+    def step(self, count):
+        values, trigger_indices = self.nextSampleBlock(count)
+        return RtSampleArray(0.0, self.sampleperiod, values, pmtypes.ComponentActivation.ON, trigger_indices)
+
+
+def samples_per_cpu_second(generator, block_size, total_samples):
+    start = time.process_time()
+    for _ in range(total_samples // block_size):
+        generator.step(block_size)
+    return total_samples / (time.process_time() - start)
+
+
+def main(block_sizes=(10, 100, 1000), total_samples=2000000):
+    print('sample buffer type: {}'.format(type(samplebuffer.mkSampleBuffer()).__name__))
+    for block_size in block_sizes:
+        former = _FormerGenerator(waveforms.sinus, -1, 1, 1.0, 0.001)
+        block = _BlockGenerator(-1, 1, 1.0, 0.001)
+        for name, generator in (('former (cycle, tuples)', former), ('block generator', block)):
+            print('{:<24s} block of {:5d} samples: {:12.0f} samples/CPU s'.format(
+                name, block_size, samples_per_cpu_second(generator, block_size, total_samples)))
+
+
+if __name__ == '__main__':
+    main()
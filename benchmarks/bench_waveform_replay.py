@@ -0,0 +1,54 @@
+""" Cost of one cycle of the real time sample loop for 64 waveforms with 1 kHz and a 0.1 second cycle
+(100 samples per waveform): replay of a recording (mdib.waveformrecording, 10 seconds per waveform with an
+annotation per second) versus the synthetic waveform generators. The mdib transaction is not included.
+
+Run with "python -m benchmarks.bench_waveform_replay" from the repository root (src in PYTHONPATH).
+"""
+import math
+import os
+import shutil
+import tempfile
+import time
+
+from sdc11073 import pmtypes
+from sdc11073 import samplebuffer
+from sdc11073.mdib.devicewaveform import _SampleArrayGenerator
+from sdc11073.mdib.waveformrecording import ReplayWaveformSource
+from sdc11073.mdib.waveformrecording import write_recording
+from sdc11073.sdcdevice import waveforms
+from .utils import print_result
+from .utils import time_per_call
+
+
+def _run_cycle(sample_array_generators):
+    def _cycle():
+        start = time.time() - 0.1
+        for generator in sample_array_generators:
+            generator._last_timestamp = start  # pylint: disable=protected-access
+            generator.getNextSampleArray()
+    return _cycle
+
+
+def main(streams=64, seconds=10, sample_period=0.001):
+    folder = tempfile.mkdtemp()
+    try:
+        path = os.path.join(folder, 'recording')
+        count = int(seconds / sample_period)
+        samples = samplebuffer.mkSampleBuffer([math.sin(i / 50) for i in range(count)])
+        beats = list(range(0, count, int(1 / sample_period)))
+        write_recording(path, [('h{}'.format(i), sample_period, 0.0, samples, beats, [0] * len(beats), [])
+                               for i in range(streams)], [pmtypes.Coding('beat')])
+        source = ReplayWaveformSource(path)
+        readers = list(source._waveform_generators.values())  # pylint: disable=protected-access
+        print_result('{} waveforms: replay'.format(streams), time_per_call(_run_cycle(readers), number=100))
+        generators = [_SampleArrayGenerator('h{}'.format(i), waveforms.SinusGenerator(-1, 1, 1.0, sample_period))
+                      for i in range(streams)]
+        print_result('{} waveforms: sinus generators'.format(streams), time_per_call(_run_cycle(generators), number=100))
+        readers = None
+        source.close()
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+""" Cadence and jitter of the waveform cohorts of sdcdevice.waveformscheduler: runs the real time sample loop of a
+device for a few seconds (five waveforms with sample periods 1 ms ... 0.5 s, latencies 0.1, 0.2 and 0.4 seconds) and
+prints per cohort the number of reports, the mean interval between the reports and the max. deviation from the
+cohort period. The reports are not sent, the loop calls a recording function instead.
+
+Run with "python -m benchmarks.bench_waveformscheduler" from the repository root (src in PYTHONPATH).
+"""
+import logging
+import statistics
+import threading
+import time
+
+from sdc11073 import pmtypes
+from sdc11073 import pysoap
+from sdc11073.sdcdevice import SdcDevice
+from sdc11073.sdcdevice import waveforms
+from tests import mockstuff
+from .utils import mk_device_mdib
+
+
+def main(duration=3.3):
+    mdib = mk_device_mdib()
+    handles = [s.descriptorHandle for s in mdib.states.objects if s.isRealtimeSampleArrayMetricState][:5]
+    for handle, sample_period in zip(handles, (0.001, 0.001, 0.01, 0.04, 0.5)):
+        mdib.registerWaveformGenerator(handle, waveforms.SinusGenerator(-10, 10, 1.0, sample_period))
+    model = pysoap.soapenvelope.DPWSThisModel(manufacturer='ABCDEFG GmbH', manufacturerUrl='www.abcdefg.com',
+                                              modelName='Foobar', modelNumber='1.0', modelUrl='www.abcdefg.com',
+                                              presentationUrl='www.abcdefg.com')
+    device = pysoap.soapenvelope.DPWSThisDevice(friendlyName='Big Bang Practice', firmwareVersion='0.99',
+                                                serialNumber='12345')
+    sdc_device = SdcDevice(mockstuff.MockWsDiscovery(['5.6.7.8']), None, model, device, mdib, logLevel=logging.INFO)
+    reports = []
+    lock = threading.Lock()
+
+    def _record(states, nsmapper, mdib_version_group):
+        with lock:
+            reports.append((time.monotonic(), {s.descriptorHandle for s in states}))
+
+    sdc_device.subscriptionsManager.sendRealtimeSamplesReport = _record
+    scheduler = sdc_device.waveformScheduler
+    scheduler.setLatency(handles[2], 0.2)
+    scheduler.setLatency(handles[3], 0.4)
+    sdc_device.startAll()
+    try:
+        time.sleep(duration)
+    finally:
+        sdc_device.stopAll()
+    reports = reports[1:]  # the first report has no samples
+    for cohort in scheduler.cohorts:
+        times = [t for t, report_handles in reports if cohort.handles[0] in report_handles]
+        intervals = [t2 - t1 for t1, t2 in zip(times, times[1:])]
+        if len(intervals) < 2:
+            continue
+        jitter = max(abs(i - cohort.period) for i in intervals)
+        print('cohort period {:.1f} s, {} waveforms: {:3d} reports, mean interval {:.4f} s, jitter {:.4f} s'.format(
+            cohort.period, len(cohort.handles), len(times), statistics.mean(intervals), jitter))
+
+
+if __name__ == '__main__':
+    main()
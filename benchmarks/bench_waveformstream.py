@@ -0,0 +1,75 @@
+""" Microseconds per WaveformStream report for 1, 16 and 64 waveforms: the generic serialization (a node per state
+built from the container properties) versus mdib.waveformstream.WaveformStreamEncoder (templates).
+Every report contains new copies of the states with new StateVersion, DeterminationTime and 50 samples, like the
+states of a real time transaction of the device.
+
+Run with "python -m benchmarks.bench_waveformstream" from the repository root (src in PYTHONPATH).
+"""
+import math
+import time
+
+from sdc11073 import namespaces
+from sdc11073 import pmtypes
+from sdc11073 import samplebuffer
+from sdc11073.mdib import descriptorcontainers
+from sdc11073.mdib import statecontainers
+from sdc11073.mdib.mdibbase import MdibVersionGroup
+from sdc11073.mdib.waveformstream import WaveformStreamEncoder
+from sdc11073.mdib.waveformstream import mkWaveformStreamGeneric
+from sdc11073.sdcdevice.subscriptionmgr import SubscriptionsManager
+
+
+def _mk_reports(waveform_count, report_count, samples_per_state):
+    nsmapper = namespaces.DocNamespaceHelper()
+    states = []
+    for i in range(waveform_count):
+        descriptor = descriptorcontainers.RealTimeSampleArrayMetricDescriptorContainer(
+            nsmapper=nsmapper, nodeName=namespaces.domTag('Metric'), handle='rtsa{}'.format(i), parentHandle='channel')
+        state = statecontainers.RealTimeSampleArrayMetricStateContainer(nsmapper, descriptor)
+        state.mkMetricValue()
+        state.ActivationState = pmtypes.ComponentActivation.ON
+        states.append(state)
+    annotation = pmtypes.Annotation(pmtypes.CodedValue('beat'))
+    reports = []
+    for n in range(report_count):
+        report_states = []
+        for i, state in enumerate(states):
+            state = state.mkCopy(copy_node=False)
+            state.StateVersion += 1
+            metric_value = state.metricValue
+            metric_value.Samples = samplebuffer.mkSampleBuffer(
+                [math.sin((n * samples_per_state + j + i) / 20) * 100 for j in range(samples_per_state)])
+            metric_value.DeterminationTime = 1700000000 + n * 0.05
+            if n % 20 == 0:  # one annotation per second
+                metric_value.Annotations = [annotation]
+                metric_value.ApplyAnnotations = [pmtypes.ApplyAnnotation(0, 0)]
+            else:
+                metric_value.Annotations = []
+                metric_value.ApplyAnnotations = []
+            states[i] = state
+            report_states.append(state)
+        reports.append((MdibVersionGroup(n + 1, 'urn:uuid:sequence', None), report_states))
+    return nsmapper.partialMap(*SubscriptionsManager.BodyNodePrefixes), reports
+
+
+def _time_per_report(func, nsmap, reports):
+    start = time.perf_counter()
+    for mdib_version_group, states in reports:
+        func(states, nsmap, mdib_version_group)
+    return (time.perf_counter() - start) / len(reports)
+
+
+def main(waveform_counts=(1, 16, 64), report_count=200, samples_per_state=50):
+    for waveform_count in waveform_counts:
+        for name in ('generic', 'template encoder'):
+            best = None
+            for _ in range(3):
+                nsmap, reports = _mk_reports(waveform_count, report_count, samples_per_state)
+                func = mkWaveformStreamGeneric if name == 'generic' else WaveformStreamEncoder().mkWaveformStream
+                secs = _time_per_report(func, nsmap, reports)
+                best = secs if best is None else min(best, secs)
+            print('{:<18s} {:3d} waveforms: {:10.1f} us per WaveformStream'.format(name, waveform_count, best * 1e6))
+
+
+if __name__ == '__main__':
+    main()
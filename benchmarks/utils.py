@@ -0,0 +1,55 @@
+""" Helpers shared by the micro benchmarks in this folder."""
+import copy
+import os
+import time
+
+from lxml import etree as etree_
+
+from sdc11073.mdib import DeviceMdibContainer
+from sdc11073.namespaces import msgTag
+
+here = os.path.dirname(__file__)
+DEFAULT_MDIB_PATH = os.path.join(here, os.pardir, 'tests', '70041_MDIB_Final.xml')
+
+
+def mk_device_mdib(path=DEFAULT_MDIB_PATH):
+    return DeviceMdibContainer.fromMdibFile(path)
+
+
+def time_per_call(func, repeat=5, number=1000):
+    """ Calls func number times, repeats this repeat times and returns the best time per call in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        duration = (time.perf_counter() - start) / number
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def print_result(name, seconds_per_call):
+    print('{:<60s} {:10.2f} us'.format(name, seconds_per_call * 1e6))
+
+
+def mk_large_device_mdib(metric_count, path=DEFAULT_MDIB_PATH):
+    """ Returns a device mdib that contains (at least) metric_count numeric metrics.
+    The additional metrics are clones of the first numeric metric descriptor in the mdib file.
+    Like in a device that reads a complete mdib (descriptors and states) from file, the state nodes are
+    part of one big document."""
+    doc = etree_.parse(path)
+    xsi_type = '{http://www.w3.org/2001/XMLSchema-instance}type'
+    descriptors = [n for n in doc.getroot().iter('{*}Metric')
+                   if n.get(xsi_type, '').endswith('NumericMetricDescriptor')]
+    template = descriptors[0]
+    for i in range(metric_count - len(descriptors)):
+        descriptor = copy.deepcopy(template)
+        descriptor.set('Handle', 'bench_numeric_{}'.format(i))
+        template.addnext(descriptor)
+    mdib = DeviceMdibContainer.fromString(etree_.tostring(doc))
+    response_node = etree_.Element(msgTag('GetMdibResponse'), nsmap=mdib.nsmapper.docNssmap)
+    mdib_node, version_group = mdib.reconstructMdib()
+    version_group.update_node(response_node)
+    response_node.append(mdib_node)
+    return DeviceMdibContainer.fromString(mdib.nodeToString(response_node))
@@ -1,6 +1,67 @@
+import contextlib
+import contextvars
 from sdc11073 import isoduration
 from decimal import Decimal
 
+# numeric modes, they determine the python representation of xsd:decimal values (see DecimalConverter)
+NUMERIC_DECIMAL = 'decimal'  # exact decimal.Decimal values, e.g. for conformance tests
+NUMERIC_FLOAT = 'float'  # floats, written with the shortest string that is read back as the same float
+
+_numeric_mode = contextvars.ContextVar('numeric_mode', default=None)
+
+
+@contextlib.contextmanager
+def numericMode(mode):
+    """ All DecimalConverter conversions in the with block (in the current thread) use mode.
+    :param mode: NUMERIC_DECIMAL, NUMERIC_FLOAT or None (DecimalConverter.USE_DECIMAL_TYPE decides)
+    """
+    token = _numeric_mode.set(mode)
+    try:
+        yield
+    finally:
+        _numeric_mode.reset(token)
+
+
+def currentNumericMode():
+    """ returns the numeric mode that is set by numericMode in the current context."""
+    return _numeric_mode.get()
+
+
+def _floatToDecimalString(value):
+    """ shortest string that is read back as value, without exponent."""
+    text = repr(value)
+    if 'e' in text:
+        text = f'{Decimal(text):f}'
+    elif text.endswith('.0'):
+        text = text[:-2]
+    return text
+
+
+def _roundedFloatString(value):
+    """ value rounded to 1..3 digits after the decimal point (depending on its magnitude), no trailing zeros."""
+    # round value to handle float inaccuracies. The formatting rounds correctly like round(value, n) does.
+    magnitude = abs(value)
+    if magnitude >= 100:
+        text = '%.1f' % value
+    elif magnitude >= 10:
+        text = '%.2f' % value
+    else:
+        text = '%.3f' % value
+    return text.rstrip('0').rstrip('.')
+
+
+def floatFormatter():
+    """ returns the function that DecimalConverter.toXML uses for floats in the current numeric mode."""
+    if _numeric_mode.get() == NUMERIC_FLOAT:
+        return _floatToDecimalString
+    return _roundedFloatString
+
+
+def floatFormatters():
+    """ returns the functions that DecimalConverter.toXML uses for floats, one per numeric mode."""
+    return _floatToDecimalString, _roundedFloatString
+
+
 class NullConverter(object):
     @staticmethod
     def toPy(xmlValue):
@@ -25,29 +86,26 @@ class TimestampConverter(object):
 
 
 class DecimalConverter(object):
+    """ The python representation depends on the numeric mode (see numericMode).
+    Without a numeric mode, USE_DECIMAL_TYPE decides."""
     USE_DECIMAL_TYPE = True
 
     @classmethod
     def toPy(cls, xmlValue):
-        if cls.USE_DECIMAL_TYPE:
+        mode = _numeric_mode.get()
+        if mode == NUMERIC_FLOAT:
+            return float(xmlValue)
+        if mode == NUMERIC_DECIMAL or cls.USE_DECIMAL_TYPE:
             return Decimal(xmlValue)
-        else:
-            if '.' in xmlValue:
-                return float(xmlValue)
-            else:
-                return int(xmlValue)
+        if '.' in xmlValue:
+            return float(xmlValue)
+        return int(xmlValue)
 
     @staticmethod
     def toXML(pyValue):
         if isinstance(pyValue, float):
-            # round value to handle float inaccuracies
-            if abs(pyValue) >= 100:
-                xmlValue = '{:.1f}'.format(round(pyValue, 1))
-            elif abs(pyValue) >= 10:
-                xmlValue = '{:.2f}'.format(round(pyValue, 2))
-            else:
-                xmlValue = '{:.3f}'.format(round(pyValue, 3))
-        elif isinstance(pyValue, Decimal):
+            return floatFormatter()(pyValue)
+        if isinstance(pyValue, Decimal):
             # assume Decimal is exact, no rounding errors
             # Decimal has no method to force string representation without exponential notion.
             # => convert to float and use :f string formatting (6 digits after decimal point, which should be good enough)
@@ -55,8 +113,8 @@ class DecimalConverter(object):
         else:
             xmlValue = str(pyValue)
         # remove trailing zeros after decimal point
-        while '.' in xmlValue and xmlValue[-1] in ('0', '.'):
-            xmlValue = xmlValue[:-1]
+        if '.' in xmlValue:
+            xmlValue = xmlValue.rstrip('0').rstrip('.')
         return xmlValue
 
 
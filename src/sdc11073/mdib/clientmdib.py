@@ -4,16 +4,18 @@ import traceback
 import time
 
 from threading import Lock
-from collections import deque
 from collections import namedtuple
-from statistics import mean, stdev
-import copy
+from statistics import mean
+import itertools
 from lxml import etree as etree_
 from .. import observableproperties as properties
 from . import mdibbase
 from . import msgreader
+from . import ringbuffer
 from .. import namespaces
 from .. import pmtypes
+from .. import samplebuffer
+from .. import runningstats
 from concurrent import futures
 from .. import loghelper
 from .. import xmlparsing
@@ -77,8 +79,35 @@ class DeterminationTimeWarner:
 
 _AgeData = namedtuple('_AgeData', 'mean_age stdev min_age max_age')
 
+
+def _appliedAnnotations(metricValue, sampleCount):
+    """ Maps the ApplyAnnotations of a SampleArrayValue to its samples.
+    ApplyAnnotation refers to the sample by its index, therefore one pass over the ApplyAnnotations is sufficient,
+    samples are not compared with annotations.
+    :param metricValue: a pmtypes.SampleArrayValue instance
+    :param sampleCount: number of samples, ApplyAnnotations with a SampleIndex outside of range(sampleCount) are ignored
+    :return: a dictionary sample index => list of annotations (in the order of the ApplyAnnotations)
+    """
+    appliedAnnotations = {}
+    applyAnnotations = metricValue.ApplyAnnotations
+    if applyAnnotations:
+        annotations = metricValue.Annotations
+        for aa in applyAnnotations:
+            sampleIndex = aa.SampleIndex
+            if 0 <= sampleIndex < sampleCount:
+                annot = annotations[aa.AnnotationIndex]  # index is zero-based
+                try:
+                    appliedAnnotations[sampleIndex].append(annot)
+                except KeyError:
+                    appliedAnnotations[sampleIndex] = [annot]
+    return appliedAnnotations
+
+
 class ClientRtBuffer(object):
-    """Collects data of one real time stream."""
+    """Collects data of one real time stream.
+    The samples are kept in a preallocated ring buffer (self.samples, a ringbuffer.SampleRingBuffer) that has
+    zero-copy read methods, e.g. self.samples.lastSeconds. self.rt_data is a view of the same samples that
+    creates RtSampleContainer objects on access."""
     def __init__(self, sample_period, max_samples):
         """
         :param sample_period: float value, in seconds. 
@@ -86,13 +115,14 @@ class ClientRtBuffer(object):
                               Value can be zero if correct value is not known. In this case all Containers will have the observation time of the sample array.
         :param max_samples: integer, max. length of self.rtdata
         """
-        self.rt_data = deque(maxlen=max_samples)
+        self.samples = ringbuffer.SampleRingBuffer(max_samples)
+        self.rt_data = ringbuffer.RtSampleContainersView(self.samples)
         self.sample_period = sample_period
         self._max_samples = max_samples
         self._logger = loghelper.getLoggerAdapter('sdc.client.mdib.rt')
         self._lock = Lock()
         self.last_sc = None  # last statecontainer that was handled
-        self._age_of_data_list = deque(maxlen=AGE_CALC_SAMPLES_COUNT) # used to calculate average age of samples when received
+        self.age_statistics = runningstats.RunningStatistics(AGE_CALC_SAMPLES_COUNT) # age of samples when received
         self._reported_min_age = None
         self._reported_max_age = None
 
@@ -110,54 +140,92 @@ class ClientRtBuffer(object):
             self._logger.debug('real time sample array "{} "has no metric value, ignoring it', realtimeSampleArrayContainer.descriptorHandle)
             return []
         observationTime = metricValue.DeterminationTime
-        annotations = metricValue.Annotations
-        applyAnnotations = metricValue.ApplyAnnotations
         rtSampleContainers = []
-        if metricValue.Samples is not None:
-            for i, sample in enumerate(metricValue.Samples):
-                appliedAnnotations = []
-                if applyAnnotations is not None:
-                    for aa in applyAnnotations:
-                        if aa.SampleIndex == i:
-                            # there is an annotation for this sample:
-                            aIndex = aa.AnnotationIndex
-                            annot = annotations[aIndex] # index is zero-based
-                            appliedAnnotations.append(annot)
+        samples = metricValue.Samples
+        if samples is not None:
+            if samplebuffer.isSampleBuffer(samples):
+                samples = samples.tolist()  # python floats, not numpy scalars
+            appliedAnnotations = _appliedAnnotations(metricValue, len(samples))
+            for i, sample in enumerate(samples):
                 t = observationTime + i * self.sample_period
-                rtSampleContainers.append(mdibbase.RtSampleContainer(sample, t, metricValue.Validity, appliedAnnotations))
+                rtSampleContainers.append(mdibbase.RtSampleContainer(sample, t, metricValue.Validity,
+                                                                     appliedAnnotations.get(i) or []))
         return rtSampleContainers
 
+    def addRealtimeSampleArray(self, realtimeSampleArrayContainer):
+        """ Appends the samples of the state to the ring buffer, no object per sample is created.
+        :param realtimeSampleArrayContainer: a RealTimeSampleArrayMetricStateContainer instance
+        :return: the observation time of the youngest sample, None if the state has no samples
+        """
+        self.last_sc = realtimeSampleArrayContainer
+        metricValue = realtimeSampleArrayContainer.metricValue
+        if metricValue is None:
+            # this can happen if metric state is not activated.
+            self._logger.debug('real time sample array "{} "has no metric value, ignoring it', realtimeSampleArrayContainer.descriptorHandle)
+            return None
+        samples = metricValue.Samples
+        if samples is None or len(samples) == 0:
+            return None
+        appliedAnnotations = _appliedAnnotations(metricValue, len(samples))
+        observationTime = metricValue.DeterminationTime
+        youngest = observationTime + (len(samples) - 1) * self.sample_period
+        with self._lock:
+            self.samples.appendSampleArray(samples, observationTime, self.sample_period, metricValue.Validity,
+                                           appliedAnnotations)
+        self._addAge(time.time() - youngest)
+        return youngest
+
     def addRtSampleContainers(self, sc):
         if not sc:
             return
         with self._lock:
-            self.rt_data.extend(sc)
-            self._age_of_data_list.append(time.time() - sc[-1].observationTime) # use time of youngest sample, this is the best value for indication of delays
-        try:
-            self._reported_min_age = min(self._age_of_data_list[-1], self._reported_min_age)
-        except TypeError:
-            self._reported_min_age = self._age_of_data_list[-1]
-        try:
-            self._reported_max_age = max(self._age_of_data_list[-1], self._reported_min_age)
-        except TypeError:
-            self._reported_max_age = self._age_of_data_list[-1]
+            for validity, group in itertools.groupby(sc, key=lambda c: c.validity):
+                group = list(group)
+                annotations = {i: c.annotations for i, c in enumerate(group) if c.annotations}
+                self.samples.appendSamples([c.value for c in group], [c.observationTime for c in group], validity,
+                                           annotations)
+        self._addAge(time.time() - sc[-1].observationTime)  # use time of youngest sample, this is the best value for indication of delays
+
+    def _addAge(self, age):
+        with self._lock:
+            self.age_statistics.add(age)
+            if self._reported_min_age is None or age < self._reported_min_age:
+                self._reported_min_age = age
+            if self._reported_max_age is None or age > self._reported_max_age:
+                self._reported_max_age = age
 
     def readData(self):
         """ This read method consumes all data in buffer.
         @return: a list of RtSampleContainer objects"""    
         with self._lock:
-            ret = copy.copy(self.rt_data)
-            self.rt_data.clear()
+            ret = list(self.samples.rtSampleContainers())
+            self.samples.clear()
         return ret
 
 
+    def copySamplesSince(self, index):
+        """ Copies the samples with an absolute index (see ringbuffer.SampleRingBuffer) >= index, as far as they are
+        still in the buffer.
+        :param index: absolute index, None for all samples in the buffer
+        :return: tuple (absolute index of the first copied sample, sample buffer with the values,
+                 time stamp of the first copied sample or None, list of (absolute index, annotations))
+        """
+        with self._lock:
+            end = self.samples.end_index
+            count = len(self.samples) if index is None else min(end - index, len(self.samples))
+            first = end - count
+            if count == 0:
+                return first, samplebuffer.mkSampleBuffer(), None, []
+            return (first, self.samples.copyValues(count), self.samples.rtSampleContainer(first).observationTime,
+                    self.samples.annotations(first))
+
     def get_age_stdev(self):
+        """ mean and stdev of the age of the last AGE_CALC_SAMPLES_COUNT received sample arrays,
+        min and max age since last call. Percentiles are available in self.age_statistics."""
         with self._lock:
             min_value, self._reported_min_age = self._reported_min_age, None
             max_value, self._reported_max_age = self._reported_max_age, None
-            mean_data = 0 if len(self._age_of_data_list) == 0 else mean(self._age_of_data_list)
-            std_deviation = 0 if len(self._age_of_data_list) < 2 else stdev(self._age_of_data_list)
-            return _AgeData(mean_data, std_deviation, min_value or 0, max_value or 0)
+            return _AgeData(self.age_statistics.mean, self.age_statistics.stdev, min_value or 0, max_value or 0)
 
 
 MDIB_VERSION_TOO_OLD = '{}: received too old MdibVersion, current {}, received {}'
@@ -175,8 +243,8 @@ class ClientMdibContainer(mdibbase.MdibContainer):
     MDIB_VERSION_CHECK_DISABLED = False # for testing purpose you can disable checking of mdib version, so that every notification is accepted.
     INITIAL_NOTIFICATION_BUFFERING = True # if False, the response for the first incoming notification is answered after the getmdib is done.
                                           # if True, first notifications are buffered and the responses are sent immediately.
-    def __init__(self, sdcClient, maxRealtimeSamples=100):
-        super(ClientMdibContainer, self).__init__(sdcClient.sdc_definitions)
+    def __init__(self, sdcClient, maxRealtimeSamples=100, numeric_mode=None):
+        super(ClientMdibContainer, self).__init__(sdcClient.sdc_definitions, numeric_mode=numeric_mode)
         self._synchronizedReports = threading.Event()
         self._logger = loghelper.getLoggerAdapter('sdc.client.mdib', sdcClient.log_prefix)
         self._sdcClient = sdcClient
@@ -315,11 +383,13 @@ class ClientMdibContainer(mdibbase.MdibContainer):
                         oldStateContainer = oldStateContainers[0]
                         if oldStateContainer.StateVersion != stateContainer.StateVersion:
                             self._logger.debug('update {} ==> {}', oldStateContainer, stateContainer)
-                            oldStateContainer.updateFromNode(stateContainer.node)
+                            with self.numericContext():
+                                oldStateContainer.updateFromNode(stateContainer.node)
                             self.contextStates.updateObjectNoLock(oldStateContainer)
                         else:
-                            old = etree_.tostring(oldStateContainer.node)
-                            new = etree_.tostring(stateContainer.node)
+                            with self.numericContext():  # nodes are created lazily
+                                old = etree_.tostring(oldStateContainer.node)
+                                new = etree_.tostring(stateContainer.node)
                             if old == new:
                                 self._logger.debug('no update {}', oldStateContainer.node)
                             else:
@@ -613,12 +683,11 @@ class ClientMdibContainer(mdibbase.MdibContainer):
                         rtBuffer = ClientRtBuffer(sample_period=sample_period, max_samples=self._maxRealtimeSamples)
                         self.rtBuffers[d_handle] = rtBuffer
 
-                    rtSampleContainers = rtBuffer.mkRtSampleContainers(new_sac)
-                    rtBuffer.addRtSampleContainers(rtSampleContainers)
+                    youngest = rtBuffer.addRealtimeSampleArray(new_sac)
 
                     # check age
-                    if len(rtSampleContainers) > 0:
-                        waveformAge[d_handle] = rtSampleContainers[-1].age
+                    if youngest is not None:
+                        waveformAge[d_handle] = time.time() - youngest
 
                     # check descriptor version
                     if descriptorContainer.DescriptorVersion != new_sac.DescriptorVersion:
@@ -787,7 +856,9 @@ class ClientMdibContainer(mdibbase.MdibContainer):
                     if container is None:
                         pass
                     else:
-                        container.updateDescrFromNode(dc.node)
+                        with self.numericContext():
+                            container.updateDescrFromNode(dc.node)
+                        self.descriptions.updateObject(container)  # e.g. the Type may have changed
                     updatedDescriptorByHandle[dc.handle] = dc
                     # if this is a context descriptor, delete all associated states that are not in
                     # state_containers list
@@ -1,15 +1,15 @@
 import copy
-import inspect
 import math
 from lxml import etree as etree_
-from .. import observableproperties as properties, xmlparsing
+from .containerproperties import get_container_schema, NO_PRIVATE_NAMES
+from .. import xmlparsing
 from ..namespaces import QN_TYPE
 from ..namespaces import Prefix_Namespace as Prefix
 
 class ContainerBase(object):
     NODETYPE = None   # overwrite in derived classes! determines the value of xsi:Type attribute, must be a etree_.QName object
     NODENAME = None
-    node = properties.ObservableProperty()
+    node = None  # the etree node, a plain instance attribute
 
     # every class with containerproperties must provice a list of property names.
     # this list is needed to create sub elements in a certain order.
@@ -18,6 +18,14 @@ class ContainerBase(object):
     # This is according to the inheritance in BICEPS xml schema
     _props = tuple()  # empty tuple, this base class has no properties
 
+    # names of locally stored property values that are not shared with copies of this container.
+    # None means that the container was never copied, all values are private. See mkCopy.
+    _cowPrivateNames = None
+
+    # set by the container properties when a value is set, or when a value that can be modified in place is
+    # accessed. Containers that cache their node (see AbstractStateContainer.node) re-create it then.
+    _nodeDirty = True
+
     def __init__(self, nsmapper, node=None):
         self.nsmapper = nsmapper
         self.node = node
@@ -67,29 +75,35 @@ class ContainerBase(object):
             cprop.updateFromNode(self, node)
 
     def mkCopy(self, copy_node=True):
-        copied = copy.copy(self)  # no deepcopy because of TypeError: cannot pickle 'lxml.etree.QName' object
-        if copy_node and self.node is not None:
-            new_node = xmlparsing.copy_node(self.node)
-            copied.node = new_node
+        """ Returns a copy of this container.
+        The copy shares the locally stored property values with this container (copy-on-write):
+        Immutable values are simply shared, values that can be modified in place (lists, pmtypes objects) are
+        copied when they are accessed the first time in one of the containers.
+        :param copy_node: if True, the copy gets a deep copy of the etree node, otherwise both containers reference
+                          the same node. Use False if the node of the copy will be replaced anyway (e.g. in transactions)
+                          or is not modified. State containers pass only an up-to-date node to the copy.
+        :return: the new container
+        """
+        # no deepcopy because of TypeError: cannot pickle 'lxml.etree.QName' object
+        copied = self.__class__.__new__(self.__class__)
+        copied.__dict__.update(self.__dict__)
+        # the sets of private names are created when the first value becomes private
+        self._cowPrivateNames = NO_PRIVATE_NAMES
+        copied._cowPrivateNames = NO_PRIVATE_NAMES
+        self._copyNodeTo(copied, copy_node)
         return copied
 
+    def _copyNodeTo(self, copied, copy_node):
+        node = self.node
+        if copy_node and node is not None:
+            node = xmlparsing.copy_node(node)
+        copied.node = node
+
     def _sortedContainerProperties(self):
         """
-        @return: a list of (name, object) tuples of all GenericProperties ( and subclasses)
+        @return: a tuple of (name, object) tuples of all GenericProperties ( and subclasses)
         """
-        ret = []
-        all_classes = inspect.getmro(self.__class__)
-        for cls in reversed(all_classes):
-            try:
-                names = cls._props  # pylint:disable=protected-access
-            except:
-                continue
-            for name in names:
-                obj = getattr(cls, name)
-                if obj is not None:
-                    ret.append((name, obj))
-        return ret
-
+        return get_container_schema(self.__class__).properties
 
     def diff(self,
              other,
@@ -121,7 +135,7 @@ class ContainerBase(object):
                 elif my_value != other_value:
                     ret.append('{}={}, other={}'.format(name, my_value, other_value))
         # check also if other has a different list of properties
-        my_property_names = set([p[0] for p in my_properties])
+        my_property_names = get_container_schema(self.__class__).property_names
         other_property_names = set([p[0] for p in other._sortedContainerProperties()])
         surplus_names = other_property_names - my_property_names
         if surplus_names:
@@ -5,14 +5,17 @@ The properties completely hide the XML nature of data. To serve this purpose, th
 """
 import copy
 import datetime
+import decimal
 import time
 
 from lxml import etree as etree_
 
 import sdc11073.namespaces as namespaces
 from sdc11073 import isoduration
+from sdc11073 import samplebuffer
 from sdc11073.dataconverters import TimestampConverter, DecimalConverter, IntegerConverter, BooleanConverter, \
-    DurationConverter, NullConverter
+    DurationConverter, NullConverter, NUMERIC_DECIMAL, NUMERIC_FLOAT, currentNumericMode, floatFormatter, \
+    floatFormatters
 from sdc11073.xmlparsing import copy_node_wo_parent
 
 
@@ -20,14 +23,93 @@ class ElementNotFoundException(Exception):
     pass
 
 
+# values of these types are never modified in place, they can be shared between copies of a container.
+_IMMUTABLE_TYPES = (str, int, float, decimal.Decimal, etree_.QName, datetime.date, datetime.time)
+
+
+def _copyPyValue(value):
+    """ copy-on-write support: returns a copy of value that can be modified without affecting value."""
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    if isinstance(value, list):
+        return value.__class__(_copyPyValue(v) for v in value)
+    if samplebuffer.isSampleBuffer(value):
+        return samplebuffer.copySampleBuffer(value)
+    mk_copy = getattr(value, 'mkCopy', None)
+    if mk_copy is not None:
+        return mk_copy()
+    return copy.deepcopy(value)
+
+
+# Stored value of list properties that are empty. All containers share it, a list is only created for a container
+# when the property is accessed.
+_EMPTY_LIST = ()
+
+# _cowPrivateNames of a copied container that has no private values yet. See ContainerBase.mkCopy
+NO_PRIVATE_NAMES = frozenset()
+
+
 class _PropertyValue:
-    """This class contains two representations of a value (XML side and Python side) """
+    """This class contains the Python side of a value, and the XML side if it can not be re-created from the
+    Python side (see _mkPropertyValue)."""
+    __slots__ = ('xml_value', 'py_value')
 
     def __init__(self, xml_value, py_value):
         self.xml_value = xml_value
         self.py_value = py_value
 
 
+def _mkPropertyValue(converter, xml_value, py_value):
+    """ Returns the value that is stored for a value that was read from xml.
+    The xml string is only kept if the converter does not re-create exactly the same string from the
+    python value, otherwise it is converted again when a node is created."""
+    if py_value is xml_value:  # NullConverter
+        return _PropertyValue(None, py_value)
+    if converter is DecimalConverter and py_value.__class__ is float:
+        # the string of a float depends on the numeric mode of the serialization, which might differ from the mode of
+        # parsing: keep the string unless all modes re-create it.
+        for formatter in floatFormatters():
+            if formatter(py_value) != xml_value:
+                return _PropertyValue(xml_value, py_value)
+        return _PropertyValue(None, py_value)
+    if converter is DecimalConverter and py_value.__class__ is decimal.Decimal:
+        # most values are decimals; str() is much cheaper than DecimalConverter.toXML, and it returns the same string
+        # for plain notation without trailing zeros after the decimal point.
+        if str(py_value) == xml_value and 'E' not in xml_value and not (xml_value[-1] == '0' and '.' in xml_value):
+            return _PropertyValue(None, py_value)
+    if converter.toXML(py_value) != xml_value:
+        return _PropertyValue(xml_value, py_value)
+    return _PropertyValue(None, py_value)
+
+
+class _IdentityToken(object):
+    """ compares equal to another _IdentityToken of the same object"""
+    __slots__ = ('obj',)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __eq__(self, other):
+        return isinstance(other, _IdentityToken) and self.obj is other.obj
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return id(self.obj)
+
+
+def _valueToken(stored_value):
+    if isinstance(stored_value, _PropertyValue):
+        py_value = stored_value.py_value
+        if stored_value.xml_value is None and isinstance(py_value, _IMMUTABLE_TYPES):
+            # repr distinguishes values that are equal but are written differently, e.g. Decimal('1.0') and Decimal('1')
+            return py_value.__class__, repr(py_value)
+    elif stored_value is None:
+        return None
+    return _IdentityToken(stored_value)
+
+
 class _PropertyBase(object):
     """ Navigates to sub element and handles storage of value in instance.
 
@@ -79,6 +161,10 @@ class _PropertyBase(object):
                 value = self.impliedPyValue()
             else:
                 value = self.impliedPyValue
+        elif not isinstance(value, _IMMUTABLE_TYPES):
+            instance._nodeDirty = True  # the caller might modify the value in place
+            if instance._cowPrivateNames is not None:
+                value = self._unshare(instance, property_value).py_value
         return value
 
     def getActualValue(self, instance):
@@ -88,12 +174,45 @@ class _PropertyBase(object):
         except AttributeError:
             return None
 
+    def valueToken(self, instance):
+        """ Returns a token that is equal to the token of an earlier call as long as the value was not changed.
+        Immutable values are compared by value, all other values by identity of the stored object (copy-on-write
+        replaces the stored object of a copied container before it can be modified in place)."""
+        return _valueToken(getattr(instance, self._localVarName, None))
+
     def __set__(self, instance, pyValue):
         """value is the representation on the program side, e.g a float. """
         if pyValue is None:
             setattr(instance, self._localVarName, None)
         else:
             setattr(instance, self._localVarName, _PropertyValue(None, pyValue))
+        instance._nodeDirty = True
+        self._markPrivate(instance)
+
+    def _markPrivate(self, instance):
+        """ copy-on-write support: the locally stored value of instance is no longer shared with copies."""
+        private_names = instance._cowPrivateNames
+        if private_names is NO_PRIVATE_NAMES:
+            instance._cowPrivateNames = {self._localVarName}
+        elif private_names is not None:
+            private_names.add(self._localVarName)
+
+    def _unshare(self, instance, stored_value):
+        """ copy-on-write support: containers that were copied share their stored values with the copy.
+        Values that can be modified in place (lists, pmtypes objects) are copied on first access.
+        :return: the stored value that is private to instance
+        """
+        private_names = instance._cowPrivateNames
+        if self._localVarName in private_names:
+            return stored_value
+        stored_value = self._copyStoredValue(stored_value)
+        setattr(instance, self._localVarName, stored_value)
+        self._markPrivate(instance)
+        return stored_value
+
+    @staticmethod
+    def _copyStoredValue(stored_value):
+        return _PropertyValue(stored_value.xml_value, _copyPyValue(stored_value.py_value))
 
     def initInstanceData(self, instance):
         if self._defaultPyValue is None:
@@ -159,7 +278,7 @@ class NotImplementedProperty(_PropertyBase):
 class _ListPropertyBase(_PropertyBase):
     """ Base class for all classes that have an empty list as default value.
     These classes do not use an implied value.
-    The local variable is just a plain list, no _PropertyValue"""
+    The local variable is just a plain list, no _PropertyValue. Empty lists are stored as _EMPTY_LIST."""
 
     def __init__(self, attrname, subElementNames):
         super().__init__(attrname, subElementNames, None)
@@ -167,19 +286,38 @@ class _ListPropertyBase(_PropertyBase):
     def __set__(self, instance, pyValue):
         """value is the representation on the program side, e.g a float. """
         setattr(instance, self._localVarName, pyValue)
+        instance._nodeDirty = True
+        self._markPrivate(instance)
 
     def __get__(self, instance, owner):
         """ returns a python value, uses the locally stored value"""
         if instance is None:  # if called via class
             return self
         try:
-            return getattr(instance, self._localVarName)
+            value = getattr(instance, self._localVarName)
         except AttributeError:
-            self.initInstanceData(instance)
-            return getattr(instance, self._localVarName)
+            value = _EMPTY_LIST
+        if value is not None:
+            instance._nodeDirty = True  # the caller might modify the list in place
+        if value is _EMPTY_LIST:
+            # the caller might modify the list in place
+            value = []
+            setattr(instance, self._localVarName, value)
+            self._markPrivate(instance)
+        elif value is not None and instance._cowPrivateNames is not None:
+            value = self._unshare(instance, value)
+        return value
+
+    def getActualValue(self, instance):
+        """ Returns the stored list (without copy-on-write handling), None if the value was set to None."""
+        return getattr(instance, self._localVarName, None)
+
+    @staticmethod
+    def _copyStoredValue(stored_value):
+        return _copyPyValue(stored_value)
 
     def initInstanceData(self, instance):
-        setattr(instance, self._localVarName, [])
+        setattr(instance, self._localVarName, _EMPTY_LIST)
 
 
 class NodeAttributeProperty(_PropertyBase):
@@ -190,18 +328,16 @@ class NodeAttributeProperty(_PropertyBase):
         self._converter = valueConverter if valueConverter is not None else NullConverter
 
     def getPyValueFromNode(self, node):
-        value = self._defaultPyValue
-        xmlValue = None
         try:
             subNode = self._getElementbyChildNamesList(node, self._subElementNames, createMissingNodes=False)
             xmlValue = subNode.attrib.get(self._attrname)
             if xmlValue is not None:
-                value = self._converter.toPy(xmlValue)
+                return _mkPropertyValue(self._converter, xmlValue, self._converter.toPy(xmlValue))
         except ElementNotFoundException:
             pass
-        if xmlValue is None and value is None:
+        if self._defaultPyValue is None:
             return None
-        return _PropertyValue(xmlValue, value)
+        return _PropertyValue(None, self._defaultPyValue)
 
     def updateXMLValue(self, instance, node):
         try:
@@ -218,14 +354,25 @@ class NodeAttributeProperty(_PropertyBase):
             except ElementNotFoundException:
                 return
         else:
-            # use xml_value if available, otherwise convert py_value to xml_value
             subNode = self._getElementbyChildNamesList(node, self._subElementNames, createMissingNodes=True)
-            if property_value.xml_value is not None:
-                subNode.set(self._attrname, property_value.xml_value)
-            elif property_value.py_value is not None:
-                xml_value = self._converter.toXML(property_value.py_value)
-                if xml_value is not None:
-                    subNode.set(self._attrname, xml_value)
+            xml_value = self._xmlValue(property_value)
+            if xml_value is not None:
+                subNode.set(self._attrname, xml_value)
+
+    def _xmlValue(self, property_value):
+        # use xml_value if available, otherwise convert py_value to xml_value
+        if property_value.xml_value is not None:
+            return property_value.xml_value
+        if property_value.py_value is not None:
+            return self._converter.toXML(property_value.py_value)
+        return None
+
+    def getXmlValue(self, instance):
+        """ Returns the string that updateXMLValue writes to the attribute, None if no attribute is written."""
+        property_value = getattr(instance, self._localVarName, None)
+        if property_value is None:
+            return None
+        return self._xmlValue(property_value)
 
 
 class NodeAttributeListProperty(_ListPropertyBase):
@@ -310,22 +457,103 @@ class XsiTypeAttributeProperty(_PropertyBase):
             subNode.set(self._attrname, xml_value)
 
 
+class DecimalListCodec(object):
+    """ Converts between the xml representation of a list of decimals (separated with white space) and python values
+    in bulk: the string is formatted with one format operation for all values instead of one converter call per value.
+    Without precision the output is the same as DecimalConverter.toXML of each value.
+    In numeric mode NUMERIC_FLOAT values are parsed into a sample buffer, otherwise into a list
+    (see DecimalConverter.toPy).
+    """
+    _ROUNDED_FORMATS = ('%.3f', '%.2f', '%.1f')  # same rounding as DecimalConverter for |value| < 10, < 100, >= 100
+
+    def __init__(self, precision=None):
+        """
+        :param precision: None or the number of digits after the decimal point of all values (trailing zeros are
+                          removed)
+        """
+        self.precision = precision
+        self._fixed_format = None if precision is None else '%.{}f'.format(precision)
+        self._fixed_formats = {}  # number of values => format string for all values
+
+    def format(self, values):
+        """
+        :param values: a list of numbers or a sample buffer
+        :return: the xml string
+        """
+        if samplebuffer.isSampleBuffer(values):
+            values = values.tolist()
+        elif self._fixed_format is None and set(map(type, values)) - {float}:
+            # ints, Decimals: use the converter for each value
+            return ' '.join([DecimalConverter.toXML(v) for v in values])
+        if not values:
+            return ''
+        if self._fixed_format is not None:
+            format_string = self._fixed_formats.get(len(values))
+            if format_string is None:
+                format_string = ' '.join([self._fixed_format] * len(values))
+                if len(self._fixed_formats) < 64:
+                    self._fixed_formats[len(values)] = format_string
+            text = format_string % tuple(values)
+            return text if self.precision == 0 else self._stripZeros(text)
+        if currentNumericMode() == NUMERIC_FLOAT:
+            text = ' '.join(map(str, values))  # shortest repr of each value
+            if 'e' in text:
+                return ' '.join(map(floatFormatter(), values))
+            return (text + ' ').replace('.0 ', ' ')[:-1]
+        formats = self._ROUNDED_FORMATS
+        format_string = ' '.join([formats[(v >= 10) + (v >= 100)] for v in map(abs, values)])
+        return self._stripZeros(format_string % tuple(values))
+
+    @staticmethod
+    def _stripZeros(text):
+        """ removes trailing zeros of all values in text, all values must contain a decimal point."""
+        text += ' '
+        while '0 ' in text:  # at most precision passes
+            text = text.replace('0 ', ' ')
+        return text.replace('. ', ' ')[:-1]
+
+    @staticmethod
+    def parse(xml_value, out=None):
+        """
+        :param xml_value: str or bytes, decimals separated with white space
+        :param out: optional sample buffer with the same number of values; it is filled in numeric mode NUMERIC_FLOAT
+        :return: a list or a sample buffer (see DecimalConverter.toPy)
+        """
+        mode = currentNumericMode()
+        if mode == NUMERIC_FLOAT:
+            samples = samplebuffer.parseSamples(xml_value)
+            if out is not None and len(out) == len(samples):
+                out[:] = samples
+                return out
+            return samples
+        if isinstance(xml_value, bytes):
+            xml_value = xml_value.decode('ascii')
+        tokens = xml_value.split()
+        if mode == NUMERIC_DECIMAL or DecimalConverter.USE_DECIMAL_TYPE:
+            return list(map(decimal.Decimal, tokens))
+        return [float(t) if '.' in t else int(t) for t in tokens]
+
+
 class DecimalListAttributeProperty(_ListPropertyBase):
     """ XML representation: an attribute string that represents 1..n decimals, separated with spaces.
-        Python representation: a list of integers and/or floats.
+        Python representation: a list of integers and/or floats, or a sample buffer (see samplebuffer module).
+        In numeric mode NUMERIC_FLOAT the values are read into a sample buffer.
+        The conversion is done by a DecimalListCodec.
         """
 
-    def __init__(self, attrname, subElementNames=None):
+    def __init__(self, attrname, subElementNames=None, precision=None):
+        """
+        :param precision: see DecimalListCodec
+        """
         super(DecimalListAttributeProperty, self).__init__(attrname, subElementNames)
+        self.codec = DecimalListCodec(precision)
 
     def getPyValueFromNode(self, node):
         try:
             subNode = self._getElementbyChildNamesList(node, self._subElementNames, createMissingNodes=False)
             xmlValue = subNode.attrib.get(self._attrname)
             if xmlValue is not None:
-                xmlValues = xmlValue.split()
-                values = [DecimalConverter.toPy(v) for v in xmlValues]
-                return values
+                return self.codec.parse(xmlValue)
         except ElementNotFoundException:
             pass
         return self._defaultPyValue
@@ -335,7 +563,7 @@ class DecimalListAttributeProperty(_ListPropertyBase):
             value = getattr(instance, self._localVarName)
         except AttributeError:
             value = None
-        # value is a list of integer/float or None
+        # value is a list of integer/float, a sample buffer or None
         if value is None:
             try:
                 subNode = self._getElementbyChildNamesList(node, self._subElementNames, createMissingNodes=False)
@@ -346,8 +574,14 @@ class DecimalListAttributeProperty(_ListPropertyBase):
             return
         else:
             subNode = self._getElementbyChildNamesList(node, self._subElementNames, createMissingNodes=True)
-            attr_value = ' '.join([DecimalConverter.toXML(v) for v in value])
-            subNode.set(self._attrname, attr_value)
+            subNode.set(self._attrname, self.codec.format(value))
+
+    def getXmlValue(self, instance):
+        """ Returns the string that updateXMLValue writes to the attribute, None if no attribute is written."""
+        value = getattr(instance, self._localVarName, None)
+        if value is None:
+            return None
+        return self.codec.format(value)
 
 
 class NodeTextProperty(_PropertyBase):
@@ -365,8 +599,7 @@ class NodeTextProperty(_PropertyBase):
             subNode = self._getElementbyChildNamesList(node, self._subElementNames, createMissingNodes=False)
             xmlValue = subNode.text
             if xmlValue is not None:
-                value = self._converter.toPy(xmlValue)
-                return _PropertyValue(xmlValue, value)
+                return _mkPropertyValue(self._converter, xmlValue, self._converter.toPy(xmlValue))
         except ElementNotFoundException:
             pass
         if self._defaultPyValue is None:
@@ -523,9 +756,12 @@ class ExtensionNodeProperty(_PropertyBase):
             value = getattr(instance, self._localVarName)
         except AttributeError:
             value = None
+        instance._nodeDirty = True  # the caller might modify the value in place
         if value is None:
             value = _PropertyValue(None, ExtensionLocalValue())
             setattr(instance, self._localVarName, value)
+        elif instance._cowPrivateNames is not None:
+            value = self._unshare(instance, value)
         return value.py_value
 
     def getPyValueFromNode(self, node):
@@ -533,8 +769,8 @@ class ExtensionNodeProperty(_PropertyBase):
         try:
             extension_node = self._getElementbyChildNamesList(node, self._subElementNames, createMissingNodes=False)
         except ElementNotFoundException:
-            return _PropertyValue(None, ExtensionLocalValue())
-        return _PropertyValue(extension_node, ExtensionLocalValue(extension_node[:]))
+            return None  # an empty ExtensionLocalValue is created on access
+        return _PropertyValue(None, ExtensionLocalValue(extension_node[:]))
 
     def updateXMLValue(self, instance, node):
         """Write value to node.
@@ -593,16 +829,13 @@ class SubElementListProperty(_ListPropertyBase):
 
     def getPyValueFromNode(self, node):
         """ get from node"""
-        objects = []
         try:
             pNode = self._getElementbyChildNamesList(node, self._subElementNames[:-1],
                                                      createMissingNodes=False)  # get parent Node
-            nodes = pNode.findall(self._subElementNames[-1])
-            for n in nodes:
-                objects.append(self._cls.fromNode(n))
-            return objects
         except ElementNotFoundException:
-            return objects
+            return _EMPTY_LIST
+        objects = [self._cls.fromNode(n) for n in pNode.findall(self._subElementNames[-1])]
+        return objects or _EMPTY_LIST
 
     def updateXMLValue(self, instance, node):
         """ value is a list of objects with "asEtreeNode" method"""
@@ -830,3 +1063,44 @@ class UTC(datetime.tzinfo):
 
     def dst(self, dt):  # pylint:disable=unused-argument
         return ZERO
+
+
+class ContainerSchema(object):
+    """Precompiled description of all container properties of a class.
+
+    The schema is built once per class and holds the ordered list of (name, property) tuples, the property
+    names and (for descriptors) the ordered list of child node names. Sub element paths and converters
+    are part of the property objects themselves, so iterating over the schema needs no further lookups.
+    """
+    __slots__ = ('properties', 'property_names', 'child_node_names')
+
+    def __init__(self, properties, child_node_names=()):
+        self.properties = tuple(properties)
+        self.property_names = frozenset(name for name, _ in self.properties)
+        self.child_node_names = tuple(child_node_names)
+
+
+def get_container_schema(cls):
+    """Returns the ContainerSchema of cls. The schema is compiled on first use and cached in the class.
+
+    Properties are collected from the _props lists of all classes in the mro, ordered from root class to
+    derived class. Only the _props / _childNodeNames members that a class defines itself are used, so
+    classes that do not define own properties do not repeat the properties of their parent class.
+    """
+    schema = cls.__dict__.get('_containerSchema')
+    if schema is None:
+        properties = []
+        child_node_names = []
+        seen = set()
+        for klass in reversed(cls.__mro__):
+            for name in klass.__dict__.get('_props', ()):
+                if name in seen:
+                    continue
+                obj = getattr(klass, name)
+                if obj is not None:
+                    seen.add(name)
+                    properties.append((name, obj))
+            child_node_names.extend(klass.__dict__.get('_childNodeNames', ()))
+        schema = ContainerSchema(properties, child_node_names)
+        cls._containerSchema = schema
+    return schema
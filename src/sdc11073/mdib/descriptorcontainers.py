@@ -1,4 +1,3 @@
-import inspect
 from collections import defaultdict
 
 from lxml import etree as etree_
@@ -6,11 +5,20 @@ from lxml import etree as etree_
 from . import containerproperties as cp
 from .containerbase import ContainerBase
 from .. import msgtypes
-from .. import observableproperties as properties
 from .. import pmtypes
 from ..namespaces import Prefix_Namespace as Prefix
 from ..namespaces import domTag, extTag, siTag, msgTag
 
+# all descriptors with the same tag share one QName object as nodeName
+_node_names = {}
+
+
+def _nodeNameFromTag(tag):
+    node_name = _node_names.get(tag)
+    if node_name is None:
+        node_name = _node_names.setdefault(tag, etree_.QName(tag))
+    return node_name
+
 
 class AbstractDescriptorContainer(ContainerBase):
     """
@@ -35,7 +43,7 @@ class AbstractDescriptorContainer(ContainerBase):
     isAlertConditionDescriptor = False
     isContextDescriptor = False
 
-    node = properties.ObservableProperty()  # the elementtree node
+    node = None  # the elementtree node
 
     Handle = cp.NodeAttributeProperty('Handle')
     handle = Handle
@@ -58,8 +66,7 @@ class AbstractDescriptorContainer(ContainerBase):
             self.nodeName = nodeName
             self.Handle = handle
         else:
-            self.nodeName = etree_.QName(node.tag)
-            self._updateFromNode((node))
+            self.nodeName = _nodeNameFromTag(node.tag)  # the properties were already read from node by base class
         self._orderedChildContainers = defaultdict(list)  # needed to keep the order,  key is node name
 
     @property
@@ -127,6 +134,24 @@ class AbstractDescriptorContainer(ContainerBase):
             if container.handle == childDescriptorContainer.handle:
                 tag_specific_list.remove(container)
 
+    def rmChildren(self, childDescriptorContainers):
+        """ removes many children in one pass per child tag (rmChild for every child is quadratic)"""
+        handles_by_tag = defaultdict(set)
+        for child in childDescriptorContainers:
+            handles_by_tag[child.nodeName].add(child.handle)
+        for tag, handles in handles_by_tag.items():
+            tag_specific_list = self._orderedChildContainers[tag]
+            tag_specific_list[:] = [c for c in tag_specific_list if c.handle not in handles]
+
+    def replaceChild(self, childDescriptorContainer):
+        """ replaces the child with the same handle, it keeps its position in the list of children"""
+        tag_specific_list = self._orderedChildContainers[childDescriptorContainer.nodeName]
+        for i, container in enumerate(tag_specific_list):
+            if container.handle == childDescriptorContainer.handle:
+                tag_specific_list[i] = childDescriptorContainer
+                return
+        tag_specific_list.append(childDescriptorContainer)
+
     def getOrderedChildContainers(self):
         ret = []
         for n in self._sortedChildNames():
@@ -149,36 +174,11 @@ class AbstractDescriptorContainer(ContainerBase):
             ret.append((c, n))
         return ret
 
-    def _sortedContainerProperties(self):
-        """
-        @return: a list of (name, object) tuples of all GenericProperties ( and subclasses)
-        """
-        ret = []
-        classes = inspect.getmro(self.__class__)
-        for cls in reversed(classes):
-            try:
-                names = cls.__dict__['_props']  # only access class member of this class, not parent
-            except:
-                continue
-            for name in names:
-                obj = getattr(cls, name)
-                if obj is not None:
-                    ret.append((name, obj))
-        return ret
-
     def _sortedChildNames(self):
         """
-        @return: a list of QNames
+        @return: a tuple of QNames
         """
-        ret = []
-        classes = inspect.getmro(self.__class__)
-        for cls in reversed(classes):
-            try:
-                names = cls.__dict__['_childNodeNames']  # only access class member of this class, not parent
-                ret.extend(names)
-            except:
-                continue
-        return ret
+        return cp.get_container_schema(self.__class__).child_node_names
 
     def mkDescriptorNode(self, parent_node, setXsiType=True, tag=None):
         """
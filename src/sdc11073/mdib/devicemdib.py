@@ -1,10 +1,11 @@
 import time
 import uuid
 from collections import OrderedDict
+from collections import defaultdict
 from collections import namedtuple
 from contextlib import contextmanager
 from functools import wraps
-from threading import Lock
+from threading import Lock, Timer
 
 from lxml import etree as etree_
 
@@ -47,8 +48,22 @@ class _TransactionBase(object):
         else:
             return self._deviceMdibContainer.descriptions.handle.getOne(descriptorHandle)
 
-    def _get_or_mk_StateContainer(self, descriptorHandle, adjustStateVersion=True):
-        """ returns oldContainer, newContainer"""
+    def _getPendingUpdates(self, updatesName):
+        """ returns the updates (dictionary handle -> _TrItem) of the pending transaction of transaction coalescing
+        (see DeviceMdibContainer.setTransactionCoalescing) or an empty dictionary"""
+        pending = self._deviceMdibContainer._pendingTransaction  # pylint: disable=protected-access
+        if pending is None or pending is self:
+            return {}
+        return getattr(pending, updatesName)
+
+    def _get_or_mk_StateContainer(self, descriptorHandle, adjustStateVersion=True, updatesName=None):
+        """ returns oldContainer, newContainer
+        :param updatesName: name of the updates dictionary of the state type (e.g. 'metricStateUpdates'). If the state
+          is updated in a pending transaction, the new container is a copy of that not yet committed state."""
+        if updatesName is not None:
+            pending_tr_item = self._getPendingUpdates(updatesName).get(descriptorHandle)
+            if pending_tr_item is not None:
+                return self._copyPendingState(pending_tr_item)
         descriptorContainer = self._getDescriptorInTransaction(descriptorHandle)
         old_stateContainer = self._deviceMdibContainer.states.descriptorHandle.getOne(descriptorContainer.handle,
                                                                                       allowNone=True)
@@ -58,10 +73,42 @@ class _TransactionBase(object):
             if adjustStateVersion:
                 self._deviceMdibContainer.states.setVersion(new_stateContainer)
         else:
-            new_stateContainer = old_stateContainer.mkCopy()
+            # copy-on-write copy; the node is not copied, it is re-created when the transaction is committed
+            new_stateContainer = old_stateContainer.mkCopy(copy_node=False)
             new_stateContainer.incrementState()
         return old_stateContainer, new_stateContainer
 
+    @staticmethod
+    def _copyPendingState(pending_tr_item):
+        """ Continues with the state of a pending transaction; both transactions are merged before they are committed,
+        a copy of the committed state would lose the updates of the pending one. The pending state is not committed
+        yet, therefore its StateVersion is not incremented again."""
+        return pending_tr_item.old, pending_tr_item.new.mkCopy(copy_node=False)
+
+    _coalescedUpdateNames = ('metricStateUpdates', 'componentStateUpdates', 'operationalStateUpdates')
+
+    def isCoalescable(self):
+        """ True if the transaction only contains metric, component or operational state updates.
+        Descriptor updates, alert states, context states and real time samples are never delayed."""
+        if self.descriptorUpdates or self.alertStateUpdates or self.contextStateUpdates or self.rtSampleStateUpdates:
+            return False
+        return any(getattr(self, name) for name in self._coalescedUpdateNames)
+
+    def mergeEarlierTransaction(self, earlierTransaction):
+        """ Adds the metric, component and operational state updates of an earlier transaction that was not
+        committed yet. If both transactions contain a state, the state of this transaction wins; it was created from
+        the state of the earlier transaction (see _get_or_mk_StateContainer), therefore it contains its updates."""
+        for name in self._coalescedUpdateNames:
+            merged = OrderedDict(getattr(earlierTransaction, name))
+            for handle, tr_item in getattr(self, name).items():
+                earlier = merged.get(handle)
+                # keep the old state of the earlier transaction, it is the state that is still in the mdib
+                merged[handle] = tr_item if earlier is None else _TrItem(earlier.old, tr_item.new)
+            setattr(self, name, merged)
+
+    def coalescedStatesCount(self):
+        return sum(len(getattr(self, name)) for name in self._coalescedUpdateNames)
+
 
 def tr_method_wrapper(method):
     """a decorator for consistency checks and error handling"""
@@ -223,12 +270,56 @@ class _MdibUpdateTransaction(_TransactionBase):
         """
         if descriptorHandle in self.metricStateUpdates:
             raise ValueError('descriptorHandle {} already in updated set!'.format(descriptorHandle))
-        old_state, new_state = self._get_or_mk_StateContainer(descriptorHandle, adjustStateVersion)
+        old_state, new_state = self._get_or_mk_StateContainer(descriptorHandle, adjustStateVersion,
+                                                              'metricStateUpdates')
         if not new_state.isMetricState:
             raise ValueError('descriptorHandle {} does not reference a metric state'.format(descriptorHandle))
         self.metricStateUpdates[descriptorHandle] = _TrItem(old_state, new_state)
         return new_state
 
+    @tr_method_wrapper
+    def update_metric_values(self, values):
+        """ Updates the metric values of many metric states in one pass.
+        This is faster than a getMetricState call per state, the mdib lookups are done while holding the lock once.
+        Note: If the transaction sets the determination time on commit (setDeterminationTime=True),
+        the given determination times are overwritten. DeviceMdibContainer.update_metric_values keeps them.
+        :param values: a dictionary descriptor handle -> (value, validity, determination_time).
+                       If validity is None, the validity is not changed.
+                       If determination_time is None, the current time is used.
+        @return: a list of the updated states (copies).
+        """
+        now = time.time()
+        states = self._deviceMdibContainer.states
+        metric_state_updates = self.metricStateUpdates
+        pending_updates = self._getPendingUpdates('metricStateUpdates')
+        new_states = []
+        with states.lock.read_lock:
+            for descriptorHandle, (value, validity, determination_time) in values.items():
+                if descriptorHandle in metric_state_updates:
+                    raise ValueError('descriptorHandle {} already in updated set!'.format(descriptorHandle))
+                pending_tr_item = pending_updates.get(descriptorHandle)
+                old_state = states.descriptorHandle.getOneNoLock(descriptorHandle, allowNone=True)
+                if pending_tr_item is not None:
+                    old_state, new_state = self._copyPendingState(pending_tr_item)
+                elif old_state is None or descriptorHandle in self.descriptorUpdates:
+                    # state does not exist yet or descriptor is changed in this transaction
+                    old_state, new_state = self._get_or_mk_StateContainer(descriptorHandle)
+                else:
+                    new_state = old_state.mkCopy(copy_node=False)
+                    new_state.incrementState()
+                if not new_state.isMetricState:
+                    raise ValueError('descriptorHandle {} does not reference a metric state'.format(descriptorHandle))
+                metric_value = new_state.metricValue
+                if metric_value is None:
+                    metric_value = new_state.mkMetricValue()
+                metric_value.Value = value
+                if validity is not None:
+                    metric_value.Validity = validity
+                metric_value.DeterminationTime = now if determination_time is None else determination_time
+                metric_state_updates[descriptorHandle] = _TrItem(old_state, new_state)
+                new_states.append(new_state)
+        return new_states
+
     @tr_method_wrapper
     def getComponentState(self, descriptorHandle, adjustStateVersion=True):
         """ Update a ComponentState.
@@ -241,7 +332,8 @@ class _MdibUpdateTransaction(_TransactionBase):
         """
         if descriptorHandle in self.componentStateUpdates:
             raise ValueError('descriptorHandle {} already in updated set!'.format(descriptorHandle))
-        old_state, new_state = self._get_or_mk_StateContainer(descriptorHandle, adjustStateVersion)
+        old_state, new_state = self._get_or_mk_StateContainer(descriptorHandle, adjustStateVersion,
+                                                              'componentStateUpdates')
         if not new_state.isComponentState:
             raise ValueError('descriptorHandle {} does not reference a component state'.format(descriptorHandle))
         self.componentStateUpdates[descriptorHandle] = _TrItem(old_state, new_state)
@@ -297,7 +389,7 @@ class _MdibUpdateTransaction(_TransactionBase):
                     raise ValueError(
                         f'Handle {contextStateHandle} and DescriptorHandle {descriptorHandle} do not match.')
                 set_associated = False  # keep state as it is
-                newStateContainer = oldStateContainer.mkCopy()
+                newStateContainer = oldStateContainer.mkCopy(copy_node=False)
                 newStateContainer.incrementState()
             else:
                 # create a new context state with given handle.
@@ -339,7 +431,8 @@ class _MdibUpdateTransaction(_TransactionBase):
         """
         if descriptorHandle in self.operationalStateUpdates:
             raise ValueError('descriptorHandle {} already in updated set!'.format(descriptorHandle))
-        old_state, new_state = self._get_or_mk_StateContainer(descriptorHandle, adjustStateVersion)
+        old_state, new_state = self._get_or_mk_StateContainer(descriptorHandle, adjustStateVersion,
+                                                              'operationalStateUpdates')
         if not new_state.isOperationalState:
             raise ValueError('descriptorHandle {} does not reference an operational state '
                              '({})'.format(descriptorHandle, new_state.__class__.__name__))
@@ -373,15 +466,16 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
      Do not modify containers directly, use transactions for that purpose.
      Transactions keep track of changes and initiate sending of update notifications to clients."""
 
-    def __init__(self, sdc_definitions, log_prefix=None, waveform_source=None):
+    def __init__(self, sdc_definitions, log_prefix=None, waveform_source=None, numeric_mode=None):
         """
         :param sdc_definitions: defaults to sdc11073.definitions_sdc.SDC_v1_Definitions
         :param log_prefix: a string
         :param waveform_source: an instance of an object that implements devicewaveform.AbstractWaveformSource
+        :param numeric_mode: None, dataconverters.NUMERIC_DECIMAL or dataconverters.NUMERIC_FLOAT, see MdibContainer
         """
         if sdc_definitions is None:
             sdc_definitions = SDC_v1_Definitions
-        super(DeviceMdibContainer, self).__init__(sdc_definitions)
+        super(DeviceMdibContainer, self).__init__(sdc_definitions, numeric_mode=numeric_mode)
         self._logger = loghelper.getLoggerAdapter('sdc.device.mdib', log_prefix)
         self._sdcDevice = None
         self._trLock = Lock()  # transaction lock
@@ -396,8 +490,19 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
         self.postCommitHandler = None  # postCommitHandler can modify mdib if needed after it is committed
         self._waveform_source = waveform_source or DefaultWaveformSource()
 
+        # transaction coalescing, see setTransactionCoalescing
+        self._coalescingWindow = None  # seconds
+        self._coalescingMaxStates = None
+        self._pendingTransaction = None  # merged transactions that are not committed yet
+        self._coalescingTimer = None
+        self._coalescingGeneration = 0  # identifies the window of the running timer
+
     @contextmanager
-    def mdibUpdateTransaction(self, setDeterminationTime=True):
+    def mdibUpdateTransaction(self, setDeterminationTime=True, flush=False):
+        """
+        :param setDeterminationTime: if True, the DeterminationTime of metric values and alert conditions is set
+        :param flush: if True, the transaction is committed immediately even if transaction coalescing is enabled.
+        """
         # pylint: disable=protected-access
         with self._trLock:
             try:
@@ -407,13 +512,105 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
                     self.preCommitHandler(self, self._current_transaction)  # pylint: disable=not-callable
                 if self._current_transaction._error:
                     self._logger.info('mdibUpdateTransaction: transaction without updates!')
+                elif self._coalescingWindow and not flush and self._current_transaction.isCoalescable():
+                    self._coalesceTransaction(self._current_transaction, setDeterminationTime)
                 else:
+                    if self._pendingTransaction is not None:
+                        # pending updates are committed together with this transaction; committing them before
+                        # would send the same StateVersion twice if this transaction updates the same states.
+                        self._current_transaction.mergeEarlierTransaction(self._takePendingTransaction())
                     self._process_transaction(setDeterminationTime)
                     if callable(self.postCommitHandler):
                         self.postCommitHandler(self, self._current_transaction)  # pylint: disable=not-callable
             finally:
                 self._current_transaction = None
 
+    def update_metric_values(self, values, flush=False):
+        """ Updates the metric values of many metric states in one transaction (one EpisodicMetricReport).
+        :param values: a dictionary descriptor handle -> (value, validity, determination_time).
+                       If validity is None, the validity is not changed.
+                       If determination_time is None, the current time is used.
+        :param flush: see mdibUpdateTransaction
+        @return: the mdib version of the transaction (None if the transaction was delayed by coalescing)
+        """
+        with self.mdibUpdateTransaction(setDeterminationTime=False, flush=flush) as mgr:
+            mgr.update_metric_values(values)
+        return mgr.mdib_version
+
+    def setTransactionCoalescing(self, windowMs, maxStates=None):
+        """ Enables or disables transaction coalescing.
+        If enabled, transactions that only update metric, component or operational states are not committed
+        immediately. All such transactions within windowMs milliseconds are merged into one mdibVersion increment and
+        one report per report type. A transaction gets a copy of the pending (not committed) state if it updates a
+        state more than once, the latest values win.
+        Local readers of the mdib see the updates only after they are committed.
+        The merged transactions are committed when
+         - the window is elapsed,
+         - the merged transactions contain maxStates states,
+         - flushTransactions is called,
+         - a transaction is committed that can not be delayed (descriptor updates, alert states, context states or
+           real time samples) or that was created with flush=True.
+        mdib_version of a delayed transaction is still None at the end of the with block.
+        :param windowMs: window in milliseconds, None or 0 disables coalescing (pending transactions are committed).
+        :param maxStates: optional max. number of states in merged transactions
+        """
+        with self._trLock:
+            self._coalescingWindow = windowMs / 1000.0 if windowMs else None
+            self._coalescingMaxStates = maxStates
+            if self._coalescingWindow is None:
+                self._flushPendingTransaction()
+
+    def flushTransactions(self):
+        """ Commits pending (merged) transactions now, see setTransactionCoalescing."""
+        with self._trLock:
+            self._flushPendingTransaction()
+
+    def _coalesceTransaction(self, transaction, setDeterminationTime):
+        if setDeterminationTime:
+            # the time of the transaction, not of the later commit
+            now = time.time()
+            for tr_item in transaction.metricStateUpdates.values():
+                if tr_item.new.metricValue is not None:
+                    tr_item.new.metricValue.DeterminationTime = now
+        if self._pendingTransaction is None:
+            self._coalescingGeneration += 1
+            self._coalescingTimer = Timer(self._coalescingWindow, self._onCoalescingTimer,
+                                          args=(self._coalescingGeneration,))
+            self._coalescingTimer.daemon = True
+            self._coalescingTimer.start()
+        else:
+            transaction.mergeEarlierTransaction(self._pendingTransaction)
+        self._pendingTransaction = transaction
+        if self._coalescingMaxStates and self._pendingTransaction.coalescedStatesCount() >= self._coalescingMaxStates:
+            self._flushPendingTransaction()
+
+    def _onCoalescingTimer(self, generation):
+        with self._trLock:
+            # cancel() has no effect if the timer already waits for the lock while the window is committed by
+            # someone else. Then it must not commit the next window.
+            if generation == self._coalescingGeneration:
+                self._flushPendingTransaction()
+
+    def _takePendingTransaction(self):
+        pending, self._pendingTransaction = self._pendingTransaction, None
+        if self._coalescingTimer is not None:
+            self._coalescingTimer.cancel()
+            self._coalescingTimer = None
+        return pending
+
+    def _flushPendingTransaction(self):
+        """ Caller must hold the transaction lock."""
+        if self._pendingTransaction is None:
+            return
+        previous_transaction = self._current_transaction
+        self._current_transaction = self._takePendingTransaction()
+        try:
+            self._process_transaction(setDeterminationTime=False)  # already set when the transactions were merged
+            if callable(self.postCommitHandler):
+                self.postCommitHandler(self, self._current_transaction)  # pylint: disable=not-callable
+        finally:
+            self._current_transaction = previous_transaction
+
     @contextmanager
     def _rt_sample_transaction(self):
         with self._trLock:
@@ -466,10 +663,8 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
         # handle descriptors
         if len(mgr.descriptorUpdates) > 0:
             # need to know all to be deleted and to be created descriptors
-            to_be_deleted = [old for old, new in mgr.descriptorUpdates.values() if new is None]
-            to_be_created = [new for old, new in mgr.descriptorUpdates.values() if old is None]
-            to_be_deleted_handles = [d.handle for d in to_be_deleted]
-            to_be_created_handles = [d.handle for d in to_be_created]
+            to_be_deleted_handles = {old.handle for old, new in mgr.descriptorUpdates.values() if new is None}
+            to_be_created_handles = {new.handle for old, new in mgr.descriptorUpdates.values() if old is None}
             with self.mdibLock:
 
                 def _updateCorrespondingState(descriptorContainer):
@@ -503,7 +698,7 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
                                 old_state, new_state = state_update
                             else:
                                 old_state = st
-                                new_state = old_state.mkCopy()
+                                new_state = old_state.mkCopy(copy_node=False)
                                 update_dict[key] = _TrItem(old_state, new_state)
                             new_state.descriptorContainer = descriptorContainer
                             new_state.incrementState()
@@ -525,7 +720,7 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
                         else:
                             old_state = self.states.descriptorHandle.getOne(descriptorContainer.handle, allowNone=True)
                             if old_state is not None:
-                                new_state = old_state.mkCopy()
+                                new_state = old_state.mkCopy(copy_node=False)
                                 new_state.descriptorContainer = descriptorContainer
                                 new_state.incrementState()
                                 new_state.updateDescriptorVersion()
@@ -533,16 +728,22 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
                         if new_state is not None:
                             descr_updated_states.append(new_state)
 
-                def _incrementParentDescriptorVersion(descriptorContainer):
-                    parentDescriptorContainer = self.descriptions.handle.getOne(descriptorContainer.parentHandle)
-                    parentDescriptorContainer.incrementDescriptorVersion()
-                    descr_updated.append(parentDescriptorContainer)
-                    _updateCorrespondingState(parentDescriptorContainer)
+                def _incrementParentDescriptorVersion(parentHandle):
+                    parentDescriptorContainer = self.descriptions.handle.getOne(parentHandle)
+                    # committed descriptors are not modified, the new version replaces the old one
+                    newParentDescriptorContainer = parentDescriptorContainer.mkCopy(copy_node=False)
+                    newParentDescriptorContainer.incrementDescriptorVersion()
+                    self.descriptions.replaceObjectNoLock(newParentDescriptorContainer)
+                    descr_updated.append(newParentDescriptorContainer)
+                    _updateCorrespondingState(newParentDescriptorContainer)
 
                 # handling only updated states here: If a descriptor is created, I assume that the application also creates the state in an transaction.
                 # The state will then be transported via that notification report.
                 # Maybe this needs to be reworked, but at the time of this writing it seems fine.
-                for tr_item in mgr.descriptorUpdates.values():
+                # parents of added and deleted descriptors, their DescriptorVersion is incremented only once
+                changed_parent_handles = {}  # dict as ordered set
+                deleted_handles = set()
+                for tr_item in self._parentsFirst(mgr.descriptorUpdates.values(), to_be_created_handles):
                     origDescriptor, newDescriptor = tr_item.old, tr_item.new
                     if newDescriptor is not None:
                         newDescriptor.updateNode(setXsiType=True)
@@ -556,31 +757,41 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
                         # this is a create operation
                         self._logger.debug('mdibUpdateTransaction: new descriptor Handle={}, DescriptorVersion={}',
                                            newDescriptor.handle, newDescriptor.DescriptorVersion)
-                        descr_created.append(newDescriptor.mkCopy())
+                        descr_created.append(newDescriptor)
                         self.descriptions.addObjectNoLock(newDescriptor)
                         # R0033: A SERVICE PROVIDER SHALL increment pm:AbstractDescriptor/@DescriptorVersion by one if a direct child descriptor is added or deleted.
                         if newDescriptor.parentHandle is not None and \
                                 newDescriptor.parentHandle not in to_be_created_handles:
                             # only update parent if it is not also created in this transaction
-                            _incrementParentDescriptorVersion(newDescriptor)
+                            changed_parent_handles[newDescriptor.parentHandle] = None
                     elif newDescriptor is None:
                         # this is a delete operation
+                        if not to_be_deleted_handles.isdisjoint(
+                                self.descriptions.getAncestorHandles(origDescriptor.handle) or ()):
+                            continue  # part of the subtree of a deleted ancestor
                         self._logger.debug('mdibUpdateTransaction: rm descriptor Handle={}, DescriptorVersion={}',
                                            origDescriptor.handle, origDescriptor.DescriptorVersion)
                         all_descriptors = self.getAllDescriptorsInSubTree(origDescriptor)
-                        self._rmDescriptorsAndStates(all_descriptors)
+                        deleted_handles.update(d.handle for d in all_descriptors)
                         descr_deleted.extend(all_descriptors)
                         # R0033: A SERVICE PROVIDER SHALL increment pm:AbstractDescriptor/@DescriptorVersion by one if a direct child descriptor is added or deleted.
                         if origDescriptor.parentHandle is not None and \
                                 origDescriptor.parentHandle not in to_be_deleted_handles:
                             # only update parent if it is not also deleted in this transaction
-                            _incrementParentDescriptorVersion(origDescriptor)
+                            changed_parent_handles[origDescriptor.parentHandle] = None
                     else:
                         # this is an update operation
                         descr_updated.append(newDescriptor)
                         self._logger.debug('mdibUpdateTransaction: update descriptor Handle={}, DescriptorVersion={}',
                                            newDescriptor.handle, newDescriptor.DescriptorVersion)
                         self.descriptions.replaceObjectNoLock(newDescriptor)
+                if descr_deleted:
+                    # one call for all deleted subtrees, the lookups are updated in one pass
+                    self._rmDescriptorsAndStates(descr_deleted)
+                for parentHandle in changed_parent_handles:
+                    # a parent that is updated in this transaction has already a new DescriptorVersion
+                    if parentHandle not in deleted_handles and parentHandle not in mgr.descriptorUpdates:
+                        _incrementParentDescriptorVersion(parentHandle)
 
         # handle metric states
         if len(mgr.metricStateUpdates) > 0:
@@ -595,8 +806,7 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
                         if setDeterminationTime and newstate.metricValue is not None:
                             newstate.metricValue.DeterminationTime = now
                         # replace the old container with the new one
-                        self.states.removeObjectNoLock(oldstate)
-                        self.states.addObjectNoLock(newstate)
+                        self.states.swapObjectNoLock(oldstate, newstate)
                         metric_updates.append(newstate)
                     except RuntimeError:
                         self._logger.warn('mdibUpdateTransaction: {} did not exist before!! really??', newstate)
@@ -611,10 +821,8 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
                     try:
                         if setDeterminationTime and newstate.isAlertCondition:
                             newstate.DeterminationTime = time.time()
-                        newstate.updateNode()
                         # replace the old container with the new one
-                        self.states.removeObjectNoLock(oldstate)
-                        self.states.addObjectNoLock(newstate)
+                        self.states.swapObjectNoLock(oldstate, newstate)
                         alert_updates.append(newstate)
                     except RuntimeError:
                         self._logger.warn('mdibUpdateTransaction: {} did not exist before!! really??', newstate)
@@ -628,10 +836,8 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
                 for value in mgr.componentStateUpdates.values():
                     oldstate, newstate = value.old, value.new
                     try:
-                        newstate.updateNode()
                         # replace the old container with the new one
-                        self.states.removeObjectNoLock(oldstate)
-                        self.states.addObjectNoLock(newstate)
+                        self.states.swapObjectNoLock(oldstate, newstate)
                         comp_updates.append(newstate)
                     except RuntimeError:
                         self._logger.warn('mdibUpdateTransaction: {} did not exist before!! really??', newstate)
@@ -646,9 +852,7 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
                     try:
                         ctxt_updates.append(newstate)
                         # replace the old container with the new one
-                        self.contextStates.removeObjectNoLock(oldstate)
-                        self.contextStates.addObjectNoLock(newstate)
-                        newstate.updateNode()
+                        self.contextStates.swapObjectNoLock(oldstate, newstate)
                     except RuntimeError:
                         self._logger.warn('mdibUpdateTransaction: {} did not exist before!! really??', newstate)
                         raise
@@ -660,9 +864,7 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
                 for value in mgr.operationalStateUpdates.values():
                     oldstate, newstate = value.old, value.new
                     try:
-                        newstate.updateNode()
-                        self.states.removeObjectNoLock(oldstate)
-                        self.states.addObjectNoLock(newstate)
+                        self.states.swapObjectNoLock(oldstate, newstate)
                         op_updates.append(newstate)
                     except RuntimeError:
                         self._logger.warn('mdibUpdateTransaction: {} did not exist before!! really??', newstate)
@@ -677,9 +879,7 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
                 for value in mgr.rtSampleStateUpdates.values():
                     oldstate, newstate = value.old, value.new
                     try:
-                        newstate.updateNode()
-                        self.states.removeObjectNoLock(oldstate)
-                        self.states.addObjectNoLock(newstate)
+                        self.states.swapObjectNoLock(oldstate, newstate)
                         rt_updates.append(newstate)
                     except RuntimeError:
                         self._logger.warn('mdibUpdateTransaction: {} did not exist before!! really??', newstate)
@@ -689,55 +889,84 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
 
         mdib_version_grp = self.mdib_version_group
         if self._sdcDevice is not None:
+            # Committed descriptors and states are never modified, every transaction works on copies of them.
+            # => they can be used for reports without copying. Their nodes are created lazily, only if a
+            # notification is really sent.
+            # Exception are real time sample states: _RtDataMdibUpdateTransaction does not copy them (no rollback,
+            # less overhead), the waveform source modifies the committed objects. For them cheap copy-on-write
+            # snapshots are sent.
             if len(mgr.descriptorUpdates) > 0:
-                updated = [d.mkCopy() for d in descr_updated]
-                created = [d.mkCopy() for d in descr_created]
-                deleted = [d.mkCopy() for d in descr_deleted]
-                updated_states = [s.mkCopy() for s in descr_updated_states]
-                self._sdcDevice.sendDescriptorUpdates(mdib_version_grp, updated=updated, created=created, deleted=deleted,
+                updated_states = [s.mkCopy(copy_node=False) if s.isRealtimeSampleArrayMetricState else s
+                                  for s in descr_updated_states]
+                self._sdcDevice.sendDescriptorUpdates(mdib_version_grp, updated=descr_updated, created=descr_created,
+                                                      deleted=descr_deleted,
                                                       updated_states=updated_states)
             if len(metric_updates) > 0:
-                updates = [s.mkCopy() for s in metric_updates]
-                self._sdcDevice.sendMetricStateUpdates(mdib_version_grp, updates)
+                self._sdcDevice.sendMetricStateUpdates(mdib_version_grp, metric_updates)
             if len(alert_updates) > 0:
-                updates = [s.mkCopy() for s in alert_updates]
-                self._sdcDevice.sendAlertStateUpdates(mdib_version_grp, updates)
+                self._sdcDevice.sendAlertStateUpdates(mdib_version_grp, alert_updates)
             if len(comp_updates) > 0:
-                updates = [s.mkCopy() for s in comp_updates]
-                self._sdcDevice.sendComponentStateUpdates(mdib_version_grp, updates)
+                self._sdcDevice.sendComponentStateUpdates(mdib_version_grp, comp_updates)
             if len(ctxt_updates) > 0:
-                updates = [s.mkCopy() for s in ctxt_updates]
-                self._sdcDevice.sendContextStateUpdates(mdib_version_grp, updates)
+                self._sdcDevice.sendContextStateUpdates(mdib_version_grp, ctxt_updates)
             if len(op_updates) > 0:
-                updates = [s.mkCopy() for s in op_updates]
-                self._sdcDevice.sendOperationalStateUpdates(mdib_version_grp, updates)
+                self._sdcDevice.sendOperationalStateUpdates(mdib_version_grp, op_updates)
             if len(rt_updates) > 0:
-                updates = [s.mkCopy() for s in rt_updates]
+                updates = [s.mkCopy(copy_node=False) for s in rt_updates]
                 self._sdcDevice.sendRealtimeSamplesStateUpdates(mdib_version_grp, updates)
         mgr.mdib_version = self.mdibVersion
 
+    @staticmethod
+    def _parentsFirst(tr_items, created_handles):
+        """ Orders transaction items so that a created descriptor follows its parent if the parent is also created
+        in this transaction. Other items keep their order.
+        :param tr_items: iterable of _TrItem
+        :param created_handles: set of handles of the created descriptors
+        :return: list of _TrItem
+        """
+        children = defaultdict(list)  # key = handle of a created parent, value = list of created children
+        result = []
+        for tr_item in tr_items:
+            if tr_item.old is None and tr_item.new.parentHandle in created_handles:
+                children[tr_item.new.parentHandle].append(tr_item)
+            else:
+                result.append(tr_item)
+        i = 0
+        while i < len(result) and children:
+            tr_item = result[i]
+            if tr_item.old is None:
+                result.extend(children.pop(tr_item.new.handle, ()))
+            i += 1
+        for remaining in children.values():  # only possible with inconsistent parent handles (a cycle)
+            result.extend(remaining)
+        return result
+
     def _process_internal_rt_transaction(self):
         mgr = self._current_transaction
         # handle real time samples
         if len(mgr.rtSampleStateUpdates) > 0:
             self.mdibVersion += 1
-            updates = []
             self._logger.debug('mdibUpdateTransaction: rtSample updates = {}', mgr.rtSampleStateUpdates)
-            for value in mgr.rtSampleStateUpdates.values():
-                oldstate, newstate = value.old, value.new
-                try:
-                    newstate.updateNode()
-                    updates.append(newstate)
-                except RuntimeError:
-                    self._logger.warn('mdibUpdateTransaction: {} did not exist before!! really??', newstate)
-                    raise
             # makes copies of all states for sending, so that they can't be affected by transactions after this one
-            updates = [s.mkCopy() for s in updates]
+            # (copy-on-write, the nodes are only created if a notification is sent)
+            updates = [value.new.mkCopy(copy_node=False) for value in mgr.rtSampleStateUpdates.values()]
             if self._sdcDevice is not None:
                 self._sdcDevice.sendRealtimeSamplesStateUpdates(self.mdib_version_group, updates)
 
         mgr.mdib_version = self.mdibVersion
 
+    def _snapshotDescriptor(self, descriptorContainer):
+        # Transactions replace committed descriptors instead of modifying them, therefore a reference is sufficient.
+        return descriptorContainer
+
+    def _snapshotState(self, stateContainer):
+        # Transactions replace committed states instead of modifying them, therefore a reference is sufficient.
+        # Exception are real time sample states, _RtDataMdibUpdateTransaction hands out the committed objects
+        # to the waveform source, which modifies them without a copy.
+        if stateContainer.isRealtimeSampleArrayMetricState:
+            return stateContainer.mkCopy(copy_node=False)
+        return stateContainer
+
     def setSdcDevice(self, sdcDevice):
         self._sdcDevice = sdcDevice
 
@@ -971,6 +1200,16 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
         with self._rt_sample_transaction() as tr:
             self._waveform_source.update_all_realtime_samples(tr)
 
+    def update_rt_samples(self, descriptorHandles):
+        """ updates the real time sample states of descriptorHandles in one transaction"""
+        with self._rt_sample_transaction() as tr:
+            self._waveform_source.update_realtime_samples(tr, descriptorHandles)
+
+    def getRtSampleSchedulingInfo(self):
+        """ :return: tuple (dictionary handle => sample period, list of linked handle groups) of the waveform source,
+                     sample periods are None if the waveform source does not provide them."""
+        return self._waveform_source.get_sample_periods(), self._waveform_source.get_linked_handles()
+
     def mkStateContainersforAllDescriptors(self):
         """The model requires that there is a state for every descriptor (exception: multi-states)
         Call this method to create missing states
@@ -1003,7 +1242,7 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
 
     @classmethod
     def fromMdibFile(cls, path, createLocationContextDescr=True, createPatientContextDescr=True,
-                     protocol_definition=None, log_prefix=None):
+                     protocol_definition=None, log_prefix=None, numeric_mode=None):
         """
         An alternative constructor for the class
         :param path: the input file path for creating the mdib
@@ -1011,16 +1250,17 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
         :param createPatientContextDescr: same as in fromString method
         :param protocol_definition: an optional object derived from BaseDefinitions, forces usage of this definition
         :param log_prefix: a string or None
+        :param numeric_mode: same as in fromString method
         :return: instance
         """
         with open(path, 'rb') as f:
             xml_text = f.read()
         return DeviceMdibContainer.fromString(xml_text, createLocationContextDescr, createPatientContextDescr,
-                                              protocol_definition, log_prefix)
+                                              protocol_definition, log_prefix, numeric_mode)
 
     @classmethod
     def fromString(cls, xml_text, createLocationContextDescr=True, createPatientContextDescr=True,
-                   protocol_definition=None, log_prefix=None):
+                   protocol_definition=None, log_prefix=None, numeric_mode=None):
         """
         An alternative constructor for the class
         :param xml_text: the input string for creating the mdib
@@ -1028,6 +1268,7 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
         :param createPatientContextDescr: if True, and the mdib does not contain a PatientContextDescriptor, it adds one
         :param protocol_definition: an optional object derived from BaseDefinitions, forces usage of this definition
         :param log_prefix: a string or None
+        :param numeric_mode: None, dataconverters.NUMERIC_DECIMAL or dataconverters.NUMERIC_FLOAT
         :return: instance
         """
         # get protocol definition that matches xml_text
@@ -1040,7 +1281,7 @@ class DeviceMdibContainer(mdibbase.MdibContainer):
         if protocol_definition is None:
             raise ValueError('cannot create instance, no known BICEPS schema version identified')
 
-        mdib = cls(protocol_definition, log_prefix=log_prefix)
+        mdib = cls(protocol_definition, log_prefix=log_prefix, numeric_mode=numeric_mode)
         root = msgreader.MessageReader.getMdibRootNode(mdib.sdc_definitions, xml_text)
         mdib.sdc_definitions.xml_validator.assertValid(root)
         mdib.nsmapper.useDocPrefixes(root.nsmap)
@@ -7,21 +7,28 @@ of the mdib.
 import time
 from abc import ABC, abstractmethod
 from .. import pmtypes
+from .. import samplebuffer
 
 
 class RtSampleArray:
-    """ This class contains a list of waveform values plus time stamps and annotations.
+    """ This class contains a block of waveform values plus time stamps and annotations.
     It is used to create Waveform notifications."""
-    def __init__(self, determination_time, sample_period, samples, activation_state):
+    def __init__(self, determination_time, sample_period, samples, activation_state, trigger_indices=None):
         """
         :param determination_time: the time stamp of the first value in samples
         :param sample_period: the time difference between two samples
-        :param samples: a list of 2-tuples (value (float or int), flag annotation_trigger)
+        :param samples: a sample buffer (or list) of values.
+                        If trigger_indices is None: a list of 2-tuples (value (float or int), flag annotation_trigger)
         :param activation_state: one of pmtypes.ComponentActivation values
+        :param trigger_indices: list of the indices of the samples that trigger annotations
         """
         self.determination_time = determination_time
         self.sample_period = sample_period
+        if trigger_indices is None:
+            trigger_indices = [i for i, sample in enumerate(samples) if sample[1]]
+            samples = samplebuffer.mkSampleBuffer([sample[0] for sample in samples])
         self.samples = samples
+        self.trigger_indices = trigger_indices
         self.activation_state = activation_state
         self.annotations = []
         self.apply_annotations = []
@@ -39,7 +46,7 @@ class RtSampleArray:
 
     def get_annotation_trigger_timestamps(self):
         """ returns the time stamps of all samples annotation_trigger set"""
-        return [self.determination_time + i * self.sample_period for i, sample in enumerate(self.samples) if sample[1]]
+        return [self.determination_time + i * self.sample_period for i in self.trigger_indices]
 
     def add_annotations_at(self, annotation, timestamps):
         """
@@ -79,20 +86,31 @@ class _SampleArrayGenerator:
         If activation state is not 'On', no samples are returned.
         @return: RtSampleArray instance"""
         if self._activation_state != pmtypes.ComponentActivation.ON:
-            self.current_rt_sample_array = RtSampleArray(None, self._generator.sampleperiod, [], self._activation_state)
+            self.current_rt_sample_array = RtSampleArray(None, self._generator.sampleperiod,
+                                                         samplebuffer.mkSampleBuffer(), self._activation_state, [])
         else:
             now = time.time()
             observation_time = self._last_timestamp or now
             samples_count = int((now - observation_time) / self._generator.sampleperiod)
-            samples = self._generator.nextSamples(samples_count)
             self._last_timestamp = observation_time + self._generator.sampleperiod * samples_count
-            self.current_rt_sample_array = RtSampleArray(
-                observation_time, self._generator.sampleperiod, samples, self._activation_state)
+            next_sample_block = getattr(self._generator, 'nextSampleBlock', None)
+            if next_sample_block is not None:
+                samples, trigger_indices = next_sample_block(samples_count)
+                self.current_rt_sample_array = RtSampleArray(
+                    observation_time, self._generator.sampleperiod, samples, self._activation_state, trigger_indices)
+            else:  # generator that only implements nextSamples
+                samples = self._generator.nextSamples(samples_count)
+                self.current_rt_sample_array = RtSampleArray(
+                    observation_time, self._generator.sampleperiod, samples, self._activation_state)
         return self.current_rt_sample_array
 
     def setWfGenerator(self, generator):
         self._generator = generator
 
+    @property
+    def sample_period(self):
+        return self._generator.sampleperiod
+
 
 class AbstractWaveformSource(ABC):
     """The methods declared by this abstract class are used by mdib. """
@@ -108,6 +126,21 @@ class AbstractWaveformSource(ABC):
     def set_activation_state(self, mdib, descriptorHandle, componentActivation):
         pass
 
+    def update_realtime_samples(self, transaction, descriptor_handles):
+        """ update the realtime sample states of descriptor_handles.
+        This default implementation updates all states, like update_all_realtime_samples."""
+        self.update_all_realtime_samples(transaction)
+
+    def get_sample_periods(self):
+        """ :return: dictionary descriptor handle => sample period of all waveforms of this source.
+        None if not known, then the sdc device updates all waveforms in every cycle."""
+        return None
+
+    def get_linked_handles(self):
+        """ :return: list of handle groups (tuples) that shall be updated together,
+        e.g. the trigger and the annotated waveforms of an annotation."""
+        return []
+
 
 class DefaultWaveformSource(AbstractWaveformSource):
     """ This is the basic mechanism that reads data from waveform sources and applies it to mdib
@@ -125,12 +158,39 @@ class DefaultWaveformSource(AbstractWaveformSource):
             self._update_rt_samples(st)
         self._add_all_annotations()
 
+    def update_realtime_samples(self, transaction, descriptor_handles):
+        """ update the realtime sample states of descriptor_handles that have a waveform generator registered."""
+        for descriptor_handle in descriptor_handles:
+            if descriptor_handle in self._waveform_generators:
+                st = transaction.getRealTimeSampleArrayMetricState(descriptor_handle)
+                self._update_rt_samples(st)
+        self._add_all_annotations(descriptor_handles)
+
+    def get_sample_periods(self):
+        return {handle: g.sample_period for handle, g in self._waveform_generators.items()}
+
+    def update_descriptors(self, mdib):
+        """ sets the SamplePeriod of the descriptors to the sample periods of the waveforms (this is done when a
+        waveform generator is registered, sub classes with other sample sources need to call it)."""
+        with mdib.mdibUpdateTransaction() as tr:
+            for handle, sample_period in self.get_sample_periods().items():
+                if mdib.descriptions.handle.getOne(handle).SamplePeriod != sample_period:
+                    tr.getDescriptor(handle).SamplePeriod = sample_period
+
+    def get_linked_handles(self):
+        return [(trigger_handle,) + tuple(annotated_handles)
+                for trigger_handle, (_, annotated_handles) in self._annotators.items()]
+
     def register_waveform_generator(self, mdib, descriptor_handle, wf_generator):
         """
         param mdib: a device mdib instance
         :param descriptor_handle: the handle of the RealtimeSampelArray that shall accept this data
         :param wf_generator: a waveforms.WaveformGenerator instance
         """
+        current = self._waveform_generators.get(descriptor_handle)
+        if current is not None and not isinstance(current, _SampleArrayGenerator):
+            raise ValueError('the samples of "{}" are provided by {}, a waveform generator can not be '
+                             'registered'.format(descriptor_handle, current.__class__.__name__))
         sample_period = wf_generator.sampleperiod
         descriptor_container = mdib.descriptions.handle.getOne(descriptor_handle)
         if descriptor_container.SamplePeriod != sample_period:
@@ -138,8 +198,8 @@ class DefaultWaveformSource(AbstractWaveformSource):
             with mdib.mdibUpdateTransaction() as tr:
                 descr = tr.getDescriptor(descriptor_handle)
                 descr.SamplePeriod = sample_period
-        if descriptor_handle in self._waveform_generators:
-            self._waveform_generators[descriptor_handle].setWfGenerator(wf_generator)
+        if current is not None:
+            current.setWfGenerator(wf_generator)
         else:
             self._waveform_generators[descriptor_handle] = _SampleArrayGenerator(descriptor_handle, wf_generator)
 
@@ -167,18 +227,18 @@ class DefaultWaveformSource(AbstractWaveformSource):
         wf_generator = self._waveform_generators.get(state.descriptorHandle)
         if wf_generator:
             rt_sample = wf_generator.getNextSampleArray()
-            samples = [s[0] for s in rt_sample.samples]  # only the values without the 'start of cycle' flags
             if state.metricValue is None:
                 state.mkMetricValue()
-            state.metricValue.Samples = samples
+            state.metricValue.Samples = rt_sample.samples
             state.metricValue.DeterminationTime = rt_sample.determination_time
             state.metricValue.Annotations = rt_sample.annotations
             state.metricValue.ApplyAnnotations = rt_sample.apply_annotations
             state.ActivationState = rt_sample.activation_state
 
-    def _add_all_annotations(self):
-        """ add annotations to all current RtSampleArrays """
-        rt_sample_arrays = {handle: g.current_rt_sample_array for (handle, g) in self._waveform_generators.items()}
+    def _add_all_annotations(self, descriptor_handles=None):
+        """ add annotations to all current RtSampleArrays (only those of descriptor_handles if not None)"""
+        rt_sample_arrays = {handle: g.current_rt_sample_array for (handle, g) in self._waveform_generators.items()
+                            if descriptor_handles is None or handle in descriptor_handles}
         for src_handle, _annotator in self._annotators.items():
             if src_handle in rt_sample_arrays:
                 annotation, dest_handles = _annotator
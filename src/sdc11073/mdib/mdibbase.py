@@ -1,12 +1,14 @@
 import traceback
 import time
-from threading import Lock
+from collections import defaultdict
 from dataclasses import dataclass
 from lxml import etree as etree_
 from .. import observableproperties as properties
 from .. import namespaces
 from .. import pmtypes
 from .. import multikey
+from ..dataconverters import numericMode
+from ..rwlock import ReadWriteLock
 from typing import Union
 
 class RtSampleContainer(object):
@@ -40,6 +42,40 @@ class MdibVersionGroup:
             node.set('InstanceId', str(self.instance_id))
 
 
+@dataclass
+class MdibSnapshot:
+    """A consistent view of the mdib content. It is taken while holding the read side of the mdibLock, the containers
+    in it are not modified afterwards. This allows to serialize it without holding the lock."""
+    mdib_version_group: MdibVersionGroup
+    md_description_version: int
+    md_state_version: int
+    root_descriptors: list
+    child_descriptors: dict  # key: parent handle, value: ordered list of child descriptors
+    states: list
+    context_states: list
+
+
+def _getTypeCodings(descriptor):
+    """ returns the codings of the Type of a descriptor and of all its translations (without duplicates)"""
+    if descriptor.Type is None:
+        return None
+    return _getCodings(descriptor.Type)
+
+
+def _getCodings(code):
+    """ returns the codings of a CodedValue (coding and translations) or of a Coding (only itself), like
+    pmtypes.have_matching_codes compares them. Strings and ints are codes in the DefaultCodingSystem."""
+    if isinstance(code, (str, int)):
+        return [pmtypes.Coding(code)]
+    if isinstance(code, pmtypes.Coding):
+        return [code]
+    codings = [code.coding]
+    for translation in getattr(code, 'Translation', None) or ():
+        if translation.coding not in codings:
+            codings.append(translation.coding)
+    return codings
+
+
 class _MultikeyWithVersionLookup(multikey.MultiKeyLookup):
     """
     This class keeps track of versions of removed objects
@@ -72,12 +108,15 @@ class DescriptorsLookup(_MultikeyWithVersionLookup):
 
     def __init__(self):
         _MultikeyWithVersionLookup.__init__(self)
-        self.addIndex('handle', multikey.UIndexDefinition(lambda obj: obj.handle))
-        self.addIndex('parentHandle', multikey.IndexDefinition(lambda obj: obj.parentHandle))
+        self.addIndex('handle', multikey.UIndexDefinition(lambda obj: obj.handle, attrName='handle'))
+        self.addIndex('parentHandle', multikey.IndexDefinition(lambda obj: obj.parentHandle,
+                                                                     attrName='parentHandle'))
         # nodeName may differ but refers to the same type. use NODETYPE instead
-        self.addIndex('nodeName', multikey.IndexDefinition(lambda obj: obj.nodeName))
-        self.addIndex('NODETYPE', multikey.IndexDefinition(lambda obj: obj.NODETYPE))
-        self.addIndex('ConditionSignaled', multikey.IndexDefinition(lambda obj: obj.ConditionSignaled, indexNoneValues=False))
+        self.addIndex('nodeName', multikey.IndexDefinition(lambda obj: obj.nodeName, attrName='nodeName'))
+        self.addIndex('NODETYPE', multikey.IndexDefinition(lambda obj: obj.NODETYPE, attrName='NODETYPE'))
+        self.addIndex('parentHandle_nodeName', multikey.CompositeIndexDefinition(('parentHandle', 'nodeName')))
+        self.addIndex('ConditionSignaled', multikey.IndexDefinition(lambda obj: obj.ConditionSignaled, indexNoneValues=False,
+                                                                          attrName='ConditionSignaled'))
         # an index to find all alert conditions for a metric (AlertCondition is the only class that has a
         # "Source" attribute, therefore this simple approach without type testing is sufficient):
         self.addIndex('Source', multikey.IndexDefinition1n(lambda obj: [s.text for s in obj.Source], indexNoneValues=False))
@@ -86,11 +125,72 @@ class DescriptorsLookup(_MultikeyWithVersionLookup):
         self.addIndex('codingSystem', multikey.IndexDefinition(lambda obj: obj.codingSystem))
         self.addIndex('codeId', multikey.IndexDefinition(lambda obj: obj.codeId))
         self.addIndex('coding', multikey.IndexDefinition(lambda obj: obj.coding))
-
+        # key = pmtypes.Coding of the Type or of one of its translations
+        self.addIndex('typeCoding', multikey.IndexDefinition1n(_getTypeCodings, indexNoneValues=False))
+        # tree index: key = handle, value = tuple of the handles of all ancestors (root first).
+        # The depth of a descriptor tree is small (Mds, Vmd, Channel, Metric), ancestry checks are O(1) in practice.
+        self._ancestorHandles = {}
 
     def _saveVersion(self, obj):
         self.handle_version_lookup[obj.handle] = obj.DescriptorVersion
 
+    def _setAncestorHandles(self, obj):
+        """ updates the tree index for obj, and for its descendants if they were added before obj."""
+        pending = [obj]
+        while pending:
+            descriptor = pending.pop()
+            parentHandle = descriptor.parentHandle
+            if parentHandle is None:
+                self._ancestorHandles[descriptor.handle] = ()
+            else:
+                self._ancestorHandles[descriptor.handle] = self._ancestorHandles.get(parentHandle, ()) + (parentHandle,)
+            pending.extend(dict.get(self.parentHandle, descriptor.handle, ()))
+
+    def getByTypeNoLock(self, code):
+        """ returns all descriptors whose Type matches code (see pmtypes.have_matching_codes), taken from the
+        typeCoding index.
+        The index is updated when a descriptor is added, replaced or updated (updateObject). If the index has no
+        matching descriptor, all descriptors are checked: this finds descriptors whose Type was modified in place.
+        :param code: a pmtypes.CodedValue, a pmtypes.Coding, or a str / int code in the DefaultCodingSystem
+        :return: a list of descriptor containers"""
+        codings = _getCodings(code)
+        if len(codings) == 1:
+            result = list(dict.get(self.typeCoding, codings[0], ()))
+        else:
+            found = {}  # key = id(descriptor), keeps the order
+            for coding in codings:
+                for descriptor in dict.get(self.typeCoding, coding, ()):
+                    found[id(descriptor)] = descriptor
+            result = list(found.values())
+        if not result:
+            for descriptor in self.objects:
+                typeCodings = _getTypeCodings(descriptor)
+                if typeCodings and any(coding in typeCodings for coding in codings):
+                    result.append(descriptor)
+        return result
+
+    def getAncestorHandles(self, handle):
+        """ returns the handles of all ancestors of the descriptor with given handle, the root (Mds) first.
+        :return: a tuple of handles, None if the handle is unknown"""
+        with self._lock.read_lock:
+            return self._ancestorHandles.get(handle)
+
+    def isDescendantOf(self, handle, ancestorHandle):
+        """ True if the descriptor with handle is a (direct or indirect) child of the descriptor with ancestorHandle"""
+        with self._lock.read_lock:
+            return ancestorHandle in self._ancestorHandles.get(handle, ())
+
+    def getNearestAncestor(self, handle, nodeType):
+        """ returns the closest ancestor descriptor of type nodeType, e.g. the Vmd or Mds of a metric.
+        :param nodeType: a QName, compared with NODETYPE of the descriptors
+        :return: descriptor container or None"""
+        with self._lock.read_lock:
+            for ancestorHandle in reversed(self._ancestorHandles.get(handle, ())):
+                ancestor = self.handle.getOneNoLock(ancestorHandle, allowNone=True)
+                if ancestor is not None and ancestor.NODETYPE == nodeType:
+                    return ancestor
+            return None
+
     def setVersion(self, obj, increment=True):
         version = self.handle_version_lookup.get(obj.handle)
         if version is not None:
@@ -104,8 +204,11 @@ class DescriptorsLookup(_MultikeyWithVersionLookup):
 
     def addObjectNoLock(self, obj):
         """ appends obj to parent"""
+        if obj in self._objects:
+            return
         _MultikeyWithVersionLookup.addObjectNoLock(self, obj)
-        parent = None if obj.parentHandle is None else self.handle.getOne(obj.parentHandle, allowNone=True)
+        self._setAncestorHandles(obj)
+        parent = None if obj.parentHandle is None else self.handle.getOneNoLock(obj.parentHandle, allowNone=True)
         if parent is not None:
             parent.addChild(obj)
 
@@ -125,7 +228,10 @@ class DescriptorsLookup(_MultikeyWithVersionLookup):
             self.removeObjectNoLock(obj)
 
     def removeObjectNoLock(self, obj):
+        if id(obj) not in self._objectIDs:
+            return
         _MultikeyWithVersionLookup.removeObjectNoLock(self, obj)
+        self._ancestorHandles.pop(obj.handle, None)
         parent = self.handle.getOne(obj.parentHandle, allowNone=True)
         if parent is not None:
             parent.rmChild(obj)
@@ -135,8 +241,21 @@ class DescriptorsLookup(_MultikeyWithVersionLookup):
             self.removeObjectsNoLock(objs)
 
     def removeObjectsNoLock(self, objs):
+        children_by_parent = defaultdict(list)
         for obj in objs:
-            self.removeObjectNoLock(obj)
+            parent = self.handle.getOneNoLock(obj.parentHandle, allowNone=True)
+            if parent is not None:
+                children_by_parent[id(parent)].append((parent, obj))
+            if id(obj) in self._objectIDs:
+                self._ancestorHandles.pop(obj.handle, None)
+        _MultikeyWithVersionLookup.removeObjectsNoLock(self, objs)
+        for children in children_by_parent.values():
+            children[0][0].rmChildren([obj for _, obj in children])
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._ancestorHandles.clear()
 
     def replaceObject(self, newObj):
         with self._lock:
@@ -145,8 +264,12 @@ class DescriptorsLookup(_MultikeyWithVersionLookup):
     def replaceObjectNoLock(self, newObj):
         """ remove existing descriptorContainer and add new one, but do not touch childlist of parent (that keeps order)"""
         origObj = self.handle.getOne(newObj.handle)
-        self.removeObjectNoLock(origObj)
-        self.addObjectNoLock(newObj)
+        self.swapObjectNoLock(origObj, newObj)
+        if newObj.parentHandle != origObj.parentHandle:
+            self._setAncestorHandles(newObj)
+        parent = None if newObj.parentHandle is None else self.handle.getOne(newObj.parentHandle, allowNone=True)
+        if parent is not None:
+            parent.replaceChild(newObj)
 
 
 class StatesLookup(_MultikeyWithVersionLookup):
@@ -190,11 +313,14 @@ class MdibContainer(object):
     sequenceId = properties.ObservableProperty()
     instanceId = properties.ObservableProperty()
 
-    def __init__(self, sdc_definitions):
+    def __init__(self, sdc_definitions, numeric_mode=None):
         """
         :param sdc_definitions: a class derived from Definitions_Base
+        :param numeric_mode: python representation of decimal values in this mdib, dataconverters.NUMERIC_DECIMAL
+                (exact), dataconverters.NUMERIC_FLOAT (fast) or None (DecimalConverter.USE_DECIMAL_TYPE decides)
         """
         self.sdc_definitions = sdc_definitions
+        self.numeric_mode = numeric_mode
         self._logger = None # must to be instantiated by derived class
         self.nsmapper = namespaces.DocNamespaceHelper()  # default map, might be replaced with nsmap from xml file  
         self.mdibVersion = 0
@@ -205,18 +331,24 @@ class MdibContainer(object):
         self.descriptions = DescriptorsLookup()
 
         self.states = StatesLookup() #multikey.MultiKeyLookup()
-        self.states.addIndex('descriptorHandle', multikey.UIndexDefinition(lambda obj: obj.descriptorHandle))
-        self.states.addIndex('NODETYPE', multikey.IndexDefinition(lambda obj: obj.NODETYPE, indexNoneValues=False))
+        self.states.addIndex('descriptorHandle', multikey.UIndexDefinition(lambda obj: obj.descriptorHandle,
+                                                                            attrName='descriptorHandle'))
+        self.states.addIndex('NODETYPE', multikey.IndexDefinition(lambda obj: obj.NODETYPE, indexNoneValues=False,
+                                                                    attrName='NODETYPE'))
 
         self.contextStates = MultiStatesLookup() #multikey.MultiKeyLookup()
 
         # descriptorHandle index is NOT unique!
         # => multiple ContextStates refer to the same descriptor( history of locations)
         # 'handle' index can be unique, because we ignore None values 
-        self.contextStates.addIndex('descriptorHandle', multikey.IndexDefinition(lambda obj: obj.descriptorHandle))
-        self.contextStates.addIndex('handle', multikey.UIndexDefinition(lambda obj: obj.Handle, indexNoneValues=False))
-        self.contextStates.addIndex('NODETYPE', multikey.IndexDefinition(lambda obj: obj.NODETYPE, indexNoneValues=False))
-        self.mdibLock = Lock()
+        self.contextStates.addIndex('descriptorHandle', multikey.IndexDefinition(lambda obj: obj.descriptorHandle,
+                                                                                   attrName='descriptorHandle'))
+        self.contextStates.addIndex('handle', multikey.UIndexDefinition(lambda obj: obj.Handle, indexNoneValues=False,
+                                                                            attrName='Handle'))
+        self.contextStates.addIndex('NODETYPE', multikey.IndexDefinition(lambda obj: obj.NODETYPE, indexNoneValues=False,
+                                                                           attrName='NODETYPE'))
+        # transactions and reports take the write side ("with mdibLock:"), readers use mdibLock.read_lock
+        self.mdibLock = ReadWriteLock()
         
 
         self.mdStateVersion = 0
@@ -226,6 +358,11 @@ class MdibContainer(object):
     def logger(self):
         return self._logger
 
+    def numericContext(self):
+        """ returns a context manager, conversions between xml and python values in its with block use the
+        numeric mode of this mdib."""
+        return numericMode(self.numeric_mode)
+
     @property
     def mdib_version_group(self):
         return MdibVersionGroup(self.mdibVersion, self.sequenceId, self.instanceId)
@@ -326,79 +463,133 @@ class MdibContainer(object):
     setMdStates = addStateContainers # backwards compatibility
 
 
-    def _reconstructMdDescription(self, parent_node):
-        """build dom tree from current data
+    def _snapshotDescriptor(self, descriptorContainer):
+        """ Returns a descriptor that is not affected by later changes of the mdib."""
+        return descriptorContainer.mkCopy(copy_node=False)
+
+    def _snapshotState(self, stateContainer):
+        """ Returns a state that is not affected by later changes of the mdib."""
+        return stateContainer.mkCopy(copy_node=False)
+
+    def _mkSnapshot(self, addStates=True, addContextStates=True):
+        """ Collects the content of the mdib. Caller must hold the mdibLock (read side is sufficient).
+        @return: a MdibSnapshot instance
+        """
+        childDescriptors = {}
+
+        def collectChildren(parentContainer):
+            childContainers = parentContainer.getOrderedChildContainers()
+            childDescriptors[parentContainer.handle] = [self._snapshotDescriptor(c) for c in childContainers]
+            for childContainer in childContainers:
+                collectChildren(childContainer)
+
+        rootContainers = self.descriptions.parentHandle.get(None) or []
+        for rootContainer in rootContainers:
+            collectChildren(rootContainer)
+        states = [self._snapshotState(s) for s in self.states.objects] if addStates else []
+        contextStates = [self._snapshotState(s) for s in self.contextStates.objects] if addContextStates else []
+        return MdibSnapshot(self.mdib_version_group, self.mdDescriptionVersion, self.mdStateVersion,
+                            [self._snapshotDescriptor(c) for c in rootContainers], childDescriptors,
+                            states, contextStates)
+
+    def mkSnapshot(self, addContextStates=True):
+        """ Takes a consistent view of all descriptors and states.
+        Only this method holds the mdibLock, the snapshot can be serialized later without holding it.
+        @return: a MdibSnapshot instance
+        """
+        with self.mdibLock.read_lock:
+            return self._mkSnapshot(addContextStates=addContextStates)
+
+    def reconstructMdDescriptionFromSnapshot(self, parent_node, snapshot):
+        """build dom tree from a snapshot
         @return: an etree_ node
         """
         doc_nsmap = self.nsmapper.docNssmap
-        rootContainers = self.descriptions.parentHandle.get(None) or []
         mdDescriptionNode = etree_.SubElement(parent_node,
                                               namespaces.domTag('MdDescription'),
-                                              attrib={'DescriptionVersion':str(self.mdDescriptionVersion)},
+                                              attrib={'DescriptionVersion':str(snapshot.md_description_version)},
                                               nsmap=doc_nsmap)
 
         def connectDescriptors(parentContainer, parentNode):
-            childContainers = parentContainer.getOrderedChildContainers()
+            childContainers = snapshot.child_descriptors.get(parentContainer.handle, [])
             ret = parentContainer.connectChildContainers(parentNode, childContainers)
             # recursive call for children
             for childContainer, node in ret:
                 connectDescriptors(childContainer, node)
 
-        for rootContainer in rootContainers:
-            n = rootContainer.mkDescriptorNode(mdDescriptionNode)
-            connectDescriptors(rootContainer, n)
+        with self.numericContext():
+            for rootContainer in snapshot.root_descriptors:
+                n = rootContainer.mkDescriptorNode(mdDescriptionNode)
+                connectDescriptors(rootContainer, n)
         return mdDescriptionNode
 
-
-    def _reconstructMdib(self, addContextStates):
-        """build dom tree from current data
-        :param addContextStates: bool
+    def reconstructMdibFromSnapshot(self, snapshot):
+        """build dom tree from a snapshot
         @return: an etree_ node
         """
         doc_nsmap = self.nsmapper.docNssmap
         mdibNode = etree_.Element(namespaces.msgTag('Mdib'), nsmap=doc_nsmap)
-        self.mdib_version_group.update_node(mdibNode)
-        self._reconstructMdDescription(mdibNode)
+        snapshot.mdib_version_group.update_node(mdibNode)
+        self.reconstructMdDescriptionFromSnapshot(mdibNode, snapshot)
 
         # add a list of states
         mdStateNode = etree_.SubElement(mdibNode, namespaces.domTag('MdState'),
-                                        attrib={'StateVersion':str(self.mdStateVersion)},
+                                        attrib={'StateVersion':str(snapshot.md_state_version)},
                                         nsmap=doc_nsmap)
-        for stateContainer in self.states.objects:
-            try:
-                tmpNode = stateContainer.mkStateNode()
-                mdStateNode.append(tmpNode)
-            except RuntimeError:
-                self._logger.error('State {} has no descriptorContainer', stateContainer.descriptorHandle)
-        if addContextStates:
-            for stateContainer in self.contextStates.objects:
-                tmpNode = stateContainer.mkStateNode()
+        # the states keep their nodes, every consumer of a state version gets a copy of the same node
+        with self.numericContext():
+            for stateContainer in snapshot.states:
+                try:
+                    tmpNode = stateContainer.copyStateNode()
+                    mdStateNode.append(tmpNode)
+                except RuntimeError:
+                    self._logger.error('State {} has no descriptorContainer', stateContainer.descriptorHandle)
+            for stateContainer in snapshot.context_states:
+                tmpNode = stateContainer.copyStateNode()
                 mdStateNode.append(tmpNode)
 
         return mdibNode
 
+    def _reconstructMdDescription(self, parent_node):
+        """build dom tree from current data. Caller must hold the mdibLock.
+        @return: an etree_ node
+        """
+        snapshot = self._mkSnapshot(addStates=False, addContextStates=False)
+        return self.reconstructMdDescriptionFromSnapshot(parent_node, snapshot)
+
+    def _reconstructMdib(self, addContextStates):
+        """build dom tree from current data. Caller must hold the mdibLock.
+        :param addContextStates: bool
+        @return: an etree_ node
+        """
+        return self.reconstructMdibFromSnapshot(self._mkSnapshot(addContextStates=addContextStates))
+
     def reconstructMdDescription(self, parent_node):
         """build dom tree from current data
+        The mdibLock is only held while the descriptors are collected.
         @return: a tuple etree_ node, mdibVersion
         """
-        with self.mdibLock:
-            node = self._reconstructMdDescription(parent_node)
-            return node, self.mdib_version_group
+        with self.mdibLock.read_lock:
+            snapshot = self._mkSnapshot(addStates=False, addContextStates=False)
+        node = self.reconstructMdDescriptionFromSnapshot(parent_node, snapshot)
+        return node, snapshot.mdib_version_group
 
     def reconstructMdib(self):
         """build dom tree from current data
         This method does not include context states!
+        The mdibLock is only held while the snapshot is taken.
         @return: an etree_ node
         """
-        with self.mdibLock:
-            return self._reconstructMdib(addContextStates=False), self.mdib_version_group
+        snapshot = self.mkSnapshot(addContextStates=False)
+        return self.reconstructMdibFromSnapshot(snapshot), snapshot.mdib_version_group
 
 
     def reconstructMdibWithContextStates(self):
         """ this method includes the context states in mdib tree.
+        The mdibLock is only held while the snapshot is taken.
         """
-        with self.mdibLock:
-            return self._reconstructMdib(addContextStates=True), self.mdib_version_group
+        snapshot = self.mkSnapshot(addContextStates=True)
+        return self.reconstructMdibFromSnapshot(snapshot), snapshot.mdib_version_group
 
 
     def nodeToString(self, etree_node, pretty_print=False, xml_declaration=True, encoding='utf-8'):
@@ -425,17 +616,16 @@ class MdibContainer(object):
         :param metricCode: a pmtypes.CodedValue or a pmtypes.Coding instance
         :return: None or a DescriptorContainer
         """
-        all_vmds = self.descriptions.NODETYPE.get(namespaces.domTag('VmdDescriptor'))
-        matching_vmd_handles = [vmd.Handle for vmd in all_vmds if pmtypes.have_matching_codes(vmd.Type, vmdCode)]
-
-        matching_channels = []
-        for handle in matching_vmd_handles:
-            matching_channels.extend(self.get_children_by_type_match(handle, channelCode ))
-        matching_channel_handles = [ch.Handle for ch in matching_channels]
-
+        vmd_type = namespaces.domTag('VmdDescriptor')
         matching_leaf_descriptors = []
-        for handle in matching_channel_handles:
-            matching_leaf_descriptors.extend(self.get_children_by_type_match(handle, metricCode ))
+        with self.descriptions.lock.read_lock:
+            for descriptor in self.descriptions.getByTypeNoLock(metricCode):
+                channel = self.descriptions.handle.getOneNoLock(descriptor.parentHandle, allowNone=True)
+                if channel is None or not pmtypes.have_matching_codes(channel.Type, channelCode):
+                    continue
+                vmd = self.descriptions.handle.getOneNoLock(channel.parentHandle, allowNone=True)
+                if vmd is not None and vmd.NODETYPE == vmd_type and pmtypes.have_matching_codes(vmd.Type, vmdCode):
+                    matching_leaf_descriptors.append(descriptor)
         if len(matching_leaf_descriptors) == 0:
             return
         if len(matching_leaf_descriptors) > 1:
@@ -444,6 +634,15 @@ class MdibContainer(object):
 
     getMetricDescriptorByCode = getDescriptorByCode  # backwards compatibility with previous name
 
+    def getDescriptorsByCodes(self, codes):
+        """ Batch lookup of descriptors by their Type, e.g. to resolve all codes of an application at once.
+        A descriptor matches if its Type or one of its translations matches the code (see pmtypes.have_matching_codes).
+        :param codes: an iterable of pmtypes.CodedValue, pmtypes.Coding, or str / int codes in the DefaultCodingSystem
+        :return: a list with one list of matching descriptor containers per code, in the order of codes
+        """
+        with self.descriptions.lock.read_lock:
+            return [self.descriptions.getByTypeNoLock(code) for code in codes]
+
     def getOperationsForMetric(self, vmdCode, channelCode, metricCode):
         """ This is the "correct" way to find an operation.
         Using well known handles is shaky, because they have no meaning and can change over time!
@@ -530,10 +729,23 @@ class MdibContainer(object):
         ['70041', '69650', '69651'] : returns all descriptors with CodedValue= 69651 and parent descriptor CodedValue = 69650 and parent's parent descriptor CodedValue = 70041
         It is not necessary that path starts at the top of an mds, it can start anywhere.  
         """
+        with self.mdibLock.read_lock:
+            return self._selectDescriptors(codings)
+
+    def _selectDescriptors(self, codings):
         selectedObjects = None
         for coding in codings:
-            
+            # normalize coding
+            if isinstance(coding, str):
+                coding = pmtypes.CodedValue(coding, pmtypes.DefaultCodingSystem).coding
+            elif hasattr(coding, 'coding'):
+                coding=coding.coding
+
             if selectedObjects is None:
+                if coding is not None:
+                    # initially all objects with this coding
+                    selectedObjects = list(dict.get(self.descriptions.coding, coding, ()))
+                    continue
                 selectedObjects = self.descriptions.objects # initially all objects
             else:
                 # get all children of selected objects
@@ -541,13 +753,7 @@ class MdibContainer(object):
                 selectedObjects = []
                 for h in allhandles:
                     selectedObjects.extend(self.descriptions.parentHandle.get(h, []))
-                
-            # normalize coding
-            if isinstance(coding, str):
-                coding = pmtypes.CodedValue(coding, pmtypes.DefaultCodingSystem).coding
-            elif hasattr(coding, 'coding'):
-                coding=coding.coding
-                
+
             if coding is not None:
                 # apply filter
                 tmpObjects = [o for o in selectedObjects if o.coding == coding ]
@@ -563,19 +769,21 @@ class MdibContainer(object):
         :return: a list of DescriptorContainer objects
         """
         result = []
+        children_index = self.descriptions.parentHandle
         def _getchildren(parent):
-            childContainers = self.descriptions.parentHandle.get(parent.handle, list())
+            childContainers = dict.get(children_index, parent.handle, ())
             if not depthFirst:
                 result.extend(childContainers)
             for ch in childContainers:
                 _getchildren(ch)
             if depthFirst:
                 result.extend(childContainers)
-        if includeRoot and not depthFirst:
-            result.append(descriptorContainer)
-        _getchildren(descriptorContainer)
-        if includeRoot and depthFirst:
-            result.append(descriptorContainer)
+        with self.descriptions.lock.read_lock:
+            if includeRoot and not depthFirst:
+                result.append(descriptorContainer)
+            _getchildren(descriptorContainer)
+            if includeRoot and depthFirst:
+                result.append(descriptorContainer)
         return result
 
 
@@ -583,20 +791,24 @@ class MdibContainer(object):
         """ recursive delete of a descriptor and all children and all related states"""
         deletedDescriptorByHandle = {}
         deletedStatesByHandle = {}
+        deletedStates = {self.states: [], self.contextStates: []}
         for descriptorContainer in descriptorContainers:
             self._logger.debug('rm Descriptor node {} handle {}',
                                descriptorContainer.nodeName, descriptorContainer.handle)
-            self.descriptions.removeObject(descriptorContainer)
             deletedDescriptorByHandle[descriptorContainer.handle] = descriptorContainer
-            for m_key in (self.states, self.contextStates):
+            for m_key, m_key_states in deletedStates.items():
                 stateContainers = m_key.descriptorHandle.get(descriptorContainer.handle)
                 if stateContainers is not None:
                     # make a copy, otherwise removeObjects will manipulate same list in place
                     stateContainers = stateContainers[:]
                     self._logger.debug('rm {} states(s) associated to descriptor {} ',
                                       len(stateContainers), descriptorContainer.handle)
-                    m_key.removeObjects(stateContainers)
+                    m_key_states.extend(stateContainers)
                     deletedStatesByHandle[descriptorContainer.handle] = stateContainers
+        # remove all objects at once, this filters every index list only once
+        self.descriptions.removeObjects(descriptorContainers)
+        for m_key, m_key_states in deletedStates.items():
+            m_key.removeObjects(m_key_states)
 
         if deletedDescriptorByHandle:
             self.deletedDescriptorByHandle = deletedDescriptorByHandle
@@ -118,7 +118,8 @@ class MessageReader(object):
         else:
             nodeType = etree_.QName(node.tag)
         cls = self._mdib.getDescriptorContainerClass(nodeType)
-        return cls.fromNode(self._mdib.nsmapper, node, parentHandle)
+        with self._mdib.numericContext():
+            return cls.fromNode(self._mdib.nsmapper, node, parentHandle)
 
 
     def mkStateContainerFromNode(self, node, forcedType=None, additionalDescriptorContainers = None):
@@ -150,7 +151,8 @@ class MessageReader(object):
         if node.tag != namespaces.domTag('State'):
             node = xmlparsing.copy_node(node)  # make a copy, do not modify the original report
             node.tag = namespaces.domTag('State')
-        return cls(self._mdib.nsmapper, descriptorContainer, node)
+        with self._mdib.numericContext():
+            return cls(self._mdib.nsmapper, descriptorContainer, node)
 
 
     def _mkStateContainersFromReportPart(self, reportPartNode):
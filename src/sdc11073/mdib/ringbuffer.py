@@ -0,0 +1,268 @@
+"""
+A preallocated ring buffer for real time samples. Values, time stamps and validity of all samples are stored in
+columns (sample buffers, see samplebuffer module), annotations in a sparse table.
+Appending a sample array writes into the columns, no python object per sample is created or kept.
+"""
+import array
+import decimal
+import time
+from collections import deque
+
+from .. import samplebuffer
+from .mdibbase import RtSampleContainer
+
+
+class SampleRingBuffer(object):
+    """ Keeps the last 'capacity' samples of one real time stream.
+
+    Samples have an absolute index that counts all samples that were ever appended. The read methods return
+    zero-copy views of the columns. A view is a list of 1 or 2 segments (2 if the requested range wraps around
+    the end of the columns); each segment is a numpy array view or a memoryview.
+    Views show the current content of the columns: samples that are appended later may overwrite the viewed data.
+    Use copyValues, copyTimestamps or RtSampleContainers if this is not acceptable.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError('capacity must be greater than zero, got {}'.format(capacity))
+        self.capacity = capacity
+        self.values = samplebuffer.mkSampleBuffer([0.0] * capacity)
+        self.timestamps = samplebuffer.mkSampleBuffer([0.0] * capacity)
+        self.validity = array.array('B', bytes(capacity))  # codes of self._validity_values
+        self._validity_values = [None]  # code => validity
+        self._validity_codes = {None: 0}  # validity => code
+        self._annotations = deque()  # (absolute index, list of annotations), sorted by absolute index
+        self._end = 0  # absolute index of next sample
+        self._length = 0
+        self._value_views = self._mkViews(self.values)
+        self._timestamp_views = self._mkViews(self.timestamps)
+        self._validity_views = memoryview(self.validity)
+
+    @staticmethod
+    def _mkViews(column):
+        return column if not isinstance(column, array.array) else memoryview(column)
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def start_index(self):
+        """ absolute index of the oldest sample"""
+        return self._end - self._length
+
+    @property
+    def end_index(self):
+        """ absolute index of the next sample"""
+        return self._end
+
+    def clear(self):
+        self._length = 0
+        self._annotations.clear()
+
+    def _validityCode(self, validity):
+        code = self._validity_codes.get(validity)
+        if code is None:
+            if len(self._validity_values) > 255:
+                raise ValueError('too many different validity values')
+            code = len(self._validity_values)
+            self._validity_values.append(validity)
+            self._validity_codes[validity] = code
+        return code
+
+    def _write(self, column, data):
+        """ writes data (same type as column) to the column, starting at position of self._end"""
+        count = len(data)
+        pos = self._end % self.capacity
+        first = min(count, self.capacity - pos)
+        column[pos:pos + first] = data[:first]
+        if first < count:
+            column[:count - first] = data[first:]
+
+    def appendSamples(self, values, timestamps, validity=None, annotations=None):
+        """
+        :param values: a list of numbers or a sample buffer
+        :param timestamps: a list of numbers or a sample buffer with the same length as values
+        :param validity: validity of all samples
+        :param annotations: None or a dictionary: index in values => list of annotations
+        :return: absolute index of the first appended sample
+        """
+        count = len(values)
+        first_index = self._end
+        if count == 0:
+            return first_index
+        if count > self.capacity:  # only the youngest samples fit into the buffer
+            skip = count - self.capacity
+            values = values[skip:]
+            timestamps = timestamps[skip:]
+            if annotations:
+                annotations = {i - skip: a for i, a in annotations.items() if i >= skip}
+            first_index += skip
+            self._end += skip
+            count = self.capacity
+        if isinstance(self.values, array.array):
+            if not isinstance(values, array.array):
+                values = array.array('d', values)
+            if not isinstance(timestamps, array.array):
+                timestamps = array.array('d', timestamps)
+        self._write(self.values, values)
+        self._write(self.timestamps, timestamps)
+        self._write(self.validity, array.array('B', [self._validityCode(validity)]) * count)
+        self._end += count
+        self._length = min(self._length + count, self.capacity)
+        if annotations:
+            for i in sorted(annotations):
+                self._annotations.append((first_index + i, annotations[i]))
+        start_index = self.start_index
+        while self._annotations and self._annotations[0][0] < start_index:
+            self._annotations.popleft()
+        return first_index
+
+    def appendSampleArray(self, values, first_timestamp, sample_period, validity=None, annotations=None):
+        """ Appends equidistant samples, the time stamp of sample i is first_timestamp + i * sample_period.
+        See appendSamples for the other parameters."""
+        count = len(values)
+        if samplebuffer.numpy is not None and not isinstance(self.timestamps, array.array):
+            timestamps = samplebuffer.numpy.arange(count, dtype=samplebuffer.numpy.float64) * sample_period \
+                         + first_timestamp
+        else:
+            timestamps = array.array('d', [first_timestamp + i * sample_period for i in range(count)])
+        return self.appendSamples(values, timestamps, validity, annotations)
+
+    def _segments(self, views, count):
+        """ the last count samples of views as a list of 1 or 2 slices"""
+        count = min(count, self._length)
+        if count == 0:
+            return []
+        start = (self._end - count) % self.capacity
+        end = start + count
+        if end <= self.capacity:
+            return [views[start:end]]
+        return [views[start:], views[:end - self.capacity]]
+
+    def valueSegments(self, count):
+        """ zero-copy view of the values of the last count samples"""
+        return self._segments(self._value_views, count)
+
+    def timestampSegments(self, count):
+        """ zero-copy view of the time stamps of the last count samples"""
+        return self._segments(self._timestamp_views, count)
+
+    def validitySegments(self, count):
+        """ zero-copy view of the validity codes (see validityValue) of the last count samples"""
+        return self._segments(self._validity_views, count)
+
+    def validityValue(self, code):
+        return self._validity_values[code]
+
+    def countSince(self, timestamp):
+        """ returns the number of the youngest samples with time stamp >= timestamp (binary search)"""
+        low, high = 0, self._length  # logical positions, 0 is the oldest sample
+        offset = self._end - self._length
+        timestamps = self.timestamps
+        capacity = self.capacity
+        while low < high:
+            middle = (low + high) // 2
+            if timestamps[(offset + middle) % capacity] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return self._length - low
+
+    def lastSeconds(self, seconds, now=None):
+        """ returns (value segments, time stamp segments) of all samples not older than now - seconds.
+        :param now: default is time.time()"""
+        if now is None:
+            now = time.time()
+        count = self.countSince(now - seconds)
+        return self.valueSegments(count), self.timestampSegments(count)
+
+    def copyValues(self, count):
+        """ returns a sample buffer with a copy of the values of the last count samples"""
+        return _concat(self.valueSegments(count))
+
+    def copyTimestamps(self, count):
+        """ returns a sample buffer with a copy of the time stamps of the last count samples"""
+        return _concat(self.timestampSegments(count))
+
+    def annotations(self, first_index=None):
+        """ returns a list of (absolute index, annotations) of all samples with annotations"""
+        if first_index is None:
+            return list(self._annotations)
+        return [a for a in self._annotations if a[0] >= first_index]
+
+    def rtSampleContainer(self, index):
+        """ creates a RtSampleContainer for the sample with the absolute index"""
+        if not self.start_index <= index < self._end:
+            raise IndexError('sample index {} out of range {}..{}'.format(index, self.start_index, self._end - 1))
+        pos = index % self.capacity
+        annotations = None
+        for annotation_index, sample_annotations in self._annotations:
+            if annotation_index == index:
+                annotations = list(sample_annotations)
+                break
+            if annotation_index > index:
+                break
+        return RtSampleContainer(_decimalValue(self.values[pos]), float(self.timestamps[pos]),
+                                 self._validity_values[self.validity[pos]], annotations)
+
+    def rtSampleContainers(self, count=None):
+        """ yields RtSampleContainer objects for the last count (default: all) samples, oldest first"""
+        count = self._length if count is None else min(count, self._length)
+        first = self._end - count
+        annotations = iter(self._annotations)
+        next_annotation = next(annotations, None)
+        while next_annotation is not None and next_annotation[0] < first:
+            next_annotation = next(annotations, None)
+        values, timestamps, validity = self.values, self.timestamps, self.validity
+        for index in range(first, self._end):
+            pos = index % self.capacity
+            sample_annotations = None
+            if next_annotation is not None and next_annotation[0] == index:
+                sample_annotations = list(next_annotation[1])
+                next_annotation = next(annotations, None)
+            yield RtSampleContainer(_decimalValue(values[pos]), float(timestamps[pos]),
+                                    self._validity_values[validity[pos]], sample_annotations)
+
+
+def _decimalValue(value):
+    # RtSampleContainer.valueString is the parsed value of the sample, a Decimal unless numeric mode NUMERIC_FLOAT is
+    # used. The shortest repr of the stored float is the decimal string it was read from (up to 15 digits).
+    return decimal.Decimal(repr(float(value)))
+
+
+def _concat(segments):
+    if not segments:
+        return samplebuffer.mkSampleBuffer()
+    if samplebuffer.numpy is not None and not isinstance(segments[0], memoryview):
+        return samplebuffer.numpy.concatenate(segments)
+    result = array.array('d')
+    for segment in segments:
+        result.frombytes(segment.tobytes())
+    return result
+
+
+class RtSampleContainersView(object):
+    """ Read only sequence of RtSampleContainer objects for all samples of a SampleRingBuffer, oldest first.
+    The containers are created on access, a copy (copy.copy) is a list of containers."""
+
+    def __init__(self, ring_buffer):
+        self._ring_buffer = ring_buffer
+
+    def __len__(self):
+        return len(self._ring_buffer)
+
+    def __getitem__(self, index):
+        length = len(self._ring_buffer)
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(length))]
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('index out of range')
+        return self._ring_buffer.rtSampleContainer(self._ring_buffer.start_index + index)
+
+    def __iter__(self):
+        return self._ring_buffer.rtSampleContainers()
+
+    def __copy__(self):
+        return list(self)
@@ -0,0 +1,250 @@
+"""
+Waveform source that reads samples from a ring buffer in shared memory. The samples are written by a separate
+producer process (e.g. the acquisition process of the device), no python calls of the producer are needed.
+
+The shared memory is a memory mapped file (on linux a file in /dev/shm is memory only). Layout, all values in native
+byte order, all offsets are multiples of 8:
+
+    file header, 64 bytes:
+        0   8 bytes   magic b'SDCWRING'
+        8   uint32    layout version (1)
+        12  uint32    channel count
+        16  uint64    capacity: samples per channel, a power of 2
+        24  -         reserved
+    channel headers, 128 bytes per channel, starting at offset 64:
+        0   uint64    write count: number of samples written to the channel since creation (producer)
+        8   float64   start time: time.time() of the first sample of the channel (producer)
+        16  float64   sample period in seconds (producer)
+        24  uint64    overrun count: samples the producer dropped because the ring was full (producer)
+        32  uint64    sample number offset: sample number - ring index of the samples in the ring (producer)
+        64  uint64    read count: number of samples read from the channel (consumer)
+        72  -         reserved
+    sample rings, capacity float64 values per channel, starting at offset 64 + channel count * 128.
+        Ring index i of a channel is at position i % capacity. Sample number n (the time stamp of the sample is
+        start time + n * sample period) is at ring index n - sample number offset.
+
+The ring of a channel is a lock-free single producer / single consumer queue:
+ - the producer writes samples to the ring indices write count ... write count + n - 1, then increments write count
+   by n. It never writes more than capacity - (write count - read count) samples, the rest is dropped and counted in
+   overrun count.
+ - after an overrun (overrun count != sample number offset) the producer drops all samples until the consumer has
+   taken all samples out of the ring (read count == write count). Then it sets sample number offset to overrun count
+   before it writes the next samples, which keeps the time stamps of the samples after the gap correct. The offset
+   changes only while the ring is empty, so all samples of one read have the same offset.
+ - the consumer copies the samples from read count to write count, reads sample number offset, then sets read count
+   to write count.
+Each counter is written by one side only, and with one aligned 64 bit store (memoryview item assignment), so the
+other side never reads a partially written counter. Write count and read count are in different cache lines.
+The consumer reads write count before the samples, the producer writes the samples before write count; this order
+is kept by the store ordering of x86-64. A native producer on a weakly ordered cpu (e.g. arm) must publish write count
+with a release store.
+"""
+import array
+import mmap
+import struct
+import time
+
+from .devicewaveform import DefaultWaveformSource
+from .devicewaveform import RtSampleArray
+from .. import pmtypes
+from .. import samplebuffer
+
+MAGIC = b'SDCWRING'
+LAYOUT_VERSION = 1
+FILE_HEADER_SIZE = 64
+CHANNEL_HEADER_SIZE = 128
+
+_FILE_HEADER = struct.Struct('=8sIIQ')
+# offsets in the channel header, in units of 8 bytes
+_WRITE_COUNT = 0
+_START_TIME = 1
+_SAMPLE_PERIOD = 2
+_OVERRUN_COUNT = 3
+_SAMPLE_NUMBER_OFFSET = 4
+_READ_COUNT = 8
+
+
+class SharedRingBuffer(object):
+    """ Access to the memory mapped ring buffer file, used by producer and consumer."""
+
+    def __init__(self, path, channel_count=None, capacity=None, sample_periods=None):
+        """
+        Opens an existing ring buffer file, or creates a new one if channel_count is given.
+        :param path: the file name
+        :param channel_count: number of channels of a new file
+        :param capacity: samples per channel of a new file, a power of 2
+        :param sample_periods: list of the sample periods of the channels of a new file
+        """
+        self.path = path
+        if channel_count is not None:
+            if capacity <= 0 or capacity & (capacity - 1):
+                raise ValueError('capacity must be a power of 2, got {}'.format(capacity))
+            size = FILE_HEADER_SIZE + channel_count * (CHANNEL_HEADER_SIZE + capacity * 8)
+            with open(path, 'wb') as f:
+                f.write(_FILE_HEADER.pack(MAGIC, LAYOUT_VERSION, channel_count, capacity))
+                f.truncate(size)
+        with open(path, 'r+b') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0)
+        magic, version, self.channel_count, self.capacity = _FILE_HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            self._mmap.close()
+            raise ValueError('{} is not a ring buffer file of layout version {}'.format(path, LAYOUT_VERSION))
+        self._mask = self.capacity - 1
+        view = memoryview(self._mmap)
+        headers_end = FILE_HEADER_SIZE + self.channel_count * CHANNEL_HEADER_SIZE
+        self._views = [view]
+        # per channel: the header as unsigned 64 bit integers and as doubles, and the ring as bytes
+        self._counters = []
+        self._floats = []
+        self._rings = []
+        for i in range(self.channel_count):
+            header = view[FILE_HEADER_SIZE + i * CHANNEL_HEADER_SIZE:FILE_HEADER_SIZE + (i + 1) * CHANNEL_HEADER_SIZE]
+            ring_start = headers_end + i * self.capacity * 8
+            ring = view[ring_start:ring_start + self.capacity * 8]
+            self._counters.append(header.cast('Q'))
+            self._floats.append(header.cast('d'))
+            self._rings.append(ring)
+            self._views.extend((header, ring))
+        if channel_count is not None:
+            now = time.time()
+            for i, sample_period in enumerate(sample_periods):
+                self._floats[i][_START_TIME] = now
+                self._floats[i][_SAMPLE_PERIOD] = sample_period
+
+    def close(self):
+        for view in self._counters + self._floats + self._views[::-1]:
+            view.release()
+        self._counters = self._floats = self._rings = self._views = []
+        self._mmap.close()
+
+    def sample_period(self, channel):
+        return self._floats[channel][_SAMPLE_PERIOD]
+
+    def start_time(self, channel):
+        return self._floats[channel][_START_TIME]
+
+    def write_count(self, channel):
+        return self._counters[channel][_WRITE_COUNT]
+
+    def read_count(self, channel):
+        return self._counters[channel][_READ_COUNT]
+
+    def overrun_count(self, channel):
+        return self._counters[channel][_OVERRUN_COUNT]
+
+    def sample_number_offset(self, channel):
+        return self._counters[channel][_SAMPLE_NUMBER_OFFSET]
+
+    def set_start_time(self, start_time):
+        """ Producer side: sets the time of the first sample of all channels, before the first write."""
+        for floats in self._floats:
+            floats[_START_TIME] = start_time
+
+    def write(self, channel, values):
+        """ Producer side: appends values to the ring of channel.
+        :param values: a sample buffer or a list of numbers
+        :return: number of written values, less than len(values) if the ring is full or if the consumer has not yet
+                 taken all samples that were written before the last overrun
+        """
+        if samplebuffer.numpy is not None and isinstance(values, samplebuffer.numpy.ndarray):
+            values = samplebuffer.numpy.ascontiguousarray(values, dtype=samplebuffer.numpy.float64)
+        elif not isinstance(values, array.array) or values.typecode != 'd':
+            values = array.array('d', values)
+        counters = self._counters[channel]
+        write_count = counters[_WRITE_COUNT]
+        read_count = counters[_READ_COUNT]
+        if counters[_OVERRUN_COUNT] != counters[_SAMPLE_NUMBER_OFFSET]:
+            if write_count != read_count:  # samples before the gap are not read yet
+                counters[_OVERRUN_COUNT] += len(values)
+                return 0
+            counters[_SAMPLE_NUMBER_OFFSET] = counters[_OVERRUN_COUNT]  # before the samples after the gap
+        free = self.capacity - (write_count - read_count)
+        count = min(len(values), free)
+        if count < len(values):
+            counters[_OVERRUN_COUNT] += len(values) - count
+        if count:
+            data = memoryview(values).cast('B')
+            ring = self._rings[channel]
+            start = (write_count & self._mask) * 8
+            first = min(count * 8, len(ring) - start)
+            ring[start:start + first] = data[:first]
+            if first < count * 8:
+                ring[:count * 8 - first] = data[first:count * 8]
+            counters[_WRITE_COUNT] = write_count + count  # publish
+        return count
+
+    def read(self, channel):
+        """ Consumer side: takes all available samples of channel out of the ring.
+        :return: tuple (sample number of the first sample, sample buffer)
+        """
+        counters = self._counters[channel]
+        write_count = counters[_WRITE_COUNT]  # read before the samples and the sample number offset
+        read_count = counters[_READ_COUNT]
+        count = write_count - read_count
+        if count == 0:
+            return read_count + counters[_SAMPLE_NUMBER_OFFSET], samplebuffer.mkSampleBuffer()
+        ring = self._rings[channel]
+        start = (read_count & self._mask) * 8
+        end = start + count * 8
+        if end <= len(ring):
+            parts = (ring[start:end],)
+        else:
+            parts = (ring[start:], ring[:end - len(ring)])
+        samples = samplebuffer.fromBuffers(parts)
+        sample_number = read_count + counters[_SAMPLE_NUMBER_OFFSET]
+        counters[_READ_COUNT] = write_count  # the samples can be overwritten now
+        return sample_number, samples
+
+
+class _RingChannelReader(object):
+    """ Makes RtSampleArray objects from one channel of the ring buffer, same interface as the generator wrapper
+    of DefaultWaveformSource."""
+
+    def __init__(self, ring_buffer, channel):
+        self._ring_buffer = ring_buffer
+        self._channel = channel
+        self._activation_state = pmtypes.ComponentActivation.ON
+        self.current_rt_sample_array = None
+
+    @property
+    def sample_period(self):
+        return self._ring_buffer.sample_period(self._channel)
+
+    def set_activation_state(self, component_activation):
+        self._activation_state = component_activation
+
+    def getNextSampleArray(self):
+        sample_number, samples = self._ring_buffer.read(self._channel)
+        sample_period = self.sample_period
+        if self._activation_state != pmtypes.ComponentActivation.ON:  # samples are discarded
+            self.current_rt_sample_array = RtSampleArray(None, sample_period, samplebuffer.mkSampleBuffer(),
+                                                         self._activation_state, [])
+        else:
+            determination_time = self._ring_buffer.start_time(self._channel) + sample_number * sample_period
+            self.current_rt_sample_array = RtSampleArray(determination_time, sample_period, samples,
+                                                         self._activation_state, [])
+        return self.current_rt_sample_array
+
+
+class SharedMemoryWaveformSource(DefaultWaveformSource):
+    """ Waveform source for samples that are written to a SharedRingBuffer by another process.
+    Every update of the realtime samples takes all samples that the producer wrote since the last update
+    (a block copy per channel). Waveform generators can still be registered for other handles."""
+
+    def __init__(self, path, handles):
+        """
+        :param path: file name of an existing ring buffer file
+        :param handles: list of the descriptor handles of the channels, in channel order
+        """
+        super().__init__()
+        self.ring_buffer = SharedRingBuffer(path)
+        if len(handles) != self.ring_buffer.channel_count:
+            self.ring_buffer.close()
+            raise ValueError('ring buffer has {} channels, got {} handles'.format(self.ring_buffer.channel_count,
+                                                                                 len(handles)))
+        for channel, handle in enumerate(handles):
+            self._waveform_generators[handle] = _RingChannelReader(self.ring_buffer, channel)
+
+    def close(self):
+        self.ring_buffer.close()
+
@@ -3,11 +3,18 @@ import uuid
 import sys
 import inspect
 import copy
+import threading
 from .containerbase import ContainerBase
 from ..namespaces import domTag
 from .. import pmtypes
+from .. import xmlparsing
 from . import containerproperties as cp
 
+# Readers that hold only the read side of the mdib lock create the nodes of states lazily, possibly at the same time.
+# Creating the node of a state is protected by one of these locks (selected by the id of the state), a lock per state
+# would cost as much memory as a state itself.
+_NODE_LOCKS = tuple(threading.Lock() for _ in range(64))
+
 
 class AbstractStateContainer(ContainerBase):
     NODENAME = domTag('State')
@@ -31,6 +38,12 @@ class AbstractStateContainer(ContainerBase):
 
     stateVersion = StateVersion  # lower case for backwards compatibility
 
+    # The etree node of a state is created lazily, see node property.
+    # _nodeKey is the (StateVersion, DescriptorVersion) tuple of the data in _node, _nodeDirty is set by the
+    # container properties when a value is changed (see ContainerBase).
+    _node = None
+    _nodeKey = None
+
     def __init__(self, nsmapper, descriptorContainer, node=None):
         self.descriptorContainer = descriptorContainer
         self.descriptorHandle = descriptorContainer.handle
@@ -38,13 +51,67 @@ class AbstractStateContainer(ContainerBase):
 
         if node is None:
             self.DescriptorVersion = descriptorContainer.DescriptorVersion
+        else:
+            self._nodeKey = self._currentNodeKey()  # versions were not yet read from node when it was set
 
     @property
     def nodeName(self):
         return self.NODENAME
 
+    @property
+    def node(self):
+        """ The etree node that represents this state.
+        It is only created when it is needed: a new node is created if one of the versions or a property value
+        changed (or a value that can be modified in place was accessed), or updateNode was called since the last
+        access."""
+        if self._nodeDirty or self._nodeKey != self._currentNodeKey():
+            with self._nodeLock():
+                if self._nodeDirty or self._nodeKey != self._currentNodeKey():  # another thread might have done it
+                    self.node = self.mkStateNode()
+        return self._node
+
+    @node.setter
+    def node(self, node):
+        self._node = node
+        self._nodeKey = self._currentNodeKey()
+        self._nodeDirty = node is None
+
+    def _nodeLock(self):
+        return _NODE_LOCKS[(id(self) >> 4) % len(_NODE_LOCKS)]
+
+    def _currentNodeKey(self):
+        return self.StateVersion, self.DescriptorVersion
+
     def updateNode(self):
-        self.node = self.mkStateNode()
+        """ Marks the node as outdated. The node is re-created when it is accessed the next time."""
+        self._nodeDirty = True
+
+    def copyStateNode(self, tag=None):
+        """ Returns a copy of the node of this state, e.g. for adding it to a message.
+        All consumers of the same state version share the work of creating the node.
+        :param tag: tag of the node, defaults to self.NODENAME
+        :return: an etree node without parent
+        """
+        node = self.node
+        if node.getparent() is not None:
+            # node is part of a bigger document (e.g. read from file), replace it by a node with all needed namespaces
+            with self._nodeLock():
+                node = self._node
+                if node.getparent() is not None:
+                    node = self.mkStateNode(updateDescriptorVersion=False)
+                    self.node = node
+        node = copy.deepcopy(node)
+        node.tag = tag or self.NODENAME
+        return node
+
+    def _copyNodeTo(self, copied, copy_node):
+        # Only an up-to-date node is passed to the copy, otherwise the copy creates its own node. The copy has its
+        # own dirty flag: a change of the copy re-creates the node of the copy, a node is never modified in place.
+        if self._node is not None and not self._nodeDirty and self._nodeKey == self._currentNodeKey():
+            copied._node = xmlparsing.copy_node(self._node) if copy_node else self._node
+        else:
+            copied._node = None
+            copied._nodeDirty = True
 
     def mkStateNode(self, tag=None, updateDescriptorVersion=True):
         if updateDescriptorVersion:
@@ -76,11 +143,15 @@ class AbstractStateContainer(ContainerBase):
         # update all ContainerProperties
         if skippedProperties is None:
             skippedProperties = []
-        self.node = other.node
         for prop_name, _ in self._sortedContainerProperties():
             if prop_name not in skippedProperties:
                 new_value = getattr(other, prop_name)
                 setattr(self, prop_name, new_value)
+        # the node of other is only valid for this container if no property was skipped
+        if skippedProperties or other._nodeDirty or other._nodeKey != other._currentNodeKey():
+            self.node = None
+        else:
+            self.node = other._node
 
     def incrementState(self):
         if self.StateVersion is None:
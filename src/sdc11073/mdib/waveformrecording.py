@@ -0,0 +1,365 @@
+"""
+Recording and replay of waveforms, e.g. in order to clone the waveforms of a real device for load tests.
+
+WaveformRecorder records the samples and annotations that a client received (ClientRtBuffer objects) and writes
+them into a recording file. ReplayWaveformSource is a waveform source for a device mdib that replays the recording
+in real time or faster; the file is memory mapped and samples are copied as blocks, not as python objects.
+Samples that the recorder lost (ClientRtBuffer overrun) are not in the file, the samples after the loss start a new
+segment with its own time stamp; the replay pauses for the duration of the missing samples.
+
+File layout, all numbers little endian (reading and writing is only supported on little endian machines):
+    header, 24 bytes:
+        0   8 bytes   magic b'SDCWREC1'
+        8   uint32    layout version (1)
+        12  uint32    stream count
+        16  uint32    size of the directory in bytes (a multiple of 8)
+        20  -         reserved
+    directory: utf-8 json {"handles": [...], "annotation_types": [[code, coding system, coding system version]...]},
+        padded with blanks
+    stream table, 64 bytes per stream:
+        0   float64   sample period in seconds
+        8   float64   time stamp of the first sample (time.time() based)
+        16  uint64    sample count n
+        24  uint64    offset of the samples: n float64 values
+        32  uint64    annotation count m
+        40  uint64    offset of the annotations: m uint64 sample indices (ascending), followed by m uint64 indices
+                      of the annotation types in the directory
+        48  uint64    segment count k: number of gaps in the recording
+        56  uint64    offset of the segments: k uint64 sample indices (ascending) of the first samples after a gap,
+                      followed by k float64 time stamps of these samples
+    data, all offsets are multiples of 8.
+"""
+import array
+import bisect
+import json
+import mmap
+import struct
+import sys
+import time
+
+from .devicewaveform import DefaultWaveformSource
+from .devicewaveform import RtSampleArray
+from .. import pmtypes
+from .. import samplebuffer
+
+MAGIC = b'SDCWREC1'
+LAYOUT_VERSION = 1
+
+_HEADER = struct.Struct('<8sIII4x')
+_STREAM = struct.Struct('<ddQQQQQQ')
+
+
+def _checkByteOrder():
+    if sys.byteorder != 'little':
+        raise NotImplementedError('waveform recordings are only supported on little endian machines')
+
+
+def write_recording(path, streams, annotation_types):
+    """ Writes a recording file.
+    :param path: the file name
+    :param streams: list of (handle, sample period, start time, samples, annotation sample indices,
+                    annotation type indices, segments); samples is a sample buffer, the indices are lists or arrays
+                    of int, segments is a list of (sample index, time stamp) of the first samples after gaps
+    :param annotation_types: list of pmtypes.Coding (or 3-tuples code, coding system, coding system version)
+    """
+    _checkByteOrder()
+    directory = json.dumps({'handles': [s[0] for s in streams],
+                            'annotation_types': [list(t) for t in annotation_types]}).encode('utf-8')
+    directory += b' ' * (-len(directory) % 8)
+    offset = _HEADER.size + len(directory) + _STREAM.size * len(streams)
+    table = []
+    data = []
+    for _, sample_period, start_time, samples, annotation_indices, annotation_type_indices, segments in streams:
+        sample_bytes = samples.tobytes()
+        annotation_bytes = array.array('Q', annotation_indices).tobytes() + \
+            array.array('Q', annotation_type_indices).tobytes()
+        segment_bytes = array.array('Q', [s[0] for s in segments]).tobytes() + \
+            array.array('d', [s[1] for s in segments]).tobytes()
+        annotations_offset = offset + len(sample_bytes)
+        table.append(_STREAM.pack(sample_period, start_time, len(sample_bytes) // 8, offset,
+                                  len(annotation_indices), annotations_offset,
+                                  len(segments), annotations_offset + len(annotation_bytes)))
+        data.extend((sample_bytes, annotation_bytes, segment_bytes))
+        offset += len(sample_bytes) + len(annotation_bytes) + len(segment_bytes)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, LAYOUT_VERSION, len(streams), len(directory)))
+        f.write(directory)
+        f.writelines(table)
+        f.writelines(data)
+
+
+class RecordedStream(object):
+    """ The samples and annotations of one waveform in a recording file (memory mapped)."""
+
+    def __init__(self, handle, sample_period, start_time, samples, annotation_indices, annotation_type_indices,
+                 annotations, segment_indices, segment_times):
+        self.handle = handle
+        self.sample_period = sample_period
+        self.start_time = start_time
+        self.samples = samples  # memoryview of float64
+        self.annotation_indices = annotation_indices  # memoryview of uint64, ascending
+        self.annotation_type_indices = annotation_type_indices  # memoryview of uint64
+        self._annotations = annotations  # pmtypes.Annotation per annotation type
+        self.segment_indices = segment_indices  # memoryview of uint64, first samples after gaps, ascending
+        self.segment_times = segment_times  # memoryview of float64, time stamps of these samples
+
+    def __len__(self):
+        return len(self.samples)
+
+    def copy_samples(self, start, count):
+        """ returns a sample buffer with a copy of the samples start ... start + count - 1"""
+        return samplebuffer.fromBuffers([self.samples[start:start + count]])
+
+    def annotations(self, start, count):
+        """ returns a list of (sample index, pmtypes.Annotation) of the samples start ... start + count - 1"""
+        first = bisect.bisect_left(self.annotation_indices, start)
+        last = bisect.bisect_left(self.annotation_indices, start + count, first)
+        return [(self.annotation_indices[i], self._annotations[self.annotation_type_indices[i]])
+                for i in range(first, last)]
+
+    def timestamp(self, index):
+        """ returns the time stamp of sample index"""
+        segment = bisect.bisect_right(self.segment_indices, index)
+        if segment == 0:
+            return self.start_time + index * self.sample_period
+        return self.segment_times[segment - 1] + (index - self.segment_indices[segment - 1]) * self.sample_period
+
+    def gaps(self):
+        """ returns a list of (sample index, number of missing samples before this sample), computed from the
+        time stamps of the segments"""
+        result = []
+        start_index, start_time = 0, self.start_time
+        for index, timestamp in zip(self.segment_indices, self.segment_times):
+            missing = int(round((timestamp - start_time) / self.sample_period)) - (index - start_index)
+            result.append((index, max(missing, 0)))
+            start_index, start_time = index, timestamp
+        return result
+
+
+class WaveformRecording(object):
+    """ A memory mapped recording file."""
+
+    def __init__(self, path):
+        _checkByteOrder()
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, stream_count, directory_size = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            self._mmap.close()
+            raise ValueError('{} is not a waveform recording of layout version {}'.format(path, LAYOUT_VERSION))
+        directory = json.loads(self._mmap[_HEADER.size:_HEADER.size + directory_size].decode('utf-8'))
+        self.annotation_types = [pmtypes.Coding(*t) for t in directory['annotation_types']]
+        annotations = [pmtypes.Annotation(pmtypes.CodedValue(
+            t.code, None if t.codingSystem == pmtypes.DefaultCodingSystem else t.codingSystem, t.codingSystemVersion))
+            for t in self.annotation_types]
+        self._view = memoryview(self._mmap)
+        self._views = []
+        self.streams = {}
+        table_offset = _HEADER.size + directory_size
+        for i, handle in enumerate(directory['handles']):
+            (sample_period, start_time, sample_count, samples_offset, annotation_count, annotations_offset,
+             segment_count, segments_offset) = _STREAM.unpack_from(self._mmap, table_offset + i * _STREAM.size)
+            samples = self._cast(samples_offset, sample_count, 'd')
+            annotation_indices = self._cast(annotations_offset, annotation_count, 'Q')
+            annotation_type_indices = self._cast(annotations_offset + annotation_count * 8, annotation_count, 'Q')
+            segment_indices = self._cast(segments_offset, segment_count, 'Q')
+            segment_times = self._cast(segments_offset + segment_count * 8, segment_count, 'd')
+            self.streams[handle] = RecordedStream(handle, sample_period, start_time, samples, annotation_indices,
+                                                  annotation_type_indices, annotations, segment_indices,
+                                                  segment_times)
+
+    def _cast(self, offset, count, typecode):
+        view = self._view[offset:offset + count * 8]
+        cast_view = view.cast(typecode)
+        self._views.extend((cast_view, view))
+        return cast_view
+
+    @property
+    def handles(self):
+        return list(self.streams.keys())
+
+    def close(self):
+        self.streams = {}
+        for view in self._views + [self._view]:
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+
+class _StreamRecord(object):
+    """ the recorded data of one stream"""
+
+    def __init__(self, sample_period):
+        self.sample_period = sample_period
+        self.start_time = None
+        self.next_index = None  # absolute index (in the ClientRtBuffer) of the next sample
+        self.samples = array.array('d')
+        self.annotation_indices = array.array('Q')
+        self.annotation_type_indices = array.array('Q')
+        self.segment_indices = array.array('Q')
+        self.segment_times = array.array('d')
+
+
+class WaveformRecorder(object):
+    """ Records the samples of ClientRtBuffer objects.
+    Call poll regularly, before the ring buffers of the ClientRtBuffer objects are full (maxRealtimeSamples of the
+    client mdib); samples that were overwritten before poll are counted in lost_samples, the recording gets a gap.
+    """
+
+    def __init__(self, rtBuffers, handles=None):
+        """
+        :param rtBuffers: a dictionary handle => ClientRtBuffer, e.g. ClientMdibContainer.rtBuffers
+                          (buffers that are added later are recorded from the next poll on)
+        :param handles: the handles to record, default: all
+        """
+        self._rtBuffers = rtBuffers
+        self._handles = handles
+        self._records = {}
+        self._annotation_types = {}  # pmtypes.Coding => index
+        self.lost_samples = 0
+
+    def poll(self):
+        """ takes the new samples of all ClientRtBuffer objects."""
+        for handle, rt_buffer in list(self._rtBuffers.items()):
+            if self._handles is not None and handle not in self._handles:
+                continue
+            record = self._records.get(handle)
+            if record is None:
+                record = _StreamRecord(rt_buffer.sample_period)
+                self._records[handle] = record
+            first, values, first_timestamp, annotations = rt_buffer.copySamplesSince(record.next_index)
+            if not len(values):
+                continue
+            if record.start_time is None:
+                record.start_time = first_timestamp
+            elif first > record.next_index:
+                self.lost_samples += first - record.next_index
+                record.segment_indices.append(len(record.samples))
+                record.segment_times.append(first_timestamp)
+            offset = len(record.samples) - first
+            for index, sample_annotations in annotations:
+                for annotation in sample_annotations:
+                    type_index = self._annotation_types.setdefault(annotation.coding, len(self._annotation_types))
+                    record.annotation_indices.append(index + offset)
+                    record.annotation_type_indices.append(type_index)
+            record.samples.frombytes(values.tobytes())
+            record.next_index = first + len(values)
+
+    def save(self, path):
+        """ writes all recorded samples to a recording file."""
+        streams = []
+        for handle, record in self._records.items():
+            if record.start_time is None:
+                continue
+            if not record.sample_period:
+                raise ValueError('sample period of "{}" is not known'.format(handle))
+            streams.append((handle, record.sample_period, record.start_time, record.samples,
+                            record.annotation_indices, record.annotation_type_indices,
+                            list(zip(record.segment_indices, record.segment_times))))
+        annotation_types = sorted(self._annotation_types, key=self._annotation_types.get)
+        write_recording(path, streams, annotation_types)
+
+
+class _ReplayChannelReader(object):
+    """ Makes RtSampleArray objects from a RecordedStream, same interface as the generator wrapper
+    of DefaultWaveformSource."""
+
+    def __init__(self, stream, speed, loop):
+        self._stream = stream
+        self._loop = loop
+        self.sample_period = stream.sample_period / speed
+        self._position = 0  # index of the next sample in the stream
+        self._gaps = dict(stream.gaps())
+        self._gap_indices = sorted(self._gaps)
+        self._missing = 0  # missing samples of a gap that are still to be skipped before the sample at _position
+        self._last_timestamp = None
+        self._activation_state = pmtypes.ComponentActivation.ON
+        self.current_rt_sample_array = None
+
+    def set_activation_state(self, component_activation):
+        self._activation_state = component_activation
+        if component_activation == pmtypes.ComponentActivation.ON:
+            self._last_timestamp = time.time()
+
+    def _skip_gap(self, count):
+        """ skips up to count missing samples, returns the number of skipped samples"""
+        skipped = min(count, self._missing)
+        self._missing -= skipped
+        return skipped
+
+    def _segments(self, count):
+        """ (start, count) tuples of the next count samples of the stream, up to the next gap"""
+        length = len(self._stream)
+        segments = []
+        while count > 0 and length > 0 and not self._missing:
+            gap = bisect.bisect_right(self._gap_indices, self._position)
+            end = self._gap_indices[gap] if gap < len(self._gap_indices) else length
+            segment_count = min(count, end - self._position)
+            if segment_count > 0:
+                segments.append((self._position, segment_count))
+            self._position += segment_count
+            count -= segment_count
+            if self._position == length:
+                if not self._loop:
+                    break
+                self._position = 0
+            elif self._position == end:
+                self._missing = self._gaps[end]
+        return segments
+
+    def getNextSampleArray(self):
+        if self._activation_state != pmtypes.ComponentActivation.ON:
+            self.current_rt_sample_array = RtSampleArray(None, self.sample_period, samplebuffer.mkSampleBuffer(),
+                                                         self._activation_state, [])
+            return self.current_rt_sample_array
+        now = time.time()
+        observation_time = self._last_timestamp or now
+        samples_count = int((now - observation_time) / self.sample_period)
+        skipped = self._skip_gap(samples_count)
+        segments = self._segments(samples_count - skipped)
+        if self._missing:  # stopped at a gap, the samples after the gap go into the next sample array
+            count = sum(c for _, c in segments)
+            samples_count = skipped + count + self._skip_gap(samples_count - skipped - count)
+        self._last_timestamp = observation_time + self.sample_period * samples_count
+        samples = samplebuffer.fromBuffers([self._stream.samples[start:start + count] for start, count in segments])
+        rt_sample_array = RtSampleArray(observation_time + self.sample_period * skipped, self.sample_period, samples,
+                                        self._activation_state, [])
+        offset = 0
+        annotation_indices = {}  # annotation => index in rt_sample_array.annotations
+        for start, count in segments:
+            for sample_index, annotation in self._stream.annotations(start, count):
+                annotation_index = annotation_indices.get(id(annotation))
+                if annotation_index is None:
+                    annotation_index = annotation_indices[id(annotation)] = len(rt_sample_array.annotations)
+                    rt_sample_array.annotations.append(annotation)
+                rt_sample_array.apply_annotations.append(
+                    pmtypes.ApplyAnnotation(annotation_index, sample_index - start + offset))
+            offset += count
+        self.current_rt_sample_array = rt_sample_array
+        return rt_sample_array
+
+
+class ReplayWaveformSource(DefaultWaveformSource):
+    """ Waveform source that replays a recording file.
+    With speed > 1 the replay is accelerated: the sample period of the waveforms is the recorded sample period / speed
+    (call update_descriptors), so the device sends speed times more samples per second."""
+
+    def __init__(self, path, speed=1.0, loop=True, handles=None):
+        """
+        :param path: file name of a recording file
+        :param speed: replay speed, 1.0 is real time
+        :param loop: if True, the replay starts again at the end of the recording
+        :param handles: dictionary recorded handle => handle in the mdib, default: the recorded handles.
+                        Recorded handles that are not in the dictionary are not replayed.
+        """
+        super().__init__()
+        self.recording = WaveformRecording(path)
+        for handle, stream in self.recording.streams.items():
+            target_handle = handle if handles is None else handles.get(handle)
+            if target_handle is not None:
+                self._waveform_generators[target_handle] = _ReplayChannelReader(stream, speed, loop)
+
+    def close(self):
+        self._waveform_generators.clear()
+        self.recording.close()
@@ -0,0 +1,212 @@
+""" Template based serialization of WaveformStream reports.
+
+Between two WaveformStream reports usually only the MdibVersion of the report and the StateVersion,
+DeterminationTime, Samples and annotations of the RealTimeSampleArrayMetricStates change.
+WaveformStreamEncoder serializes a state once with the generic container properties into a template (the xml text
+with placeholders for these values) and re-uses the template as long as all other values of the state are unchanged.
+The result is the same xml as the generic path (mkWaveformStreamGeneric).
+
+Unchanged values are detected with the valueToken method of the container properties: immutable values are compared
+by value, all other values by identity. This relies on the copy-on-write of containers in transactions, a value that
+is modified in place without a transaction is not detected (the same restriction applies to the cached state nodes).
+"""
+import re
+
+from lxml import etree as etree_
+
+from ..dataconverters import currentNumericMode
+from ..namespaces import domTag
+from ..namespaces import msgTag
+from .containerproperties import get_container_schema
+
+_STATE_VERSION = 'StateVersion'
+_DETERMINATION_TIME = 'DeterminationTime'
+_SAMPLES = 'Samples'
+_ANNOTATIONS = 'Annotations'
+
+_STATE_VARIABLE_NAMES = ('StateVersion', '_MetricValue')
+_VALUE_VARIABLE_NAMES = ('DeterminationTime', 'Samples', 'Annotation', 'ApplyAnnotations')
+
+_PLACEHOLDER = '@@{}@@'
+_PLACEHOLDER_REGEX = re.compile(b'@@([A-Za-z]+)@@')
+_NEEDS_ESCAPING_REGEX = re.compile('[&<>"\n\r\t]')
+
+
+def mkWaveformStreamGeneric(states, nsmap, mdib_version_group):
+    """ Creates the WaveformStream node with the generic container properties (one node per state).
+    :param states: list of RealTimeSampleArrayMetricStateContainer instances
+    :param nsmap: namespace map of the WaveformStream node
+    :param mdib_version_group: a MdibVersionGroup instance
+    :return: etree node
+    """
+    body_node = etree_.Element(msgTag('WaveformStream'), nsmap=nsmap)
+    mdib_version_group.update_node(body_node)
+    for state in states:
+        body_node.append(state.copyStateNode(msgTag('State')))
+    return body_node
+
+
+def _variableProperties(cls, variable_names):
+    """ returns the (name, property) tuples of cls that are not variable (part of the template)"""
+    return tuple(p for p in get_container_schema(cls).properties if p[0] not in variable_names)
+
+
+def _innerXml(node):
+    """ serialized children of node (without the start and end tag of node)"""
+    text = etree_.tostring(node)
+    return text[text.index(b'>') + 1:text.rindex(b'</')]
+
+
+class _StateTemplate(object):
+    """ The serialized xml of one state with placeholders for the variable values."""
+    __slots__ = ('key', 'chunks', 'slots', 'value_nsmap')
+
+    def __init__(self, key, chunks, slots, value_nsmap):
+        self.key = key
+        self.chunks = chunks  # len(chunks) == len(slots) + 1
+        self.slots = slots  # names of the variable values between the chunks
+        self.value_nsmap = value_nsmap  # effective namespace map of the MetricValue node
+
+
+class WaveformStreamEncoder(object):
+    """ Creates WaveformStream nodes from templates, see module doc string."""
+
+    def __init__(self):
+        self._templates = {}  # (descriptor handle, has annotations) => _StateTemplate
+        self._static_properties = {}  # class => ((name, property), ...) of all values that are in the template
+        self._end_tags = {}  # namespace map key => end tag of the WaveformStream node
+        self.hits = 0
+        self.misses = 0
+
+    def _staticProperties(self, cls, variable_names):
+        props = self._static_properties.get(cls)
+        if props is None:
+            props = _variableProperties(cls, variable_names)
+            self._static_properties[cls] = props
+        return props
+
+    def _templateKey(self, state, nsmap_key):
+        """ a tuple that is equal for two states if their templates are equal"""
+        metric_value = state.__class__._MetricValue.getActualValue(state)  # pylint: disable=protected-access
+        key = [state.__class__, state.descriptorHandle, nsmap_key, currentNumericMode()]
+        key.extend(prop.valueToken(state) for _, prop in self._staticProperties(state.__class__,
+                                                                                _STATE_VARIABLE_NAMES))
+        if metric_value is not None:
+            value_cls = metric_value.__class__
+            key.append(value_cls)
+            key.extend(prop.valueToken(metric_value) for _, prop in self._staticProperties(value_cls,
+                                                                                          _VALUE_VARIABLE_NAMES))
+            # presence of the variable values changes the structure of the xml
+            key.append(value_cls.DeterminationTime.getActualValue(metric_value) is None)
+            key.append(value_cls.Samples.getActualValue(metric_value) is None)
+            key.append(self._hasAnnotations(metric_value))
+        return tuple(key)
+
+    @staticmethod
+    def _hasAnnotations(metric_value):
+        value_cls = metric_value.__class__
+        return bool(value_cls.Annotation.getActualValue(metric_value)
+                    or value_cls.ApplyAnnotations.getActualValue(metric_value))
+
+    def _mkTemplate(self, state, key, nsmap):
+        """ serializes the state with placeholders for the variable values.
+        :return: a _StateTemplate or None if the state can not be handled with a template."""
+        node = state.mkStateNode(msgTag('State'), updateDescriptorVersion=False)
+        node.set('StateVersion', _PLACEHOLDER.format(_STATE_VERSION))
+        value_node = node.find(domTag('MetricValue'))
+        value_nsmap = None
+        expected_slots = {_STATE_VERSION}
+        if value_node is not None:
+            value_nsmap = value_node.nsmap
+            for attr_name in (_DETERMINATION_TIME, _SAMPLES):
+                if value_node.get(attr_name) is not None:
+                    value_node.set(attr_name, _PLACEHOLDER.format(attr_name))
+                    expected_slots.add(attr_name)
+            annotation_nodes = value_node.findall(domTag('Annotation')) + value_node.findall(domTag('ApplyAnnotation'))
+            if annotation_nodes:
+                for annotation_node in annotation_nodes:
+                    value_node.remove(annotation_node)
+                if len(value_node):
+                    value_node[-1].tail = _PLACEHOLDER.format(_ANNOTATIONS)
+                else:
+                    value_node.text = _PLACEHOLDER.format(_ANNOTATIONS)
+                expected_slots.add(_ANNOTATIONS)
+        body_node = etree_.Element(msgTag('WaveformStream'), nsmap=nsmap)
+        body_node.append(node)
+        parts = _PLACEHOLDER_REGEX.split(_innerXml(body_node))
+        slots = tuple(p.decode('ascii') for p in parts[1::2])
+        if len(slots) != len(expected_slots) or set(slots) != expected_slots:
+            return None  # a placeholder text is part of a static value
+        return _StateTemplate(key, tuple(parts[0::2]), slots, value_nsmap)
+
+    @staticmethod
+    def _annotationsXml(metric_value, value_nsmap):
+        value_node = etree_.Element(domTag('MetricValue'), nsmap=value_nsmap)
+        for annotation in metric_value.__class__.Annotation.getActualValue(metric_value) or ():
+            value_node.append(annotation.asEtreeNode(domTag('Annotation'), value_nsmap))
+        for apply_annotation in metric_value.__class__.ApplyAnnotations.getActualValue(metric_value) or ():
+            value_node.append(apply_annotation.asEtreeNode(domTag('ApplyAnnotation'), value_nsmap))
+        return _innerXml(value_node)
+
+    def _renderState(self, state, template):
+        """ :return: list of byte strings, None if a value can not be written into the template"""
+        metric_value = state.__class__._MetricValue.getActualValue(state)  # pylint: disable=protected-access
+        result = [template.chunks[0]]
+        for slot, chunk in zip(template.slots, template.chunks[1:]):
+            if slot == _STATE_VERSION:
+                value = state.__class__.StateVersion.getXmlValue(state)
+            elif slot == _DETERMINATION_TIME:
+                value = metric_value.__class__.DeterminationTime.getXmlValue(metric_value)
+            elif slot == _SAMPLES:
+                value = metric_value.__class__.Samples.getXmlValue(metric_value)
+            else:
+                result.append(self._annotationsXml(metric_value, template.value_nsmap))
+                result.append(chunk)
+                continue
+            if value is None or _NEEDS_ESCAPING_REGEX.search(value):
+                return None
+            result.append(value.encode('ascii', 'xmlcharrefreplace'))
+            result.append(chunk)
+        return result
+
+    def _stateXml(self, state, nsmap, nsmap_key):
+        key = self._templateKey(state, nsmap_key)
+        # states with and without annotations alternate, keep a template for both
+        template_id = state.descriptorHandle, key[-1] is True
+        template = self._templates.get(template_id)
+        if template is None or template.key != key:
+            self.misses += 1
+            template = self._mkTemplate(state, key, nsmap)
+            if template is None:
+                self._templates.pop(template_id, None)
+                return None
+            self._templates[template_id] = template
+        else:
+            self.hits += 1
+        return self._renderState(state, template)
+
+    def mkWaveformStream(self, states, nsmap, mdib_version_group):
+        """ Creates the WaveformStream node, same result as mkWaveformStreamGeneric.
+        :param states: list of RealTimeSampleArrayMetricStateContainer instances
+        :param nsmap: namespace map of the WaveformStream node
+        :param mdib_version_group: a MdibVersionGroup instance
+        :return: etree node
+        """
+        body_node = etree_.Element(msgTag('WaveformStream'), nsmap=nsmap)
+        mdib_version_group.update_node(body_node)
+        head = etree_.tostring(body_node)  # an empty element: <... />
+        nsmap_key = frozenset(nsmap.items())
+        end_tag = self._end_tags.get(nsmap_key)
+        if end_tag is None:
+            end_tag = b'</' + head[1:].split(None, 1)[0] + b'>'
+            self._end_tags[nsmap_key] = end_tag
+        xml = [head[:-2], b'>']
+        for state in states:
+            # same as the generic path (copyStateNode creates a new node for each new StateVersion)
+            state.updateDescriptorVersion()
+            state_xml = self._stateXml(state, nsmap, nsmap_key)
+            if state_xml is None:
+                return mkWaveformStreamGeneric(states, nsmap, mdib_version_group)
+            xml.extend(state_xml)
+        xml.append(end_tag)
+        return etree_.fromstring(b''.join(xml))
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from collections import defaultdict, namedtuple
-from threading import RLock
+
+from .rwlock import ReadWriteLock
 
 """
 This module implements an in-memory table with indices for faster access to objects.
@@ -35,37 +36,44 @@ class IndexDefinition(dict):
     This is a dictionary that has lists ob objects as value.
     Each list contains objects that have the same key member"""
 
-    def __init__(self, getKeyFunc, indexNoneValues=True):
+    def __init__(self, getKeyFunc, indexNoneValues=True, attrName=None):
         """
         :param getKeyFunc: a callable that returns a key value from a given object
         :param indexNoneValues: if True, a None key is handled like every other value.
                                 if False,a None key is not added to index.
+        :param attrName: name of the attribute that getKeyFunc returns. If set, MultiKeyLookup.find and select use
+                         this index for this attribute instead of checking all objects.
         """
         super(IndexDefinition, self).__init__()
         self._getKeyFunc = getKeyFunc
         self._indexNoneValues = indexNoneValues
-        self._lock: RLock | None = None
+        self._lock: ReadWriteLock | None = None
+        self.attrName = attrName
 
     def getOne(self, key, allowNone=False):
-        with self._lock:
-            try:
-                result = self[key]
-                if len(result) > 1:
-                    raise RuntimeError('getOne: key "{}" has {} objects'.format(key, len(result)))
-                return result[0]
-            except KeyError:
-                if allowNone:
-                    return
-                raise RuntimeError('key "{}" not found'.format(key))
+        with self._lock.read_lock:
+            return self.getOneNoLock(key, allowNone)
+
+    def getOneNoLock(self, key, allowNone=False):
+        """ getOne for callers that already hold the lock (e.g. for many lookups in a loop)"""
+        try:
+            result = dict.__getitem__(self, key)
+            if len(result) > 1:
+                raise RuntimeError('getOne: key "{}" has {} objects'.format(key, len(result)))
+            return result[0]
+        except KeyError:
+            if allowNone:
+                return
+            raise RuntimeError('key "{}" not found'.format(key))
 
     def get(self, *args, **kwargs):
-        """Overwritten get method that uses lock."""
-        with self._lock:
+        """Overwritten get method that uses the read side of the lock."""
+        with self._lock.read_lock:
             return super().get(*args, **kwargs)
 
     def __getitem__(self, key):
-        """Overwritten __getitem__ method that uses lock."""
-        with self._lock:
+        """Overwritten __getitem__ method that uses the read side of the lock."""
+        with self._lock.read_lock:
             return super().__getitem__(key)
 
     def set_lock(self, lock):
@@ -76,20 +84,57 @@ class IndexDefinition(dict):
         if not self._indexNoneValues and key is None:
             return
         try:
-            self[key].append(obj)
+            dict.__getitem__(self, key).append(obj)  # caller holds the write lock
         except KeyError:
             self[key] = [obj]
         return [key]
 
     def _rmKey(self, key, obj):
         try:
-            objList = self[key]
+            objList = dict.__getitem__(self, key)
             objList.remove(obj)
             if len(objList) == 0:
                 del self[key]
         except (KeyError, ValueError):
             pass
 
+    def _rmObjects(self, key, objIds):
+        """ removes all objects with an id in objIds from the list of key in one pass"""
+        objList = dict.get(self, key)
+        if objList is None:
+            return
+        objList[:] = [o for o in objList if id(o) not in objIds]
+        if len(objList) == 0:
+            del self[key]
+
+    def _findNoLock(self, value):
+        """ returns the list of objects with key == value, or None if the index can not answer this
+        (a None value that is not indexed, an unhashable value)."""
+        if value is None and not self._indexNoneValues:
+            return None
+        try:
+            return dict.get(self, value, [])
+        except TypeError:
+            return None
+
+    def _getKeys(self, obj):
+        """ returns the list of keys of obj in this index, without modifying the index"""
+        key = self._getKeyFunc(obj)
+        if not self._indexNoneValues and key is None:
+            return []
+        return [key]
+
+    def _replaceObj(self, key, oldObj, newObj, position=None):
+        """ puts newObj at the position of oldObj, both have the same key.
+        :param position: expected position of oldObj in the list (avoids searching it in long lists)
+        :return: position of newObj in the list
+        """
+        objList = dict.__getitem__(self, key)
+        if position is None or position >= len(objList) or objList[position] is not oldObj:
+            position = objList.index(oldObj)
+        objList[position] = newObj
+        return position
+
 
 class UIndexDefinition(IndexDefinition):
     """ A unique Index, there can only be one object with that key"""
@@ -109,6 +154,12 @@ class UIndexDefinition(IndexDefinition):
             self[k] = [obj]
         return keys
 
+    def _getKeys(self, obj):
+        keys = super()._getKeys(obj)
+        if keys and isinstance(keys[0], list):
+            raise ValueError('list of keys not allowed in UIndex: obj= {}, keys={}'.format(obj, keys[0]))
+        return keys
+
 
 class IndexDefinition1n(IndexDefinition):
     """ For member values that are a list of keys (1:n relationship)"""
@@ -119,16 +170,61 @@ class IndexDefinition1n(IndexDefinition):
             return
         for k in keys:
             try:
-                self[k].append(obj)
+                dict.__getitem__(self, k).append(obj)
             except KeyError:
                 self[k] = [obj]
         return keys
 
+    def _getKeys(self, obj):
+        keys = self._getKeyFunc(obj)
+        if not self._indexNoneValues and keys is None:
+            return []
+        return list(keys)
+
+    def _findNoLock(self, value):
+        return None  # the attribute is a list of keys, the index can not be used to compare the list
+
+
+class CompositeIndexDefinition(IndexDefinition):
+    """ An index for the combination of several attributes, the key is a tuple of the attribute values.
+    MultiKeyLookup.select uses it if all its attributes are selected, e.g.
+    lookup.addIndex('NODETYPE_parentHandle', CompositeIndexDefinition(('NODETYPE', 'parentHandle')))
+    lookup.select(NODETYPE=x, parentHandle=y) is O(result) then."""
+
+    def __init__(self, attrNames, indexNoneValues=True):
+        attrNames = tuple(attrNames)
+        super().__init__(lambda obj: tuple(getattr(obj, name) for name in attrNames), indexNoneValues, attrNames)
+
+    def _findNoLock(self, value):
+        value = tuple(value)
+        if not self._indexNoneValues and None in value:
+            return None
+        try:
+            return dict.get(self, value, [])
+        except TypeError:
+            return None
+
+
+def _matches(obj, name, value):
+    """ compares an attribute like ObjectSelector.find does: callables are called, missing attributes never match"""
+    try:
+        val = getattr(obj, name)
+        if callable(val):
+            val = val()
+    except AttributeError:
+        return False
+    return val == value
+
 
 class ObjectSelector(object):
     def __init__(self, selectedObjects):
         self.objects = selectedObjects
 
+    def select(self, **kwargs):
+        """ AND combination of args. Values are compared for equality (==), not identity (is)."""
+        return ObjectSelector([o for o in self.objects if all(_matches(o, name, value)
+                                                              for name, value in kwargs.items())])
+
     def find(self, **kwargs):
         """ OR combination of args. Values are compared for equality (==), not identity (is)."""
         result = []
@@ -147,19 +243,27 @@ class ObjectSelector(object):
         return ObjectSelector(result)
 
 
-_ObjRef = namedtuple('_ObjRef', 'index_dict key')  # used internally in MultiKeyLookup to keep track of all indexes.
+# used internally in MultiKeyLookup to keep track of all indexes.
+# position is the last known position of the object in the list of the index (set by swapObject).
+_ObjRef = namedtuple('_ObjRef', 'index_dict key position', defaults=(None,))
 
 
 # when we remove an object we need it to delete all indices referencing it
 
 class MultiKeyLookup(object):
+    """ Lookups and find() only take the read side of the lock, so that they can run in parallel.
+    All methods that modify the lookup take the write side. The lock property also returns the write side
+    ("with lookup.lock:" is exclusive), read only code can use "with lookup.lock.read_lock:".
+    """
 
     def __init__(self):
         self._objects = set()  # contains the objects
         self._objectIDs = defaultdict(
             list)  # key = id(object), value = list of ((_idxDefs, key) tuples that reference the object
         self._idxDefs = {}  # holds UIndexDefinition Objects
-        self._lock = RLock()
+        self._attrIndices = {}  # key = attrName, value = IndexDefinition; used by find and select
+        self._compositeIndices = []  # CompositeIndexDefinitions, most attributes first
+        self._lock = ReadWriteLock()
 
     @property
     def objects(self):
@@ -178,6 +282,11 @@ class MultiKeyLookup(object):
     def addIndex(self, indexName, indexDefinition):
         self._idxDefs[indexName] = indexDefinition
         indexDefinition.set_lock(self._lock)
+        if isinstance(indexDefinition, CompositeIndexDefinition):
+            self._compositeIndices.append(indexDefinition)
+            self._compositeIndices.sort(key=lambda idx: len(idx.attrName), reverse=True)
+        elif indexDefinition.attrName is not None:
+            self._attrIndices[indexDefinition.attrName] = indexDefinition
         # add existing objects to new lookup
         for obj in self._objects:
             keys = indexDefinition._mkKeys(obj)
@@ -225,6 +334,40 @@ class MultiKeyLookup(object):
             obj_ref.index_dict._rmKey(obj_ref.key, obj)
         del self._objectIDs[id(obj)]
 
+    def _swapIndices(self, obj_refs, oldObj, newObj):
+        """ Moves the index entries of oldObj to newObj. Indices where the keys of newObj are the same as the
+        keys of oldObj keep their entries (newObj takes the place of oldObj), only indices with changed keys are
+        updated.
+        :param obj_refs: the _ObjRef list of oldObj
+        :return: the _ObjRef list of newObj
+        """
+        old_refs = defaultdict(list)  # key = id(indexDefinition), value = list of _ObjRef
+        for obj_ref in obj_refs:
+            old_refs[id(obj_ref.index_dict)].append(obj_ref)
+        new_obj_refs = []
+        for indexDefinition in self._idxDefs.values():
+            refs = old_refs.get(id(indexDefinition), [])
+            keys = [obj_ref.key for obj_ref in refs]
+            try:
+                new_keys = indexDefinition._getKeys(newObj)
+            except (TypeError, AttributeError):
+                new_keys = []
+            if new_keys == keys:
+                if oldObj is not newObj:
+                    refs = [_ObjRef(indexDefinition, r.key, indexDefinition._replaceObj(r.key, oldObj, newObj,
+                                                                                         r.position))
+                            for r in refs]
+                new_obj_refs.extend(refs)
+            else:
+                for k in keys:
+                    indexDefinition._rmKey(k, oldObj)
+                try:
+                    keys = indexDefinition._mkKeys(newObj) or []
+                except (TypeError, AttributeError):
+                    keys = []
+                new_obj_refs.extend(_ObjRef(indexDefinition, k) for k in keys)
+        return new_obj_refs
+
     def removeObject(self, obj):
         obj_refs = self._objectIDs.get(id(obj))
         if obj_refs is None:
@@ -245,25 +388,50 @@ class MultiKeyLookup(object):
             self.removeObjectsNoLock(objs)
 
     def removeObjectsNoLock(self, objs):
+        """ removes many objects at once: every affected index list is filtered only once instead of one
+        list.remove per object, which is quadratic for long lists (e.g. all objects of one NODETYPE)."""
+        removed_ids = {}  # key = (id(indexDefinition), key), value = (indexDefinition, key, set of object ids)
         for obj in objs:
-            obj_refs = self._objectIDs.get(id(obj))
+            obj_refs = self._objectIDs.pop(id(obj), None)
             if obj_refs is None:
                 continue
-            self._rmIndices(obj)
+            for obj_ref in obj_refs:
+                entry = removed_ids.get((id(obj_ref.index_dict), obj_ref.key))
+                if entry is None:
+                    entry = (obj_ref.index_dict, obj_ref.key, set())
+                    removed_ids[(id(obj_ref.index_dict), obj_ref.key)] = entry
+                entry[2].add(id(obj))
             self._objects.remove(obj)
+        for indexDefinition, key, obj_ids in removed_ids.values():
+            indexDefinition._rmObjects(key, obj_ids)
+
+    def swapObject(self, oldObj, newObj):
+        with self._lock:
+            self.swapObjectNoLock(oldObj, newObj)
+
+    def swapObjectNoLock(self, oldObj, newObj):
+        """ Replaces oldObj with newObj, typically a new version of the same object.
+        This is faster than removeObject + addObject, because only indices where the keys of newObj differ from the
+        keys of oldObj are updated. If oldObj is None or not in the lookup, newObj is added."""
+        obj_refs = None if oldObj is None else self._objectIDs.pop(id(oldObj), None)
+        if obj_refs is None:
+            self.addObjectNoLock(newObj)
+            return
+        self._objects.remove(oldObj)
+        self._objects.add(newObj)
+        self._objectIDs[id(newObj)] = self._swapIndices(obj_refs, oldObj, newObj)
 
     def updateObject(self, obj):
         if obj not in self._objects:
             raise RuntimeError('object {} not known'.format(obj))
         with self._lock:
-            self._rmIndices(obj)
-            self._mkIndices(obj)
+            self.updateObjectNoLock(obj)
 
     def updateObjectNoLock(self, obj):
+        """ updates the indices of obj after it was modified (only indices with changed keys)"""
         if obj not in self._objects:
             raise RuntimeError('object {} not known'.format(obj))
-        self._rmIndices(obj)
-        self._mkIndices(obj)
+        self._objectIDs[id(obj)] = self._swapIndices(self._objectIDs[id(obj)], obj, obj)
 
     def updateObjects(self, objs):
         with self._lock:
@@ -274,8 +442,7 @@ class MultiKeyLookup(object):
             if obj not in self._objects:
                 raise RuntimeError('object {} not known'.format(obj))
             with self._lock:
-                self._rmIndices(obj)
-                self._mkIndices(obj)
+                self._objectIDs[id(obj)] = self._swapIndices(self._objectIDs[id(obj)], obj, obj)
 
     def clear(self):
         with self._lock:
@@ -285,11 +452,55 @@ class MultiKeyLookup(object):
             self._objects.clear()
 
     def find(self, **kwargs):
-        sel = ObjectSelector(self._objects)
-        with self._lock:
-            return sel.find(**kwargs)
+        """ OR combination of args, see ObjectSelector.find.
+        If all args are attributes with an index (IndexDefinition.attrName), the result is taken from the indices,
+        otherwise all objects are checked."""
+        with self._lock.read_lock:
+            return self.findNoLock(**kwargs)
 
     def findNoLock(self, **kwargs):
-        sel = ObjectSelector(self._objects)
-        return sel.find(**kwargs)
+        hit_lists = []
+        for name, value in kwargs.items():
+            hits = self._findInIndex(name, value)
+            if hits is None:
+                return ObjectSelector(self._objects).find(**kwargs)
+            hit_lists.append(hits)
+        if len(hit_lists) == 1:
+            return ObjectSelector(list(hit_lists[0]))
+        result = {}  # id(obj): obj, keeps the order
+        for hits in hit_lists:
+            for obj in hits:
+                result[id(obj)] = obj
+        return ObjectSelector(list(result.values()))
+
+    def select(self, **kwargs):
+        """ AND combination of args (values are compared for equality).
+        The candidates are taken from the composite or single attribute index with the fewest hits, only these
+        candidates are checked for the other args.
+        :return: an ObjectSelector instance"""
+        with self._lock.read_lock:
+            return self.selectNoLock(**kwargs)
+
+    def selectNoLock(self, **kwargs):
+        candidates = None
+        covered_names = ()
+        for indexDefinition in self._compositeIndices:
+            if all(name in kwargs for name in indexDefinition.attrName):
+                hits = indexDefinition._findNoLock(tuple(kwargs[name] for name in indexDefinition.attrName))
+                if hits is not None and (candidates is None or len(hits) < len(candidates)):
+                    candidates, covered_names = hits, indexDefinition.attrName
+        for name, value in kwargs.items():
+            hits = self._findInIndex(name, value)
+            if hits is not None and (candidates is None or len(hits) < len(candidates)):
+                candidates, covered_names = hits, (name,)
+        if candidates is None:
+            candidates = self._objects
+        remaining = {name: value for name, value in kwargs.items() if name not in covered_names}
+        return ObjectSelector(list(candidates)).select(**remaining)
+
+    def _findInIndex(self, name, value):
+        indexDefinition = self._attrIndices.get(name)
+        if indexDefinition is None:
+            return None
+        return indexDefinition._findNoLock(value)
 
@@ -2,7 +2,6 @@
 import decimal
 from collections import namedtuple
 import traceback
-import inspect
 import itertools
 import enum
 import warnings
@@ -23,6 +22,8 @@ asEtreeNode: returns an etree node that represents the object
 
 class PropertyBasedPMType(object):
     """ Base class that assumes all data is defined as containerproperties and _props lists all property names."""
+    # names of locally stored property values that are not shared with copies, None if never copied. See mkCopy
+    _cowPrivateNames = None
 
     def asEtreeNode(self, qname, nsmap):
         node = etree_.Element(qname, nsmap=nsmap)
@@ -44,21 +45,19 @@ class PropertyBasedPMType(object):
 
     def _sortedContainerProperties(self):
         """
-        @return: a list of (name, object) tuples of all GenericProperties ( and subclasses)
+        @return: a tuple of (name, object) tuples of all GenericProperties ( and subclasses)
         list is created based on _props lists of classes
         """
-        ret = []
-        classes = inspect.getmro(self.__class__)
-        for cls in reversed(classes):
-            try:
-                names = cls._props  # pylint: disable=protected-access
-            except:
-                continue
-            for name in names:
-                obj = getattr(cls, name)
-                if obj is not None:
-                    ret.append((name, obj))
-        return ret
+        return cp.get_container_schema(self.__class__).properties
+
+    def mkCopy(self):
+        """ Returns a copy that shares the property values with self.
+        Values that can be modified in place are copied on first access (copy-on-write)."""
+        copied = self.__class__.__new__(self.__class__)
+        copied.__dict__.update(self.__dict__)
+        self._cowPrivateNames = cp.NO_PRIVATE_NAMES
+        copied._cowPrivateNames = cp.NO_PRIVATE_NAMES
+        return copied
 
     def __eq__(self, other):
         """ compares all properties"""
@@ -0,0 +1,162 @@
+""" Running statistics of the last values of a stream (e.g. the age of received waveform samples).
+
+Adding a value is O(1): mean and variance are updated with Welford's algorithm for a sliding window, min and max
+with monotonic queues, percentiles with a fixed-bucket histogram. The floating point error of the sliding window
+update is removed by an exact recalculation after every 'window' values (amortized O(1)).
+
+Example:
+    stats = RunningStatistics(window=100)
+    for age in ages:
+        stats.add(age)
+    print(stats.mean, stats.stdev, stats.min, stats.max, stats.percentile(95))
+"""
+import math
+from collections import deque
+
+
+class RunningStatistics(object):
+    """ Statistics of the last 'window' values.
+
+    Percentiles are read from a histogram with buckets of width bucketWidth between low and high, the result is the
+    middle of the bucket (limited to min and max), so it is exact within bucketWidth / 2. Values outside of
+    low...high are counted in an underflow or overflow bucket, a percentile in these buckets is reported as min or max.
+    """
+
+    def __init__(self, window, low=-1.0, high=5.0, bucketWidth=0.001):
+        """
+        :param window: number of values that are included in the statistics
+        :param low: lower limit of the histogram
+        :param high: upper limit of the histogram
+        :param bucketWidth: width of one histogram bucket
+        """
+        if window < 1:
+            raise ValueError('window must be greater than zero, got {}'.format(window))
+        if high <= low or bucketWidth <= 0:
+            raise ValueError('invalid histogram low={}, high={}, bucketWidth={}'.format(low, high, bucketWidth))
+        self.window = window
+        self._values = deque()
+        self._mean = 0.0
+        self._m2 = 0.0  # sum of squared differences from the mean
+        self._addsSinceRecalc = 0
+        self._seq = 0  # sequence number of the next value
+        self._minQueue = deque()  # (seq, value), values increasing; first entry is the minimum of the window
+        self._maxQueue = deque()  # (seq, value), values decreasing; first entry is the maximum of the window
+        self._low = low
+        self._bucketWidth = bucketWidth
+        self._bucketCount = int(math.ceil((high - low) / bucketWidth))
+        self._histogram = [0] * (self._bucketCount + 2)  # first entry is underflow, last entry is overflow
+
+    def __len__(self):
+        return len(self._values)
+
+    def clear(self):
+        self._values.clear()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._addsSinceRecalc = 0
+        self._minQueue.clear()
+        self._maxQueue.clear()
+        self._histogram = [0] * (self._bucketCount + 2)
+
+    def _bucket(self, value):
+        i = int(math.floor((value - self._low) / self._bucketWidth)) + 1
+        if i < 0:
+            return 0
+        return min(i, self._bucketCount + 1)
+
+    def add(self, value):
+        value = float(value)
+        values = self._values
+        if len(values) == self.window:
+            old = values.popleft()
+            self._histogram[self._bucket(old)] -= 1
+            oldMean = self._mean
+            self._mean += (value - old) / self.window
+            self._m2 += (value - old) * (value - self._mean + old - oldMean)
+        else:
+            delta = value - self._mean
+            self._mean += delta / (len(values) + 1)
+            self._m2 += delta * (value - self._mean)
+        values.append(value)
+        self._histogram[self._bucket(value)] += 1
+
+        seq = self._seq
+        self._seq += 1
+        first = seq - self.window  # values with a sequence number <= first are no longer in the window
+        minQueue = self._minQueue
+        while minQueue and minQueue[-1][1] >= value:
+            minQueue.pop()
+        minQueue.append((seq, value))
+        if minQueue[0][0] <= first:
+            minQueue.popleft()
+        maxQueue = self._maxQueue
+        while maxQueue and maxQueue[-1][1] <= value:
+            maxQueue.pop()
+        maxQueue.append((seq, value))
+        if maxQueue[0][0] <= first:
+            maxQueue.popleft()
+
+        self._addsSinceRecalc += 1
+        if self._addsSinceRecalc >= self.window:
+            self._recalc()
+
+    def _recalc(self):
+        values = self._values
+        self._mean = math.fsum(values) / len(values)
+        self._m2 = math.fsum((v - self._mean) ** 2 for v in values)
+        self._addsSinceRecalc = 0
+
+    @property
+    def mean(self):
+        """ mean of the values, 0.0 if there are no values"""
+        return self._mean if self._values else 0.0
+
+    @property
+    def variance(self):
+        """ sample variance (same as statistics.variance), 0.0 if there are less than two values"""
+        n = len(self._values)
+        if n < 2:
+            return 0.0
+        return max(self._m2, 0.0) / (n - 1)
+
+    @property
+    def stdev(self):
+        """ sample standard deviation (same as statistics.stdev), 0.0 if there are less than two values"""
+        return math.sqrt(self.variance)
+
+    @property
+    def min(self):
+        """ smallest value, None if there are no values"""
+        return self._minQueue[0][1] if self._values else None
+
+    @property
+    def max(self):
+        """ largest value, None if there are no values"""
+        return self._maxQueue[0][1] if self._values else None
+
+    def percentile(self, p):
+        """ Nearest rank percentile, read from the histogram (time does not depend on the number of values).
+        :param p: 0...100
+        :return: a float, None if there are no values
+        """
+        if not 0 <= p <= 100:
+            raise ValueError('percentile must be in range 0...100, got {}'.format(p))
+        n = len(self._values)
+        if n == 0:
+            return None
+        if p == 0:
+            return self.min
+        if p == 100:
+            return self.max
+        rank = max(1, int(math.ceil(p / 100.0 * n)))
+        count = 0
+        for i, bucketCount in enumerate(self._histogram):
+            count += bucketCount
+            if count >= rank:
+                break
+        if i == 0:  # underflow
+            return self.min
+        if i > self._bucketCount:  # overflow
+            return self.max
+        value = self._low + (i - 0.5) * self._bucketWidth  # middle of bucket i
+        return min(max(value, self.min), self.max)
@@ -0,0 +1,134 @@
+""" A reentrant reader-writer lock.
+
+Any number of threads can hold the read side at the same time, the write side is exclusive.
+The lock itself behaves like threading.RLock and takes the write side, which keeps existing code like
+"with mdib.mdibLock:" exclusive, also in threads that already hold the read side. Code that only reads uses
+"with lock.read_lock:".
+
+Example:
+    lock = ReadWriteLock()
+    with lock.read_lock:   # shared access
+        ...
+    with lock:             # exclusive access, same as "with lock.write_lock:"
+        ...
+"""
+import threading
+
+
+class _LockSide(object):
+    """ Context manager for one side of a ReadWriteLock."""
+    __slots__ = ('acquire', 'release')
+
+    def __init__(self, acquire, release):
+        self.acquire = acquire
+        self.release = release
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class ReadWriteLock(object):
+    """ A reentrant reader-writer lock that prefers writers.
+    A thread that holds the write side can also take the read side.
+    A thread that holds the read side can also take the write side: it gives up the read side while it waits for
+    the write side (otherwise two threads that do this would dead lock), and gets it back when it releases the
+    write side. Other writers can run in between, data that was read before must be read again.
+    New readers wait while a writer is waiting, except threads that already hold the read side.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._cond = threading.Condition(self._mutex)  # only used for waiting, "with self._mutex" is faster
+        self._writer = None  # ident of the thread that holds the write side
+        self._writer_count = 0
+        self._readers = {}  # key: thread ident, value: count
+        self._waiting_writers = 0
+        self._writer_read_count = 0  # read side count that the writer gave up to get the write side
+        self.read_lock = _LockSide(self.acquire_read, self.release_read)
+        self.write_lock = _LockSide(self.acquire, self.release)
+
+    def acquire_read(self, blocking=True, timeout=-1):
+        me = threading.get_ident()
+        readers = self._readers
+        with self._mutex:
+            count = readers.get(me)
+            if count is not None:
+                readers[me] = count + 1
+                return True
+            if (self._writer is not None or self._waiting_writers) and self._writer != me:
+                if not self._wait(lambda: self._writer is None and not self._waiting_writers, blocking, timeout):
+                    return False
+            readers[me] = 1
+            return True
+
+    def release_read(self):
+        me = threading.get_ident()
+        readers = self._readers
+        with self._mutex:
+            count = readers.get(me)
+            if count is None:
+                raise RuntimeError('cannot release un-acquired read lock')
+            if count > 1:
+                readers[me] = count - 1
+            else:
+                del readers[me]
+                if not readers and self._waiting_writers:
+                    self._cond.notify_all()
+
+    def acquire(self, blocking=True, timeout=-1):
+        """ acquires the write side"""
+        me = threading.get_ident()
+        with self._mutex:
+            if self._writer == me:
+                self._writer_count += 1
+                return True
+            read_count = self._readers.pop(me, 0)  # upgrade: give up the read side while waiting
+            self._waiting_writers += 1
+            try:
+                acquired = self._wait(lambda: self._writer is None and not self._readers, blocking, timeout)
+            finally:
+                self._waiting_writers -= 1
+            if not acquired:
+                if read_count:
+                    self._cond.wait_for(lambda: self._writer is None)
+                    self._readers[me] = read_count
+                self._cond.notify_all()  # readers might have waited for this writer
+                return False
+            self._writer = me
+            self._writer_count = 1
+            self._writer_read_count = read_count
+            return True
+
+    def release(self):
+        """ releases the write side"""
+        with self._mutex:
+            if self._writer != threading.get_ident():
+                raise RuntimeError('cannot release un-acquired write lock')
+            self._writer_count -= 1
+            if self._writer_count == 0:
+                self._writer = None
+                if self._writer_read_count:
+                    # upgraded reader: it keeps the read side, and also the reads it took while writing
+                    me = threading.get_ident()
+                    self._readers[me] = self._readers.get(me, 0) + self._writer_read_count
+                    self._writer_read_count = 0
+                self._cond.notify_all()
+
+    __enter__ = acquire
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def _wait(self, predicate, blocking, timeout):
+        if predicate():
+            return True
+        if not blocking:
+            return False
+        if timeout is None or timeout < 0:
+            self._cond.wait_for(predicate)
+            return True
+        return self._cond.wait_for(predicate, timeout)
@@ -0,0 +1,80 @@
+"""Sample buffers hold the values of a real time sample array (pmtypes.SampleArrayValue.Samples) as C doubles in one
+contiguous buffer: a numpy float64 array if numpy is installed, otherwise an array.array('d').
+No python object per sample is needed to store, copy, parse or serialize them.
+
+Containers read Samples as sample buffers if the numeric mode is dataconverters.NUMERIC_FLOAT.
+A sample buffer can always be assigned to Samples, it is serialized like a list of floats.
+"""
+import array
+
+from . import dataconverters
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+USE_NUMPY = numpy is not None  # set to False in order to use array.array even if numpy is installed
+
+if numpy is not None:
+    _BUFFER_TYPES = (array.array, numpy.ndarray)
+else:
+    _BUFFER_TYPES = (array.array,)
+
+
+def mkSampleBuffer(values=()):
+    """
+    :param values: an iterable of numbers
+    :return: a new sample buffer that contains values as floats
+    """
+    if USE_NUMPY:
+        if isinstance(values, (list, tuple) + _BUFFER_TYPES):
+            return numpy.array(values, dtype=numpy.float64)
+        return numpy.fromiter(values, dtype=numpy.float64)
+    return array.array('d', values)
+
+
+def fromBuffers(buffers):
+    """
+    :param buffers: list of objects with the buffer interface that contain C doubles (e.g. memoryview slices)
+    :return: a new sample buffer with a copy of the concatenated values
+    """
+    if not buffers:
+        return mkSampleBuffer()
+    if USE_NUMPY:
+        if len(buffers) == 1:
+            return numpy.frombuffer(buffers[0], dtype=numpy.float64).copy()
+        return numpy.concatenate([numpy.frombuffer(b, dtype=numpy.float64) for b in buffers])
+    result = array.array('d')
+    for buffer in buffers:
+        result.frombytes(memoryview(buffer).cast('B'))
+    return result
+
+
+def isSampleBuffer(value):
+    return isinstance(value, _BUFFER_TYPES)
+
+
+def copySampleBuffer(samples):
+    """ returns a copy of the sample buffer (of the same type)."""
+    if isinstance(samples, array.array):
+        return array.array(samples.typecode, samples)
+    return samples.copy()
+
+
+def parseSamples(xml_value):
+    """
+    :param xml_value: str or bytes, decimals separated with white space
+    :return: a sample buffer
+    """
+    if USE_NUMPY:
+        if isinstance(xml_value, bytes):
+            xml_value = xml_value.decode('ascii')
+        return numpy.array(xml_value.split(), dtype=numpy.float64)
+    return array.array('d', map(float, xml_value.split()))
+
+
+def formatSamples(samples):
+    """ Returns the space separated xml representation of the sample buffer.
+    Each value is written like dataconverters.DecimalConverter.toXML writes a float in the current numeric mode."""
+    return ' '.join(map(dataconverters.floatFormatter(), samples.tolist()))
@@ -1,3 +1,4 @@
+import contextlib
 import weakref
 from lxml import etree as etree_
 import urllib
@@ -40,6 +41,14 @@ class HostedServiceClient(object):
             raise RuntimeError('Client "{}" has already an registered mdib'.format(self.porttype))
         self._mdib_wref = None if mdib is None else weakref.ref(mdib)
 
+    def _numericContext(self):
+        """ returns a context manager, proposed states are converted to xml with the numeric mode of the registered
+        mdib (see MdibContainer.numericContext)."""
+        mdib = None if self._mdib_wref is None else self._mdib_wref()
+        if mdib is None:
+            return contextlib.nullcontext()
+        return mdib.numericContext()
+
 
     def setOperationsManager(self, operationsManager):
         self._operationsManager = operationsManager
@@ -363,7 +372,8 @@ class SetServiceClient(HostedServiceClient):
         _proposedAlertStates = [p.mkCopy() for p in proposedAlertStates]
         for p in _proposedAlertStates:
             p.nsmapper = DocNamespaceHelper()  # use my namespaces
-        _proposedAlertStateNodes = [p.mkStateNode(msgTag('ProposedAlertState')) for p in _proposedAlertStates]
+        with self._numericContext():
+            _proposedAlertStateNodes = [p.mkStateNode(msgTag('ProposedAlertState')) for p in _proposedAlertStates]
 
         return self._mkSetMethodSoapEnvelope('SetAlertState', operationHandle, _proposedAlertStateNodes)
 
@@ -374,7 +384,8 @@ class SetServiceClient(HostedServiceClient):
         nsmapper = DocNamespaceHelper()
         for p in _proposedMetricStates:
             p.nsmapper = nsmapper  # use my namespaces
-        _proposedMetricStateNodes = [p.mkStateNode(msgTag('ProposedMetricState')) for p in _proposedMetricStates]
+        with self._numericContext():
+            _proposedMetricStateNodes = [p.mkStateNode(msgTag('ProposedMetricState')) for p in _proposedMetricStates]
 
         return self._mkSetMethodSoapEnvelope('SetMetricState', operationHandle, _proposedMetricStateNodes)
 
@@ -385,8 +396,9 @@ class SetServiceClient(HostedServiceClient):
         nsmapper = DocNamespaceHelper()
         for p in _proposedComponentStates:
             p.nsmapper = nsmapper  # use my namespaces
-        _proposedComponentStateNodes = [p.mkStateNode(msgTag('ProposedComponentState')) for p in
-                                        _proposedComponentStates]
+        with self._numericContext():
+            _proposedComponentStateNodes = [p.mkStateNode(msgTag('ProposedComponentState')) for p in
+                                            _proposedComponentStates]
 
         return self._mkSetMethodSoapEnvelope('SetComponentState', operationHandle, _proposedComponentStateNodes)
 
@@ -485,7 +497,8 @@ class ContextServiceClient(HostedServiceClient):
             if p.Handle is None:
                 p.Handle = p.DescriptorHandle
             p.nsmapper = DocNamespaceHelper()  # use my namespaces
-        _proposedContextStateNodes = [p.mkStateNode(msgTag('ProposedContextState')) for p in _proposedContextStates]
+        with self._numericContext():
+            _proposedContextStateNodes = [p.mkStateNode(msgTag('ProposedContextState')) for p in _proposedContextStates]
 
         return self._mkSetMethodSoapEnvelope('SetContextState', operationHandle, _proposedContextStateNodes)
 
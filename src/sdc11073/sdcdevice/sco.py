@@ -21,6 +21,7 @@ from .. import mdib as mdib_
 from .. import namespaces
 from .. import observableproperties as properties
 from .. import pmtypes
+from ..dataconverters import DecimalConverter
 from ..mdib import msgreader
 
 
@@ -80,7 +81,9 @@ class _OperationsWorker(threading.Thread):
                     self._subscriptionsmgr.notifyOperation(self._mdib.mdib_version_group, tr_id,
                                                            operation.handle, pmtypes.InvocationState.START)
                     try:
-                        operation.executeOperation(request)
+                        # the operation and its handlers convert values with the numeric mode of the mdib
+                        with self._mdib.numericContext():
+                            operation.executeOperation(request)
                         operation.last_called_time = time.time()
 
                         self._logger.info('{}: successfully finished operation "{}"', operation.__class__.__name__,
@@ -121,8 +124,8 @@ class ScoOperationsRegistry(object):
 
         # find the Sco of the Mds, this will be the default sco for new operations
         mdsDescriptorContainer = mdib.descriptions.NODETYPE.getOne(namespaces.domTag('MdsDescriptor'))
-        scos = mdib.descriptions.find(parentHandle=mdsDescriptorContainer.handle).find(
-            nodeName=namespaces.domTag('Sco')).objects
+        scos = mdib.descriptions.select(parentHandle=mdsDescriptorContainer.handle,
+                                        nodeName=namespaces.domTag('Sco')).objects
         if len(scos) == 1:
             self._logger.info('found Sco node in mds, using it')
             self._mds_sco_descriptorContainer = scos[0]
@@ -382,7 +385,10 @@ class SetValueOperation(OperationDefinition):
         super(SetValueOperation, self).executeOperation(request)
         valueNodes = request.bodyNode.xpath('*/msg:RequestedNumericValue', namespaces=namespaces.nsmap)
         if valueNodes:
-            self.currentArgument = float(valueNodes[0].text)
+            if self._mdib.numeric_mode is None:
+                self.currentArgument = float(valueNodes[0].text)
+            else:
+                self.currentArgument = DecimalConverter.toPy(valueNodes[0].text)
 
 
 class SetContextStateOperation(OperationDefinition):
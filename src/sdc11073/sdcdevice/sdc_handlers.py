@@ -15,6 +15,7 @@ from . import httpserver
 from . import intervaltimer
 from . import sco
 from . import subscriptionmgr
+from .waveformscheduler import WaveformScheduler
 from .localizationservice import LocalizationService
 from .sdcservicesimpl import GetService, SetService, StateEventService, ContainmentTreeService, ContextService, \
     WaveformService, DescriptionEventService
@@ -118,6 +119,7 @@ class SdcHandler_Base(object):
         self._rtSampleSendThread = None
         self._runRtSampleThread = False
         self.collectRtSamplesPeriod = 0.1  # in seconds
+        self.waveformScheduler = WaveformScheduler(self.collectRtSamplesPeriod)
         if self._ssl_context_container is not None:
             self._urlschema = 'https'
         else:
@@ -207,7 +209,8 @@ class SdcHandler_Base(object):
                                                     self._compression_methods,
                                                     max_subscription_duration,
                                                     log_prefix=self._log_prefix,
-                                                    chunked_messages=self.chunked_messages)
+                                                    chunked_messages=self.chunked_messages,
+                                                    numeric_mode=self._mdib.numeric_mode)
 
     def _mkScoOperationsRegistry(self, handle):
         return sco.ScoOperationsRegistry(self._subscriptionsManager, self._mdib, handle, log_prefix=self._log_prefix)
@@ -435,7 +438,7 @@ class SdcHandler_Base(object):
 
     def _store_for_periodic_report(self, mdib_version, state_updates, dest_list):
         if self._run_periodic_reports_thread:
-            copied_updates = [s.mkCopy() for s in state_updates]
+            copied_updates = [s.mkCopy(copy_node=False) for s in state_updates]
             with self._periodic_reports_lock:
                 dest_list.append(PeriodicStates(mdib_version, copied_updates))
 
@@ -482,11 +485,19 @@ class SdcHandler_Base(object):
         # start delayed in order to have a fully initialized device when waveforms start
         # (otherwise timing issues might happen)
         time.sleep(0.1)
+        self.waveformScheduler.setBasePeriod(self.collectRtSamplesPeriod)
         timer = intervaltimer.IntervalTimer(periodInSeconds=self.collectRtSamplesPeriod)
         while self._runRtSampleThread:
             behindScheduleSeconds = timer.waitForNextIntervalBegin()
             try:
-                self._mdib.update_all_rt_samples()  # update from waveform generators
+                sample_periods, linked_handles = self._mdib.getRtSampleSchedulingInfo()
+                if sample_periods is None:
+                    self._mdib.update_all_rt_samples()  # update from waveform generators
+                else:
+                    # only the cohorts that are due in this cycle, see waveformscheduler module
+                    handles = self.waveformScheduler.nextHandles(sample_periods, linked_handles)
+                    if handles:
+                        self._mdib.update_rt_samples(handles)
                 self._logWaveformTiming(behindScheduleSeconds)
             except Exception:
                 self._logger.warn(' could not update real time samples: {}', traceback.format_exc())
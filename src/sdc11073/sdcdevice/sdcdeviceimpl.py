@@ -69,6 +69,10 @@ class SdcDevice(object):
     def subscriptionsManager(self):
         return self._handler._subscriptionsManager
 
+    @property
+    def waveformScheduler(self):
+        return self._handler.waveformScheduler
+
     @property
     def scoOperationsRegistry(self):
         return self._handler._scoOperationsRegistry
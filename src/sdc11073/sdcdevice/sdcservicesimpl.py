@@ -466,7 +466,7 @@ class GetService(DPWSPortTypeImpl):
 
         # get the requested state containers from mdib
         stateContainers = []
-        with self._mdib.mdibLock:
+        with self._mdib.mdibLock.read_lock:
             if len(requestedHandles) == 0:
                 # MessageModel: If the HANDLE reference list is empty, all states in the MDIB SHALL be included in the result list.
                 for stateContainer in self._mdib.states.objects:
@@ -501,8 +501,9 @@ class GetService(DPWSPortTypeImpl):
             self._mdib.mdib_version_group.update_node(getMdStateResponseNode)
 
             mdStateNode = etree_.Element(msgTag('MdState'), attrib=None, nsmap=self._mdib.nsmapper.docNssmap)
-            for stateContainer in stateContainers:
-                mdStateNode.append(stateContainer.mkStateNode())
+            with self._mdib.numericContext():
+                for stateContainer in stateContainers:
+                    mdStateNode.append(stateContainer.copyStateNode())
 
             getMdStateResponseNode.append(mdStateNode)
             responseSoapEnvelope.addBodyElement(getMdStateResponseNode)
@@ -516,6 +517,7 @@ class GetService(DPWSPortTypeImpl):
             nsmapper.partialMap(Prefix.S12, Prefix.WSA, Prefix.PM, Prefix.MSG))
         replyAddress = request.address.mkReplyAddress(action=self._getActionString('GetMdibResponse'))
         responseSoapEnvelope.addHeaderObject(replyAddress)
+        # the states keep their nodes until they change, only changed states are serialized again
         if self._sdcDevice.contextstates_in_getmdib:
             mdibNode, mdib_version_group = self._mdib.reconstructMdibWithContextStates()
         else:
@@ -898,7 +900,7 @@ class ContextService(DPWSPortTypeImpl):
         replyAddress = request.address.mkReplyAddress(action=self._getActionString('GetContextStatesResponse'))
         response.addHeaderObject(replyAddress)
         getContextStatesResponseNode = etree_.Element(msgTag('GetContextStatesResponse'))
-        with self._mdib.mdibLock:
+        with self._mdib.mdibLock.read_lock:
             self._mdib.mdib_version_group.update_node(getContextStatesResponseNode)
             if len(requestedHandles) == 0:
                 # MessageModel: If the HANDLE reference list is empty, all states in the MDIB SHALL be included in the result list.
@@ -927,10 +929,10 @@ class ContextService(DPWSPortTypeImpl):
                             contextStateContainersLookup[st.Handle] = st
                 contextStateContainers = contextStateContainersLookup.values()
             if contextStateContainers:
-                for contextStateContainer in contextStateContainers:
-                    node = contextStateContainer.mkStateNode()
-                    getContextStatesResponseNode.append(node)
-                    node.tag = msgTag('ContextState')
+                with self._mdib.numericContext():
+                    for contextStateContainer in contextStateContainers:
+                        node = contextStateContainer.copyStateNode(msgTag('ContextState'))
+                        getContextStatesResponseNode.append(node)
         response.addBodyElement(getContextStatesResponseNode)
         self._logger.debug('_onGetContextStates returns {}', lambda: response.as_xml(pretty=False))
         return response
@@ -21,6 +21,9 @@ from .. import observableproperties
 from .. import pysoap
 from .. import xmlparsing
 from ..compression import CompressionHandler
+from ..dataconverters import numericMode
+from ..mdib.waveformstream import WaveformStreamEncoder
+from ..mdib.waveformstream import mkWaveformStreamGeneric
 from ..namespaces import DocNamespaceHelper
 from ..namespaces import Prefix_Namespace as Prefix
 from ..namespaces import msgTag
@@ -314,12 +317,16 @@ class SubscriptionsManager(object):
     BodyNodePrefixes = [Prefix.PM, Prefix.MSG, Prefix.XSI, Prefix.EXT, Prefix.XML]
     NotificationPrefixes = [Prefix.S12, Prefix.WSA, Prefix.WSE]
     DEFAULT_MAX_SUBSCR_DURATION = 7200  # max. possible duration of a subscription
+    USE_WAVEFORM_TEMPLATES = True  # WaveformStream reports are created from templates, see mdib.waveformstream
 
     _ssl_context_container: typing.Optional[sdc11073.certloader.SSLContextContainer]
 
     def __init__(self, ssl_context_container, sdc_definitions, supportedEncodings,
-                 max_subscription_duration=None, log_prefix=None, chunked_messages=False):
+                 max_subscription_duration=None, log_prefix=None, chunked_messages=False, numeric_mode=None):
         self._ssl_context_container = ssl_context_container
+        # numeric mode of the mdib, values are serialized with it (see dataconverters.numericMode)
+        self._numeric_mode = numeric_mode
+        self._waveformStreamEncoder = WaveformStreamEncoder()
         self.sdc_definitions = sdc_definitions
         self.log_prefix = log_prefix
         self._logger = loghelper.getLoggerAdapter('sdc.device.subscrMgr', self.log_prefix)
@@ -506,6 +513,11 @@ class SubscriptionsManager(object):
             response.addBodyElement(renewResponseNode)
         return response
 
+    def _mkStateNode(self, stateContainer, tag):
+        # the state keeps its node until it changes, all reports of a state version copy the same node
+        with numericMode(self._numeric_mode):
+            return stateContainer.copyStateNode(tag)
+
     def sendEpisodicMetricReport(self, updatedMetricStates, nsmapper, mdib_version_group):
         action = self.sdc_definitions.Actions.EpisodicMetricReport
         subscribers = self._getSubscriptionsForAction(action)
@@ -518,7 +530,7 @@ class SubscriptionsManager(object):
         reportPartNode = etree_.SubElement(bodyNode, msgTag('ReportPart'))
 
         for s in updatedMetricStates:
-            stateNode = s.mkStateNode(msgTag('MetricState'))
+            stateNode = self._mkStateNode(s, msgTag('MetricState'))
             reportPartNode.append(stateNode)
 
         for s in subscribers:
@@ -540,7 +552,7 @@ class SubscriptionsManager(object):
         for part in updatedMetricStatesList:
             reportPartNode = etree_.SubElement(bodyNode, msgTag('ReportPart'))
             for s in part.states:
-                stateNode = s.mkStateNode(msgTag('MetricState'))
+                stateNode = self._mkStateNode(s, msgTag('MetricState'))
                 reportPartNode.append(stateNode)
 
         for s in subscribers:
@@ -561,7 +573,7 @@ class SubscriptionsManager(object):
         reportPartNode = etree_.SubElement(bodyNode, msgTag('ReportPart'))
 
         for s in updatedStates:
-            stateNode = s.mkStateNode(msgTag('OperationState'))
+            stateNode = self._mkStateNode(s, msgTag('OperationState'))
             reportPartNode.append(stateNode)
 
         for s in subscribers:
@@ -583,7 +595,7 @@ class SubscriptionsManager(object):
         for part in updatedStatesList:
             reportPartNode = etree_.SubElement(bodyNode, msgTag('ReportPart'))
             for s in part.states:
-                stateNode = s.mkStateNode(msgTag('OperationState'))
+                stateNode = self._mkStateNode(s, msgTag('OperationState'))
                 reportPartNode.append(stateNode)
 
         for s in subscribers:
@@ -603,7 +615,7 @@ class SubscriptionsManager(object):
         reportPartNode = etree_.SubElement(bodyNode, msgTag('ReportPart'))
 
         for s in updatedAlertStates:
-            stateNode = s.mkStateNode(msgTag('AlertState'))
+            stateNode = self._mkStateNode(s, msgTag('AlertState'))
             reportPartNode.append(stateNode)
 
         for s in subscribers:
@@ -624,7 +636,7 @@ class SubscriptionsManager(object):
         for part in updatedStatesList:
             reportPartNode = etree_.SubElement(bodyNode, msgTag('ReportPart'))
             for s in part.states:
-                stateNode = s.mkStateNode(msgTag('AlertState'))
+                stateNode = self._mkStateNode(s, msgTag('AlertState'))
                 reportPartNode.append(stateNode)
 
         for s in subscribers:
@@ -644,7 +656,7 @@ class SubscriptionsManager(object):
         reportPartNode = etree_.SubElement(bodyNode, msgTag('ReportPart'))
 
         for s in updatedComponentStates:
-            stateNode = s.mkStateNode(msgTag('ComponentState'))
+            stateNode = self._mkStateNode(s, msgTag('ComponentState'))
             reportPartNode.append(stateNode)
 
         for s in subscribers:
@@ -666,7 +678,7 @@ class SubscriptionsManager(object):
         for part in updatedStatesList:
             reportPartNode = etree_.SubElement(bodyNode, msgTag('ReportPart'))
             for s in part.states:
-                stateNode = s.mkStateNode(msgTag('ComponentState'))
+                stateNode = self._mkStateNode(s, msgTag('ComponentState'))
                 reportPartNode.append(stateNode)
 
         for s in subscribers:
@@ -686,7 +698,7 @@ class SubscriptionsManager(object):
         reportPartNode = etree_.SubElement(bodyNode, msgTag('ReportPart'))
 
         for s in updatedContextStates:
-            stateNode = s.mkStateNode(msgTag('ContextState'))
+            stateNode = self._mkStateNode(s, msgTag('ContextState'))
             reportPartNode.append(stateNode)
 
         for s in subscribers:
@@ -707,7 +719,7 @@ class SubscriptionsManager(object):
         for part in updatedStatesList:
             reportPartNode = etree_.SubElement(bodyNode, msgTag('ReportPart'))
             for s in part.states:
-                stateNode = s.mkStateNode(msgTag('ContextState'))
+                stateNode = self._mkStateNode(s, msgTag('ContextState'))
                 reportPartNode.append(stateNode)
 
         for s in subscribers:
@@ -721,13 +733,13 @@ class SubscriptionsManager(object):
         if not subscribers:
             return
         self._logger.debug('sending real time samples report {}', updatedRealTimeSampleStates)
-        bodyNode = etree_.Element(msgTag('WaveformStream'),
-                                  nsmap=nsmapper.partialMap(*self.BodyNodePrefixes))
-        mdib_version_group.update_node(bodyNode)
-
-        for s in updatedRealTimeSampleStates:
-            stateNode = s.mkStateNode(msgTag('State'))
-            bodyNode.append(stateNode)
+        body_nsmap = nsmapper.partialMap(*self.BodyNodePrefixes)
+        with numericMode(self._numeric_mode):
+            if self.USE_WAVEFORM_TEMPLATES:
+                bodyNode = self._waveformStreamEncoder.mkWaveformStream(updatedRealTimeSampleStates, body_nsmap,
+                                                                        mdib_version_group)
+            else:
+                bodyNode = mkWaveformStreamGeneric(updatedRealTimeSampleStates, body_nsmap, mdib_version_group)
         for s in subscribers:
             self._logger.debug('sendRealtimeSamplesReport: sending report to {}', s.notifyToAddress)
             self._sendNotificationReport(s, bodyNode, action, nsmapper.partialMap(*self.NotificationPrefixes))
@@ -741,8 +753,9 @@ class SubscriptionsManager(object):
                     s.sendNotificationEndMessage(action)
             self._subscriptions.clear()
 
-    def _mkDescriptorUpdatesReportPart(self, parentNode, modificationtype, descriptors, updated_states):
-        """ Helper that creates ReportPart."""
+    def _mkDescriptorUpdatesReportPart(self, parentNode, modificationtype, descriptors, updated_states_by_handle):
+        """ Helper that creates ReportPart.
+        :param updated_states_by_handle: dictionary descriptorHandle => list of updated states"""
         # This method creates one ReportPart for every descriptor.
         # An optimization is possible by grouping all descriptors with the same parent handle into one ReportPart.
         # This is not implemented, and I think it is not needed.
@@ -751,10 +764,10 @@ class SubscriptionsManager(object):
                                            attrib={'ModificationType': modificationtype})
             if descrContainer.parentHandle is not None:  # only Mds can have None
                 reportPart.set('ParentDescriptor', descrContainer.parentHandle)
-            descrContainer.mkDescriptorNode(reportPart, tag=msgTag('Descriptor'))
-            relatedStateContainers = [s for s in updated_states if s.descriptorHandle == descrContainer.handle]
-            for stateContainer in relatedStateContainers:
-                node = stateContainer.mkStateNode(msgTag('State'))
+            with numericMode(self._numeric_mode):
+                descrContainer.mkDescriptorNode(reportPart, tag=msgTag('Descriptor'))
+            for stateContainer in updated_states_by_handle.get(descrContainer.handle, ()):
+                node = self._mkStateNode(stateContainer, msgTag('State'))
                 reportPart.append(node)
 
     def sendDescriptorUpdates(self, updated, created, deleted, updated_states, nsmapper, mdib_version_group):
@@ -766,9 +779,12 @@ class SubscriptionsManager(object):
         bodyNode = etree_.Element(msgTag('DescriptionModificationReport'),
                                   nsmap=nsmapper.partialMap(Prefix.MSG, Prefix.PM))
         mdib_version_group.update_node(bodyNode)
-        self._mkDescriptorUpdatesReportPart(bodyNode, 'Upt', updated, updated_states)
-        self._mkDescriptorUpdatesReportPart(bodyNode, 'Crt', created, updated_states)
-        self._mkDescriptorUpdatesReportPart(bodyNode, 'Del', deleted, updated_states)
+        updated_states_by_handle = defaultdict(list)
+        for stateContainer in updated_states:
+            updated_states_by_handle[stateContainer.descriptorHandle].append(stateContainer)
+        self._mkDescriptorUpdatesReportPart(bodyNode, 'Upt', updated, updated_states_by_handle)
+        self._mkDescriptorUpdatesReportPart(bodyNode, 'Crt', created, updated_states_by_handle)
+        self._mkDescriptorUpdatesReportPart(bodyNode, 'Del', deleted, updated_states_by_handle)
 
         for s in subscribers:
             self._sendNotificationReport(s, bodyNode, action,
@@ -1,5 +1,7 @@
+import array
 import math
-import itertools
+
+from .. import samplebuffer
 
 
 def sinus(min_value, max_value, samples):
@@ -26,19 +28,43 @@ def triangle(min_value, max_value, samples):
 
     
 class _WaveformGeneratorBase(object):
+    """ Repeats one period of a waveform. The period is precomputed in a table (a sample buffer),
+    nextSampleBlock copies whole blocks of samples from this table."""
     def __init__(self, values_generator, min_value, max_value, waveformperiod, sampleperiod):
         if sampleperiod >= waveformperiod:
             raise ValueError('please choose a waveformperiod >> sampleperiod. currently use have wp={}, sp={}'.format(waveformperiod, sampleperiod))
         self.sampleperiod = sampleperiod
         samples = int(waveformperiod / sampleperiod)
         values = values_generator(min_value, max_value, samples)     
-        wf_with_startflag = [ (v, i==0) for i, v in  enumerate(values)]
-        self._values = wf_with_startflag
-        self._generator = itertools.cycle(self._values)
-
+        self._table = samplebuffer.mkSampleBuffer(values)  # one waveform period
+        self._position = 0  # position of the next sample in self._table
+
+    def nextSampleBlock(self, count):
+        """ Returns the next count samples.
+        :return: a tuple (sample buffer with count values, list of indices of the samples that start a waveform period)
+        """
+        table = self._table
+        table_len = len(table)
+        start = self._position
+        end = start + count
+        self._position = end % table_len
+        trigger_indices = list(range((table_len - start) % table_len, count, table_len))
+        if end <= table_len:
+            block = table[start:end]
+            return (block if isinstance(block, array.array) else block.copy()), trigger_indices
+        if isinstance(table, array.array):
+            block = table[start:] + table * (end // table_len - 1) + table[:end % table_len]
+        else:
+            block = samplebuffer.numpy.resize(samplebuffer.numpy.roll(table, -start), count)
+        return block, trigger_indices
 
     def nextSamples(self, count):
-        return [next(self._generator) for i in range(count)]
+        """ Returns the next count samples as a list of tuples (value, flag start of waveform period)."""
+        block, trigger_indices = self.nextSampleBlock(count)
+        flags = [False] * count
+        for i in trigger_indices:
+            flags[i] = True
+        return list(zip(block.tolist(), flags))
 
     
 
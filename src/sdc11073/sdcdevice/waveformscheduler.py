@@ -0,0 +1,124 @@
+""" Multi-rate scheduling of real time sample arrays (waveforms).
+
+The sdc device updates the real time sample array states in cycles of a fixed base period
+(SdcHandler_Base.collectRtSamplesPeriod). WaveformScheduler decides which waveforms are due in a cycle:
+every waveform belongs to a send cohort with a period of base period * 2**n, the largest one that does not exceed
+the latency of the waveform. All cohorts that are due in a cycle are updated in one transaction, which results in
+one WaveformStream report. Because the cohort periods are multiples of each other, the slower cohorts are always due
+together with the faster ones and the number of reports is the number of cycles of the fastest cohort.
+
+The latency of a waveform is the base period unless it is set with setLatency. It is increased to
+minSamplesPerReport sample periods, a report shall not contain less than minSamplesPerReport samples of a waveform.
+Linked waveforms (e.g. the trigger and the annotated waveforms of an annotation) are always in the same cohort,
+that of the fastest one.
+"""
+
+
+class WaveformCohort(object):
+    """ Waveforms that are sent together."""
+
+    def __init__(self, cycles, period, handles):
+        self.cycles = cycles  # period in base periods
+        self.period = period  # in seconds
+        self.handles = handles
+
+    def __repr__(self):
+        return '{}(period={}, handles={})'.format(self.__class__.__name__, self.period, self.handles)
+
+
+class WaveformScheduler(object):
+    """ Assigns waveforms to send cohorts and returns the waveforms that are due in a cycle, see module doc string."""
+
+    def __init__(self, basePeriod, minSamplesPerReport=1):
+        """
+        :param basePeriod: the period of the send loop in seconds
+        :param minSamplesPerReport: a waveform is not sent faster than every minSamplesPerReport sample periods
+        """
+        self._basePeriod = basePeriod
+        self._minSamplesPerReport = minSamplesPerReport
+        self._latencies = {}
+        self._samplePeriods = None
+        self._linkedHandles = None
+        self._cohorts = []
+        self._schedule = []  # list of handles per cycle of the longest cohort period
+        self._cycle = 0
+
+    @property
+    def basePeriod(self):
+        return self._basePeriod
+
+    @property
+    def cohorts(self):
+        """ list of WaveformCohort instances, sorted by period"""
+        return self._cohorts
+
+    def setBasePeriod(self, basePeriod):
+        self._basePeriod = basePeriod
+        self._samplePeriods = None  # forces new cohorts
+
+    def setMinSamplesPerReport(self, minSamplesPerReport):
+        self._minSamplesPerReport = minSamplesPerReport
+        self._samplePeriods = None
+
+    def setLatency(self, descriptorHandle, latency):
+        """
+        :param descriptorHandle: handle of a RealTimeSampleArrayMetricDescriptor
+        :param latency: max. time in seconds between two reports of this waveform, None resets it to the base period
+        """
+        if latency is None:
+            self._latencies.pop(descriptorHandle, None)
+        else:
+            self._latencies[descriptorHandle] = latency
+        self._samplePeriods = None
+
+    def getLatency(self, descriptorHandle):
+        return self._latencies.get(descriptorHandle, self._basePeriod)
+
+    def _cohortCycles(self, descriptorHandle, samplePeriod):
+        latency = max(self.getLatency(descriptorHandle), self._minSamplesPerReport * (samplePeriod or 0.0))
+        limit = latency * (1 + 1e-9)  # tolerance for rounding errors, e.g. 0.3 / 0.1 = 2.9999999999999996
+        cycles = 1
+        while cycles * 2 * self._basePeriod <= limit:
+            cycles *= 2
+        return cycles
+
+    def _mkCohorts(self, samplePeriods, linkedHandles):
+        cycles = {handle: self._cohortCycles(handle, period) for handle, period in samplePeriods.items()}
+        # linked waveforms get the cycles of the fastest one, repeat until stable because groups can overlap
+        changed = True
+        while changed:
+            changed = False
+            for handles in linkedHandles:
+                handles = [h for h in handles if h in cycles]
+                if handles:
+                    fastest = min(cycles[h] for h in handles)
+                    for handle in handles:
+                        if cycles[handle] != fastest:
+                            cycles[handle] = fastest
+                            changed = True
+        handles_by_cycles = {}
+        for handle, count in cycles.items():
+            handles_by_cycles.setdefault(count, []).append(handle)
+        cohorts = [WaveformCohort(count, count * self._basePeriod, handles)
+                   for count, handles in sorted(handles_by_cycles.items())]
+        schedule_length = cohorts[-1].cycles if cohorts else 1
+        schedule = []
+        for cycle in range(schedule_length):
+            schedule.append([h for c in cohorts if cycle % c.cycles == 0 for h in c.handles])
+        self._cohorts = cohorts
+        self._schedule = schedule
+        self._cycle = 0
+
+    def nextHandles(self, samplePeriods, linkedHandles=()):
+        """ Returns the handles of the waveforms that are due in this cycle and advances to the next cycle.
+        :param samplePeriods: dictionary handle => sample period of all waveforms
+        :param linkedHandles: list of handle groups that shall be sent together
+        :return: list of handles (empty if no waveform is due)
+        """
+        if samplePeriods != self._samplePeriods or linkedHandles != self._linkedHandles:
+            self._mkCohorts(samplePeriods, linkedHandles)
+            self._samplePeriods = samplePeriods
+            self._linkedHandles = linkedHandles
+        handles = self._schedule[self._cycle]
+        self._cycle = (self._cycle + 1) % len(self._schedule)
+        return handles
@@ -1,8 +1,13 @@
 import datetime
+import decimal
+import random
 import unittest
 
+from sdc11073 import dataconverters
+from sdc11073 import samplebuffer
+
 import sdc11073.mdib.containerproperties as containerproperties
-from sdc11073.mdib.descriptorcontainers import ClockDescriptorContainer
+from sdc11073.mdib.descriptorcontainers import ClockDescriptorContainer, NumericMetricDescriptorContainer
 from sdc11073.namespaces import DocNamespaceHelper, domTag
 
 # pylint: disable=protected-access
@@ -100,6 +105,94 @@ class TestContainerproperties(unittest.TestCase):
         node2 = dc2.mkNode()
         self.assertEqual(node2.attrib['Resolution'], 'PT77S')
 
+    def test_decimal_list_codec(self):
+        """Verify that the codec creates the same xml strings and python values as the DecimalConverter."""
+        rnd = random.Random(42)
+        value_lists = [[], [0.0, -0.0, 10.0, 100.0, -99.9999, 9.9995, 1e-05, 123456789.25, 2.5e20, float('nan')],
+                       [1, 2, 3, 4, 5.5], [decimal.Decimal('1.50'), decimal.Decimal('-0.001'), 7]]
+        for _ in range(300):
+            value_lists.append([rnd.choice((rnd.uniform(-1000, 1000), rnd.uniform(-20, 20), rnd.uniform(-1, 1),
+                                            float(rnd.randint(-300, 300)), rnd.uniform(-1, 1) * 10 ** rnd.randint(-8, 12)))
+                                for _ in range(rnd.randint(1, 50))])
+        codec = containerproperties.DecimalListCodec()
+        converter = dataconverters.DecimalConverter
+        for numeric_mode in (None, dataconverters.NUMERIC_DECIMAL, dataconverters.NUMERIC_FLOAT):
+            with dataconverters.numericMode(numeric_mode):
+                for values in value_lists:
+                    expected = ' '.join([converter.toXML(v) for v in values])
+                    self.assertEqual(codec.format(values), expected)
+                    if all(isinstance(v, float) for v in values):
+                        self.assertEqual(codec.format(samplebuffer.mkSampleBuffer(values)), expected)
+                    if 'nan' in expected:
+                        continue
+                    expected_values = [converter.toPy(v) for v in expected.split()]
+                    for xml_value in (expected, expected.encode('ascii')):
+                        parsed = codec.parse(xml_value)
+                        if samplebuffer.isSampleBuffer(parsed):  # float mode
+                            parsed = parsed.tolist()
+                        self.assertEqual(list(parsed), expected_values)
+                        self.assertEqual([type(v) for v in parsed], [type(v) for v in expected_values])
+        # fixed precision
+        for precision in (0, 1, 2, 5):
+            codec = containerproperties.DecimalListCodec(precision)
+            for values in value_lists:
+                expected = []
+                for v in values:
+                    text = '{:.{}f}'.format(float(v), precision)
+                    expected.append(text.rstrip('0').rstrip('.') if '.' in text else text)
+                self.assertEqual(codec.format(values), ' '.join(expected))
+        # mixed lists are also formatted with the precision
+        codec = containerproperties.DecimalListCodec(2)
+        self.assertEqual(codec.format([decimal.Decimal('1.23456'), 7, 2.5, decimal.Decimal('-0.126')]), '1.23 7 2.5 -0.13')
+        # parse into an existing sample buffer
+        out = samplebuffer.mkSampleBuffer([0, 0, 0])
+        with dataconverters.numericMode(dataconverters.NUMERIC_FLOAT):
+            self.assertIs(codec.parse(b'1 2.5 -3', out=out), out)
+            self.assertEqual(list(out), [1.0, 2.5, -3.0])
+            self.assertEqual(list(codec.parse(' 1\t2 ', out=out)), [1.0, 2.0])
+
+    def test_mk_property_value(self):
+        """Verify that the xml string of a decimal is kept exactly if it can not be re-created from the value."""
+        converter = dataconverters.DecimalConverter
+        numeric_modes = (None, dataconverters.NUMERIC_DECIMAL, dataconverters.NUMERIC_FLOAT)
+        for xml_value in ('0', '-0', '42', '-42', '123.45', '0.001', '1.50', '10', '1.0', '100.0', '1E+2', '1e-7',
+                          '0.0000001', '0.1234', '+5', '05', '.5', '5.', ' 7', 'NaN', 'Infinity'):
+            for numeric_mode in numeric_modes:
+                with dataconverters.numericMode(numeric_mode):
+                    py_value = converter.toPy(xml_value)
+                    stored = containerproperties._mkPropertyValue(converter, xml_value, py_value)
+                self.assertIs(stored.py_value, py_value)
+                # the string must be re-created in every numeric mode, a node might be created in another mode
+                xml_values = set()
+                for write_mode in numeric_modes:
+                    with dataconverters.numericMode(write_mode):
+                        xml_values.add(converter.toXML(py_value))
+                expected = None if xml_values == {xml_value} else xml_value
+                self.assertEqual(stored.xml_value, expected, msg='{} {}'.format(xml_value, numeric_mode))
+
+    def test_decimal_other_numeric_mode(self):
+        """Verify that a decimal that is read in one numeric mode is written unchanged in another mode."""
+        ns_mapper = DocNamespaceHelper()
+        dc = NumericMetricDescriptorContainer(nsmapper=ns_mapper,
+                                              nodeName=domTag('MyDescriptor'),
+                                              handle='123',
+                                              parentHandle='456',
+                                              )
+        node = dc.mkNode()
+        numeric_modes = (None, dataconverters.NUMERIC_DECIMAL, dataconverters.NUMERIC_FLOAT)
+        for xml_value in ('0.1234', '0.0000001', '123.456', '1.5', '1e-7'):
+            node.attrib['Resolution'] = xml_value
+            for read_mode in numeric_modes:
+                for write_mode in numeric_modes:
+                    with dataconverters.numericMode(read_mode):
+                        dc2 = NumericMetricDescriptorContainer.fromNode(nsmapper=ns_mapper, node=node,
+                                                                        parentHandle='467')
+                    with dataconverters.numericMode(write_mode):
+                        node2 = dc2.mkNode()
+                    self.assertEqual(node2.attrib['Resolution'], xml_value,
+                                     msg='{} {} {}'.format(xml_value, read_mode, write_mode))
+
+
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(TestContainerproperties)
 
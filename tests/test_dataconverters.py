@@ -26,6 +26,35 @@ class TestDataConverters(unittest.TestCase):
         finally:
             dataconverters.DecimalConverter.USE_DECIMAL_TYPE = before # reset flag
 
+    def test_decimal_converter_numeric_mode(self):
+        conv = dataconverters.DecimalConverter
+        before = conv.USE_DECIMAL_TYPE
+        try:
+            for use_decimal_type in (True, False):
+                conv.USE_DECIMAL_TYPE = use_decimal_type
+                with dataconverters.numericMode(dataconverters.NUMERIC_FLOAT):
+                    self.assertEqual(conv.toPy('123'), 123.0)
+                    self.assertIsInstance(conv.toPy('123'), float)
+                    # shortest string that is read back as the same float, no rounding, no exponent
+                    for value, expected in ((0.1 + 0.2, '0.30000000000000004'), (123.456, '123.456'),
+                                            (1e-05, '0.00001'), (-2.5e20, '-250000000000000000000'),
+                                            (42.0, '42'), (0.0, '0')):
+                        self.assertEqual(conv.toXML(value), expected)
+                        self.assertEqual(conv.toPy(conv.toXML(value)), value)
+                    self.assertEqual(conv.toXML(Decimal('42.100')), '42.1')
+                with dataconverters.numericMode(dataconverters.NUMERIC_DECIMAL):
+                    self.assertEqual(conv.toPy('123'), Decimal('123'))
+                    self.assertIsInstance(conv.toPy('1.50'), Decimal)
+                    for text in ('0.30000000000000004', '123.456', '-42', '0.001'):
+                        self.assertEqual(conv.toXML(conv.toPy(text)), text)
+                    self.assertEqual(conv.toXML(123.456), '123.5')  # floats are still rounded
+                with dataconverters.numericMode(None):
+                    self.assertEqual(type(conv.toPy('123')), Decimal if use_decimal_type else int)
+                # mode is reset after the with block
+                self.assertEqual(conv.toXML(123.456), '123.5')
+        finally:
+            conv.USE_DECIMAL_TYPE = before
+
     def test_timestamp_converter(self):
         self.assertEqual(dataconverters.TimestampConverter.toPy('10000'), 10)
         self.assertEqual(dataconverters.TimestampConverter.toPy('10001'), 10.001)
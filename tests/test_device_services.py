@@ -89,6 +89,32 @@ class TestDeviceServices(unittest.TestCase):
             response = getService._onGetMdib(httpHeader, receivedEnv)
             response.validate_envelope(sdcDevice._handler.xml_validator)
 
+    def test_getMdib_state_nodes(self):
+        """Verify that GetMdib reuses the nodes of unchanged states and contains the changed ones."""
+        sdcDevice = self.sdcDevice_final
+        getService = sdcDevice._handler._GetDispatcher
+        getEnv = self._mkGetRequest(sdcDevice, getService.port_type_string, 'GetMdib', '123')
+        receivedEnv = ReceivedSoap12Envelope.fromXMLString(getEnv.as_xml())
+        mdib = sdcDevice.mdib
+        handle = mdib.descriptions.NODETYPE.get(domTag('NumericMetricDescriptor'))[0].handle
+        getService._onGetMdib({}, receivedEnv)
+        other_state = mdib.states.NODETYPE.get(domTag('EnumStringMetricState'))[0]
+        other_node = other_state._node  # pylint: disable=protected-access
+        self.assertIsNotNone(other_node)
+
+        with mdib.mdibUpdateTransaction() as mgr:
+            state = mgr.getMetricState(handle)
+            state.mkMetricValue()
+            state.metricValue.Value = 42
+        response = getService._onGetMdib({}, receivedEnv)
+        response.validate_envelope(sdcDevice._handler.xml_validator)
+        body = response.buildDoc().find('.//' + msgTag('GetMdibResponse').text)
+        self.assertEqual(body.get('MdibVersion'), str(mdib.mdibVersion))
+        value_nodes = [n for n in body.iter(domTag('MetricValue').text)
+                       if n.getparent().get('DescriptorHandle') == handle]
+        self.assertEqual(value_nodes[0].get('Value'), '42')
+        self.assertIs(other_state._node, other_node)  # pylint: disable=protected-access
+
     def test_getMdState(self):
         for sdcDevice in self._alldevices:
             getService = sdcDevice._handler._GetDispatcher
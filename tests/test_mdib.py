@@ -1,9 +1,20 @@
 import os
+import time
 import unittest
+from unittest import mock
 import dataclasses
+from decimal import Decimal
+from lxml import etree as etree_
 from lxml.etree import QName
 from sdc11073 import mdib
 from sdc11073 import pmtypes
+from sdc11073 import namespaces
+from sdc11073 import dataconverters
+from sdc11073 import observableproperties as properties
+from sdc11073.definitions_sdc import SDC_v1_Definitions
+from sdc11073.pysoap.soapenvelope import DPWSHosted, WsaEndpointReferenceType, ReceivedSoap12Envelope
+from sdc11073.sdcclient.hostedservice import SetServiceClient
+from sdc11073.sdcdevice import sco
 
 mdibFolder = os.path.dirname(__file__)
 
@@ -64,6 +75,33 @@ class TestMdib(unittest.TestCase):
         self.assertIsNotNone(found2)
         self.assertEqual(handle, found2.Handle)
 
+    def test_get_descriptors_by_codes(self):
+        deviceMdibContainer = mdib.DeviceMdibContainer.fromMdibFile(
+            os.path.join(os.path.dirname(__file__), 'mdib_tns.xml'))
+        handle = 'numeric.ch0.vmd0'
+        with deviceMdibContainer.mdibUpdateTransaction() as mgr:
+            descriptor = mgr.getDescriptor(handle)
+            descriptor.Type.Translation.append(pmtypes.T_Translation('some_code', 'some_coding_system'))
+        expected = [d for d in deviceMdibContainer.descriptions.objects
+                    if pmtypes.have_matching_codes(d.Type, pmtypes.CodedValue('196174'))]
+        self.assertTrue(len(expected) > 0)
+        found = deviceMdibContainer.getDescriptorsByCodes([pmtypes.CodedValue('196174'),
+                                                           pmtypes.Coding('some_code', 'some_coding_system'),
+                                                           '196174',
+                                                           pmtypes.CodedValue('unknown')])
+        self.assertEqual(set(found[0]), set(expected))
+        self.assertEqual([d.handle for d in found[1]], [handle])
+        self.assertEqual(set(found[2]), set(expected))
+        self.assertEqual(found[3], [])
+        # the index follows descriptor updates
+        with deviceMdibContainer.mdibUpdateTransaction() as mgr:
+            descriptor = mgr.getDescriptor(handle)
+            descriptor.Type = pmtypes.CodedValue('other_code')
+        found = deviceMdibContainer.getDescriptorsByCodes([pmtypes.Coding('some_code', 'some_coding_system'),
+                                                           pmtypes.CodedValue('other_code')])
+        self.assertEqual(found[0], [])
+        self.assertEqual([d.handle for d in found[1]], [handle])
+
     def test_activate_operation_argument(self):
         """Test that pm:ActivateOperationDescriptor/pm:argument/pm:Arg is handled correctly
         because its value is a QName"""
@@ -149,8 +187,395 @@ class TestMdib(unittest.TestCase):
             self.assertTrue(prefix in arg_node.nsmap)
 
 
+    def test_snapshot(self):
+        """Verify that a snapshot is not affected by transactions that are committed after it was taken."""
+        device_mdib = mdib.DeviceMdibContainer.fromMdibFile(os.path.join(mdibFolder, '70041_MDIB_Final.xml'))
+        metric_state = device_mdib.states.NODETYPE.get(namespaces.domTag('NumericMetricState'))[0]
+        metric_descriptor = device_mdib.descriptions.handle.getOne(metric_state.descriptorHandle)
+        channel_descriptor = device_mdib.descriptions.handle.getOne(metric_descriptor.parentHandle)
+        child_handles = channel_descriptor.orderedChildHandles
+        snapshot = device_mdib.mkSnapshot(addContextStates=True)
+        self.assertEqual(snapshot.mdib_version_group, device_mdib.mdib_version_group)
+        expected = device_mdib.nodeToString(device_mdib.reconstructMdibFromSnapshot(snapshot))
+
+        cls = device_mdib.getDescriptorContainerClass(namespaces.domTag('NumericMetricDescriptor'))
+        with device_mdib.mdibUpdateTransaction() as mgr:
+            state = mgr.getMetricState(metric_state.descriptorHandle)
+            state.mkMetricValue()
+            state.metricValue.Value = 42
+            descriptor = mgr.getDescriptor(metric_descriptor.handle)
+            descriptor.Resolution = 0.42
+            new_descriptor = cls(nsmapper=device_mdib.nsmapper, nodeName=namespaces.domTag('Metric'), handle='new_metric',
+                                 parentHandle=metric_descriptor.parentHandle)
+            new_descriptor.Type = pmtypes.CodedValue('12345')
+            new_descriptor.Unit = pmtypes.CodedValue('hector')
+            new_descriptor.Resolution = 1
+            mgr.createDescriptor(new_descriptor)
+
+        self.assertEqual(expected, device_mdib.nodeToString(device_mdib.reconstructMdibFromSnapshot(snapshot)))
+        # updated descriptors keep their position, the parent of a new descriptor is replaced by a new version
+        new_channel_descriptor = device_mdib.descriptions.handle.getOne(metric_descriptor.parentHandle)
+        self.assertEqual(new_channel_descriptor.orderedChildHandles, child_handles + ['new_metric'])
+        self.assertEqual(new_channel_descriptor.DescriptorVersion, channel_descriptor.DescriptorVersion + 1)
+        mdib_node, mdib_version_group = device_mdib.reconstructMdibWithContextStates()
+        self.assertGreater(mdib_version_group.mdib_version, snapshot.mdib_version_group.mdib_version)
+        self.assertEqual(len(mdib_node.xpath('//*[@Handle="new_metric"]')), 1)
+        self.assertNotEqual(expected, device_mdib.nodeToString(mdib_node))
+
+    def test_state_nodes_are_reused(self):
+        """Verify that GetMdib serializes only states that changed since the last call."""
+        device_mdib = mdib.DeviceMdibContainer.fromMdibFile(os.path.join(mdibFolder, '70041_MDIB_Final.xml'))
+        metric_handle = device_mdib.states.NODETYPE.get(namespaces.domTag('NumericMetricState'))[0].descriptorHandle
+        node, _ = device_mdib.reconstructMdibWithContextStates()
+        # real time sample array states change with every waveform update, GetMdib uses copies of them
+        states = [s for s in device_mdib.states.objects if not s.isRealtimeSampleArrayMetricState]
+        nodes = {s.descriptorHandle: s._node for s in states}  # pylint: disable=protected-access
+        self.assertNotIn(None, nodes.values())
+        node2, _ = device_mdib.reconstructMdibWithContextStates()
+        self.assertEqual(device_mdib.nodeToString(node), device_mdib.nodeToString(node2))
+
+        with device_mdib.mdibUpdateTransaction() as mgr:
+            state = mgr.getMetricState(metric_handle)
+            state.mkMetricValue()
+            state.metricValue.Value = 42
+        node, _ = device_mdib.reconstructMdibWithContextStates()
+        value_nodes = [n for n in node.iter(namespaces.domTag('MetricValue'))
+                       if n.getparent().get('DescriptorHandle') == metric_handle]
+        self.assertEqual(value_nodes[0].get('Value'), '42')
+        for state in device_mdib.states.objects:
+            if state.descriptorHandle in nodes and state.descriptorHandle != metric_handle:
+                self.assertIs(state._node, nodes[state.descriptorHandle])  # pylint: disable=protected-access
+
+    def test_numeric_mode(self):
+        path = os.path.join(mdibFolder, '70041_MDIB_Final.xml')
+        for numeric_mode, py_type in ((dataconverters.NUMERIC_FLOAT, float),
+                                      (dataconverters.NUMERIC_DECIMAL, Decimal)):
+            device_mdib = mdib.DeviceMdibContainer.fromMdibFile(path, numeric_mode=numeric_mode)
+            descriptors = device_mdib.descriptions.NODETYPE.get(namespaces.domTag('NumericMetricDescriptor'))
+            for descriptor in descriptors:
+                self.assertIsInstance(descriptor.Resolution, py_type)
+            descriptor = descriptors[0]
+            with device_mdib.mdibUpdateTransaction() as mgr:
+                state = mgr.getMetricState(descriptor.handle)
+                state.mkMetricValue()
+                state.metricValue.Value = 0.1 + 0.2 if numeric_mode == dataconverters.NUMERIC_FLOAT else Decimal('0.30')
+            # round trip through the xml of the mdib
+            response_node = etree_.Element(namespaces.msgTag('GetMdibResponse'), nsmap=device_mdib.nsmapper.docNssmap)
+            mdib_node, mdib_version_group = device_mdib.reconstructMdibWithContextStates()
+            mdib_version_group.update_node(response_node)
+            response_node.append(mdib_node)
+            mdib_string = device_mdib.nodeToString(response_node)
+            copied_mdib = mdib.DeviceMdibContainer.fromString(mdib_string, numeric_mode=numeric_mode)
+            value = copied_mdib.states.descriptorHandle.getOne(descriptor.handle).metricValue.Value
+            self.assertEqual(value, state.metricValue.Value)
+            self.assertIsInstance(value, py_type)
+
+    def test_numeric_mode_set_operations(self):
+        """ Proposed states are converted with the numeric mode of the client mdib and of the device mdib,
+        operation handlers run with the numeric mode of the device mdib."""
+        path = os.path.join(mdibFolder, '70041_MDIB_Final.xml')
+        hosted = DPWSHosted(endpointReferencesList=[WsaEndpointReferenceType('http://1.2.3.4:6000')],
+                            typesList=['xyz'], serviceId='abc')
+        for numeric_mode, value, requested_value in ((dataconverters.NUMERIC_FLOAT, 0.1 + 0.2, 0.5),
+                                                     (dataconverters.NUMERIC_DECIMAL, Decimal('0.123456'),
+                                                      Decimal('0.5'))):
+            device_mdib = mdib.DeviceMdibContainer.fromMdibFile(path, numeric_mode=numeric_mode)
+            client_mdib = mdib.DeviceMdibContainer.fromMdibFile(path, numeric_mode=numeric_mode)  # as a client would
+            descriptor = device_mdib.descriptions.NODETYPE.get(namespaces.domTag('NumericMetricDescriptor'))[0]
+            sco_descriptor = device_mdib.descriptions.NODETYPE.get(namespaces.domTag('ScoDescriptor'))[0]
+            set_client = SetServiceClient(None, hosted, 'Set', SDC_v1_Definitions)
+            set_client.register_mdib(client_mdib)
+            proposed_state = client_mdib.states.descriptorHandle.getOne(descriptor.handle).mkCopy()
+            proposed_state.mkMetricValue()
+            proposed_state.metricValue.Value = value
+            envelopes = [set_client._mkSetMetricStateEnvelope('op1', [proposed_state]),
+                         set_client._mkRequestedNumericValueEnvelope('op2', requested_value)]
+            requests = [ReceivedSoap12Envelope.fromXMLString(e.as_xml()) for e in envelopes]
+            operations = [sco.SetMetricStateOperation('op1', descriptor.handle),
+                          sco.SetValueOperation('op2', descriptor.handle)]
+            received = []
+
+            def _on_argument(argument):
+                received.append((dataconverters.currentNumericMode(), argument))
+
+            for operation in operations:
+                operation.setMdib(device_mdib, sco_descriptor)
+                properties.bind(operation, currentArgument=_on_argument)
+            worker = sco._OperationsWorker(mock.Mock(), mock.Mock(), device_mdib, None)
+            worker.start()
+            for operation, request in zip(operations, requests):
+                worker.enqueueOperation(operation, request)
+            worker.stop()
+            worker.join(timeout=10)
+            self.assertEqual([mode for mode, _ in received], [numeric_mode, numeric_mode])
+            self.assertEqual(received[0][1][0].metricValue.Value, value)
+            self.assertEqual(received[1][1], requested_value)
+            self.assertIsInstance(received[1][1], type(requested_value))
+
+
+class _ReportRecorder(object):
+    """ Replaces the sdc device of a DeviceMdibContainer and records the sent notifications."""
+
+    def __init__(self):
+        self.reports = []
+        self.report_kwargs = []
+
+    def __getattr__(self, name):
+        if not name.startswith('send'):
+            raise AttributeError(name)
+
+        def _record(mdib_version_group, *args, **kwargs):
+            self.reports.append((name, mdib_version_group, args))
+            self.report_kwargs.append(kwargs)
+        return _record
+
+
+class TestTransactionCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        self.mdib = mdib.DeviceMdibContainer.fromMdibFile(os.path.join(mdibFolder, '70041_MDIB_Final.xml'))
+        self.recorder = _ReportRecorder()
+        self.mdib.setSdcDevice(self.recorder)
+        states = self.mdib.states.NODETYPE.get(namespaces.domTag('NumericMetricState'))
+        self.metric_handles = [s.descriptorHandle for s in states[:3]]
+        self.alert_handle = self.mdib.states.NODETYPE.get(namespaces.domTag('AlertConditionState'))[0].descriptorHandle
+
+    def _set_value(self, handle, value, **kwargs):
+        with self.mdib.mdibUpdateTransaction(**kwargs) as mgr:
+            state = mgr.getMetricState(handle)
+            if state.metricValue is None:
+                state.mkMetricValue()
+            state.metricValue.Value = value
+
+    def test_latest_value_wins(self):
+        self.mdib.setTransactionCoalescing(10000)
+        mdib_version = self.mdib.mdibVersion
+        state_version = self.mdib.states.descriptorHandle.getOne(self.metric_handles[0]).StateVersion
+        self._set_value(self.metric_handles[0], 1)
+        self._set_value(self.metric_handles[1], 2)
+        self._set_value(self.metric_handles[0], 3)
+        self.assertEqual(self.recorder.reports, [])
+        self.assertEqual(self.mdib.mdibVersion, mdib_version)
+
+        self.mdib.flushTransactions()
+        self.assertEqual(self.mdib.mdibVersion, mdib_version + 1)
+        self.assertEqual(len(self.recorder.reports), 1)
+        name, mdib_version_group, (states,) = self.recorder.reports[0]
+        self.assertEqual(name, 'sendMetricStateUpdates')
+        self.assertEqual(mdib_version_group.mdib_version, mdib_version + 1)
+        self.assertEqual([s.descriptorHandle for s in states], self.metric_handles[:2])
+        self.assertEqual(states[0].metricValue.Value, 3)
+        self.assertEqual(states[0].StateVersion, state_version + 1)
+        self.assertIs(self.mdib.states.descriptorHandle.getOne(self.metric_handles[0]), states[0])
+
+        self.mdib.flushTransactions()  # nothing pending
+        self.assertEqual(len(self.recorder.reports), 1)
+
+    def test_later_transaction_keeps_pending_updates(self):
+        self.mdib.setTransactionCoalescing(10000)
+        handle = self.metric_handles[0]
+        state_version = self.mdib.states.descriptorHandle.getOne(handle).StateVersion
+        self._set_value(handle, 1)
+        with self.mdib.mdibUpdateTransaction() as mgr:
+            state = mgr.getMetricState(handle)
+            self.assertEqual(state.metricValue.Value, 1)  # the pending state, not the committed one
+            state.ActivationState = pmtypes.ComponentActivation.STANDBY
+        self.mdib.update_metric_values({self.metric_handles[1]: (2, None, None)})
+        self.mdib.update_metric_values({self.metric_handles[1]: (3, None, None), handle: (4, None, None)})
+        self.assertEqual(self.recorder.reports, [])
+
+        self.mdib.flushTransactions()
+        _, _, (states,) = self.recorder.reports[0]
+        self.assertEqual([s.descriptorHandle for s in states], self.metric_handles[:2])
+        self.assertEqual(states[0].metricValue.Value, 4)
+        self.assertEqual(states[0].ActivationState, pmtypes.ComponentActivation.STANDBY)
+        self.assertEqual(states[0].StateVersion, state_version + 1)
+        self.assertEqual(states[1].metricValue.Value, 3)
+
+    def test_late_timer_does_not_flush_next_window(self):
+        self.mdib.setTransactionCoalescing(10000)
+        self._set_value(self.metric_handles[0], 1)
+        first_window = self.mdib._coalescingGeneration
+        self.mdib.flushTransactions()  # e.g. while the timer waits for the transaction lock
+        self._set_value(self.metric_handles[0], 2)
+        self.mdib._onCoalescingTimer(first_window)
+        self.assertEqual(len(self.recorder.reports), 1)
+        self.mdib._onCoalescingTimer(self.mdib._coalescingGeneration)
+        self.assertEqual(len(self.recorder.reports), 2)
+
+    def test_bypass(self):
+        self.mdib.setTransactionCoalescing(10000)
+        mdib_version = self.mdib.mdibVersion
+        self._set_value(self.metric_handles[0], 1)
+        self._set_value(self.metric_handles[1], 2, flush=True)
+        self.assertEqual(self.mdib.mdibVersion, mdib_version + 1)
+        self.assertEqual([s.metricValue.Value for s in self.recorder.reports[0][2][0]], [1, 2])
+
+        # alert states are never delayed, pending metrics are sent with the same mdib version
+        self._set_value(self.metric_handles[0], 3)
+        with self.mdib.mdibUpdateTransaction() as mgr:
+            state = mgr.getAlertState(self.alert_handle)
+            state.Presence = True
+        self.assertEqual(self.mdib.mdibVersion, mdib_version + 2)
+        self.assertEqual(sorted(r[0] for r in self.recorder.reports[1:]),
+                         ['sendAlertStateUpdates', 'sendMetricStateUpdates'])
+        self.assertTrue(all(r[1].mdib_version == mdib_version + 2 for r in self.recorder.reports[1:]))
+
+    def test_update_metric_values(self):
+        with self.mdib.mdibUpdateTransaction() as mgr:
+            state = mgr.getMetricState(self.metric_handles[0])
+            state.mkMetricValue()
+            state.metricValue.Validity = pmtypes.MeasurementValidity.INVALID
+        self.recorder.reports.clear()
+        mdib_version = self.mdib.mdibVersion
+        old_states = [self.mdib.states.descriptorHandle.getOne(h) for h in self.metric_handles]
+        values = {self.metric_handles[0]: (1, None, None),
+                  self.metric_handles[1]: (2, pmtypes.MeasurementValidity.QUESTIONABLE, 1234.5),
+                  self.metric_handles[2]: (3, pmtypes.MeasurementValidity.VALID, None)}
+        before = time.time()
+        self.assertEqual(self.mdib.update_metric_values(values), mdib_version + 1)
+        self.assertEqual(len(self.recorder.reports), 1)
+        name, _, (states,) = self.recorder.reports[0]
+        self.assertEqual(name, 'sendMetricStateUpdates')
+        self.assertEqual([s.descriptorHandle for s in states], self.metric_handles)
+        for old_state, state, value in zip(old_states, states, (1, 2, 3)):
+            self.assertIs(self.mdib.states.descriptorHandle.getOne(state.descriptorHandle), state)
+            self.assertEqual(state.StateVersion, old_state.StateVersion + 1)
+            self.assertEqual(state.metricValue.Value, value)
+        self.assertEqual(states[0].metricValue.Validity, pmtypes.MeasurementValidity.INVALID)  # not changed
+        self.assertGreaterEqual(states[0].metricValue.DeterminationTime, before)
+        self.assertEqual(states[1].metricValue.Validity, pmtypes.MeasurementValidity.QUESTIONABLE)
+        self.assertEqual(states[1].metricValue.DeterminationTime, 1234.5)
+        self.assertEqual(states[2].metricValue.Validity, pmtypes.MeasurementValidity.VALID)
+
+        with self.mdib.mdibUpdateTransaction() as mgr:
+            self.assertRaises(ValueError, mgr.update_metric_values, {self.alert_handle: (1, None, None)})
+        self.assertEqual(self.mdib.mdibVersion, mdib_version + 1)
+
+    def test_max_states_and_window(self):
+        self.mdib.setTransactionCoalescing(10000, maxStates=2)
+        mdib_version = self.mdib.mdibVersion
+        self._set_value(self.metric_handles[0], 1)
+        self._set_value(self.metric_handles[0], 2)
+        self.assertEqual(self.mdib.mdibVersion, mdib_version)
+        self._set_value(self.metric_handles[1], 3)
+        self.assertEqual(self.mdib.mdibVersion, mdib_version + 1)
+
+        self.mdib.setTransactionCoalescing(20)
+        self._set_value(self.metric_handles[2], 4)
+        self.assertEqual(self.mdib.mdibVersion, mdib_version + 1)
+        time.sleep(0.5)
+        self.assertEqual(self.mdib.mdibVersion, mdib_version + 2)
+
+        self._set_value(self.metric_handles[2], 5)
+        self.mdib.setTransactionCoalescing(None)  # commits pending transactions
+        self.assertEqual(self.mdib.mdibVersion, mdib_version + 3)
+        self._set_value(self.metric_handles[2], 6)
+        self.assertEqual(self.mdib.mdibVersion, mdib_version + 4)
+
+
+class TestDescriptorTransactions(unittest.TestCase):
+
+    def setUp(self):
+        self.mdib = mdib.DeviceMdibContainer.fromMdibFile(os.path.join(mdibFolder, '70041_MDIB_Final.xml'))
+        self.recorder = _ReportRecorder()
+        self.mdib.setSdcDevice(self.recorder)
+        self.vmd = self.mdib.descriptions.NODETYPE.get(namespaces.domTag('VmdDescriptor'))[0]
+
+    def _mk_descriptor(self, type_name, node_name, handle, parent_handle):
+        cls = self.mdib.getDescriptorContainerClass(namespaces.domTag(type_name))
+        descriptor = cls(nsmapper=self.mdib.nsmapper, nodeName=namespaces.domTag(node_name), handle=handle,
+                         parentHandle=parent_handle)
+        descriptor.Type = pmtypes.CodedValue('12345')
+        return descriptor
+
+    def test_create_subtree(self):
+        """ children can be added before their parent, the parent of the subtree is incremented only once"""
+        metric_count = 20
+        with self.mdib.mdibUpdateTransaction() as mgr:
+            for i in range(metric_count):
+                metric = self._mk_descriptor('NumericMetricDescriptor', 'Metric', 'new_metric_{}'.format(i),
+                                             'new_channel')
+                metric.Unit = pmtypes.CodedValue('hector')
+                metric.Resolution = 1
+                mgr.createDescriptor(metric)
+            mgr.createDescriptor(self._mk_descriptor('ChannelDescriptor', 'Channel', 'new_channel', self.vmd.handle))
+            mgr.createDescriptor(self._mk_descriptor('ChannelDescriptor', 'Channel', 'new_channel2', self.vmd.handle))
+        kwargs = self.recorder.report_kwargs[0]
+        self.assertEqual([d.handle for d in kwargs['created']],
+                         ['new_channel', 'new_channel2'] + ['new_metric_{}'.format(i) for i in range(metric_count)])
+        self.assertEqual([d.handle for d in kwargs['updated']], [self.vmd.handle])
+        new_vmd = self.mdib.descriptions.handle.getOne(self.vmd.handle)
+        self.assertEqual(new_vmd.DescriptorVersion, self.vmd.DescriptorVersion + 1)
+        self.assertEqual(len(self.mdib.descriptions.parentHandle.get('new_channel')), metric_count)
+
+    def test_delete_subtree(self):
+        """ deleting a descriptor and a descendant of it in one transaction deletes every descriptor once"""
+        channel = self.mdib.descriptions.parentHandle.get(self.vmd.handle)[0]
+        metric = self.mdib.descriptions.parentHandle.get(channel.handle)[0]
+        subtree = self.mdib.getAllDescriptorsInSubTree(channel)
+        with self.mdib.mdibUpdateTransaction() as mgr:
+            mgr.removeDescriptor(metric.handle)
+            mgr.removeDescriptor(channel.handle)
+        kwargs = self.recorder.report_kwargs[0]
+        self.assertEqual(sorted(d.handle for d in kwargs['deleted']), sorted(d.handle for d in subtree))
+        self.assertEqual([d.handle for d in kwargs['updated']], [self.vmd.handle])
+        self.assertEqual(self.mdib.descriptions.handle.getOne(self.vmd.handle).DescriptorVersion,
+                         self.vmd.DescriptorVersion + 1)
+        self.assertEqual(set(self.mdib.deletedDescriptorByHandle), {d.handle for d in subtree})
+        for descriptor in subtree:
+            self.assertIsNone(self.mdib.descriptions.handle.getOne(descriptor.handle, allowNone=True))
+            self.assertIsNone(self.mdib.states.descriptorHandle.getOne(descriptor.handle, allowNone=True))
+        self.assertIsNone(self.mdib.descriptions.parentHandle.get(channel.handle))
+
+    def test_tree_index(self):
+        mds = self.mdib.descriptions.NODETYPE.getOne(namespaces.domTag('MdsDescriptor'))
+        with self.mdib.mdibUpdateTransaction() as mgr:
+            mgr.createDescriptor(self._mk_descriptor('StringMetricDescriptor', 'Metric', 'new_metric', 'new_channel'))
+            mgr.createDescriptor(self._mk_descriptor('ChannelDescriptor', 'Channel', 'new_channel', self.vmd.handle))
+        lookup = self.mdib.descriptions
+        self.assertEqual(lookup.getAncestorHandles('new_metric'), (mds.handle, self.vmd.handle, 'new_channel'))
+        self.assertTrue(lookup.isDescendantOf('new_metric', mds.handle))
+        self.assertTrue(lookup.isDescendantOf('new_metric', 'new_channel'))
+        self.assertFalse(lookup.isDescendantOf('new_channel', 'new_metric'))
+        self.assertFalse(lookup.isDescendantOf('new_metric', 'new_metric'))
+        self.assertEqual(lookup.getNearestAncestor('new_metric', namespaces.domTag('VmdDescriptor')).handle,
+                         self.vmd.handle)
+        self.assertIsNone(lookup.getNearestAncestor('new_metric', namespaces.domTag('ScoDescriptor')))
+        # every descriptor of the mdib file is indexed
+        for descriptor in lookup.objects:
+            parent_handle = descriptor.parentHandle
+            ancestors = lookup.getAncestorHandles(descriptor.handle)
+            if parent_handle is None:
+                self.assertEqual(ancestors, ())
+            else:
+                self.assertEqual(ancestors, lookup.getAncestorHandles(parent_handle) + (parent_handle,))
+        with self.mdib.mdibUpdateTransaction() as mgr:
+            mgr.removeDescriptor('new_channel')
+        self.assertIsNone(lookup.getAncestorHandles('new_metric'))
+        self.assertFalse(lookup.isDescendantOf('new_metric', mds.handle))
+
+    def test_tree_index_children_first(self):
+        """ a client can receive children before their parent, the index is updated when the parent is added"""
+        lookup = mdib.mdibbase.DescriptorsLookup()
+        metric = self._mk_descriptor('StringMetricDescriptor', 'Metric', 'm', 'ch')
+        channel = self._mk_descriptor('ChannelDescriptor', 'Channel', 'ch', 'vmd')
+        vmd = self._mk_descriptor('VmdDescriptor', 'Vmd', 'vmd', None)
+        lookup.addObjects([metric, channel])
+        self.assertEqual(lookup.getAncestorHandles('m'), ('vmd', 'ch'))
+        lookup.addObject(vmd)
+        self.assertEqual(lookup.getAncestorHandles('m'), ('vmd', 'ch'))
+        self.assertEqual(lookup.getAncestorHandles('vmd'), ())
+        self.assertEqual(lookup.getNearestAncestor('m', namespaces.domTag('VmdDescriptor')), vmd)
+        lookup.clear()
+        self.assertIsNone(lookup.getAncestorHandles('m'))
+
+
 def suite():
-    return unittest.TestLoader().loadTestsFromTestCase(TestMdib)
+    loader = unittest.TestLoader()
+    return unittest.TestSuite([loader.loadTestsFromTestCase(TestMdib),
+                               loader.loadTestsFromTestCase(TestTransactionCoalescing),
+                               loader.loadTestsFromTestCase(TestDescriptorTransactions)])
 
 
 if __name__ == '__main__':
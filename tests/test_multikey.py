@@ -0,0 +1,110 @@
+import unittest
+
+from sdc11073 import multikey
+
+
+class _Obj(object):
+    def __init__(self, handle, kind, tags=None):
+        self.handle = handle
+        self.kind = kind
+        self.tags = tags
+
+
+class TestMultiKeyLookup(unittest.TestCase):
+
+    def setUp(self):
+        self.lookup = multikey.MultiKeyLookup()
+        self.lookup.addIndex('handle', multikey.UIndexDefinition(lambda obj: obj.handle))
+        self.lookup.addIndex('kind', multikey.IndexDefinition(lambda obj: obj.kind, indexNoneValues=False))
+        self.lookup.addIndex('tags', multikey.IndexDefinition1n(lambda obj: obj.tags, indexNoneValues=False))
+        self.objects = [_Obj('a', 'x', ['t1']), _Obj('b', 'x'), _Obj('c', 'y', ['t1', 't2'])]
+        self.lookup.addObjects(self.objects)
+
+    def test_swap_same_keys(self):
+        old = self.objects[0]
+        new = _Obj('a', 'x', ['t1'])
+        self.lookup.swapObject(old, new)
+        self.assertIs(self.lookup.handle.getOne('a'), new)
+        self.assertEqual(self.lookup.kind.get('x'), [new, self.objects[1]])  # position is kept
+        self.assertEqual(self.lookup.tags.get('t1'), [new, self.objects[2]])
+        self.assertEqual(self.lookup.objects, {new, self.objects[1], self.objects[2]})
+        self.lookup.removeObject(new)
+        self.assertIsNone(self.lookup.handle.getOne('a', allowNone=True))
+        self.assertEqual(self.lookup.kind.get('x'), [self.objects[1]])
+        self.assertEqual(self.lookup.tags.get('t1'), [self.objects[2]])
+
+    def test_swap_after_remove(self):
+        # the remembered position of an object in an index list is outdated after a removal of an object before it
+        current = self.objects[1]
+        for _ in range(2):
+            new = _Obj('b', 'x')
+            self.lookup.swapObject(current, new)
+            current = new
+        self.lookup.removeObject(self.objects[0])
+        new = _Obj('b', 'x')
+        self.lookup.swapObject(current, new)
+        self.assertEqual(self.lookup.kind.get('x'), [new])
+        self.assertIs(self.lookup.handle.getOne('b'), new)
+
+    def test_swap_changed_keys(self):
+        old = self.objects[2]
+        new = _Obj('c', None, ['t3'])
+        self.lookup.swapObject(old, new)
+        self.assertIs(self.lookup.handle.getOne('c'), new)
+        self.assertIsNone(self.lookup.kind.get('y'))
+        self.assertIsNone(self.lookup.kind.get(None))
+        self.assertEqual(self.lookup.tags.get('t1'), [self.objects[0]])
+        self.assertIsNone(self.lookup.tags.get('t2'))
+        self.assertEqual(self.lookup.tags.get('t3'), [new])
+        # an unknown old object: new object is added
+        other = _Obj('d', 'y')
+        self.lookup.swapObject(None, other)
+        self.assertIs(self.lookup.handle.getOne('d'), other)
+        # unique index is still checked
+        self.assertRaises(KeyError, self.lookup.swapObject, other, _Obj('a', 'y'))
+
+    def test_update_object(self):
+        obj = self.objects[1]
+        obj.kind = 'y'
+        obj.tags = ['t2']
+        self.lookup.updateObject(obj)
+        self.assertEqual(self.lookup.kind.get('x'), [self.objects[0]])
+        self.assertEqual(self.lookup.kind.get('y'), [self.objects[2], obj])
+        self.assertEqual(self.lookup.tags.get('t2'), [self.objects[2], obj])
+        self.lookup.updateObject(obj)  # unchanged keys
+        self.assertEqual(self.lookup.kind.get('y'), [self.objects[2], obj])
+        self.lookup.removeObject(obj)
+        self.assertEqual(self.lookup.kind.get('y'), [self.objects[2]])
+        self.assertEqual(self.lookup.tags.get('t2'), [self.objects[2]])
+        self.assertRaises(RuntimeError, self.lookup.updateObject, obj)
+
+    def test_find_indexed(self):
+        self.lookup = multikey.MultiKeyLookup()
+        self.lookup.addIndex('handle', multikey.UIndexDefinition(lambda obj: obj.handle, attrName='handle'))
+        self.lookup.addIndex('kind', multikey.IndexDefinition(lambda obj: obj.kind, indexNoneValues=False,
+                                                              attrName='kind'))
+        self.lookup.addIndex('tags', multikey.IndexDefinition1n(lambda obj: obj.tags, indexNoneValues=False,
+                                                                attrName='tags'))
+        self.lookup.addIndex('handle_kind', multikey.CompositeIndexDefinition(('handle', 'kind')))
+        none_kind = _Obj('d', None)
+        self.lookup.addObjects(self.objects + [none_kind])
+        a, b, c = self.objects
+        # OR semantics, same result as the full scan
+        self.assertEqual(self.lookup.find(handle='a', kind='x').objects, [a, b])
+        self.assertEqual(self.lookup.find(kind='z').objects, [])
+        self.assertEqual(self.lookup.find(kind=None).objects, [none_kind])  # not indexed => scan
+        self.assertEqual(self.lookup.find(tags=['t1']).objects, [a])  # 1n index => scan
+        self.assertEqual(self.lookup.find(handle=['a']).objects, [])  # unhashable => scan
+        # AND semantics
+        self.assertEqual(self.lookup.select(handle='a', kind='x').objects, [a])
+        self.assertEqual(self.lookup.select(handle='a', kind='y').objects, [])
+        self.assertEqual(self.lookup.select(kind='x').objects, [a, b])
+        self.assertEqual(self.lookup.select(kind='y', tags=['t1', 't2']).objects, [c])
+        self.assertEqual(self.lookup.select(kind=None, handle='d').objects, [none_kind])
+        self.assertEqual(self.lookup.select(kind='x', unknown=1).objects, [])
+        self.assertEqual(len(self.lookup.select().objects), 4)
+        # indices follow updates
+        b.kind = 'y'
+        self.lookup.updateObject(b)
+        self.assertEqual(self.lookup.select(handle='b', kind='y').objects, [b])
+        self.assertEqual(self.lookup.find(kind='x').objects, [a])
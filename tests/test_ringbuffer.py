@@ -0,0 +1,183 @@
+import array
+import copy
+import decimal
+import random
+import unittest
+from unittest import mock
+
+from sdc11073 import namespaces
+from sdc11073 import pmtypes
+from sdc11073 import samplebuffer
+from sdc11073.mdib import clientmdib
+from sdc11073.mdib import descriptorcontainers
+from sdc11073.mdib import ringbuffer
+from sdc11073.mdib import statecontainers
+
+
+class TestSampleRingBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.annotation = pmtypes.Annotation(pmtypes.CodedValue('a'))
+
+    def _flatten(self, segments):
+        return [float(v) for segment in segments for v in segment.tolist()]
+
+    def _mkRing(self):
+        """ a ring with 12 samples appended, the second sample array wraps around the end of the columns"""
+        ring = ringbuffer.SampleRingBuffer(10)
+        ring.appendSampleArray([1, 2, 3, 4, 5, 6], 100.0, 0.5, 'Vld', {1: [self.annotation]})
+        ring.appendSampleArray(samplebuffer.mkSampleBuffer([7, 8, 9, 10, 11, 12]), 103.0, 0.5, 'Qst',
+                               {0: [self.annotation]})
+        return ring
+
+    def test_append_sample_array(self):
+        ring = ringbuffer.SampleRingBuffer(10)
+        self.assertEqual(len(ring), 0)
+        self.assertEqual(ring.valueSegments(5), [])
+        ring.appendSampleArray([1, 2, 3, 4, 5, 6], 100.0, 0.5, 'Vld', {1: [self.annotation]})
+        self.assertEqual(len(ring), 6)
+        self.assertEqual(self._flatten(ring.valueSegments(4)), [3.0, 4.0, 5.0, 6.0])
+        self.assertEqual(len(ring.valueSegments(4)), 1)  # no wrap around => one segment
+        self.assertEqual(self._flatten(ring.timestampSegments(100)), [100.0, 100.5, 101.0, 101.5, 102.0, 102.5])
+        self.assertEqual(ring.annotations(), [(1, [self.annotation])])
+
+    def test_wrap_around(self):
+        ring = self._mkRing()
+        self.assertEqual(len(ring), 10)
+        self.assertEqual((ring.start_index, ring.end_index), (2, 12))
+        segments = ring.valueSegments(10)
+        self.assertEqual(len(segments), 2)
+        self.assertEqual(self._flatten(segments), [3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0, 11.0, 12.0])
+        self.assertEqual(list(ring.copyValues(3)), [10.0, 11.0, 12.0])
+        self.assertEqual(list(ring.copyTimestamps(2)), [105.0, 105.5])
+        codes = [c for segment in ring.validitySegments(7) for c in segment.tolist()]
+        self.assertEqual([ring.validityValue(c) for c in codes], ['Vld', 'Qst', 'Qst', 'Qst', 'Qst', 'Qst', 'Qst'])
+        # annotation of sample 1 is overwritten
+        self.assertEqual(ring.annotations(), [(6, [self.annotation])])
+        values, timestamps = ring.lastSeconds(1.0, now=105.5)
+        self.assertEqual(self._flatten(values), [10.0, 11.0, 12.0])
+        self.assertEqual(self._flatten(timestamps), [104.5, 105.0, 105.5])
+        self.assertEqual(ring.countSince(0), 10)
+        self.assertEqual(ring.countSince(200), 0)
+
+    def test_rt_sample_containers(self):
+        ring = self._mkRing()
+        containers = list(ring.rtSampleContainers())
+        self.assertEqual([c.value for c in containers], [3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0, 11.0, 12.0])
+        self.assertEqual([c.observationTime for c in containers][:2], [101.0, 101.5])
+        self.assertEqual([c.validity for c in containers], ['Vld'] * 4 + ['Qst'] * 6)
+        self.assertEqual([len(c.annotations) for c in containers], [0, 0, 0, 0, 1, 0, 0, 0, 0, 0])
+        self.assertEqual(ring.rtSampleContainer(6).annotations, [self.annotation])
+        self.assertEqual(ring.rtSampleContainer(11).value, 12.0)
+        self.assertRaises(IndexError, ring.rtSampleContainer, 1)
+        # valueString is the decimal value of the sample, like the value that was read from xml
+        ring.appendSampleArray([decimal.Decimal('0.1'), decimal.Decimal('-12.345')], 106.0, 0.5, 'Vld')
+        self.assertEqual(ring.rtSampleContainer(12).valueString, decimal.Decimal('0.1'))
+        self.assertEqual(str(ring.rtSampleContainer(13).valueString), '-12.345')
+
+    def test_more_samples_than_capacity(self):
+        ring = self._mkRing()
+        ring.appendSampleArray(list(range(25)), 0.0, 1.0, None, {3: [self.annotation], 20: [self.annotation]})
+        self.assertEqual(self._flatten(ring.valueSegments(10)), [float(v) for v in range(15, 25)])
+        self.assertEqual(ring.annotations(), [(32, [self.annotation])])
+        ring.clear()
+        self.assertEqual(len(ring), 0)
+        self.assertEqual(list(ring.rtSampleContainers()), [])
+
+    @unittest.skipIf(samplebuffer.numpy is None, 'numpy is not installed')
+    def test_array_and_numpy_columns(self):
+        """ array.array columns and numpy columns (numpy.arange time stamps, numpy.concatenate) have the same content"""
+        with mock.patch.object(samplebuffer, 'USE_NUMPY', False):
+            array_ring = self._mkRing()
+        with mock.patch.object(samplebuffer, 'USE_NUMPY', True):
+            numpy_ring = self._mkRing()
+        self.assertIsInstance(array_ring.copyValues(10), array.array)
+        self.assertIsInstance(numpy_ring.copyValues(10), samplebuffer.numpy.ndarray)
+        for count in (0, 3, 10):
+            self.assertEqual(numpy_ring.copyValues(count).tolist(), array_ring.copyValues(count).tolist())
+            self.assertEqual(numpy_ring.copyTimestamps(count).tolist(), array_ring.copyTimestamps(count).tolist())
+        self.assertEqual([(c.value, c.observationTime, c.validity) for c in numpy_ring.rtSampleContainers()],
+                         [(c.value, c.observationTime, c.validity) for c in array_ring.rtSampleContainers()])
+
+
+def _former_applied_annotations(metricValue):
+    """ the former mapping of ClientRtBuffer.mkRtSampleContainers: every sample is compared with every ApplyAnnotation"""
+    result = []
+    for i, _ in enumerate(metricValue.Samples):
+        appliedAnnotations = []
+        for aa in metricValue.ApplyAnnotations or []:
+            if aa.SampleIndex == i:
+                appliedAnnotations.append(metricValue.Annotations[aa.AnnotationIndex])
+        result.append(appliedAnnotations)
+    return result
+
+
+class TestClientRtBuffer(unittest.TestCase):
+
+    def test_annotation_mapping(self):
+        """mapping of ApplyAnnotations to samples is the same as the former mapping"""
+        nsmapper = namespaces.DocNamespaceHelper()
+        dc = descriptorcontainers.RealTimeSampleArrayMetricDescriptorContainer(nsmapper=nsmapper,
+                                                                               nodeName='MyDescriptor',
+                                                                               handle='123',
+                                                                               parentHandle='456')
+        rnd = random.Random(42)
+        annotations = [pmtypes.Annotation(pmtypes.CodedValue(c)) for c in 'abc']
+        for _ in range(200):
+            sample_count = rnd.randint(0, 60)
+            sc = statecontainers.RealTimeSampleArrayMetricStateContainer(nsmapper=nsmapper, descriptorContainer=dc)
+            sc.mkMetricValue()
+            sc.metricValue.Samples = [float(i) for i in range(sample_count)]
+            sc.metricValue.DeterminationTime = 1000.0
+            sc.metricValue.Annotations = annotations
+            # duplicates, unsorted and out of range sample indices
+            sc.metricValue.ApplyAnnotations = [pmtypes.ApplyAnnotation(rnd.randint(0, 2), rnd.randint(-2, 62))
+                                               for _ in range(rnd.randint(0, 30))]
+            expected = _former_applied_annotations(sc.metricValue)
+            rt_buffer = clientmdib.ClientRtBuffer(sample_period=0.01, max_samples=100)
+            containers = rt_buffer.mkRtSampleContainers(sc)
+            self.assertEqual([c.annotations for c in containers], expected)
+            rt_buffer.addRealtimeSampleArray(sc)
+            self.assertEqual([c.annotations for c in rt_buffer.rt_data], expected)
+
+    def test_compatibility_view(self):
+        """the RtSampleContainers of rt_data are the same as the ones of mkRtSampleContainers"""
+        nsmapper = namespaces.DocNamespaceHelper()
+        dc = descriptorcontainers.RealTimeSampleArrayMetricDescriptorContainer(nsmapper=nsmapper,
+                                                                               nodeName='MyDescriptor',
+                                                                               handle='123',
+                                                                               parentHandle='456')
+        rt_buffer = clientmdib.ClientRtBuffer(sample_period=0.01, max_samples=8)
+        annotations = [pmtypes.Annotation(pmtypes.CodedValue('a')), pmtypes.Annotation(pmtypes.CodedValue('b'))]
+        expected = []
+        for i in range(3):
+            sc = statecontainers.RealTimeSampleArrayMetricStateContainer(nsmapper=nsmapper, descriptorContainer=dc)
+            sc.mkMetricValue()
+            sc.metricValue.Samples = [i + 0.5, i + 1, i + 2, i + 3]
+            sc.metricValue.DeterminationTime = 1000 + i * 0.04
+            sc.metricValue.Validity = pmtypes.MeasurementValidity.VALID if i else pmtypes.MeasurementValidity.QUESTIONABLE
+            sc.metricValue.Annotations = annotations
+            sc.metricValue.ApplyAnnotations = [pmtypes.ApplyAnnotation(0, 1), pmtypes.ApplyAnnotation(1, 1),
+                                               pmtypes.ApplyAnnotation(1, 3), pmtypes.ApplyAnnotation(0, 4)]
+            expected.extend(rt_buffer.mkRtSampleContainers(sc))
+            self.assertAlmostEqual(rt_buffer.addRealtimeSampleArray(sc), 1000 + i * 0.04 + 0.03)
+        expected = expected[-8:]
+        rt_data = rt_buffer.rt_data
+        self.assertEqual(len(rt_data), 8)
+        for containers in (rt_data, list(rt_data), copy.copy(rt_data), rt_data[:]):
+            self.assertEqual([c.value for c in containers], [float(c.value) for c in expected])
+            self.assertEqual([c.valueString for c in containers], [c.valueString for c in expected])
+            self.assertTrue(all(isinstance(c.valueString, decimal.Decimal) for c in containers))
+            self.assertEqual([c.observationTime for c in containers], [c.observationTime for c in expected])
+            self.assertEqual([c.validity for c in containers], [c.validity for c in expected])
+            self.assertEqual([c.annotations for c in containers], [c.annotations for c in expected])
+        self.assertEqual(rt_data[-1].value, 5.0)
+
+        # the former interface
+        rt_buffer2 = clientmdib.ClientRtBuffer(sample_period=0.01, max_samples=8)
+        rt_buffer2.addRtSampleContainers(expected)
+        self.assertEqual([c.annotations for c in rt_buffer2.rt_data], [c.annotations for c in expected])
+        self.assertEqual([c.validity for c in rt_buffer2.rt_data], [c.validity for c in expected])
+        values = rt_buffer2.readData()
+        self.assertEqual([c.value for c in values], [float(c.value) for c in expected])
+        self.assertEqual(len(rt_buffer2.rt_data), 0)
@@ -0,0 +1,74 @@
+import math
+import random
+import statistics
+import unittest
+from unittest import mock
+
+from sdc11073.mdib import clientmdib
+from sdc11073.mdib import mdibbase
+from sdc11073.runningstats import RunningStatistics
+
+
+class TestRunningStatistics(unittest.TestCase):
+
+    def test_compare_with_statistics_module(self):
+        rnd = random.Random(1)
+        window = 100
+        stats = RunningStatistics(window, low=-1.0, high=5.0, bucketWidth=0.001)
+        values = []
+        for i in range(2500):
+            # offset changes over time, some outliers
+            value = 0.2 + i * 0.0002 + rnd.gauss(0, 0.01) + (3.0 if i % 97 == 0 else 0.0)
+            stats.add(value)
+            values.append(value)
+            last = values[-window:]
+            self.assertEqual(len(stats), len(last))
+            self.assertAlmostEqual(stats.mean, statistics.mean(last), places=9)
+            if len(last) > 1:
+                self.assertAlmostEqual(stats.stdev, statistics.stdev(last), places=9)
+            self.assertEqual(stats.min, min(last))
+            self.assertEqual(stats.max, max(last))
+            if i % 50 == 0:
+                ordered = sorted(last)
+                for p in (1, 25, 50, 95, 99):
+                    expected = ordered[max(1, math.ceil(p / 100 * len(ordered))) - 1]
+                    self.assertAlmostEqual(stats.percentile(p), expected, delta=0.0005)
+                self.assertEqual(stats.percentile(0), ordered[0])
+                self.assertEqual(stats.percentile(100), ordered[-1])
+
+    def test_empty_and_out_of_range(self):
+        stats = RunningStatistics(3, low=0.0, high=1.0, bucketWidth=0.1)
+        self.assertEqual((stats.mean, stats.stdev, stats.min, stats.max), (0.0, 0.0, None, None))
+        self.assertIsNone(stats.percentile(50))
+        stats.add(0.5)
+        self.assertEqual((stats.mean, stats.stdev, stats.min, stats.max), (0.5, 0.0, 0.5, 0.5))
+        for value in (-7.0, 12.0, 13.0):  # outside of histogram range: limited to min and max
+            stats.add(value)
+        self.assertEqual(stats.percentile(1), -7.0)
+        self.assertEqual(stats.percentile(99), 13.0)
+        self.assertAlmostEqual(stats.stdev, statistics.stdev([-7.0, 12.0, 13.0]))
+        self.assertRaises(ValueError, stats.percentile, 101)
+        self.assertRaises(ValueError, RunningStatistics, 0)
+        stats.clear()
+        self.assertEqual(len(stats), 0)
+        self.assertIsNone(stats.max)
+
+
+class TestClientRtBufferAge(unittest.TestCase):
+
+    def test_age_stdev(self):
+        rt_buffer = clientmdib.ClientRtBuffer(sample_period=0.01, max_samples=10)
+        rnd = random.Random(2)
+        ages = [rnd.uniform(0.0, 0.5) for _ in range(clientmdib.AGE_CALC_SAMPLES_COUNT + 30)]
+        with mock.patch.object(clientmdib.time, 'time', return_value=1000.0):
+            for age in ages:
+                rt_buffer.addRtSampleContainers([mdibbase.RtSampleContainer(1.0, 1000.0 - age, None, [])])
+        last = ages[-clientmdib.AGE_CALC_SAMPLES_COUNT:]
+        age_data = rt_buffer.get_age_stdev()
+        self.assertAlmostEqual(age_data.mean_age, statistics.mean(last), places=9)
+        self.assertAlmostEqual(age_data.stdev, statistics.stdev(last), places=9)
+        self.assertAlmostEqual(age_data.min_age, min(ages), places=9)
+        self.assertAlmostEqual(age_data.max_age, max(ages), places=9)
+        # min and max are reset by get_age_stdev
+        self.assertEqual(rt_buffer.get_age_stdev()[2:], (0, 0))
+        self.assertAlmostEqual(rt_buffer.age_statistics.percentile(50), statistics.median_low(last), delta=0.0005)
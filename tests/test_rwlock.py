@@ -0,0 +1,121 @@
+import threading
+import time
+import unittest
+
+from sdc11073.rwlock import ReadWriteLock
+
+
+class TestReadWriteLock(unittest.TestCase):
+
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def _run_in_thread(self, func):
+        result = []
+        thread = threading.Thread(target=lambda: result.append(func()))
+        thread.start()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+        return result[0]
+
+    def test_parallel_readers(self):
+        with self.lock.read_lock:
+            # another thread can also read, but not write
+            self.assertTrue(self._run_in_thread(lambda: self._acquire_release_read(blocking=False)))
+            self.assertFalse(self._run_in_thread(lambda: self.lock.acquire(blocking=False)))
+        self.assertTrue(self._run_in_thread(lambda: self._acquire_release_write(blocking=False)))
+
+    def test_writer_is_exclusive(self):
+        with self.lock:
+            self.assertFalse(self._run_in_thread(lambda: self.lock.acquire_read(blocking=False)))
+            self.assertFalse(self._run_in_thread(lambda: self.lock.acquire(timeout=0.01)))
+        self.assertTrue(self._run_in_thread(lambda: self._acquire_release_read(blocking=False)))
+
+    def test_reentrance(self):
+        with self.lock:
+            with self.lock.write_lock:
+                with self.lock.read_lock:  # writer can also read
+                    with self.lock.read_lock:
+                        pass
+            self.assertFalse(self._run_in_thread(lambda: self.lock.acquire_read(blocking=False)))
+        with self.lock.read_lock:
+            with self.lock.read_lock:
+                pass
+        self.assertRaises(RuntimeError, self.lock.release)
+        self.assertRaises(RuntimeError, self.lock.release_read)
+
+    def test_upgrade(self):
+        with self.lock.read_lock:
+            with self.lock:  # like the former RLock, a reader can take the write side
+                self.assertFalse(self._run_in_thread(lambda: self.lock.acquire_read(blocking=False)))
+                with self.lock.read_lock:
+                    pass
+            # the thread holds the read side again
+            self.assertFalse(self._run_in_thread(lambda: self.lock.acquire(blocking=False)))
+        self.assertRaises(RuntimeError, self.lock.release_read)
+        self.assertTrue(self._run_in_thread(lambda: self._acquire_release_write(blocking=False)))
+
+    def test_concurrent_upgrades(self):
+        """two readers that take the write side do not dead lock"""
+        events = []
+        both_read = threading.Barrier(2)
+
+        def upgrade(name):
+            with self.lock.read_lock:
+                both_read.wait(timeout=5)
+                with self.lock:
+                    events.append(name)
+                    time.sleep(0.01)
+            return True
+
+        other = threading.Thread(target=lambda: upgrade('other'))
+        other.start()
+        self.assertTrue(upgrade('me'))
+        other.join(timeout=5)
+        self.assertFalse(other.is_alive())
+        self.assertEqual(sorted(events), ['me', 'other'])
+
+    def test_failed_upgrade_keeps_read_side(self):
+        with self.lock.read_lock:
+            reader = threading.Thread(target=self._acquire_release_read_slowly)
+            reader.start()
+            time.sleep(0.05)
+            self.assertFalse(self.lock.acquire(timeout=0.01))
+            with self.lock.read_lock:  # still a reader, no need to wait
+                pass
+            reader.join(timeout=5)
+        self.assertRaises(RuntimeError, self.lock.release_read)
+
+    def test_waiting_writer_blocks_new_readers(self):
+        events = []
+        self.lock.acquire_read()
+        writer = threading.Thread(target=lambda: self._acquire_release_write(events=events))
+        writer.start()
+        time.sleep(0.05)
+        # writer waits for the reader, new readers must wait for the writer
+        self.assertFalse(self._run_in_thread(lambda: self.lock.acquire_read(blocking=False)))
+        with self.lock.read_lock:  # this thread already holds the read side
+            pass
+        self.assertEqual(events, [])
+        self.lock.release_read()
+        writer.join(timeout=5)
+        self.assertEqual(events, ['write'])
+        self.assertTrue(self._run_in_thread(lambda: self._acquire_release_read(blocking=False)))
+
+    def _acquire_release_read(self, blocking=True):
+        if self.lock.acquire_read(blocking=blocking):
+            self.lock.release_read()
+            return True
+        return False
+
+    def _acquire_release_read_slowly(self):
+        with self.lock.read_lock:
+            time.sleep(0.2)
+
+    def _acquire_release_write(self, blocking=True, events=None):
+        if self.lock.acquire(blocking=blocking):
+            if events is not None:
+                events.append('write')
+            self.lock.release()
+            return True
+        return False
@@ -0,0 +1,121 @@
+import array
+import unittest
+from unittest import mock
+
+from sdc11073 import dataconverters
+from sdc11073 import namespaces
+from sdc11073 import samplebuffer
+from sdc11073.mdib import descriptorcontainers
+from sdc11073.mdib import statecontainers
+
+
+class TestSampleBuffer(unittest.TestCase):
+    values = [0.0, -1.5, 0.1 + 0.2, 12.3456, 123.456, 1e-05, 42.0, 100000.25]
+
+    def test_mkSampleBuffer(self):
+        buffer = samplebuffer.mkSampleBuffer(self.values)
+        self.assertTrue(samplebuffer.isSampleBuffer(buffer))
+        self.assertFalse(samplebuffer.isSampleBuffer(self.values))
+        self.assertEqual(buffer.tolist(), self.values)
+        self.assertEqual(samplebuffer.mkSampleBuffer(iter(self.values)).tolist(), self.values)
+        self.assertEqual(len(samplebuffer.mkSampleBuffer()), 0)
+
+    def test_copySampleBuffer(self):
+        buffer = samplebuffer.mkSampleBuffer(self.values)
+        copied = samplebuffer.copySampleBuffer(buffer)
+        self.assertIs(type(copied), type(buffer))
+        copied[0] = 5
+        self.assertEqual(buffer[0], 0.0)
+
+    def test_formatSamples(self):
+        """ same output as a list of floats, in all numeric modes"""
+        buffer = samplebuffer.mkSampleBuffer(self.values)
+        for numeric_mode in (None, dataconverters.NUMERIC_DECIMAL, dataconverters.NUMERIC_FLOAT):
+            with dataconverters.numericMode(numeric_mode):
+                expected = ' '.join([dataconverters.DecimalConverter.toXML(v) for v in self.values])
+                self.assertEqual(samplebuffer.formatSamples(buffer), expected)
+
+    def test_parseSamples(self):
+        # the float mode keeps all digits
+        with dataconverters.numericMode(dataconverters.NUMERIC_FLOAT):
+            text = samplebuffer.formatSamples(samplebuffer.mkSampleBuffer(self.values))
+        for xml_value in (text, text.encode('ascii')):
+            parsed = samplebuffer.parseSamples(xml_value)
+            self.assertTrue(samplebuffer.isSampleBuffer(parsed))
+            self.assertEqual(parsed.tolist(), self.values)
+        self.assertEqual(samplebuffer.parseSamples(' 1  2.5\n3 ').tolist(), [1.0, 2.5, 3.0])
+        self.assertEqual(len(samplebuffer.parseSamples('')), 0)
+
+    def test_fromBuffers(self):
+        """ copy of memory views, e.g. of a memory mapped file"""
+        view = memoryview(array.array('d', self.values))
+        joined = samplebuffer.fromBuffers([view[5:], view[:2]])
+        self.assertTrue(samplebuffer.isSampleBuffer(joined))
+        self.assertEqual(joined.tolist(), self.values[5:] + self.values[:2])
+        single = samplebuffer.fromBuffers([view[3:4]])
+        self.assertEqual(single.tolist(), self.values[3:4])
+        single[0] = 1.0  # a copy, not a view of the buffer
+        self.assertEqual(view[3], self.values[3])
+        self.assertEqual(len(samplebuffer.fromBuffers([])), 0)
+
+    def test_array_buffers(self):
+        """ array.array is used if numpy is not installed or USE_NUMPY is False"""
+        view = memoryview(array.array('d', self.values))
+        with mock.patch.object(samplebuffer, 'USE_NUMPY', False):
+            buffers = [samplebuffer.mkSampleBuffer(self.values),
+                       samplebuffer.mkSampleBuffer(iter(self.values)),
+                       samplebuffer.parseSamples(' '.join(map(repr, self.values))),
+                       samplebuffer.parseSamples(' '.join(map(repr, self.values)).encode('ascii')),
+                       samplebuffer.fromBuffers([view[:3], view[3:]]),
+                       samplebuffer.fromBuffers([view])]
+        for buffer in buffers:
+            self.assertIsInstance(buffer, array.array)
+            self.assertEqual(buffer.tolist(), self.values)
+            self.assertIsInstance(samplebuffer.copySampleBuffer(buffer), array.array)
+
+    @unittest.skipIf(samplebuffer.numpy is None, 'numpy is not installed')
+    def test_numpy_buffers(self):
+        view = memoryview(array.array('d', self.values))
+        with mock.patch.object(samplebuffer, 'USE_NUMPY', True):
+            buffers = [samplebuffer.mkSampleBuffer(self.values),
+                       samplebuffer.mkSampleBuffer(array.array('d', self.values)),
+                       samplebuffer.mkSampleBuffer(iter(self.values)),
+                       samplebuffer.parseSamples(' '.join(map(repr, self.values))),
+                       samplebuffer.parseSamples(' '.join(map(repr, self.values)).encode('ascii')),
+                       samplebuffer.fromBuffers([view[:3], view[3:]]),
+                       samplebuffer.fromBuffers([view])]
+        for buffer in buffers:
+            self.assertIsInstance(buffer, samplebuffer.numpy.ndarray)
+            self.assertEqual(buffer.dtype, samplebuffer.numpy.float64)
+            self.assertEqual(buffer.tolist(), self.values)
+            self.assertIsInstance(samplebuffer.copySampleBuffer(buffer), samplebuffer.numpy.ndarray)
+
+    def test_container_samples(self):
+        nsmapper = namespaces.DocNamespaceHelper()
+        dc = descriptorcontainers.RealTimeSampleArrayMetricDescriptorContainer(nsmapper=nsmapper,
+                                                                               nodeName='MyDescriptor',
+                                                                               handle='123',
+                                                                               parentHandle='456')
+        sc = statecontainers.RealTimeSampleArrayMetricStateContainer(nsmapper=nsmapper, descriptorContainer=dc)
+        sc.mkMetricValue()
+        sc.metricValue.Samples = samplebuffer.mkSampleBuffer(self.values)
+        node = sc.mkStateNode()
+        samples_text = node.find(namespaces.domTag('MetricValue')).get('Samples')
+        sc.metricValue.Samples = list(self.values)
+        self.assertEqual(sc.mkStateNode().find(namespaces.domTag('MetricValue')).get('Samples'), samples_text)
+
+        # without float mode samples are read into a list
+        sc2 = statecontainers.RealTimeSampleArrayMetricStateContainer(nsmapper=nsmapper, descriptorContainer=dc,
+                                                                      node=node)
+        self.assertIsInstance(sc2.metricValue.Samples, list)
+        with dataconverters.numericMode(dataconverters.NUMERIC_FLOAT):
+            sc2 = statecontainers.RealTimeSampleArrayMetricStateContainer(nsmapper=nsmapper, descriptorContainer=dc,
+                                                                          node=node)
+            self.assertTrue(samplebuffer.isSampleBuffer(sc2.metricValue.Samples))
+            self.assertEqual(sc2.mkStateNode().find(namespaces.domTag('MetricValue')).get('Samples'), samples_text)
+
+        # copy on write: a copy gets its own buffer when it is accessed
+        sc3 = sc2.mkCopy()
+        sc3.metricValue.Samples[0] = 42
+        self.assertEqual(sc2.metricValue.Samples[0], 0.0)
+        self.assertEqual(sc3.metricValue.Samples[0], 42.0)
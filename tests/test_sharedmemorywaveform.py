@@ -0,0 +1,236 @@
+import array
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import sdc11073
+from sdc11073 import pmtypes
+from sdc11073 import pysoap
+from sdc11073 import samplebuffer
+from sdc11073.definitions_sdc import SDC_v1_Definitions
+from sdc11073.mdib import descriptorcontainers as dc
+from sdc11073.mdib import sharedmemorywaveform
+from sdc11073.sdcdevice import SdcDevice
+from sdc11073.sdcdevice import waveforms
+from tests import mockstuff
+
+
+def run_producer_standin(path, duration, block_period=0.01):
+    """ Stands in for an acquisition process (run it with multiprocessing): writes samples of all channels of an
+    existing ring buffer file in real time, a block every block_period seconds.
+    Sample number n of every channel has the value n, which allows the consumer to detect lost samples.
+    All channels use the sample period of channel 0.
+    """
+    ring_buffer = sharedmemorywaveform.SharedRingBuffer(path)
+    try:
+        sample_period = ring_buffer.sample_period(0)
+        start_time = time.time()
+        ring_buffer.set_start_time(start_time)
+        written = 0
+        end = start_time + duration
+        while True:
+            now = time.time()
+            count = int((min(now, end) - start_time) / sample_period) - written
+            if count > 0:
+                values = array.array('d', range(written, written + count))
+                for channel in range(ring_buffer.channel_count):
+                    ring_buffer.write(channel, values)
+                written += count
+            if now >= end:
+                break
+            time.sleep(block_period)
+    finally:
+        ring_buffer.close()
+
+
+class TestSharedRingBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'ring')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_write_read(self):
+        producer = sharedmemorywaveform.SharedRingBuffer(self.path, 2, 8, [0.01, 0.002])
+        consumer = sharedmemorywaveform.SharedRingBuffer(self.path)
+        self.assertEqual((consumer.channel_count, consumer.capacity), (2, 8))
+        self.assertEqual((consumer.sample_period(0), consumer.sample_period(1)), (0.01, 0.002))
+        self.assertEqual(producer.write(1, [0, 1, 2, 3, 4]), 5)
+        self.assertEqual(producer.write(1, samplebuffer.mkSampleBuffer([5])), 1)
+        first, samples = consumer.read(1)
+        self.assertTrue(samplebuffer.isSampleBuffer(samples))
+        self.assertEqual((first, samples.tolist()), (0, [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]))
+        first, samples = consumer.read(1)
+        self.assertEqual((first, len(samples)), (6, 0))
+        self.assertEqual((consumer.read_count(0), consumer.write_count(0), consumer.overrun_count(0)), (0, 0, 0))
+        consumer.close()
+        producer.close()
+
+    def test_wrap_around(self):
+        producer = sharedmemorywaveform.SharedRingBuffer(self.path, 1, 8, [0.01])
+        consumer = sharedmemorywaveform.SharedRingBuffer(self.path)
+        producer.write(0, range(6))
+        consumer.read(0)
+        # the ring is full after 8 values
+        self.assertEqual(producer.write(0, array.array('d', range(6, 16))), 8)
+        self.assertEqual(producer.overrun_count(0), 2)
+        first, samples = consumer.read(0)
+        self.assertEqual((first, samples.tolist()), (6, [float(i) for i in range(6, 14)]))
+        self.assertEqual((consumer.read_count(0), consumer.write_count(0)), (14, 14))
+        consumer.close()
+        producer.close()
+
+    def test_overrun(self):
+        """ the sample numbers (and time stamps) of the samples after an overrun include the dropped samples"""
+        producer = sharedmemorywaveform.SharedRingBuffer(self.path, 1, 8, [0.01])
+        consumer = sharedmemorywaveform.SharedRingBuffer(self.path)
+        producer.set_start_time(1000.0)
+        reader = sharedmemorywaveform._RingChannelReader(consumer, 0)
+        # sample number n has the value n
+        self.assertEqual(producer.write(0, range(6)), 6)
+        self.assertEqual(producer.write(0, range(6, 10)), 2)  # 8 and 9 are dropped
+        self.assertEqual(producer.write(0, range(10, 12)), 0)
+        rt_sample_array = reader.getNextSampleArray()
+        self.assertEqual(list(rt_sample_array.samples), [float(i) for i in range(8)])
+        self.assertAlmostEqual(rt_sample_array.determination_time, 1000.0)
+        # the samples before the gap are read, numbering continues after the dropped samples
+        self.assertEqual(producer.write(0, range(12, 15)), 3)
+        self.assertEqual((producer.overrun_count(0), producer.sample_number_offset(0)), (4, 4))
+        rt_sample_array = reader.getNextSampleArray()
+        self.assertEqual(list(rt_sample_array.samples), [12.0, 13.0, 14.0])
+        self.assertAlmostEqual(rt_sample_array.determination_time, 1000.12)
+        # second overrun: samples are dropped until the samples before the gap are read
+        self.assertEqual(producer.write(0, range(15, 20)), 5)
+        first, samples = consumer.read(0)
+        self.assertEqual((first, samples.tolist()), (15, [15.0, 16.0, 17.0, 18.0, 19.0]))
+        self.assertEqual(producer.write(0, range(20, 30)), 8)
+        self.assertEqual(producer.write(0, range(30, 31)), 0)
+        rt_sample_array = reader.getNextSampleArray()
+        self.assertEqual(list(rt_sample_array.samples), [float(i) for i in range(20, 28)])
+        self.assertAlmostEqual(rt_sample_array.determination_time, 1000.2)
+        self.assertEqual(producer.write(0, range(31, 33)), 2)
+        rt_sample_array = reader.getNextSampleArray()
+        self.assertEqual(list(rt_sample_array.samples), [31.0, 32.0])
+        self.assertAlmostEqual(rt_sample_array.determination_time, 1000.31)
+        self.assertEqual(consumer.overrun_count(0), 7)
+        consumer.close()
+        producer.close()
+
+    def test_read_array_buffer(self):
+        producer = sharedmemorywaveform.SharedRingBuffer(self.path, 1, 8, [0.01])
+        producer.write(0, range(6))
+        producer.read(0)
+        producer.write(0, range(6, 10))  # wraps around
+        with mock.patch.object(samplebuffer, 'USE_NUMPY', False):
+            first, samples = producer.read(0)
+        self.assertIsInstance(samples, array.array)
+        self.assertEqual((first, samples.tolist()), (6, [6.0, 7.0, 8.0, 9.0]))
+        producer.close()
+
+    @unittest.skipIf(samplebuffer.numpy is None, 'numpy is not installed')
+    def test_write_numpy_values(self):
+        """ numpy arrays of other types and views with strides are converted to contiguous float64 values"""
+        numpy = samplebuffer.numpy
+        producer = sharedmemorywaveform.SharedRingBuffer(self.path, 1, 16, [0.01])
+        self.assertEqual(producer.write(0, numpy.arange(4, dtype=numpy.int32)), 4)
+        self.assertEqual(producer.write(0, numpy.arange(4, 12, dtype=numpy.float64)[::2]), 4)
+        self.assertEqual(producer.write(0, numpy.array([12.5], dtype=numpy.float32)), 1)
+        with mock.patch.object(samplebuffer, 'USE_NUMPY', True):
+            first, samples = producer.read(0)
+        self.assertIsInstance(samples, numpy.ndarray)
+        self.assertEqual((first, samples.tolist()), (0, [0.0, 1.0, 2.0, 3.0, 4.0, 6.0, 8.0, 10.0, 12.5]))
+        producer.close()
+
+    def test_invalid_files(self):
+        self.assertRaises(ValueError, sharedmemorywaveform.SharedRingBuffer, self.path, 1, 6, [0.01])
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 200)
+        self.assertRaises(ValueError, sharedmemorywaveform.SharedRingBuffer, self.path)
+
+
+class TestSharedMemoryWaveformSource(unittest.TestCase):
+    """ a producer process writes 64 waveforms with 1 kHz, the real time sample loop of a device sends them"""
+    CHANNELS = 64
+    SAMPLE_PERIOD = 0.001
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'ring')
+        sharedmemorywaveform.SharedRingBuffer(self.path, self.CHANNELS, 4096,
+                                              [self.SAMPLE_PERIOD] * self.CHANNELS).close()
+        self.handles = ['rtsa{}'.format(i) for i in range(self.CHANNELS)]
+        self.source = sharedmemorywaveform.SharedMemoryWaveformSource(self.path, self.handles)
+        self.mdib = sdc11073.mdib.DeviceMdibContainer(SDC_v1_Definitions, waveform_source=self.source)
+        self.mdib.descriptions.addObject(dc.MdsDescriptorContainer(self.mdib.nsmapper, sdc11073.namespaces.domTag('Mds'),
+                                                                   handle='42', parentHandle=None))
+        for handle in self.handles:
+            descriptor = dc.RealTimeSampleArrayMetricDescriptorContainer(
+                self.mdib.nsmapper, sdc11073.namespaces.domTag('Metric'), handle=handle, parentHandle='42')
+            descriptor.unit = pmtypes.CodedValue('abc')
+            descriptor.MetricAvailability = pmtypes.MetricAvailability.CONTINUOUS
+            descriptor.MetricCategory = pmtypes.MetricCategory.MEASUREMENT
+            self.mdib.descriptions.addObject(descriptor)
+        self.mdib.mkStateContainersforAllDescriptors()
+        self.source.update_descriptors(self.mdib)
+        model = pysoap.soapenvelope.DPWSThisModel(manufacturer='ABCDEFG GmbH', manufacturerUrl='www.abcdefg.com',
+                                                  modelName='Foobar', modelNumber='1.0', modelUrl='www.abcdefg.com',
+                                                  presentationUrl='www.abcdefg.com')
+        device = pysoap.soapenvelope.DPWSThisDevice(friendlyName='Big Bang Practice', firmwareVersion='0.99',
+                                                    serialNumber='12345')
+        self.sdcDevice = SdcDevice(mockstuff.MockWsDiscovery(['5.6.7.8']), None, model, device, self.mdib,
+                                   logLevel=logging.INFO)
+
+    def tearDown(self):
+        self.sdcDevice.stopAll()
+        self.source.close()
+        shutil.rmtree(self.folder)
+
+    def test_no_sample_loss(self):
+        received = {handle: [] for handle in self.handles}
+        lock = threading.Lock()
+
+        def _record(states, nsmapper, mdib_version_group):
+            with lock:
+                for state in states:
+                    metric_value = state.metricValue
+                    if metric_value.Samples is not None and len(metric_value.Samples) > 0:
+                        received[state.descriptorHandle].append((metric_value.DeterminationTime,
+                                                                 [float(v) for v in metric_value.Samples]))
+
+        self.assertEqual(self.mdib.descriptions.handle.getOne(self.handles[0]).SamplePeriod, self.SAMPLE_PERIOD)
+        self.sdcDevice.subscriptionsManager.sendRealtimeSamplesReport = _record
+        self.sdcDevice.startAll()
+        producer = multiprocessing.get_context('spawn').Process(
+            target=run_producer_standin, args=(self.path, 2.0))
+        producer.start()
+        producer.join(timeout=30)
+        self.assertEqual(producer.exitcode, 0)
+        time.sleep(0.5)  # the send loop takes the last samples
+        ring_buffer = self.source.ring_buffer
+        start_time = ring_buffer.start_time(0)
+        with lock:
+            for channel, handle in enumerate(self.handles):
+                written = ring_buffer.write_count(channel)
+                self.assertGreater(written, 1800)
+                self.assertEqual(ring_buffer.overrun_count(channel), 0)
+                self.assertEqual(ring_buffer.read_count(channel), written)
+                samples = [v for _, block in received[handle] for v in block]
+                # sample number n has the value n
+                self.assertEqual(samples, [float(i) for i in range(written)])
+                for determination_time, block in received[handle]:
+                    self.assertAlmostEqual(determination_time, start_time + block[0] * self.SAMPLE_PERIOD, places=3)
+
+    def test_register_waveform_generator(self):
+        """ the samples of the ring buffer channels can not be replaced by a waveform generator"""
+        self.sdcDevice.startAll()
+        generator = waveforms.SinusGenerator(-10, 10, 1.0, 0.01)
+        self.assertRaises(ValueError, self.mdib.registerWaveformGenerator, self.handles[0], generator)
+        self.assertEqual(self.mdib.descriptions.handle.getOne(self.handles[0]).SamplePeriod, self.SAMPLE_PERIOD)
@@ -1,6 +1,9 @@
 # coding: utf-8
 import decimal
+import threading
+import time
 import unittest
+from unittest import mock
 import datetime
 from math import isclose
 from lxml import etree as etree_
@@ -223,6 +226,168 @@ class TestStateContainers(unittest.TestCase):
         self.assertEqual(sc.metricValue, sc2.metricValue)
         self._verifyAbstractStateContainerDataEqual(sc, sc2)
 
+    def test_mkCopy_copy_on_write(self):
+        """Verify that a copy and the original do not affect each other, although they share values until modified."""
+        dc = descriptorcontainers.NumericMetricDescriptorContainer(nsmapper=self.nsmapper,
+                                                                   nodeName='MyDescriptor',
+                                                                   handle='123',
+                                                                   parentHandle='456')
+        sc = statecontainers.NumericMetricStateContainer(nsmapper=self.nsmapper, descriptorContainer=dc)
+        sc.mkMetricValue()
+        sc.metricValue.Value = 42
+        sc.PhysiologicalRange = [pmtypes.Range(1, 2, 3, 4, 5)]
+        sc.updateNode()
+        orig_node = sc.node
+
+        sc2 = sc.mkCopy(copy_node=False)
+        self.assertIs(sc2.node, orig_node)
+        sc2.incrementState()
+        sc2.metricValue.Value = 43
+        sc2.metricValue.Annotation.append(pmtypes.Annotation(pmtypes.CodedValue('a')))
+        sc2.PhysiologicalRange[0].Lower = 100
+        sc2.PhysiologicalRange.append(pmtypes.Range(10, 20, 30, 40, 50))
+        sc2.updateNode()
+        self.assertIs(sc.node, orig_node)
+        self.assertEqual(sc.StateVersion, 0)
+        self.assertEqual(sc.metricValue.Value, 42)
+        self.assertEqual(len(sc.metricValue.Annotation), 0)
+        self.assertEqual(sc.PhysiologicalRange, [pmtypes.Range(1, 2, 3, 4, 5)])
+        self.assertEqual(sc2.StateVersion, 1)
+        self.assertEqual(sc2.metricValue.Value, 43)
+        self.assertEqual(len(sc2.metricValue.Annotation), 1)
+        self.assertEqual(sc2.PhysiologicalRange[0].Lower, 100)
+        self.assertEqual(len(sc2.PhysiologicalRange), 2)
+
+        # modifications of the original do not change the copy
+        sc3 = sc2.mkCopy()
+        self.assertIsNot(sc3.node, sc2.node)
+        sc2.metricValue.Value = 44
+        self.assertEqual(sc3.metricValue.Value, 43)
+        self.assertEqual(sc3.mkStateNode().get('StateVersion'), '1')
+
+    def test_compact_storage(self):
+        """Verify that values read from a node are stored only once, and empty values are shared."""
+        dc = descriptorcontainers.NumericMetricDescriptorContainer(nsmapper=self.nsmapper,
+                                                                   nodeName='MyDescriptor',
+                                                                   handle='123',
+                                                                   parentHandle='456')
+        sc = statecontainers.NumericMetricStateContainer(nsmapper=self.nsmapper, descriptorContainer=dc)
+        sc.mkMetricValue()
+        sc.metricValue.Value = 42
+        node = sc.mkStateNode()
+        node.set('StateVersion', '3')
+        node.set('ActiveAveragingPeriod', 'PT0.50S')  # python value would be written as 'PT0.5S'
+        node.find(namespaces.domTag('MetricValue')).set('Value', '1.50')
+
+        sc2 = statecontainers.NumericMetricStateContainer(nsmapper=self.nsmapper, descriptorContainer=dc,
+                                                          node=node)
+        self.assertEqual(sc2.StateVersion, 3)
+        self.assertIsNone(sc2._stateversion.xml_value)  # re-created exactly from python value
+        self.assertEqual(sc2._activeaveragingperiod.xml_value, 'PT0.50S')
+        self.assertIsNone(sc2._extension__ext_ext)
+        self.assertIs(sc2._bodysite, containerproperties._EMPTY_LIST)
+        new_node = sc2.mkStateNode()
+        self.assertEqual(new_node.get('StateVersion'), '3')
+        self.assertEqual(new_node.get('ActiveAveragingPeriod'), 'PT0.50S')
+        self.assertEqual(new_node.find(namespaces.domTag('MetricValue')).get('Value'), '1.50')
+
+        # empty values are created on access, copies do not see them
+        sc3 = sc2.mkCopy(copy_node=False)
+        self.assertIs(sc3._cowPrivateNames, containerproperties.NO_PRIVATE_NAMES)
+        sc3.BodySite.append(pmtypes.CodedValue('a'))
+        sc3.ext_Extension.append(etree_.Element('foo'))
+        self.assertEqual(sc3._cowPrivateNames, {'_bodysite'})
+        self.assertEqual(sc2.BodySite, [])
+        self.assertEqual(len(sc2.ext_Extension), 0)
+        self.assertEqual(len(sc3.BodySite), 1)
+        self.assertEqual(len(sc3.ext_Extension), 1)
+
+    def test_lazy_state_node(self):
+        """Verify that the node is created on demand and only once per StateVersion / DescriptorVersion."""
+        dc = descriptorcontainers.NumericMetricDescriptorContainer(nsmapper=self.nsmapper,
+                                                                   nodeName='MyDescriptor',
+                                                                   handle='123',
+                                                                   parentHandle='456')
+        sc = statecontainers.NumericMetricStateContainer(nsmapper=self.nsmapper, descriptorContainer=dc)
+        with mock.patch.object(sc, 'mkStateNode', wraps=sc.mkStateNode) as mk_state_node:
+            sc.mkMetricValue()
+            sc.metricValue.Value = 42
+            sc.incrementState()
+            self.assertEqual(mk_state_node.call_count, 0)
+            node = sc.node
+            self.assertIs(sc.node, node)
+            self.assertEqual(mk_state_node.call_count, 1)
+            self.assertEqual(node.get('StateVersion'), '1')
+
+            sc.incrementState()
+            node2 = sc.node
+            self.assertIsNot(node2, node)
+            self.assertEqual(node2.get('StateVersion'), '2')
+            self.assertEqual(mk_state_node.call_count, 2)
+
+            sc.metricValue.Value = 43
+            sc.updateNode()
+            self.assertEqual(mk_state_node.call_count, 2)
+            node3 = sc.node
+            self.assertIsNot(node3, node2)
+            self.assertEqual(mk_state_node.call_count, 3)
+
+        copied = sc.copyStateNode(etree_.QName('foo', 'bar'))
+        self.assertIsNot(copied, node3)
+        self.assertIsNone(copied.getparent())
+        self.assertEqual(copied.tag, '{foo}bar')
+        self.assertEqual(copied.get('StateVersion'), '2')
+
+    def test_state_node_follows_changes(self):
+        """Verify that changes without incrementState are in the node, also in copies."""
+        dc = descriptorcontainers.NumericMetricDescriptorContainer(nsmapper=self.nsmapper,
+                                                                   nodeName='MyDescriptor',
+                                                                   handle='123',
+                                                                   parentHandle='456')
+        sc = statecontainers.NumericMetricStateContainer(nsmapper=self.nsmapper, descriptorContainer=dc)
+        sc.mkMetricValue()
+        sc.metricValue.Value = 1
+        value_tag = namespaces.domTag('MetricValue')
+        self.assertEqual(sc.node.find(value_tag).get('Value'), '1')
+        sc.metricValue.Value = 99  # in place change of a sub element
+        self.assertEqual(sc.node.find(value_tag).get('Value'), '99')
+        sc.ActivationState = pmtypes.ComponentActivation.OFF
+        self.assertEqual(sc.node.get('ActivationState'), 'Off')
+        sc.BodySite.append(pmtypes.CodedValue('abc'))
+        self.assertEqual(len(sc.node.findall(namespaces.domTag('BodySite'))), 1)
+
+        for copy_node in (False, True):
+            copied = sc.mkCopy(copy_node=copy_node)
+            copied.metricValue.Value = 7
+            self.assertEqual(copied.node.find(value_tag).get('Value'), '7')
+            self.assertEqual(sc.node.find(value_tag).get('Value'), '99')
+            self.assertEqual(sc.copyStateNode().find(value_tag).get('Value'), '99')
+
+    def test_state_node_created_once(self):
+        """Verify that readers in several threads create the node of a state only once."""
+        dc = descriptorcontainers.NumericMetricDescriptorContainer(nsmapper=self.nsmapper,
+                                                                   nodeName='MyDescriptor',
+                                                                   handle='123',
+                                                                   parentHandle='456')
+        sc = statecontainers.NumericMetricStateContainer(nsmapper=self.nsmapper, descriptorContainer=dc)
+        mk_state_node = sc.mkStateNode
+
+        def slow_mk_state_node(*args, **kwargs):
+            time.sleep(0.05)
+            return mk_state_node(*args, **kwargs)
+
+        with mock.patch.object(sc, 'mkStateNode', side_effect=slow_mk_state_node) as mk:
+            nodes = []
+            threads = [threading.Thread(target=lambda: nodes.append(sc.node)) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=5)
+        self.assertEqual(mk.call_count, 1)
+        self.assertEqual(len(nodes), 4)
+        for node in nodes:
+            self.assertIs(node, nodes[0])
+
     def test_StringMetricStateContainer(self):
         dc = descriptorcontainers.StringMetricDescriptorContainer(nsmapper=self.nsmapper,
                                                                   nodeName='MyDescriptor',
@@ -813,6 +978,20 @@ class TestStateContainers(unittest.TestCase):
         self.assertEqual(len(sc2.AllowedRange), 2)
         self.assertEqual(sc.AllowedRange, sc2.AllowedRange)
 
+    def test_container_schema(self):
+        """Verify that the precompiled container schema is cached per class and lists properties root class first."""
+        schema = containerproperties.get_container_schema(statecontainers.ClockStateContainer)
+        self.assertIs(schema, containerproperties.get_container_schema(statecontainers.ClockStateContainer))
+        names = [name for name, _ in schema.properties]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(names[:len(statecontainers.AbstractStateContainer._props)],
+                         list(statecontainers.AbstractStateContainer._props))
+        self.assertEqual(names[-len(statecontainers.ClockStateContainer._props):],
+                         list(statecontainers.ClockStateContainer._props))
+        self.assertEqual(set(names), schema.property_names)
+        sc = statecontainers.ClockStateContainer(nsmapper=self.nsmapper, descriptorContainer=self.dc)
+        self.assertEqual(sc._sortedContainerProperties(), schema.properties)
+
 
 def suite():
     return unittest.TestLoader().loadTestsFromTestCase(TestStateContainers)
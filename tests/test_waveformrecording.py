@@ -0,0 +1,220 @@
+import array
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import sdc11073
+from sdc11073 import pmtypes
+from sdc11073 import samplebuffer
+from sdc11073.definitions_sdc import SDC_v1_Definitions
+from sdc11073.mdib import clientmdib
+from sdc11073.mdib import descriptorcontainers as dc
+from sdc11073.mdib import mdibbase
+from sdc11073.mdib import waveformrecording
+
+BEAT = pmtypes.Annotation(pmtypes.CodedValue('beat'))
+PACE = pmtypes.Annotation(pmtypes.CodedValue('pace', 'urn:x', '1'))
+
+
+def _annotations(i):
+    if i % 10 == 0:
+        return [BEAT]
+    if i % 25 == 0:
+        return [PACE]
+    return None
+
+
+class TestWaveformRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'recording')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _feed(self, rt_buffer, first, count):
+        rt_buffer.addRtSampleContainers(
+            [mdibbase.RtSampleContainer(float(i), 1000.0 + i * 0.01, None, _annotations(i))
+             for i in range(first, first + count)])
+
+    def test_record(self):
+        rt_buffers = {'h1': clientmdib.ClientRtBuffer(sample_period=0.01, max_samples=50)}
+        recorder = waveformrecording.WaveformRecorder(rt_buffers)
+        recorder.poll()  # nothing received yet
+        self._feed(rt_buffers['h1'], 0, 20)
+        recorder.poll()
+        self._feed(rt_buffers['h1'], 20, 30)
+        recorder.poll()
+        recorder.poll()
+        # buffers that are added later are recorded from the next poll on
+        rt_buffers['h2'] = clientmdib.ClientRtBuffer(sample_period=0.002, max_samples=50)
+        recorder.poll()
+        self._feed(rt_buffers['h2'], 0, 10)
+        recorder.poll()
+        recorder.save(self.path)
+
+        recording = waveformrecording.WaveformRecording(self.path)
+        self.assertEqual(recording.handles, ['h1', 'h2'])
+        self.assertEqual(recording.annotation_types, [BEAT.coding, PACE.coding])
+        stream = recording.streams['h1']
+        self.assertEqual((stream.sample_period, stream.start_time), (0.01, 1000.0))
+        self.assertEqual(stream.copy_samples(0, len(stream)).tolist(), [float(i) for i in range(50)])
+        self.assertEqual([(i, a.coding) for i, a in stream.annotations(0, len(stream))],
+                         [(i, _annotations(i)[0].coding) for i in range(50) if _annotations(i)])
+        self.assertEqual([i for i, _ in stream.annotations(20, 10)], [20, 25])
+        self.assertEqual(len(recording.streams['h2']), 10)
+        stream = None
+        recording.close()
+
+    def test_lost_samples(self):
+        rt_buffers = {'h1': clientmdib.ClientRtBuffer(sample_period=0.01, max_samples=50)}
+        recorder = waveformrecording.WaveformRecorder(rt_buffers)
+        self._feed(rt_buffers['h1'], 0, 50)
+        recorder.poll()
+        self._feed(rt_buffers['h1'], 50, 80)  # buffer keeps only 50 samples, 30 are lost
+        recorder.poll()
+        self.assertEqual(recorder.lost_samples, 30)
+        recorder.save(self.path)
+        recording = waveformrecording.WaveformRecording(self.path)
+        stream = recording.streams['h1']
+        self.assertEqual(stream.copy_samples(48, 3).tolist(), [48.0, 49.0, 80.0])
+        self.assertEqual([i for i, _ in stream.annotations(40, 20)], [40, 50])
+        # the samples after the loss start a new segment
+        self.assertEqual(stream.gaps(), [(50, 30)])
+        self.assertAlmostEqual(stream.timestamp(49), 1000.49)
+        self.assertAlmostEqual(stream.timestamp(50), 1000.8)
+        self.assertAlmostEqual(stream.timestamp(99), 1001.29)
+        stream = None
+        recording.close()
+
+    def test_record_array_buffers(self):
+        """ ClientRtBuffer and recording with array.array buffers (numpy is not installed or USE_NUMPY is False)"""
+        with mock.patch.object(samplebuffer, 'USE_NUMPY', False):
+            rt_buffers = {'h1': clientmdib.ClientRtBuffer(sample_period=0.01, max_samples=50)}
+            recorder = waveformrecording.WaveformRecorder(rt_buffers)
+            self._feed(rt_buffers['h1'], 0, 30)
+            recorder.poll()
+            self._feed(rt_buffers['h1'], 30, 30)
+            recorder.poll()
+            recorder.save(self.path)
+            recording = waveformrecording.WaveformRecording(self.path)
+            samples = recording.streams['h1'].copy_samples(0, 60)
+            recording.close()
+        self.assertIsInstance(samples, array.array)
+        self.assertEqual(samples.tolist(), [float(i) for i in range(60)])
+
+    def test_unknown_sample_period(self):
+        rt_buffers = {'h3': clientmdib.ClientRtBuffer(sample_period=0, max_samples=50)}
+        recorder = waveformrecording.WaveformRecorder(rt_buffers)
+        self._feed(rt_buffers['h3'], 0, 10)
+        recorder.poll()
+        self.assertRaises(ValueError, recorder.save, self.path)
+
+    def test_invalid_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 100)
+        self.assertRaises(ValueError, waveformrecording.WaveformRecording, self.path)
+
+
+class TestReplayWaveformSource(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'recording')
+        waveformrecording.write_recording(
+            self.path,
+            [('rec1', 0.01, 1000.0, samplebuffer.mkSampleBuffer(range(100)), [5, 50, 51], [0, 1, 0], []),
+             ('rec2', 0.02, 1000.0, samplebuffer.mkSampleBuffer(range(10)), [], [], []),
+             # 5 samples are missing before sample 10
+             ('rec3', 0.01, 1000.0, samplebuffer.mkSampleBuffer(range(20)), [12], [0], [(10, 1000.15)])],
+            [BEAT.coding, PACE.coding])
+        self.now = 2000.0
+        patcher = mock.patch.object(waveformrecording.time, 'time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _mk_mdib(self, source, handles):
+        mdib = sdc11073.mdib.DeviceMdibContainer(SDC_v1_Definitions, waveform_source=source)
+        mdib.descriptions.addObject(dc.MdsDescriptorContainer(mdib.nsmapper, sdc11073.namespaces.domTag('Mds'),
+                                                              handle='42', parentHandle=None))
+        for handle in handles:
+            descriptor = dc.RealTimeSampleArrayMetricDescriptorContainer(
+                mdib.nsmapper, sdc11073.namespaces.domTag('Metric'), handle=handle, parentHandle='42')
+            descriptor.SamplePeriod = 0.1
+            mdib.descriptions.addObject(descriptor)
+        mdib.mkStateContainersforAllDescriptors()
+        return mdib
+
+    def _replay(self, mdib, handle, seconds):
+        self.now += seconds + 1e-6  # no rounding down of the sample count
+        mdib.update_all_rt_samples()
+        metric_value = mdib.states.descriptorHandle.getOne(handle).metricValue
+        return (metric_value.DeterminationTime, [float(v) for v in metric_value.Samples],
+                [(a.AnnotationIndex, a.SampleIndex) for a in metric_value.ApplyAnnotations],
+                [a.coding for a in metric_value.Annotations])
+
+    def test_accelerated_replay(self):
+        source = waveformrecording.ReplayWaveformSource(self.path, speed=2.0, handles={'rec1': 'h1'})
+        mdib = self._mk_mdib(source, ['h1', 'h2'])
+        source.update_descriptors(mdib)
+        self.assertEqual(mdib.descriptions.handle.getOne('h1').SamplePeriod, 0.005)
+        self.assertEqual(mdib.descriptions.handle.getOne('h2').SamplePeriod, 0.1)  # not replayed
+        self.assertEqual(self._replay(mdib, 'h1', 0)[1], [])
+        # 0.3 seconds with speed 2 and a recorded sample period of 0.01 => 60 samples
+        determination_time, samples, apply_annotations, annotations = self._replay(mdib, 'h1', 0.3)
+        self.assertAlmostEqual(determination_time, 2000.0, places=4)
+        self.assertEqual(samples, [float(i) for i in range(60)])
+        self.assertEqual((apply_annotations, annotations), ([(0, 5), (1, 50), (0, 51)], [BEAT.coding, PACE.coding]))
+        # end of recording, replay starts again
+        determination_time, samples, apply_annotations, annotations = self._replay(mdib, 'h1', 0.3)
+        self.assertAlmostEqual(determination_time, 2000.3, places=4)
+        self.assertEqual(samples, [float(i) for i in list(range(60, 100)) + list(range(20))])
+        self.assertEqual((apply_annotations, annotations), ([(0, 45)], [BEAT.coding]))
+        source.close()
+
+    def test_replay_without_loop(self):
+        source = waveformrecording.ReplayWaveformSource(self.path, loop=False)
+        mdib = self._mk_mdib(source, ['rec1', 'rec2', 'rec3'])
+        self._replay(mdib, 'rec2', 0)
+        self.assertEqual(self._replay(mdib, 'rec2', 0.15)[1], [float(i) for i in range(7)])
+        self.assertEqual(self._replay(mdib, 'rec2', 1.0)[1], [7.0, 8.0, 9.0])
+        self.assertEqual(self._replay(mdib, 'rec2', 1.0)[1], [])
+        self.assertEqual(source.get_sample_periods(), {'rec1': 0.01, 'rec2': 0.02, 'rec3': 0.01})
+        source.close()
+
+    def test_replay_gap(self):
+        """ the replay pauses for the duration of the missing samples"""
+        source = waveformrecording.ReplayWaveformSource(self.path, loop=False)
+        mdib = self._mk_mdib(source, ['rec1', 'rec2', 'rec3'])
+        self._replay(mdib, 'rec3', 0)
+        # the sample array ends at the gap, the rest of the time is spent in the gap
+        determination_time, samples, apply_annotations, _ = self._replay(mdib, 'rec3', 0.12)
+        self.assertAlmostEqual(determination_time, 2000.0, places=4)
+        self.assertEqual(samples, [float(i) for i in range(10)])
+        determination_time, samples, apply_annotations, _ = self._replay(mdib, 'rec3', 0.08)
+        self.assertAlmostEqual(determination_time, 2000.15, places=4)
+        self.assertEqual(samples, [10.0, 11.0, 12.0, 13.0, 14.0])
+        self.assertEqual(apply_annotations, [(0, 2)])
+        determination_time, samples, _, _ = self._replay(mdib, 'rec3', 0.05)
+        self.assertAlmostEqual(determination_time, 2000.2, places=4)
+        self.assertEqual(samples, [15.0, 16.0, 17.0, 18.0, 19.0])
+        source.close()
+
+    def test_replay_gap_in_one_cycle(self):
+        """ samples before and after the gap are not in the same sample array"""
+        source = waveformrecording.ReplayWaveformSource(self.path, loop=False, handles={'rec3': 'h3'})
+        mdib = self._mk_mdib(source, ['h3'])
+        self._replay(mdib, 'h3', 0)
+        determination_time, samples, _, _ = self._replay(mdib, 'h3', 0.3)
+        self.assertAlmostEqual(determination_time, 2000.0, places=4)
+        self.assertEqual(samples, [float(i) for i in range(10)])
+        determination_time, samples, _, _ = self._replay(mdib, 'h3', 0)
+        self.assertAlmostEqual(determination_time, 2000.15, places=4)
+        self.assertEqual(samples, [float(i) for i in range(10, 20)])
+        source.close()
@@ -0,0 +1,90 @@
+import array
+import itertools
+import unittest
+from unittest import mock
+
+from sdc11073 import pmtypes
+from sdc11073 import samplebuffer
+from sdc11073.mdib import devicewaveform
+from sdc11073.sdcdevice import waveforms
+
+
+class TestWaveformGenerators(unittest.TestCase):
+    # block sizes within one period, over the end of a period and over several periods
+    counts = (0, 1, 7, 42, 50, 49, 120, 0, 3, 251)
+
+    def test_next_sample_block(self):
+        for generator_cls, values_generator in ((waveforms.SinusGenerator, waveforms.sinus),
+                                                (waveforms.SawtoothGenerator, waveforms.sawtooth),
+                                                (waveforms.TriangleGenerator, waveforms.triangle)):
+            generator = generator_cls(min_value=-2, max_value=10, waveformperiod=0.5, sampleperiod=0.01)
+            # the former implementation: cycle over (value, start of period flag) tuples
+            values = values_generator(-2, 10, 50)
+            former = itertools.cycle([(v, i == 0) for i, v in enumerate(values)])
+            for count in self.counts:
+                block, trigger_indices = generator.nextSampleBlock(count)
+                self.assertTrue(samplebuffer.isSampleBuffer(block))
+                expected = [next(former) for _ in range(count)]
+                self.assertEqual(block.tolist(), [e[0] for e in expected])
+                self.assertEqual(trigger_indices, [i for i, e in enumerate(expected) if e[1]])
+            self.assertEqual(generator.nextSamples(60), [next(former) for _ in range(60)])
+
+    def test_block_is_a_copy(self):
+        generator = waveforms.SawtoothGenerator(min_value=0, max_value=10, waveformperiod=0.5, sampleperiod=0.01)
+        block, _ = generator.nextSampleBlock(10)
+        block[0] = 42
+        generator.nextSampleBlock(40)
+        self.assertEqual(generator.nextSampleBlock(1)[0][0], 0.0)
+
+    @unittest.skipIf(samplebuffer.numpy is None, 'numpy is not installed')
+    def test_array_and_numpy_table(self):
+        """ the array.array table and the numpy table (numpy.resize of the rolled table) give the same blocks"""
+        with mock.patch.object(samplebuffer, 'USE_NUMPY', False):
+            array_generator = waveforms.TriangleGenerator(min_value=-2, max_value=10, waveformperiod=0.5,
+                                                          sampleperiod=0.01)
+        with mock.patch.object(samplebuffer, 'USE_NUMPY', True):
+            numpy_generator = waveforms.TriangleGenerator(min_value=-2, max_value=10, waveformperiod=0.5,
+                                                          sampleperiod=0.01)
+        for count in self.counts:
+            array_block, array_triggers = array_generator.nextSampleBlock(count)
+            numpy_block, numpy_triggers = numpy_generator.nextSampleBlock(count)
+            self.assertIsInstance(array_block, array.array)
+            self.assertIsInstance(numpy_block, samplebuffer.numpy.ndarray)
+            self.assertEqual(numpy_block.tolist(), array_block.tolist())
+            self.assertEqual(numpy_triggers, array_triggers)
+
+
+class TestRtSampleArray(unittest.TestCase):
+
+    def test_tuple_samples(self):
+        """RtSampleArray still accepts a list of (value, flag) tuples"""
+        rt_sample_array = devicewaveform.RtSampleArray(100.0, 0.1, [(1, True), (2, False), (3, True)],
+                                                       pmtypes.ComponentActivation.ON)
+        self.assertEqual(list(rt_sample_array.samples), [1.0, 2.0, 3.0])
+        self.assertEqual(rt_sample_array.trigger_indices, [0, 2])
+        self.assertEqual(rt_sample_array.get_annotation_trigger_timestamps(), [100.0, 100.2])
+        annotation = pmtypes.Annotation(pmtypes.CodedValue('a'))
+        rt_sample_array.add_annotations_at(annotation, [100.1, 101.0])
+        self.assertEqual(rt_sample_array.annotations, [annotation])
+        self.assertEqual([(a.AnnotationIndex, a.SampleIndex) for a in rt_sample_array.apply_annotations], [(0, 1)])
+
+    def test_sample_array_generator(self):
+        class _TupleGenerator:
+            """a generator that only implements nextSamples"""
+            sampleperiod = 0.01
+
+            def nextSamples(self, count):
+                return [(float(i), i % 4 == 0) for i in range(count)]
+
+        for generator in (waveforms.SawtoothGenerator(0, 4, 0.04, 0.01), _TupleGenerator()):
+            sample_array_generator = devicewaveform._SampleArrayGenerator('h', generator)
+            sample_array_generator.set_activation_state(pmtypes.ComponentActivation.ON)
+            with mock.patch.object(devicewaveform.time, 'time', return_value=sample_array_generator._last_timestamp + 0.105):
+                rt_sample_array = sample_array_generator.getNextSampleArray()
+            self.assertEqual(len(rt_sample_array.samples), 10)
+            self.assertEqual(list(rt_sample_array.samples), [0.0, 1.0, 2.0, 3.0, 0.0, 1.0, 2.0, 3.0, 0.0, 1.0]
+                             if isinstance(generator, waveforms.SawtoothGenerator) else [float(i) for i in range(10)])
+            self.assertEqual(rt_sample_array.trigger_indices, [0, 4, 8])
+            sample_array_generator.set_activation_state(pmtypes.ComponentActivation.OFF)
+            rt_sample_array = sample_array_generator.getNextSampleArray()
+            self.assertEqual((len(rt_sample_array.samples), rt_sample_array.trigger_indices), (0, []))
@@ -0,0 +1,101 @@
+import logging
+import os
+import threading
+import time
+import unittest
+
+from sdc11073 import pmtypes
+from sdc11073 import pysoap
+from sdc11073.mdib import DeviceMdibContainer
+from sdc11073.sdcdevice import SdcDevice
+from sdc11073.sdcdevice import waveforms
+from sdc11073.sdcdevice.waveformscheduler import WaveformScheduler
+from tests import mockstuff
+
+mdibFolder = os.path.dirname(__file__)
+
+
+class TestWaveformScheduler(unittest.TestCase):
+
+    def test_cohorts(self):
+        scheduler = WaveformScheduler(0.1)
+        scheduler.setLatency('pleth', 0.3)  # => 0.2
+        scheduler.setLatency('resp', 0.4)
+        sample_periods = {'ecg1': 0.001, 'ecg2': 0.001, 'pleth': 0.008, 'resp': 0.04, 'trend': 0.5}
+        schedule = [scheduler.nextHandles(sample_periods) for _ in range(8)]
+        self.assertEqual([(c.cycles, sorted(c.handles)) for c in scheduler.cohorts],
+                         [(1, ['ecg1', 'ecg2']), (2, ['pleth']), (4, ['resp', 'trend'])])
+        self.assertAlmostEqual(scheduler.cohorts[2].period, 0.4)
+        # every cycle has one report, slower cohorts are part of the report of the faster ones
+        self.assertEqual([sorted(h) for h in schedule],
+                         [['ecg1', 'ecg2', 'pleth', 'resp', 'trend'], ['ecg1', 'ecg2'], ['ecg1', 'ecg2', 'pleth'],
+                          ['ecg1', 'ecg2']] * 2)
+
+        # min. samples per report: trend has only one sample every 0.5 seconds
+        scheduler.setMinSamplesPerReport(2)
+        scheduler.nextHandles(sample_periods)
+        self.assertEqual([(c.cycles, sorted(c.handles)) for c in scheduler.cohorts],
+                         [(1, ['ecg1', 'ecg2']), (2, ['pleth']), (4, ['resp']), (8, ['trend'])])
+
+        # linked waveforms (overlapping groups) are in the cohort of the fastest one
+        scheduler.nextHandles(sample_periods, [('trend', 'resp'), ('resp', 'pleth'), ('unknown', 'ecg1')])
+        self.assertEqual([(c.cycles, sorted(c.handles)) for c in scheduler.cohorts],
+                         [(1, ['ecg1', 'ecg2']), (2, ['pleth', 'resp', 'trend'])])
+
+        # new waveform, reset of latency
+        scheduler.setLatency('pleth', None)
+        self.assertEqual(scheduler.nextHandles({'pleth': 0.008, 'co2': 0.04}), ['pleth', 'co2'])
+        self.assertEqual(len(scheduler.cohorts), 1)
+        self.assertEqual(scheduler.nextHandles({}), [])
+
+
+class TestWaveformSendCohorts(unittest.TestCase):
+    """ runs the real time sample loop of a device with the scheduler.
+    Cadence and jitter are measured by benchmarks/bench_waveformscheduler.py, they depend on the load of the machine."""
+
+    def setUp(self):
+        self.mdib = DeviceMdibContainer.fromMdibFile(os.path.join(mdibFolder, '70041_MDIB_Final.xml'))
+        self.handles = [s.descriptorHandle for s in self.mdib.states.objects if s.isRealtimeSampleArrayMetricState][:5]
+        sample_periods = (0.001, 0.001, 0.01, 0.04, 0.5)
+        for handle, sample_period in zip(self.handles, sample_periods):
+            self.mdib.registerWaveformGenerator(handle, waveforms.SinusGenerator(-10, 10, 1.0, sample_period))
+        annotation = pmtypes.Annotation(pmtypes.CodedValue('a', 'b'))
+        self.mdib.registerAnnotationGenerator(annotation, triggerHandle=self.handles[3],
+                                              annotatedHandles=self.handles[3:])
+        model = pysoap.soapenvelope.DPWSThisModel(manufacturer='ABCDEFG GmbH', manufacturerUrl='www.abcdefg.com',
+                                                  modelName='Foobar', modelNumber='1.0', modelUrl='www.abcdefg.com',
+                                                  presentationUrl='www.abcdefg.com')
+        device = pysoap.soapenvelope.DPWSThisDevice(friendlyName='Big Bang Practice', firmwareVersion='0.99',
+                                                    serialNumber='12345')
+        self.sdcDevice = SdcDevice(mockstuff.MockWsDiscovery(['5.6.7.8']), None, model, device, self.mdib,
+                                   logLevel=logging.INFO)
+
+    def tearDown(self):
+        self.sdcDevice.stopAll()
+
+    def test_cohorts_are_sent_together(self):
+        reports = []
+        lock = threading.Lock()
+
+        def _record(states, nsmapper, mdib_version_group):
+            with lock:
+                reports.append({s.descriptorHandle: len(s.metricValue.Samples) for s in states})
+
+        self.sdcDevice.subscriptionsManager.sendRealtimeSamplesReport = _record
+        scheduler = self.sdcDevice.waveformScheduler
+        scheduler.setLatency(self.handles[2], 0.2)
+        scheduler.setLatency(self.handles[3], 0.4)
+        self.sdcDevice.startAll()
+        time.sleep(1.0)
+        self.sdcDevice.stopAll()
+        self.assertEqual([(c.cycles, sorted(c.handles)) for c in scheduler.cohorts],
+                         [(1, sorted(self.handles[:2])), (2, [self.handles[2]]), (4, sorted(self.handles[3:]))])
+        with lock:
+            reports = reports[1:]  # the first report has no samples
+        for cohort in scheduler.cohorts:
+            self.assertTrue(any(cohort.handles[0] in samples for samples in reports))
+            for samples in reports:
+                # all waveforms of a cohort are always sent together
+                self.assertIn(len([h for h in cohort.handles if h in samples]), (0, len(cohort.handles)))
+        # the fastest cohort is in every report
+        self.assertTrue(all(self.handles[0] in samples for samples in reports))
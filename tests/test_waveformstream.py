@@ -0,0 +1,99 @@
+import os
+import time
+import unittest
+from unittest import mock
+
+from lxml import etree as etree_
+
+from sdc11073 import dataconverters
+from sdc11073 import pmtypes
+from sdc11073.mdib import DeviceMdibContainer
+from sdc11073.mdib import waveformstream
+from sdc11073.sdcdevice import waveforms
+from sdc11073.sdcdevice.subscriptionmgr import SubscriptionsManager
+
+mdibFolder = os.path.dirname(__file__)
+
+
+class _RtRecorder(object):
+    """ stands in for the sdc device: records the real time sample updates of the mdib, ignores all other reports"""
+
+    def __init__(self):
+        self.updates = []
+
+    def sendRealtimeSamplesStateUpdates(self, mdib_version_group, updates):
+        self.updates.append((mdib_version_group, updates))
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class TestWaveformStreamEncoder(unittest.TestCase):
+
+    def setUp(self):
+        self.mdib = DeviceMdibContainer.fromMdibFile(os.path.join(mdibFolder, '70041_MDIB_Final.xml'))
+        self.handles = [s.descriptorHandle for s in self.mdib.states.objects if s.isRealtimeSampleArrayMetricState][:6]
+        for i, handle in enumerate(self.handles):
+            generator_cls = (waveforms.SinusGenerator, waveforms.TriangleGenerator, waveforms.SawtoothGenerator)[i % 3]
+            self.mdib.registerWaveformGenerator(handle, generator_cls(-30, 30, 0.05, 0.001))
+        annotation = pmtypes.Annotation(pmtypes.CodedValue('a', 'b'))
+        self.mdib.registerAnnotationGenerator(annotation, triggerHandle=self.handles[0],
+                                              annotatedHandles=self.handles[:3])
+        self.recorder = _RtRecorder()
+        self.mdib._sdcDevice = self.recorder
+        self.nsmap = self.mdib.nsmapper.partialMap(*SubscriptionsManager.BodyNodePrefixes)
+
+    def _tick(self):
+        time.sleep(0.01)
+        self.mdib.update_all_rt_samples()
+        return self.recorder.updates[-1]
+
+    def _verify_ticks(self, encoder, count):
+        for _ in range(count):
+            mdib_version_group, states = self._tick()
+            generic = waveformstream.mkWaveformStreamGeneric(
+                [s.mkCopy(copy_node=False) for s in states], self.nsmap, mdib_version_group)
+            node = encoder.mkWaveformStream(states, self.nsmap, mdib_version_group)
+            self.assertEqual(etree_.tostring(node), etree_.tostring(generic))
+
+    def test_byte_identical(self):
+        encoder = waveformstream.WaveformStreamEncoder()
+        self._verify_ticks(encoder, 10)
+        # one template per state, annotated states have a second one
+        self.assertLessEqual(encoder.misses, len(self.handles) + 3)
+        self.assertGreater(encoder.hits, encoder.misses)
+        annotated = [s for _, states in self.recorder.updates for s in states if s.metricValue.ApplyAnnotations]
+        self.assertGreater(len(annotated), 0)
+
+        # changed static values => new templates
+        self.mdib.setWaveformGeneratorActivationState(self.handles[1], pmtypes.ComponentActivation.OFF)
+        with self.mdib.mdibUpdateTransaction() as tr:
+            descriptor = tr.getDescriptor(self.handles[2])
+            descriptor.SamplePeriod = 0.001  # new DescriptorVersion
+        self._verify_ticks(encoder, 3)
+        self.mdib.setWaveformGeneratorActivationState(self.handles[1], pmtypes.ComponentActivation.ON)
+        self._verify_ticks(encoder, 3)
+
+        with dataconverters.numericMode(dataconverters.NUMERIC_FLOAT):
+            self._verify_ticks(encoder, 3)
+
+    def test_subscriptions_manager(self):
+        """the subscriptions manager sends the same WaveformStream with and without templates"""
+        bodies = []
+
+        def _send(subscription, body_node, action, doc_nsmap):
+            bodies.append(etree_.tostring(body_node))
+
+        managers = [SubscriptionsManager(None, self.mdib.sdc_definitions, [], numeric_mode=self.mdib.numeric_mode)
+                    for _ in range(2)]
+        managers[1].USE_WAVEFORM_TEMPLATES = False
+        for manager in managers:
+            manager._getSubscriptionsForAction = lambda action: [mock.Mock()]
+            manager._sendNotificationReport = _send
+        for _ in range(5):
+            mdib_version_group, states = self._tick()
+            for manager in managers:
+                manager.sendRealtimeSamplesReport(states, self.mdib.nsmapper, mdib_version_group)
+            self.assertEqual(bodies[-1], bodies[-2])
+        self.assertGreater(managers[0]._waveformStreamEncoder.hits, 0)
+        self.assertEqual(managers[1]._waveformStreamEncoder.hits, 0)